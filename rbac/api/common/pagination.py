@@ -16,11 +16,17 @@
 #
 
 """Common pagination class."""
+import base64
+import binascii
+import json
 import logging
 import re
 from urllib.parse import urlparse
 
-from rest_framework.pagination import LimitOffsetPagination
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
 from rest_framework.response import Response
 from rest_framework.utils.urls import replace_query_param
 
@@ -29,10 +35,27 @@ logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 
 class StandardResultsSetPagination(LimitOffsetPagination):
-    """Create standard pagination class with page size."""
+    """
+    Create standard pagination class with page size.
+
+    Views declaring a cursor_ordering also accept the cursor query parameter, which switches the request to
+    KeysetPagination.
+    """
 
     default_limit = 10
     max_limit = 1000
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate the queryset, with a cursor when requested and supported by the view."""
+        if (
+            getattr(view, "cursor_ordering", None)
+            and KeysetPagination.cursor_query_param in request.query_params
+            and isinstance(queryset, QuerySet)
+        ):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
 
     @staticmethod
     def link_rewrite(request, link):
@@ -79,6 +102,8 @@ class StandardResultsSetPagination(LimitOffsetPagination):
 
     def get_paginated_response(self, data):
         """Override pagination output."""
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
         return Response(
             {
                 "meta": {"count": self.count, "limit": self.limit, "offset": self.offset},
@@ -100,3 +125,115 @@ class WSGIRequestResultsSetPagination(StandardResultsSetPagination):
         """Get limit from query params."""
         request.query_params = request.GET
         return super().get_limit(request)
+
+
+def _cursor_value(value):
+    """Encode the ordering values which JSON does not support, such as dates and UUIDs."""
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward only keyset pagination, requested with the cursor query parameter.
+
+    The cursor is an opaque token holding the ordering values of the last item of the previous page, which is
+    resumed with a WHERE clause rather than an OFFSET, so that every page costs the same whatever its depth. The first
+    page is requested with an empty cursor. The view's cursor_ordering lists ascending fields, such as
+    ("created", "id"), and "id" is appended as the final tiebreaker unless already present, so that the ordering is
+    always unique. Passing count=false skips counting the rows, for clients walking every page.
+    """
+
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    limit_query_param = "limit"
+    default_limit = 10
+    max_limit = 1000
+    ordering = ("created", "id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the page of the queryset following the cursor."""
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = tuple(getattr(view, "cursor_ordering", self.ordering))
+        if "id" not in self.ordering:
+            self.ordering += ("id",)
+        self.count = None
+        if request.query_params.get(self.count_query_param, "").lower() != "false":
+            self.count = queryset.count()
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        results = list(queryset[: self.limit + 1])
+        self.has_next = len(results) > self.limit
+        results = results[: self.limit]
+        self.next_position = [getattr(results[-1], field) for field in self.ordering] if self.has_next else None
+        return results
+
+    def get_limit(self, request):
+        """Get the page size from the query parameters."""
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return min(limit, self.max_limit) if limit > 0 else self.default_limit
+
+    def after(self, position):
+        """Build the condition selecting the rows ordered after the given position."""
+        # (a, b) > (x, y) expands to a > x OR (a = x AND b > y), which the index on the ordering can serve.
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            condition |= Q(**dict(zip(self.ordering[:index], position)), **{f"{field}__gt": position[index]})
+        return condition
+
+    def encode_cursor(self, position):
+        """Encode a position into an opaque cursor."""
+        # Dates keep their microseconds, which DjangoJSONEncoder would truncate.
+        return base64.urlsafe_b64encode(json.dumps(position, default=_cursor_value).encode()).decode()
+
+    def decode_cursor(self, request, model):
+        """Decode the cursor of the request into a position, None for the first page."""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError(cursor)
+            return [model._meta.get_field(field).to_python(value) for field, value in zip(self.ordering, position)]
+        except (binascii.Error, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_first_link(self):
+        """Create the link to the first page."""
+        url = self.request.build_absolute_uri()
+        first_link = replace_query_param(url, self.cursor_query_param, "")
+        first_link = replace_query_param(first_link, self.limit_query_param, self.limit)
+        return StandardResultsSetPagination.link_rewrite(self.request, first_link)
+
+    def get_next_link(self):
+        """Create the link to the next page, if any."""
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        next_link = replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+        next_link = replace_query_param(next_link, self.limit_query_param, self.limit)
+        return StandardResultsSetPagination.link_rewrite(self.request, next_link)
+
+    def get_paginated_response(self, data):
+        """Paginate in the same format as StandardResultsSetPagination, without the links needing an offset."""
+        meta = {"limit": self.limit} if self.count is None else {"count": self.count, "limit": self.limit}
+        return Response(
+            {
+                "meta": meta,
+                "links": {
+                    "first": self.get_first_link(),
+                    "next": self.get_next_link(),
+                    "previous": None,
+                    "last": None,
+                },
+                "data": data,
+            }
+        )
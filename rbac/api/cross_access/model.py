@@ -17,13 +17,17 @@
 
 """Models to store cross account access request."""
 import datetime
+import logging
 from uuid import uuid4
 
 from django.db import models
+from django.db.models import signals
 from django.utils import timezone
+from management.cache import INVALIDATION_COLLECTOR, connect_access_cache_signals
 from management.rbac_fields import AutoDateTimeField
 from rest_framework.serializers import ValidationError
 
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 STATUS_LIST = ["pending", "cancelled", "approved", "denied", "expired"]
 
@@ -83,3 +87,24 @@ class RequestsRoles(models.Model):
     role = models.ForeignKey(
         "management.Role", on_delete=models.CASCADE, to_field="uuid", related_name="cross_account_requests"
     )
+
+
+def cross_account_request_cache_handler(sender=None, instance=None, using=None, **kwargs):
+    """Signal handler to purge the access of the cross-account principal when its request changes."""
+    # Imported lazily since the principal model depends on this module through api.models.
+    from management.principal.model import Principal
+
+    logger.info("Handling signal for cross-account request %s - invalidating policy cache", instance.pk)
+    INVALIDATION_COLLECTOR.add_principals(
+        instance.target_org,
+        Principal.objects.filter(
+            username=f"{instance.target_org}-{instance.user_id}",
+            cross_account=True,
+            tenant__org_id=instance.target_org,
+        ).values_list("uuid", flat=True),
+    )
+
+
+if connect_access_cache_signals():
+    signals.post_save.connect(cross_account_request_cache_handler, sender=CrossAccountRequest)
+    signals.pre_delete.connect(cross_account_request_cache_handler, sender=CrossAccountRequest)
@@ -65,7 +65,7 @@ class RelationApiDualWriteCrossAccessHandler(RelationApiDualWriteSubjectHandler)
         if not self.replication_enabled():
             return
         try:
-            self._replicator.replicate(
+            self._replicator.replicate_changes(
                 ReplicationEvent(
                     event_type=self.event_type,
                     info={
@@ -73,7 +73,7 @@ class RelationApiDualWriteCrossAccessHandler(RelationApiDualWriteSubjectHandler)
                         "roles": [role.uuid for role in self.cross_account_request.roles.all()],
                         "target_org": self.cross_account_request.target_org,
                     },
-                    partition_key=PartitionKey.byEnvironment(),
+                    partition_key=PartitionKey.byTenant(self.cross_account_request.target_org),
                     remove=self.relations_to_remove,
                     add=self.relations_to_add,
                 ),
@@ -15,16 +15,38 @@
 #    along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Producer to send messages to kafka server."""
+import atexit
 import json
 import logging
+import os
+import queue
+import threading
+import time
+import weakref
 
+from core.utils import transaction_batch
 from django.conf import settings
 from kafka import KafkaProducer
 from kafka.errors import KafkaError
+from prometheus_client import Counter, Gauge, Histogram
 
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+kafka_produce_seconds = Histogram(
+    "rbac_kafka_produce_seconds",
+    "Time from handing a Kafka message to the producer until the broker acknowledged it",
+    ["topic"],
+)
+kafka_messages_total = Counter(
+    "rbac_kafka_messages_total", "Kafka messages handed to the producer, by outcome", ["topic", "result"]
+)
+kafka_producer_queue_size = Gauge(
+    "rbac_kafka_producer_queue_size", "Kafka messages waiting to be produced", multiprocess_mode="livesum"
+)
+
+_PRODUCERS = weakref.WeakSet()
+
 
 class FakeKafkaProducer:
     """Fake kafka producer to enable local development without kafka server."""
@@ -34,44 +56,242 @@ class FakeKafkaProducer:
         pass
 
 
+def kafka_disabled():
+    """Return whether messages go to a fake producer instead of a Kafka server."""
+    return settings.DEVELOPMENT or settings.MOCK_KAFKA or not settings.KAFKA_ENABLED
+
+
 class RBACProducer:
-    """Kafka message producer to emit events to notification service."""
+    """
+    Kafka message producer to emit events to notification service.
+
+    Messages are handed to a bounded queue drained by a background thread, so that request threads neither encode
+    them nor wait on the broker, which the Kafka client does when it has to fetch metadata or its buffer is full.
+    The client itself batches the messages, lingering for up to KAFKA_PRODUCER_LINGER_MS. Like the HTTP clients, the
+    queue, its thread and the client are recreated in forked workers. When the queue is full, request threads wait
+    up to KAFKA_PRODUCER_QUEUE_TIMEOUT for room before the message is dropped and counted as such. When the client
+    cannot be created, the message fails and the next one tries again, after a backoff growing up to
+    KAFKA_PRODUCER_RETRY_BACKOFF_MAX.
+    """
+
+    def __init__(self):
+        """Init the producer, which connects once the first message is sent."""
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._retry_at = 0.0
+        _PRODUCERS.add(self)
+
+    def _producer_config(self):
+        """Return the arguments of the Kafka client."""
+        config = dict(getattr(settings, "KAFKA_AUTH", None) or {})
+        if not config:
+            if not settings.KAFKA_SERVERS:
+                raise AttributeError("Empty servers list")
+            config["bootstrap_servers"] = settings.KAFKA_SERVERS
+        config.update(
+            linger_ms=settings.KAFKA_PRODUCER_LINGER_MS,
+            batch_size=settings.KAFKA_PRODUCER_BATCH_SIZE,
+            compression_type=settings.KAFKA_PRODUCER_COMPRESSION or None,
+        )
+        return config
 
     def get_producer(self):
         """Init method to return fake kafka when flag is set to false."""
         if not hasattr(self, "producer"):
             retries = 0
             max_retries = 5
-            if settings.DEVELOPMENT or settings.MOCK_KAFKA or not settings.KAFKA_ENABLED:
+            if kafka_disabled():
                 self.producer = FakeKafkaProducer()
                 logger.info("Fake Kafka producer initialized in development mode")
             else:
+                if time.monotonic() < self._retry_at:
+                    raise KafkaError("Kafka producer initialization is backing off")
                 while retries <= max_retries:
                     try:
-                        if settings.KAFKA_AUTH:
-                            self.producer = KafkaProducer(**settings.KAFKA_AUTH)
-                            logger.info("Kafka producer initialized successfully")
-                            return self.producer
-                        elif not settings.KAFKA_SERVERS:
-                            raise AttributeError("Empty servers list")
-                        else:
-                            self.producer = KafkaProducer(bootstrap_servers=settings.KAFKA_SERVERS)
-                            return self.producer
+                        self.producer = KafkaProducer(**self._producer_config())
+                        self._failures = 0
+                        logger.info("Kafka producer initialized successfully")
+                        return self.producer
                     except KafkaError as e:
                         logger.error(f"Kafka error during initialization of Kafka producer: {e}")
                         retries += 1
                     except Exception as e:
                         logger.error(f"Non Kafka error occurred during initialization of Kafka producer: {e}")
                         retries += 1
+                backoff = min(
+                    settings.KAFKA_PRODUCER_RETRY_BACKOFF * 2**self._failures,
+                    settings.KAFKA_PRODUCER_RETRY_BACKOFF_MAX,
+                )
+                self._failures += 1
+                self._retry_at = time.monotonic() + backoff
+                raise KafkaError(f"Kafka producer could not be initialized, retrying in {backoff} seconds")
         return self.producer
 
+    def _sender(self):
+        """Return the queue of this process, starting the thread draining it on first use."""
+        with self._lock:
+            if self._pid != os.getpid():
+                if self._pid is not None and hasattr(self, "producer"):
+                    # The client of the parent process cannot be used across a fork.
+                    del self.producer
+                self._queue = queue.Queue(maxsize=settings.KAFKA_PRODUCER_QUEUE_SIZE)
+                self._thread = threading.Thread(target=self._drain, args=(self._queue,), daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+            return self._queue
+
+    def _drain(self, messages):
+        """Produce the queued messages until the queue is closed."""
+        while True:
+            item = messages.get()
+            if item is None:
+                messages.task_done()
+                return
+            kafka_producer_queue_size.dec()
+            try:
+                self._produce(*item)
+            finally:
+                messages.task_done()
+
+    def _produce(self, topic, message, headers, queued_at):
+        """Encode the message and hand it to the Kafka client, recording its delivery."""
+        try:
+            json_data = json.dumps(message).encode("utf-8")
+            future = self.get_producer().send(topic, value=json_data, headers=headers)
+        except Exception as e:
+            kafka_messages_total.labels(topic=topic, result="failed").inc()
+            logger.error(f"Failed to produce message to topic {topic}: {e}")
+            return
+        if future is not None:
+            future.add_callback(self._on_delivery, topic, queued_at)
+            future.add_errback(self._on_error, topic)
+
+    def _on_delivery(self, topic, queued_at, metadata):
+        """Record a message acknowledged by the broker."""
+        kafka_messages_total.labels(topic=topic, result="sent").inc()
+        kafka_produce_seconds.labels(topic=topic).observe(time.perf_counter() - queued_at)
+
+    def _on_error(self, topic, error):
+        """Record a message the broker failed to acknowledge."""
+        kafka_messages_total.labels(topic=topic, result="failed").inc()
+        logger.error(f"Failed to deliver message to topic {topic}: {error}")
+
     def send_kafka_message(self, topic, message, headers=None):
         """Send message to kafka server."""
-        producer = self.get_producer()
-        json_data = json.dumps(message).encode("utf-8")
         if headers and not isinstance(headers, list):
             headers = [headers]
-        producer.send(topic, value=json_data, headers=headers)
+        if not settings.KAFKA_PRODUCER_ASYNC or kafka_disabled():
+            self._produce(topic, message, headers, time.perf_counter())
+            return
+        kafka_producer_queue_size.inc()
+        try:
+            self._sender().put(
+                (topic, message, headers, time.perf_counter()), timeout=settings.KAFKA_PRODUCER_QUEUE_TIMEOUT
+            )
+        except queue.Full:
+            kafka_producer_queue_size.dec()
+            kafka_messages_total.labels(topic=topic, result="dropped").inc()
+            logger.error(f"Kafka producer queue is full, dropping message to topic {topic}")
+
+    def flush(self, timeout=None):
+        """Produce the queued messages and wait for the broker to acknowledge them."""
+        with self._lock:
+            running = self._pid == os.getpid()
+            messages = self._queue
+        if running:
+            messages.join()
+        producer = getattr(self, "producer", None)
+        if producer is not None and not isinstance(producer, FakeKafkaProducer):
+            producer.flush(timeout=timeout)
+
+    def close(self, timeout=None):
+        """Produce the queued messages, then stop the thread and close the Kafka client of this process."""
+        with self._lock:
+            running = self._pid == os.getpid()
+            messages, thread = self._queue, self._thread
+            self._queue = self._thread = self._pid = None
+        if running:
+            messages.put(None)
+            thread.join(timeout)
+        producer = getattr(self, "producer", None)
+        if running and producer is not None and not isinstance(producer, FakeKafkaProducer):
+            producer.close(timeout=timeout)
+            del self.producer
+
+    def send_kafka_messages(self, topic, messages):
+        """Send a batch of (message, headers) pairs to kafka server."""
+        for message, headers in messages:
+            self.send_kafka_message(topic, message, headers)
+
+
+class _MessageBatch:
+    """Kafka messages collected for a single transaction."""
+
+    def __init__(self):
+        """Init an empty batch."""
+        self.messages = {}
+        self.flushed = False
+
+    def flush(self):
+        """Send everything collected in order, one batch per run of messages to the same producer and topic."""
+        self.flushed = True
+        batches = []
+        for producer, topic, message, headers in self.messages.values():
+            if not batches or batches[-1][:2] != (producer, topic):
+                batches.append((producer, topic, []))
+            batches[-1][2].append((message, headers))
+        self.messages.clear()
+        for producer, topic, messages in batches:
+            try:
+                producer.send_kafka_messages(topic, messages)
+            except Exception:
+                logger.exception(f"Failed to send {len(messages)} messages to topic {topic}")
+
+
+class MessageBuffer:
+    """
+    Coalesce the Kafka messages sent by the signal handlers.
+
+    Inside a transaction the messages are accumulated and sent once the outermost transaction commits; nothing is
+    sent if it rolls back. Messages given the same key replace each other, so that an object changed many times in a
+    transaction is announced once, with its last state, at the position of its first message. Outside of a
+    transaction the messages are sent right away.
+    """
+
+    def __init__(self):
+        """Init the per thread state."""
+        self._local = threading.local()
+
+    def _batch(self):
+        """Return the batch of the current transaction, or None when in autocommit mode."""
+        return transaction_batch(self._local, _MessageBatch)
+
+    def send(self, producer, topic, message, headers=None, key=None):
+        """Send the message through the producer once the current transaction commits."""
+        batch = self._batch()
+        if batch is None:
+            producer.send_kafka_message(topic, message, headers)
+            return
+        key = (topic, key) if key is not None else object()
+        batch.messages[key] = (producer, topic, message, headers)
+
+
+MESSAGE_BUFFER = MessageBuffer()
+
+
+def close_producers():
+    """Produce the messages still queued by every producer of this process, called when a worker shuts down."""
+    for producer in list(_PRODUCERS):
+        try:
+            producer.close(timeout=settings.KAFKA_PRODUCER_CLOSE_TIMEOUT)
+        except Exception:
+            logger.exception("Failed to close Kafka producer")
+
+
+atexit.register(close_producers)
 
 
 """
@@ -20,6 +20,7 @@ import datetime
 
 import pytz
 from django.conf import settings
+from django.db import transaction
 
 
 def destructive_ok(operation_type):
@@ -31,3 +32,33 @@ def destructive_ok(operation_type):
         return now < settings.DESTRUCTIVE_SEEDING_OK_UNTIL
 
     return False
+
+
+def pending_on_commit_callbacks(using=None):
+    """
+    Return the callbacks registered with transaction.on_commit() which are still pending.
+
+    Django keeps them in the private connection.run_on_commit list of (savepoint ids, callback, robust) entries. A
+    callback leaves the list when a savepoint it was registered in is rolled back, and every callback does once the
+    transaction commits or rolls back, which lets callers tell whether a callback will still run. This is the only
+    place which relies on that list.
+    """
+    return [entry[1] for entry in transaction.get_connection(using).run_on_commit]
+
+
+def transaction_batch(local, factory):
+    """
+    Return the batch of the current transaction, or None when in autocommit mode.
+
+    The batch is kept in the thread local, and a new one is made by factory() whenever the batch held there is no
+    longer pending. The flush() method of a new batch is registered to run once the transaction commits, and is
+    expected to set its flushed attribute, so that a batch is not reused once flushed.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        return None
+    batch = getattr(local, "batch", None)
+    if batch is None or batch.flushed or batch.flush not in pending_on_commit_callbacks():
+        batch = factory()
+        local.batch = batch
+        transaction.on_commit(batch.flush, robust=True)
+    return batch
@@ -21,7 +21,21 @@ threads = int(os.environ.get("GUNICORN_THREAD_LIMIT", 10))
 limit_request_field_size = 16380
 
 
+def post_fork(server, worker):
+    """Drop the gRPC channels inherited from the arbiter, which cannot be used across a fork."""
+    from management.grpc_channels import GRPC_CHANNELS
+
+    GRPC_CHANNELS.reset()
+
+
 def child_exit(server, worker):
     """Watches for workers to exit and marks them as dead in prometheus."""
     # See: https://prometheus.github.io/client_python/multiprocess/
     multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    """Produce the Kafka messages still queued by the worker before it exits."""
+    from core.kafka import close_producers
+
+    close_producers()
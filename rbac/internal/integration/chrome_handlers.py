@@ -16,12 +16,13 @@
 #
 
 """Notification handlers of object change."""
+import copy
 import json
 import logging
 import os
 from uuid import uuid4
 
-from core.kafka import RBACProducer
+from core.kafka import MESSAGE_BUFFER, RBACProducer
 from django.conf import settings
 from django.utils import timezone
 
@@ -35,7 +36,7 @@ with open(os.path.join(settings.BASE_DIR, "internal", "integration", "chrome_mes
 
 def build_chrome_message(event_type, uuid, org_id):
     """Create message based on template."""
-    message = message_template
+    message = copy.deepcopy(message_template)
     message["id"] = str(uuid4())
     message["time"] = timezone.now().isoformat()
     message["data"]["organizations"] = [org_id]
@@ -48,4 +49,4 @@ def build_chrome_message(event_type, uuid, org_id):
 def send_chrome_message(event_type, uuid, org_id):
     """Build and send chrome message."""
     chrome_message = build_chrome_message(event_type, uuid, org_id)
-    chrome_producer.send_kafka_message(chrome_topic, chrome_message)
+    MESSAGE_BUFFER.send(chrome_producer, chrome_topic, chrome_message, key=(event_type, str(uuid)))
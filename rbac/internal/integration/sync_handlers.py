@@ -16,12 +16,13 @@
 #
 
 """Notification handlers of object change."""
+import copy
 import json
 import logging
 import os
 from datetime import datetime
 
-from core.kafka import RBACProducer
+from core.kafka import MESSAGE_BUFFER, RBACProducer
 from django.conf import settings
 
 
@@ -35,14 +36,20 @@ with open(os.path.join(settings.BASE_DIR, "internal", "integration", "message_te
 
 def build_sync_message(event_type, payload):
     """Create message based on template."""
-    message = message_template
+    message = copy.deepcopy(message_template)
     message["event_type"] = event_type
     message["timestamp"] = datetime.now().isoformat()
     message["events"][0]["payload"] = payload
     return message
 
 
+def sync_message_key(event_type, payload):
+    """Key the messages about the same role or group, which are identical but for the name of the object."""
+    obj = payload.get("role") or payload.get("group") or {}
+    return (event_type, obj.get("uuid"), payload.get("action"))
+
+
 def send_sync_message(event_type, payload):
     """Build and send external service sync message."""
     sync_message = build_sync_message(event_type, payload)
-    sync_producer.send_kafka_message(sync_topic, sync_message)
+    MESSAGE_BUFFER.send(sync_producer, sync_topic, sync_message, key=sync_message_key(event_type, payload))
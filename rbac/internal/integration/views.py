@@ -55,6 +55,7 @@ class TenantViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
     serializer_class = TenantSerializer
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = TenantFilter
+    cursor_ordering = ("id",)
 
     def list(self, request, *args, **kwargs):
         """Tenant list."""
@@ -15,14 +15,17 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Classes to handle JWT token generation and management."""
-import http.client
-import json
 import logging
 
+import requests
 from django.conf import settings
+from management.http_client import HTTPClient
 
 logger = logging.getLogger(__name__)
 
+# Token requests only grant a new token, so they are safe to retry
+SSO_CLIENT = HTTPClient("sso", settings.SSO_TIMEOUT_SECONDS, allowed_methods=("POST",))
+
 
 class JWTProvider:
     """Class to handle creation of JWT token."""
@@ -42,9 +45,9 @@ class JWTProvider:
         self.connection = None
 
     def get_conn(self):
-        """Get connection to sso stage."""
+        """Get the pooled client of sso stage."""
         if settings.REDHAT_SSO is not None:
-            self.connection = http.client.HTTPSConnection(settings.REDHAT_SSO)
+            self.connection = SSO_CLIENT
         return self.connection
 
     def get_jwt_token(self, client_id, client_secret):
@@ -67,13 +70,23 @@ class JWTProvider:
 
         headers = {"content-type": "application/x-www-form-urlencoded"}
 
-        connection.request("POST", settings.OPENID_URL, payload, headers)
-
-        res = connection.getresponse()
-        data = res.read()
-        json_data = json.loads(data)
-
-        token = json_data["access_token"]
+        try:
+            response = connection.post(
+                f"https://{settings.REDHAT_SSO}{settings.OPENID_URL}", data=payload, headers=headers
+            )
+        except requests.exceptions.RequestException as err:
+            logger.error(f"Unable to request a token from SSO: {err}")
+            return None
+        if not response.ok:
+            logger.error(f"Unable to request a token from SSO, status: {response.status_code}")
+            return None
+        try:
+            token = response.json().get("access_token")
+        except ValueError as err:
+            logger.error(f"Unable to decode the token response of SSO: {err}")
+            return None
+        if not token:
+            logger.error("The token response of SSO has no access token.")
         return token
 
 
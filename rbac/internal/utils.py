@@ -18,14 +18,13 @@
 """Utilities for Internal RBAC use."""
 import json
 import logging
-from contextlib import contextmanager
 
-import grpc
 import jsonschema
 from django.db import transaction
 from django.urls import resolve
 from internal.schemas import INVENTORY_INPUT_SCHEMAS, RELATION_INPUT_SCHEMAS
 from jsonschema import validate
+from kessel.relations.v1beta1.common_pb2 import Relationship
 from management.models import Workspace
 from management.relation_replicator.logging_replicator import stringify_spicedb_relationship
 from management.relation_replicator.outbox_replicator import OutboxReplicator
@@ -38,13 +37,6 @@ from api.models import User
 logger = logging.getLogger(__name__)
 
 
-@contextmanager
-def create_client_channel(addr):
-    """Create secure channel for grpc requests."""
-    secure_channel = grpc.insecure_channel(addr)
-    yield secure_channel
-
-
 def build_internal_user(request, json_rh_auth):
     """Build user object for internal requests."""
     user = User()
@@ -92,16 +84,22 @@ def delete_bindings(bindings):
     if bindings:
         with transaction.atomic():
             relations_to_remove = []
+            relations_by_partition: dict[str, tuple[PartitionKey, list[Relationship]]] = {}
             for binding in bindings:
-                relations_to_remove.extend(binding.as_tuples())
-            replicator.replicate(
-                ReplicationEvent(
-                    event_type=ReplicationEventType.DELETE_BINDING_MAPPINGS,
-                    info=info,
-                    partition_key=PartitionKey.byEnvironment(),
-                    remove=relations_to_remove,
-                ),
-            )
+                relations = binding.as_tuples()
+                relations_to_remove.extend(relations)
+                partition_key = binding.partition_key()
+                relations_by_partition.setdefault(str(partition_key), (partition_key, []))[1].extend(relations)
+            # The bindings of each tenant are replicated through the partition of that tenant.
+            for partition_key, relations in relations_by_partition.values():
+                replicator.replicate(
+                    ReplicationEvent(
+                        event_type=ReplicationEventType.DELETE_BINDING_MAPPINGS,
+                        info=info,
+                        partition_key=partition_key,
+                        remove=relations,
+                    ),
+                )
             bindings.delete()
         info["relations"] = [stringify_spicedb_relationship(relation) for relation in relations_to_remove]
     return info
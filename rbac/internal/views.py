@@ -19,9 +19,7 @@
 import json
 import logging
 import uuid
-from contextlib import contextmanager
 
-import grpc
 import requests
 from core.utils import destructive_ok
 from django.conf import settings
@@ -73,7 +71,11 @@ from management.principal.proxy import (
     bop_request_time_tracking,
 )
 from management.relation_replicator.outbox_replicator import OutboxReplicator
-from management.relation_replicator.relation_replicator import PartitionKey, ReplicationEvent, ReplicationEventType
+from management.relation_replicator.relation_replicator import (
+    DualWriteException,
+    ReplicationEvent,
+    ReplicationEventType,
+)
 from management.role.definer import delete_permission
 from management.role.model import Access
 from management.role.serializer import BindingMappingSerializer
@@ -86,6 +88,7 @@ from management.tasks import (
 )
 from management.tenant_service.v2 import V2TenantBootstrapService
 from management.utils import (
+    create_client_channel,
     get_principal,
     groups_for_principal,
 )
@@ -116,13 +119,6 @@ GroupPrincipalChecker = GroupPrincipalInventoryChecker()
 WorkspaceRelationChecker = WorkspaceRelationInventoryChecker()
 
 
-@contextmanager
-def create_client_channel(addr):
-    """Create secure channel for grpc requests."""
-    secure_channel = grpc.insecure_channel(addr)
-    yield secure_channel
-
-
 def tenant_is_modified(tenant_name=None, org_id=None):
     """Determine whether or not the tenant is modified."""
     # we need to check if the schema exists because if we don't, and it doesn't exist,
@@ -929,7 +925,10 @@ def list_or_delete_bindings_for_role(request, role_uuid):
         result = serializer.data or []
         return HttpResponse(json.dumps(result), content_type="application/json", status=200)
     else:
-        info = delete_bindings(bindings)
+        try:
+            info = delete_bindings(bindings)
+        except DualWriteException as e:
+            return handle_error(str(e), 400)
         return HttpResponse(json.dumps(info), status=200)
 
 
@@ -983,7 +982,7 @@ def clean_binding_mapping(request, binding_id):
                             info={
                                 "users": mapping.mappings["users"],
                             },
-                            partition_key=PartitionKey.byEnvironment(),
+                            partition_key=mapping.partition_key(),
                             remove=relations_to_remove,
                             add=[],
                         ),
@@ -1016,7 +1015,7 @@ def clean_binding_mapping(request, binding_id):
                             info={
                                 "groups": missing_groups,
                             },
-                            partition_key=PartitionKey.byEnvironment(),
+                            partition_key=mapping.partition_key(),
                             remove=relations_to_remove,
                             add=[],
                         ),
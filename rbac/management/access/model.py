@@ -0,0 +1,175 @@
+#
+# Copyright 2025 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Model for the materialized effective access of principals."""
+import logging
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+from management.permission.model import Permission
+from management.principal.model import Principal
+
+from api.models import Tenant, TenantAwareModel
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# Application key used for requests which do not filter on any application.
+ALL_APPLICATIONS = ""
+
+
+class EffectiveAccess(TenantAwareModel):
+    """
+    The serialized access list a principal is granted for a single application.
+
+    Rows are computed lazily by the access endpoint and dropped by the same signal handlers which purge the
+    access cache, so an existing row always reflects the current principal -> group -> policy -> role -> access
+    chain. Rows older than EFFECTIVE_ACCESS_LIFETIME are treated as missing to bound the impact of changes made
+    by processes which do not connect the cache signals. The ids of the underlying Access objects are kept
+    alongside the serialized items, so reads rank them the same way as the access computed from the database.
+    """
+
+    principal = models.ForeignKey(Principal, on_delete=models.CASCADE, related_name="effective_access")
+    application = models.TextField()
+    org_admin = models.BooleanField(default=False)
+    access = models.JSONField(default=list)
+    access_ids = models.JSONField(default=list)
+    modified = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["principal", "application", "org_admin"], name="unique effective access per principal"
+            )
+        ]
+
+
+class EffectiveAccessGeneration(models.Model):
+    """
+    Counts the invalidations of the materialized access of a tenant.
+
+    Readers take the generation before computing the access of a principal, and only materialize it if no
+    invalidation happened in the meantime, so that access computed from data changed since is never stored.
+    """
+
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, related_name="effective_access_generation")
+    generation = models.BigIntegerField(default=0)
+
+
+def get_effective_access_generation(tenant_id: int) -> int:
+    """Return the current generation of the materialized access of a tenant, to pass to save_effective_access."""
+    return EffectiveAccessGeneration.objects.get_or_create(tenant_id=tenant_id)[0].generation
+
+
+def split_applications(application: Optional[str]) -> list[str]:
+    """Split the application query parameter into the distinct applications it filters on."""
+    if not application:
+        return [ALL_APPLICATIONS]
+    return list(dict.fromkeys(application.split(",")))
+
+
+def get_effective_access(
+    principal: Principal, applications: list[str], org_admin: bool
+) -> Optional[list[tuple[int, dict]]]:
+    """
+    Return the materialized access of the principal for the given applications, as (access id, item) pairs.
+
+    Pairs are ordered by access id. Returns None unless a fresh row exists for every one of the applications.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.EFFECTIVE_ACCESS_LIFETIME)
+    rows = {
+        application: (access_ids, access)
+        for application, access_ids, access in EffectiveAccess.objects.filter(
+            principal=principal, application__in=applications, org_admin=org_admin, modified__gte=cutoff
+        ).values_list("application", "access_ids", "access")
+    }
+    if len(rows) != len(applications):
+        return None
+    return sorted((pair for application in applications for pair in zip(*rows[application])), key=lambda pair: pair[0])
+
+
+def save_effective_access(
+    principal: Principal, applications: list[str], org_admin: bool, access: Iterable[tuple[int, dict]], generation: int
+):
+    """
+    Materialize the computed access of the principal, given as (access id, item) pairs, by application.
+
+    Nothing is stored if the access of the tenant was invalidated since the given generation was read.
+    """
+    if applications == [ALL_APPLICATIONS]:
+        partitions = {ALL_APPLICATIONS: list(access)}
+    else:
+        partitions = {application: [] for application in applications}
+        for access_id, item in access:
+            partitions.setdefault(item["permission"].split(":")[0], []).append((access_id, item))
+        # Only keep empty results for applications which exist, so unknown names cannot grow the table.
+        known = set(Permission.objects.filter(application__in=applications).values_list("application", flat=True))
+        partitions = {app: items for app, items in partitions.items() if items or app in known}
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Holding the row blocks invalidations until the upsert commits, and they delete the rows after bumping it.
+        current = (
+            EffectiveAccessGeneration.objects.select_for_update()
+            .filter(tenant_id=principal.tenant_id)
+            .values_list("generation", flat=True)
+            .first()
+        )
+        if current != generation:
+            logger.info(f"Not materializing access of principal {principal.uuid}, invalidated while computed")
+            return
+        EffectiveAccess.objects.bulk_create(
+            [
+                EffectiveAccess(
+                    tenant_id=principal.tenant_id,
+                    principal=principal,
+                    application=application,
+                    org_admin=org_admin,
+                    access=[item for _, item in items],
+                    access_ids=[access_id for access_id, _ in items],
+                    modified=now,
+                )
+                for application, items in partitions.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["principal", "application", "org_admin"],
+            update_fields=["access", "access_ids", "modified"],
+        )
+
+
+def invalidate_effective_access(org_id: str, principal_uuids: Optional[Iterable] = None):
+    """
+    Drop materialized access for a tenant.
+
+    If principal_uuids is given only those principals are affected. An org_id of "*" covers every tenant.
+    """
+    if not settings.EFFECTIVE_ACCESS_ENABLED:
+        return
+    generations = EffectiveAccessGeneration.objects.all()
+    queryset = EffectiveAccess.objects.all()
+    if org_id != "*":
+        generations = generations.filter(tenant__org_id=org_id)
+        queryset = queryset.filter(tenant__org_id=org_id)
+    # Bumped first, so that access being computed concurrently is not materialized after the rows are deleted.
+    generations.update(generation=F("generation") + 1)
+    if principal_uuids is not None:
+        queryset = queryset.filter(principal__uuid__in=principal_uuids)
+    count, _ = queryset.delete()
+    logger.info(f"Deleted {count} effective access entries for tenant {org_id}")
@@ -16,10 +16,19 @@
 #
 
 """View for principal access."""
+from collections.abc import Sequence
+
+from django.conf import settings
 from django.db.models import Prefetch
+from management.access.model import (
+    get_effective_access,
+    get_effective_access_generation,
+    save_effective_access,
+    split_applications,
+)
 from management.cache import AccessCache
 from management.models import Access, ResourceDefinition
-from management.querysets import get_access_queryset
+from management.querysets import get_access_org_admin_status, get_access_queryset
 from management.role.serializer import AccessSerializer
 from management.utils import (
     APPLICATION_KEY,
@@ -35,10 +44,36 @@ from rest_framework.views import APIView
 
 ORDER_FIELD = "order_by"
 VALID_ORDER_VALUES = ["application", "resource_type", "verb", "-application", "-resource_type", "-verb"]
+PERMISSION_FIELDS = ["application", "resource_type", "verb"]
 STATUS_KEY = "status"
 VALID_STATUS_VALUE = ["enabled", "disabled", "all"]
 
 
+class CachedAccessPolicy(Sequence):
+    """The sorted access of a principal, with only the items of the requested page read from the access cache."""
+
+    def __init__(self, cache, uuid, entries, load):
+        """Init the access from the sorted index entries, with a function computing it if the items expired."""
+        self.cache = cache
+        self.uuid = uuid
+        self.entries = entries
+        self.load = load
+
+    def __len__(self):
+        """Get the number of items."""
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        """Get the items of a slice with a single read, or a single item."""
+        if not isinstance(index, slice):
+            return self[index : index + 1 or None][0]  # noqa: E203
+        items = self.cache.get_access_items(self.uuid, self.entries[index])
+        if items is None:
+            # The items were evicted or expired since the index was read.
+            return self.load()[index]
+        return items
+
+
 class AccessView(APIView):
     """Obtain principal access list."""
 
@@ -91,15 +126,15 @@ class AccessView(APIView):
     pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
     permission_classes = (AllowAny,)
 
-    def get_access_queryset_unique_by_column(self, *columns):
+    def get_access_queryset_unique_by_column(self, *columns, is_org_admin=None):
         """Define the access query set with DISTINCT ON clause to get unique records."""
-        access_queryset = get_access_queryset(self.request)
+        access_queryset = get_access_queryset(self.request, is_org_admin)
         return access_queryset.distinct(*columns).order_by(*columns)
 
-    def get_queryset(self, ordering):
+    def get_queryset(self, ordering, is_org_admin=None):
         """Define the query set."""
         unique_columns = ["permission_id", "resourceDefinitions__attributeFilter"]
-        distinct_queryset = self.get_access_queryset_unique_by_column(*unique_columns)
+        distinct_queryset = self.get_access_queryset_unique_by_column(*unique_columns, is_org_admin=is_org_admin)
         access_queryset = (
             Access.objects.filter(id__in=distinct_queryset)
             .select_related("permission")
@@ -118,30 +153,78 @@ class AccessView(APIView):
                 order_sign = ""
                 field = ordering
             return access_queryset.order_by(f"{order_sign}permission__{field}")
-        return access_queryset
+        return access_queryset.order_by("id")
 
     def get(self, request):
         """Provide access data for principal."""
         # Parameter extraction and validation
         try:
-            sub_key, ordering = self.validate_and_get_param(request.query_params)
+            ordering = validate_and_get_key(request.query_params, ORDER_FIELD, VALID_ORDER_VALUES, required=False)
             validate_key(request.query_params, STATUS_KEY, VALID_STATUS_VALUE, "enabled")
         except ValueError as e:
             return Response(status=status.HTTP_400_BAD_REQUEST, data=e)
 
         principal = get_principal_from_request(request)
+        applications = split_applications(request.query_params.get(APPLICATION_KEY))
         cache = AccessCache(request.tenant.org_id)
-        access_policy = cache.get_policy(principal.uuid, sub_key)
-        if access_policy is None:
-            queryset = self.get_queryset(ordering)
-            access_policy = self.serializer_class(queryset, many=True, context={"for_access": True}).data
-            cache.save_policy(principal.uuid, sub_key, access_policy)
+
+        def load():
+            """Compute the sorted access, caching it for every ordering and page."""
+            ranked_items = self.get_access_policy(principal, applications)
+            cache.save_access(principal.uuid, applications, ranked_items)
+            ranked_items = self.sort_access_policy(
+                ranked_items, ordering, lambda ranked_item: ranked_item[1]["permission"]
+            )
+            return [item for _, item in ranked_items]
+
+        entries = None
+        # The application parameter is required, requests without it are rejected by the queryset.
+        if APPLICATION_KEY in request.query_params:
+            entries = cache.get_access_index(principal.uuid, applications)
+        if entries is None:
+            access_policy = load()
+        else:
+            entries = self.sort_access_policy(entries, ordering, lambda entry: entry[3])
+            access_policy = CachedAccessPolicy(cache, principal.uuid, entries, load)
 
         page = self.paginate_queryset(access_policy)
-        response = Response({"data": access_policy}) if page is None else self.get_paginated_response(page)
+        response = Response({"data": access_policy[:]}) if page is None else self.get_paginated_response(page)
 
         return response
 
+    def get_access_policy(self, principal, applications):
+        """
+        Obtain the serialized access of the principal in canonical order, as (rank, item) pairs.
+
+        Reads through the effective access table if enabled. Items are ranked by their access id.
+        """
+        if not settings.EFFECTIVE_ACCESS_ENABLED or APPLICATION_KEY not in self.request.query_params:
+            queryset = self.get_queryset(None)
+            access_policy = self.serializer_class(queryset, many=True, context={"for_access": True}).data
+            return [(access.id, item) for access, item in zip(queryset, access_policy)]
+
+        is_org_admin = get_access_org_admin_status(self.request)
+        access_policy = get_effective_access(principal, applications, is_org_admin)
+        if access_policy is not None:
+            return access_policy
+
+        generation = get_effective_access_generation(principal.tenant_id)
+        queryset = self.get_queryset(None, is_org_admin)
+        access_policy = self.serializer_class(queryset, many=True, context={"for_access": True}).data
+        ranked_items = [(access.id, item) for access, item in zip(queryset, access_policy)]
+        save_effective_access(principal, applications, is_org_admin, ranked_items, generation)
+        return ranked_items
+
+    @staticmethod
+    def sort_access_policy(access_policy, ordering, permission=lambda item: item["permission"]):
+        """Order serialized access, or anything holding its permission, by the given permission field."""
+        if not ordering:
+            return access_policy
+        index = PERMISSION_FIELDS.index(ordering.lstrip("-"))
+        return sorted(
+            access_policy, key=lambda item: permission(item).split(":")[index], reverse=ordering.startswith("-")
+        )
+
     @property
     def paginator(self):
         """Return the paginator instance associated with the view, or `None`."""
@@ -162,12 +245,3 @@ class AccessView(APIView):
         """Return a paginated style `Response` object for the given output data."""
         assert self.paginator is not None
         return self.paginator.get_paginated_response(data)
-
-    def validate_and_get_param(self, params):
-        """Validate input parameters and get ordering and sub_key."""
-        app = params.get(APPLICATION_KEY)
-        sub_key = app
-        ordering = validate_and_get_key(params, ORDER_FIELD, VALID_ORDER_VALUES, required=False)
-        if ordering:
-            sub_key = f"{app}&order:{ordering}"
-        return sub_key, ordering
@@ -3,11 +3,18 @@
 import contextlib
 import json
 import logging
+import os
 import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
 
+from core.utils import transaction_batch
 from django.conf import settings
+from management.cache_codec import CacheCodec, CacheCodecError, get_cache_codec, model_from_cache, model_to_cache
 from prometheus_client import Counter
-from redis import BlockingConnectionPool, exceptions
+from redis import BlockingConnectionPool, ConnectionPool, exceptions
 from redis.client import Pipeline, Redis
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -18,88 +25,308 @@ redis_disable_cache_get_total = Counter(
     "redis_disable_cache_get_total", "Total amount of times cache has been disabled"
 )
 
+cache_requests_total = Counter(
+    "rbac_cache_requests_total", "Cache lookups by cache, tier and result", ["cache", "tier", "result"]
+)
+cache_local_evictions_total = Counter(
+    "rbac_cache_local_evictions_total", "Entries evicted from the in-process cache tier", ["cache"]
+)
+
 BATCH_DELETE_SIZE = 1000
+INVALIDATION_CHANNEL = "rbac::cache::invalidate"
+
+
+class RedisCircuitBreaker:
+    """
+    Circuit breaker shared by every Redis backed cache in the process.
+
+    While closed, calls go straight to Redis. After `failure_threshold` consecutive failures the breaker opens and
+    reads and writes skip Redis entirely. Once `reset_timeout` seconds have passed a single call is let through as a
+    probe (half open): a success closes the breaker, a failure opens it again for another `reset_timeout`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        """Init the breaker in the closed state."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Return whether the caller may talk to Redis."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            # Both states re-arm once the timeout elapses, so a probe which never reports back cannot wedge us.
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._opened_at = time.monotonic()
+            self._transition(self.HALF_OPEN)
+            return True
+
+    def record_success(self):
+        """Record a successful Redis call."""
+        with self._lock:
+            self._failures = 0
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self):
+        """Record a failed Redis call."""
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self.state != self.OPEN:
+                    self._transition(self.OPEN)
+
+    def _transition(self, state):
+        """Move to the given state. Must be called with the lock held."""
+        logger.info(f"Redis circuit breaker moving from {self.state} to {state}.")
+        self.state = state
+        if state == self.OPEN:
+            redis_disable_cache_get_total.inc()
+        elif state == self.CLOSED:
+            redis_enable_cache_get_total.inc()
+
+
+REDIS_CIRCUIT_BREAKER = RedisCircuitBreaker(
+    settings.REDIS_CIRCUIT_BREAKER_FAILURE_THRESHOLD, settings.REDIS_CIRCUIT_BREAKER_RESET_TIMEOUT
+)
+
+
+class LocalCache:
+    """
+    In-process LRU tier placed in front of Redis.
+
+    Entries are bounded by LOCAL_CACHE_MAX_SIZE and LOCAL_CACHE_LIFETIME. They are stored pickled so that
+    concurrent requests in the same worker never share mutable model instances.
+    """
+
+    def __init__(self, name, max_size, lifetime):
+        """Init the tier."""
+        self.name = name
+        self.max_size = max_size
+        self.lifetime = lifetime
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the entry for the key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                cache_local_evictions_total.labels(cache=self.name).inc()
+                entry = None
+            if entry is None:
+                cache_requests_total.labels(cache=self.name, tier="local", result="miss").inc()
+                return None
+            self._entries.move_to_end(key)
+        cache_requests_total.labels(cache=self.name, tier="local", result="hit").inc()
+        return pickle.loads(entry[1])
+
+    def set(self, key, item):
+        """Store the item, evicting the least recently used entries beyond the size bound."""
+        entry = (time.monotonic() + self.lifetime, pickle.dumps(item))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                cache_local_evictions_total.labels(cache=self.name).inc()
+
+    def delete(self, key):
+        """Drop the entry for the key."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+class LocalCacheInvalidator:
+    """
+    Keeps the in-process tiers of every worker coherent through Redis pub/sub.
+
+    Deletions and saves publish the cache name and key on INVALIDATION_CHANNEL, and each worker process runs a daemon
+    thread which drops the matching local entries, except for the process which published them. The thread is
+    started lazily per process, so it is created after gunicorn or celery fork their workers. Whenever the
+    subscription has to be re-established the local tiers are cleared, since messages may have been missed in the
+    meantime.
+    """
+
+    def __init__(self):
+        """Init the invalidator."""
+        self._caches = {}
+        self._pid = None
+        self._origin = None
+        self._lock = threading.Lock()
+
+    def local_cache(self, name):
+        """Return the local tier of the given cache, shared by every instance in this process."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._caches = {}
+                self._pid = os.getpid()
+                self._origin = uuid.uuid4().hex
+                threading.Thread(target=self._listen, name="rbac-cache-invalidator", daemon=True).start()
+            if name not in self._caches:
+                self._caches[name] = LocalCache(name, settings.LOCAL_CACHE_MAX_SIZE, settings.LOCAL_CACHE_LIFETIME)
+            return self._caches[name]
+
+    def publish(self, name, key, drop_local=True):
+        """Tell the other workers to drop the key, and drop it locally too unless it was just refreshed here."""
+        local_cache = self._caches.get(name)
+        if local_cache is not None and drop_local:
+            local_cache.delete(key)
+        try:
+            Redis(connection_pool=_connection_pool, ssl=settings.REDIS_SSL).publish(
+                INVALIDATION_CHANNEL, json.dumps({"cache": name, "key": key, "origin": self._origin})
+            )
+        except exceptions.RedisError:
+            logger.exception(f"Error publishing invalidation of {name} cache for {key}")
+
+    def _clear(self):
+        """Drop every local entry."""
+        for local_cache in list(self._caches.values()):
+            local_cache.clear()
+
+    def _listen(self):
+        """Apply invalidations published by any worker until the process exits."""
+        params = {**settings.REDIS_CACHE_CONNECTION_PARAMS, "max_connections": 1, "socket_timeout": None}
+        client = Redis(connection_pool=ConnectionPool(**params))
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                self._clear()
+                for message in pubsub.listen():
+                    data = json.loads(message["data"])
+                    if data.get("origin") == self._origin:
+                        continue
+                    local_cache = self._caches.get(data["cache"])
+                    if local_cache is not None:
+                        local_cache.delete(data["key"])
+            except Exception:  # noqa: BLE001
+                logger.exception("Lost the cache invalidation subscription, retrying.")
+                self._clear()
+                time.sleep(settings.REDIS_CIRCUIT_BREAKER_RESET_TIMEOUT)
+
+
+LOCAL_CACHE_INVALIDATOR = LocalCacheInvalidator()
+
+
+def _invalidate_effective_access(org_id, principal_uuids=None):
+    """Drop the materialized effective access alongside the cached policies."""
+    # Imported lazily since the models depend on this module for their signal handlers.
+    from management.access.model import invalidate_effective_access
+
+    invalidate_effective_access(org_id, principal_uuids)
 
 
 class BasicCache:
     """Basic cache class to be inherited."""
 
+    name = "basic"
+    # Whether LOCAL_CACHE_ENABLED puts an in-process tier in front of Redis for this cache.
+    local_tier = False
+
     def __init__(self):
         """Init the class."""
         self._connection = None
-        self.use_caching = True
+
+    @property
+    def local_cache(self):
+        """Get the in-process tier of this cache, if enabled."""
+        # Resolved on every use rather than in __init__, since module level caches are created before forking.
+        if self.local_tier and settings.LOCAL_CACHE_ENABLED:
+            return LOCAL_CACHE_INVALIDATOR.local_cache(self.name)
+        return None
 
     @property
     def connection(self):
         """Get Redis connection from the pool."""
         if not self._connection:
+            # Connections are checked out lazily; failures surface on the first command and feed the breaker.
             self._connection = Redis(connection_pool=_connection_pool, ssl=settings.REDIS_SSL)
-            try:
-                self._connection.ping()
-            except exceptions.RedisError:
-                self._connection = None
-                raise
         return self._connection
 
-    def enable_caching(self):
-        """Enable caching and increment prometheus metric that redis caching is enabled."""
-        self.use_caching = True
-        logger.info("Redis Cache Enabled")
-        redis_enable_cache_get_total.inc()
-        return self.use_caching
-
-    def disable_caching(self):
-        """Disable caching and increment prometheus metric that redis caching is disabled."""
-        self.use_caching = False
-        logger.info("Redis Cache Disabled")
-        redis_disable_cache_get_total.inc()
-        return self.use_caching
-
-    def redis_health_check(self):
-        """Check whether redis cache is reachable. If it is not reachable, then disable caching."""
-        self._connection = Redis(connection_pool=_connection_pool, ssl=settings.REDIS_SSL)
-        try:
-            response = self._connection.ping()
-            if response:
-                logger.info("Redis cache is reachable.")
-                self.enable_caching()
-                return True
-            else:
-                logger.info("Redis cache is not reachable.")
-                self.disable_caching()
-                return False
-        except Exception as e:
-            logger.exception(f"Error: {e}")
-
     @contextlib.contextmanager
     def delete_handler(self, err_msg):
         """Handle delete events."""
+        # Invalidations are attempted even while the breaker is open, so entries cannot outlive an outage.
         try:
             yield
+            REDIS_CIRCUIT_BREAKER.record_success()
         except exceptions.RedisError:
+            REDIS_CIRCUIT_BREAKER.record_failure()
             logger.exception(err_msg)
 
+    def serialize(self, item):
+        """Convert the item into plain values for the codec."""
+        return item
+
+    def deserialize(self, data):
+        """Rebuild the item from the values decoded by the codec."""
+        return data
+
+    def encode(self, item):
+        """Encode the item for Redis with the configured codec."""
+        return get_cache_codec().encode(self.serialize(item))
+
+    def decode(self, value):
+        """Decode a value read from Redis. Values which cannot be decoded are handled as cache misses."""
+        if not value:
+            return None
+        try:
+            return self.deserialize(CacheCodec.decode(value))
+        except CacheCodecError as e:
+            logger.warning(f"Ignoring undecodable {self.name} cache entry: {e}")
+            return None
+
     def get_from_redis(self, key):
         """Get object from redis based on key."""
         raise NotImplementedError("Please override the get_from_redis method.")
 
-    def get_cached(self, key, error_message):
-        """Get cached object from redis, throw error if there is any."""
+    def read(self, func, error_message):
+        """Run a read against Redis through the circuit breaker, returning None if Redis cannot be used."""
+        if not REDIS_CIRCUIT_BREAKER.allow_request():
+            return None
         try:
-            if self.redis_health_check() is True:
-                if self.use_caching:
-                    return self.get_from_redis(key)
-            else:
-                # Retrieve data directly
-                logger.info("Not Retrieving Data from Redis Cache")
-                self.disable_caching()
-                pass
+            obj = func()
         except exceptions.RedisError:
+            REDIS_CIRCUIT_BREAKER.record_failure()
             logger.exception(error_message)
-        return None
+            return None
+        REDIS_CIRCUIT_BREAKER.record_success()
+        return obj
+
+    def get_cached(self, key, error_message):
+        """Get cached object from the local tier or redis, returning None on misses and errors."""
+        local_cache = self.local_cache
+        if local_cache is not None:
+            obj = local_cache.get(key)
+            if obj is not None:
+                return obj
+        obj = self.read(lambda: self.get_from_redis(key), error_message)
+        cache_requests_total.labels(cache=self.name, tier="redis", result="miss" if obj is None else "hit").inc()
+        if obj is not None and local_cache is not None:
+            local_cache.set(key, obj)
+        return obj
 
     def delete_cached(self, key, obj_name):
         """Delete cache from redis."""
+        if self.local_cache is not None:
+            LOCAL_CACHE_INVALIDATOR.publish(self.name, key)
         err_msg = f"Error deleting {obj_name} for {key}"
         with self.delete_handler(err_msg):
             logger.info(f"Deleting {obj_name} cache for {key}")
@@ -111,11 +338,21 @@ class BasicCache:
 
     def save(self, key, item, obj_name):
         """Save cache including exception handler."""
+        local_cache = self.local_cache
+        if local_cache is not None:
+            local_cache.set(key, item)
+        if not REDIS_CIRCUIT_BREAKER.allow_request():
+            return
         try:
             logger.info(f"Caching {obj_name} for {key}")
             with self.connection.pipeline() as pipe:
                 self.set_cache(pipe, key, item)
+            REDIS_CIRCUIT_BREAKER.record_success()
+            if local_cache is not None:
+                # The other workers may still hold the previous value in their local tier.
+                LOCAL_CACHE_INVALIDATOR.publish(self.name, key, drop_local=False)
         except exceptions.RedisError:
+            REDIS_CIRCUIT_BREAKER.record_failure()
             logger.exception(f"Error writing {obj_name} for {key}")
         finally:
             try:
@@ -127,15 +364,27 @@ class BasicCache:
 class TenantCache(BasicCache):
     """Redis-based caching of tenant."""
 
+    name = "tenant"
+    local_tier = True
+
     def key_for(self, key):
         """Redis key for a given tenant."""
         return f"rbac::tenant::tenant={key}"
 
+    def serialize(self, item):
+        """Convert the tenant into plain values for the codec."""
+        return model_to_cache(item)
+
+    def deserialize(self, data):
+        """Rebuild the tenant."""
+        # Imported lazily since the models depend on this module for their signal handlers.
+        from api.models import Tenant
+
+        return model_from_cache(Tenant, data)
+
     def get_from_redis(self, key):
         """Override the method to get tenant based on key."""
-        obj = self.connection.get(self.key_for(key))
-        if obj:
-            return pickle.loads(obj)
+        return self.decode(self.connection.get(self.key_for(key)))
 
     def get_tenant(self, key):
         """Get the tenant by tenant_name."""
@@ -143,7 +392,7 @@ class TenantCache(BasicCache):
 
     def set_cache(self, pipe, key, item):
         """Override the method to set tenant to cache."""
-        pipe.set(self.key_for(key), pickle.dumps(item))
+        pipe.set(self.key_for(key), self.encode(item))
         pipe.expire(self.key_for(key), settings.ACCESS_CACHE_LIFETIME)
         pipe.execute()
 
@@ -159,6 +408,20 @@ class TenantCache(BasicCache):
 class AccessCache(BasicCache):
     """Redis-based caching of per-Principal per-app access policy."""  # noqa: D204
 
+    name = "policy"
+
+    # Hash field holding the compact {resource: {read, write}} RBAC access map used by the identity middleware. It
+    # lives next to the access endpoint results so that it is purged by the same invalidation.
+    ACCESS_MAP_SUB_KEY = "rbac::access_map"
+
+    # Hash fields holding the access endpoint results, partitioned by application. The index of an application lists
+    # the (rank, permission) of its items, which are stored one per field so that a page is read with one HMGET.
+    # Ranks give the canonical order of the items across applications, the permissions any other order.
+    ACCESS_INDEX_FIELD = "rbac::access::index::app={}"
+    ACCESS_ITEM_FIELD = "rbac::access::item::app={}::{}"
+    # The applications with any access, set when the access of every application is cached.
+    ACCESS_APPLICATIONS_FIELD = "rbac::access::applications"
+
     def __init__(self, tenant: str):
         """
         tenant: The name of the database schema for this tenant.
@@ -168,23 +431,68 @@ class AccessCache(BasicCache):
         if not tenant:
             raise ValueError("tenant must be provided")
         self.tenant = tenant
+        self._generation = None
         super().__init__()
 
+    @staticmethod
+    def generation_key_for(tenant):
+        """Redis key for the generation counter of a tenant, "*" being the one shared by all tenants."""
+        return f"rbac::policy::generation::tenant={tenant}"
+
+    def generation_keys(self):
+        """Redis keys for the generation counters the tenant's policies depend on."""
+        tenants = ["*"] if self.tenant == "*" else ["*", self.tenant]
+        return [self.generation_key_for(tenant) for tenant in tenants]
+
+    @property
+    def generation(self):
+        """
+        Get the generation of the tenant's policies, combining the global and the tenant counters.
+
+        Bumping either counter moves every key of the tenant to a new name, which invalidates them all in O(1). The
+        entries under the old names are left to expire. The value is read once per instance, which is short lived.
+        """
+        if self._generation is None:
+            keys = self.generation_keys()
+            values = self.connection.mget(keys)
+            if None in values:
+                # Seed missing counters with the current time rather than 0, so that a counter which was evicted
+                # or flushed can never come back to a generation that is still cached.
+                with self.connection.pipeline() as pipe:
+                    for key in keys:
+                        pipe.set(key, time.time_ns(), nx=True)
+                    pipe.mget(keys)
+                    values = pipe.execute()[-1]
+            self._generation = ".".join(value.decode() if isinstance(value, bytes) else str(value) for value in values)
+        return self._generation
+
+    def key_parts_for(self, uuid):
+        """Redis key for a given user policy, split around its generation."""
+        return f"rbac::policy::tenant={self.tenant}::generation=", f"::user={uuid}"
+
     def key_for(self, uuid):
         """Redis key for a given user policy."""
-        return f"rbac::policy::tenant={self.tenant}::user={uuid}"
+        prefix, suffix = self.key_parts_for(uuid)
+        return f"{prefix}{self.generation}{suffix}"
+
+    def read_fields(self, uuid, fields):
+        """
+        Read fields of the given user's policy hash.
+
+        The generation is resolved first, since the hash key is derived from it. Reading both in one server-side
+        script would access a key it is not given, which Redis Cluster does not allow.
+        """
+        return self.connection.hmget(self.key_for(uuid), fields)
 
     def set_cache(self, pipe, args, item):
         """Set cache to redis."""
-        pipe.hset(self.key_for(args[0]), args[1], json.dumps(item))
+        pipe.hset(self.key_for(args[0]), args[1], self.encode(item))
         pipe.expire(self.key_for(args[0]), settings.ACCESS_CACHE_LIFETIME)
         pipe.execute()
 
     def get_from_redis(self, args):
         """Get object from redis based on args."""
-        obj = self.connection.hget(*(self.key_for(args[0]), args[1]))
-        if obj:
-            return json.loads(obj)
+        return self.decode(self.read_fields(args[0], [args[1]])[0])
 
     def get_policy(self, uuid, sub_key):
         """Get the given user's policy for the given sub_key (application_offset_limit)."""
@@ -194,23 +502,44 @@ class AccessCache(BasicCache):
 
     def delete_policy(self, uuid):
         """Purge the given user's policy from the cache."""
+        _invalidate_effective_access(self.tenant, [uuid])
+        if not settings.ACCESS_CACHE_ENABLED:
+            return
         super().delete_cached(uuid, "policy")
 
+    def delete_policies(self, uuids):
+        """Purge the given users' policies from the cache, with pipelined UNLINKs."""
+        uuids = list(uuids)
+        if not uuids:
+            return
+        _invalidate_effective_access(self.tenant, uuids)
+        if not settings.ACCESS_CACHE_ENABLED:
+            return
+        err_msg = f"Error deleting policies for {len(uuids)} principals of tenant {self.tenant}"
+        with self.delete_handler(err_msg):
+            logger.info(f"Deleting policy cache for {len(uuids)} principals of tenant {self.tenant}")
+            keys = [self.key_for(uuid) for uuid in uuids]
+            pipeline = self.connection.pipeline(transaction=False)
+            while keys:
+                pipeline.unlink(*keys[:BATCH_DELETE_SIZE])
+                keys = keys[BATCH_DELETE_SIZE:]
+            pipeline.execute()
+
     def delete_all_policies_for_tenant(self):
         """Purge users' policies for a given tenant from the cache."""
+        _invalidate_effective_access(self.tenant)
         if not settings.ACCESS_CACHE_ENABLED:
             return
         err_msg = f"Error deleting all policies for tenant {self.tenant}"
         with self.delete_handler(err_msg):
             logger.info(f"Deleting entire policy cache for tenant {self.tenant}")
-            # Following piece is taken from https://github.com/jazzband/django-redis/pull/617
-            count = 0
-            pipeline = self.connection.pipeline()
-            for key in self.connection.scan_iter(match=self.key_for("*"), count=BATCH_DELETE_SIZE):
-                pipeline.delete(key)
-                count += 1
-            pipeline.execute()
-            logger.info(f"Deleted {count} policies for tenant {self.tenant}")
+            key = self.generation_key_for(self.tenant)
+            with self.connection.pipeline() as pipe:
+                # Seed a missing counter the same way as readers do, INCR alone would restart it from 1.
+                pipe.set(key, time.time_ns(), nx=True)
+                pipe.incr(key)
+                pipe.execute()
+        self._generation = None
 
     def save_policy(self, uuid, sub_key, policy):
         """Write the policy for a given user for a given sub_key (application_offset_limit) to Redis."""
@@ -218,10 +547,93 @@ class AccessCache(BasicCache):
             return
         super().save((uuid, sub_key), policy, "policy")
 
+    def get_access_map(self, uuid):
+        """Get the given user's RBAC access map."""
+        return self.get_policy(uuid, self.ACCESS_MAP_SUB_KEY)
+
+    def save_access_map(self, uuid, access_map):
+        """Write the given user's RBAC access map to Redis."""
+        self.save_policy(uuid, self.ACCESS_MAP_SUB_KEY, access_map)
+
+    def get_access_index(self, uuid, applications):
+        """
+        Get the index of the given user's cached access for the given applications, an empty one meaning all.
+
+        Returns (application, position, rank, permission) entries sorted by rank, or None unless every application
+        is cached.
+        """
+        if not settings.ACCESS_CACHE_ENABLED:
+            return None
+        return self.read(
+            lambda: self._get_access_index(uuid, applications), f"Error querying access index for uuid {uuid}"
+        )
+
+    def _get_access_index(self, uuid, applications):
+        """Read the index of the given applications."""
+        if "" in applications:
+            applications = self.decode(self.read_fields(uuid, [self.ACCESS_APPLICATIONS_FIELD])[0])
+            if applications is None:
+                return None
+        if not applications:
+            return []
+        fields = [self.ACCESS_INDEX_FIELD.format(application) for application in applications]
+        entries = []
+        for application, value in zip(applications, self.read_fields(uuid, fields)):
+            index = self.decode(value)
+            if index is None:
+                return None
+            entries.extend(
+                (application, position, rank, permission) for position, (rank, permission) in enumerate(index)
+            )
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def get_access_items(self, uuid, entries):
+        """Get the given user's cached access items for the given index entries, or None if any is missing."""
+        fields = [self.ACCESS_ITEM_FIELD.format(entry[0], entry[1]) for entry in entries]
+        if not fields:
+            return []
+        values = self.read(lambda: self.read_fields(uuid, fields), f"Error querying access for uuid {uuid}")
+        items = [self.decode(value) for value in values or [None]]
+        return None if None in items else items
+
+    def save_access(self, uuid, applications, ranked_items):
+        """
+        Write the given user's access for the given applications, an empty one meaning all, to Redis.
+
+        ranked_items are (rank, item) pairs, which are partitioned by the application of their permission.
+        """
+        if not settings.ACCESS_CACHE_ENABLED or not REDIS_CIRCUIT_BREAKER.allow_request():
+            return
+        partitions = {application: [] for application in applications if application}
+        for rank, item in ranked_items:
+            partitions.setdefault(item["permission"].split(":")[0], []).append((rank, item))
+        mapping = {}
+        for application, items in partitions.items():
+            mapping[self.ACCESS_INDEX_FIELD.format(application)] = self.encode(
+                [(rank, item["permission"]) for rank, item in items]
+            )
+            for position, (_, item) in enumerate(items):
+                mapping[self.ACCESS_ITEM_FIELD.format(application, position)] = self.encode(item)
+        if "" in applications:
+            mapping[self.ACCESS_APPLICATIONS_FIELD] = self.encode(sorted(partitions))
+        try:
+            logger.info(f"Caching access for {uuid}")
+            with self.connection.pipeline() as pipe:
+                pipe.hset(self.key_for(uuid), mapping=mapping)
+                pipe.expire(self.key_for(uuid), settings.ACCESS_CACHE_LIFETIME)
+                pipe.execute()
+            REDIS_CIRCUIT_BREAKER.record_success()
+        except exceptions.RedisError:
+            REDIS_CIRCUIT_BREAKER.record_failure()
+            logger.exception(f"Error writing access for {uuid}")
+
 
 class JWKSCache(BasicCache):
     """Redis-based caching for the storage of JKWS certificates."""
 
+    name = "jwks"
+
     JWKS_CACHE_KEY = "rbac::jwks:response"
 
     def key_for(self):
@@ -252,6 +664,8 @@ class JWKSCache(BasicCache):
 class JWTCache(BasicCache):
     """Redis-based caching for the storage of JWT token."""
 
+    name = "jwt"
+
     JWT_CACHE_KEY = "rbac::jwt::relations"
 
     def key_for(self):
@@ -282,6 +696,9 @@ class JWTCache(BasicCache):
 class PrincipalCache(BasicCache):
     """Redis-based caching for storing the principals."""
 
+    name = "principal"
+    local_tier = True
+
     def key_for(self, org_id: str, principal_username: str) -> str:
         """Generate the cache key for Redis.
 
@@ -291,19 +708,25 @@ class PrincipalCache(BasicCache):
         """
         return f"rbac::principal::{org_id}::{principal_username}"
 
+    def serialize(self, item):
+        """Convert the principal into plain values for the codec, along with its tenant when loaded."""
+        return model_to_cache(item, related=["tenant"])
+
+    def deserialize(self, data):
+        """Rebuild the principal."""
+        from management.principal.model import Principal
+
+        return model_from_cache(Principal, data, related=["tenant"])
+
     def set_cache(self, pipe: Pipeline, key: str, principal):
         """Set cache to redis."""
-        pipe.set(name=key, value=pickle.dumps(principal))
+        pipe.set(name=key, value=self.encode(principal))
         pipe.expire(name=key, time=settings.PRINCIPAL_CACHE_LIFETIME)
         pipe.execute()
 
     def get_from_redis(self, key: str):
         """Get principal from redis based on the tenant and the principal."""
-        principal = self.connection.get(name=key)
-        if principal:
-            return pickle.loads(principal)
-        else:
-            return None
+        return self.decode(self.connection.get(name=key))
 
     def get_principal(self, org_id: str, principal_username: str):
         """Fetch the principal from the cache.
@@ -325,9 +748,257 @@ class PrincipalCache(BasicCache):
         """
         super().save(key=self.key_for(org_id, principal.username), item=principal, obj_name="principal")
 
+    def delete_principal(self, org_id: str, principal_username: str):
+        """Purge the given principal from the cache.
+
+        :param org_id: The tenant of the principal.
+        :param principal_username: The username of the principal to purge.
+        """
+        key = self.key_for(org_id, principal_username)
+        if self.local_cache is not None:
+            LOCAL_CACHE_INVALIDATOR.publish(self.name, key)
+        with self.delete_handler(f"Error deleting principal for {key}"):
+            logger.info(f"Deleting principal cache for {key}")
+            self.connection.delete(key)
+
+
+class PrincipalLookupCache(BasicCache):
+    """
+    Redis-based caching of the user records returned by BOP, per tenant and username.
+
+    Each username is a hash holding one entry per set of BOP query parameters, so that every lookup variant of a
+    user is purged at once. Users which BOP does not know are cached too, for a shorter lifetime, so repeated
+    lookups of a missing user do not reach BOP either. Every entry carries its own expiry since the lifetime of
+    the hash is shared.
+    """
+
+    name = "principal_lookup"
+    local_tier = True
+
+    def key_for(self, org_id: str, username: str) -> str:
+        """Redis key for the lookups of a username, which BOP matches case insensitively."""
+        return f"rbac::principal_lookup::{org_id}::{username.lower()}"
+
+    def get_from_redis(self, key: str):
+        """Get the lookup entries of a username."""
+        entries = {}
+        for variant, value in self.connection.hgetall(key).items():
+            entry = self.decode(value)
+            if entry is not None:
+                entries[variant.decode()] = entry
+        return entries or None
+
+    def set_cache(self, pipe: Pipeline, key: str, entries):
+        """Write the lookup entries of a username."""
+        pipe.hset(key, mapping={variant: self.encode(entry) for variant, entry in entries.items()})
+        pipe.expire(key, max(settings.PRINCIPAL_LOOKUP_CACHE_LIFETIME, settings.PRINCIPAL_LOOKUP_NEGATIVE_LIFETIME))
+        pipe.execute()
+
+    def get_entries(self, org_id: str, username: str) -> dict:
+        """Return the unexpired lookup entries of a username, keyed by their variant."""
+        entries = self.get_cached(
+            self.key_for(org_id, username),
+            f'[org_id: "{org_id}"][username: "{username}"] Unable to fetch principal lookup from cache',
+        )
+        now = time.time()
+        return {variant: entry for variant, entry in (entries or {}).items() if entry["expires"] > now}
+
+    def get_users(self, org_id: str, username: str, variant: str):
+        """Return the cached users found by a lookup, an empty list if none were, or None if not cached."""
+        entry = self.get_entries(org_id, username).get(variant)
+        return None if entry is None else entry["users"]
+
+    def save_users(self, org_id: str, username: str, variant: str, users: list):
+        """Cache the users found by a lookup, keeping the other unexpired variants of the username."""
+        lifetime = settings.PRINCIPAL_LOOKUP_CACHE_LIFETIME if users else settings.PRINCIPAL_LOOKUP_NEGATIVE_LIFETIME
+        entries = self.get_entries(org_id, username)
+        entries[variant] = {"expires": time.time() + lifetime, "users": users}
+        super().save(self.key_for(org_id, username), entries, "principal lookup")
+
+    def delete_users(self, org_id: str, username: str):
+        """Purge every lookup of a username."""
+        key = self.key_for(org_id, username)
+        if self.local_cache is not None:
+            LOCAL_CACHE_INVALIDATOR.publish(self.name, key)
+        with self.delete_handler(f"Error deleting principal lookup for {key}"):
+            logger.info(f"Deleting principal lookup cache for {key}")
+            self.connection.delete(key)
+
+
+class CheckpointCache(BasicCache):
+    """Redis-based storage of the progress of long running jobs, so an interrupted job can resume."""
+
+    name = "checkpoint"
+
+    def key_for(self, job: str) -> str:
+        """Redis key for the checkpoint of a job."""
+        return f"rbac::checkpoint::{job}"
+
+    def get_from_redis(self, key: str):
+        """Get the checkpoint of a job."""
+        value = self.connection.get(key)
+        return None if value is None else json.loads(value)
+
+    def set_cache(self, pipe: Pipeline, key: str, item):
+        """Write the checkpoint of a job."""
+        pipe.set(key, json.dumps(item), ex=settings.CHECKPOINT_LIFETIME)
+        pipe.execute()
+
+    def get_checkpoint(self, job: str):
+        """Return the checkpoint of a job, or None when it has none."""
+        return self.get_cached(self.key_for(job), f"Unable to fetch the checkpoint of {job}")
+
+    def save_checkpoint(self, job: str, checkpoint):
+        """Save the checkpoint of a job."""
+        super().save(self.key_for(job), checkpoint, "checkpoint")
+
+    def delete_checkpoint(self, job: str):
+        """Drop the checkpoint of a job once it completed."""
+        key = self.key_for(job)
+        with self.delete_handler(f"Error deleting checkpoint {key}"):
+            self.connection.delete(key)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key within the process.
+
+    The first caller runs the function while the others wait for it and share its result, or its exception, so a
+    burst of cache misses for one key results in a single call to the backing service.
+    """
+
+    def __init__(self):
+        """Init the calls in flight."""
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Return the result of func, running it unless a call for the same key is already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event()}
+        if not leader:
+            call["done"].wait()
+            if "error" in call:
+                raise call["error"]
+            return call["result"]
+        try:
+            call["result"] = func()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+
+def connect_access_cache_signals():
+    """
+    Return whether the signal handlers invalidating access should be connected.
+
+    They purge both the Redis access cache and the materialized effective access, which has no other way of being
+    invalidated, so either one being enabled connects them. Processes which invalidate access in bulk themselves opt
+    out with ACCESS_CACHE_CONNECT_SIGNALS.
+    """
+    return settings.ACCESS_CACHE_CONNECT_SIGNALS and (
+        settings.ACCESS_CACHE_ENABLED or settings.EFFECTIVE_ACCESS_ENABLED
+    )
+
 
 def skip_purging_cache_for_public_tenant(tenant):
     """Skip purging cache for public tenant."""
     # Cache is by tenant org_id and user_id, we don't have to purge cache for public tenant
     if tenant.tenant_name == "public":
+        # The materialized access outlives the Redis entries, so it is dropped for every tenant inheriting the change.
+        INVALIDATION_COLLECTOR.add_public_tenant()
         return True
+
+
+class _InvalidationBatch:
+    """Access cache invalidations collected for a single transaction."""
+
+    def __init__(self):
+        """Init an empty batch."""
+        self.principals = {}
+        self.tenants = set()
+        self.claimed = set()
+        self.public_tenant = False
+        self.flushed = False
+
+    def flush(self):
+        """Purge everything collected, one pipeline per tenant."""
+        self.flushed = True
+        if self.public_tenant:
+            _invalidate_effective_access("*")
+            self.public_tenant = False
+        for org_id in self.tenants:
+            AccessCache(org_id).delete_all_policies_for_tenant()
+        for org_id, uuids in self.principals.items():
+            if org_id not in self.tenants:
+                AccessCache(org_id).delete_policies(uuids)
+        self.principals.clear()
+        self.tenants.clear()
+
+
+class InvalidationCollector:
+    """
+    Coalesce access cache invalidations made by the signal handlers.
+
+    Inside a transaction the affected (tenant, principal) keys are accumulated and purged once, after the outermost
+    transaction commits; nothing is purged if it rolls back. Outside of a transaction they are purged right away.
+    """
+
+    def __init__(self):
+        """Init the per thread state."""
+        self._local = threading.local()
+
+    def _batch(self):
+        """Return the batch of the current transaction, or None when in autocommit mode."""
+        return transaction_batch(self._local, _InvalidationBatch)
+
+    def claim(self, key):
+        """
+        Return whether key is seen for the first time in the current transaction.
+
+        Lets handlers which fire many times per transaction, once per changed object, skip repeated lookups.
+        """
+        batch = self._batch()
+        if batch is None:
+            return True
+        if key in batch.claimed:
+            return False
+        batch.claimed.add(key)
+        return True
+
+    def add_principals(self, org_id, uuids):
+        """Invalidate the cached policies of the given principals of a tenant."""
+        batch = self._batch()
+        if batch is None:
+            AccessCache(org_id).delete_policies(uuids)
+            return
+        batch.principals.setdefault(org_id, set()).update(uuids)
+
+    def add_tenant(self, org_id):
+        """Invalidate the cached policies of every principal of a tenant."""
+        batch = self._batch()
+        if batch is None:
+            AccessCache(org_id).delete_all_policies_for_tenant()
+            return
+        batch.tenants.add(org_id)
+
+    def add_public_tenant(self):
+        """Invalidate the materialized access of every tenant, which all inherit the public tenant's roles."""
+        if not settings.EFFECTIVE_ACCESS_ENABLED:
+            return
+        batch = self._batch()
+        if batch is None:
+            _invalidate_effective_access("*")
+            return
+        batch.public_tenant = True
+
+
+INVALIDATION_COLLECTOR = InvalidationCollector()
@@ -0,0 +1,274 @@
+#
+# Copyright 2025 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Compact serialization of the values stored in the Redis caches."""
+
+import functools
+import importlib
+import json
+import logging
+import struct
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from types import ModuleType
+from typing import Optional
+from uuid import UUID
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+def _optional_import(name: str) -> Optional[ModuleType]:
+    """Import an optional dependency, or return None when it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:  # pragma: no cover
+        return None
+
+
+orjson = _optional_import("orjson")
+msgpack = _optional_import("msgpack")
+zstandard = _optional_import("zstandard")
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# Every value starts with a header made of a magic byte, the format version, the codec id and the compression id,
+# so that readers can decode values written with any known codec while the writers are rolled forward. Values
+# without the magic byte, such as the JSON or pickles written by earlier releases, are rejected.
+MAGIC = 0xFE
+FORMAT_VERSION = 1
+HEADER = struct.Struct("!BBBB")
+
+
+class CacheCodecError(ValueError):
+    """Raised when a cached value cannot be decoded."""
+
+
+def _default(obj):
+    """Encode the types found in model fields which the codecs do not support natively."""
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, (date, datetime, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} cannot be cached")
+
+
+class JSONCodec:
+    """Standard library JSON, always available."""
+
+    id = 1
+    name = "json"
+    available = True
+
+    @staticmethod
+    def dumps(obj):
+        """Serialize the object."""
+        return json.dumps(obj, separators=(",", ":"), default=_default).encode()
+
+    @staticmethod
+    def loads(data):
+        """Deserialize the object."""
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """JSON through orjson."""
+
+    id = 2
+    name = "orjson"
+    available = orjson is not None
+
+    @staticmethod
+    def dumps(obj):
+        """Serialize the object."""
+        return orjson.dumps(obj, default=_default)
+
+    @staticmethod
+    def loads(data):
+        """Deserialize the object."""
+        return orjson.loads(data)
+
+
+class MsgpackCodec:
+    """MessagePack through msgpack."""
+
+    id = 3
+    name = "msgpack"
+    available = msgpack is not None
+
+    @staticmethod
+    def dumps(obj):
+        """Serialize the object."""
+        return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+    @staticmethod
+    def loads(data):
+        """Deserialize the object."""
+        return msgpack.unpackb(data, raw=False)
+
+
+class NoCompression:
+    """Values stored as serialized."""
+
+    id = 0
+    name = "none"
+    available = True
+
+    @staticmethod
+    def compress(data):
+        """Compress the data."""
+        return data
+
+    @staticmethod
+    def decompress(data):
+        """Decompress the data."""
+        return data
+
+
+class ZlibCompression:
+    """Standard library zlib, always available."""
+
+    id = 1
+    name = "zlib"
+    available = True
+
+    @staticmethod
+    def compress(data):
+        """Compress the data."""
+        return zlib.compress(data, 1)
+
+    @staticmethod
+    def decompress(data):
+        """Decompress the data."""
+        return zlib.decompress(data)
+
+
+class ZstdCompression:
+    """Zstandard through zstandard."""
+
+    id = 2
+    name = "zstd"
+    available = zstandard is not None
+
+    @staticmethod
+    def compress(data):
+        """Compress the data."""
+        return zstandard.ZstdCompressor(level=3).compress(data)
+
+    @staticmethod
+    def decompress(data):
+        """Decompress the data."""
+        return zstandard.ZstdDecompressor().decompress(data)
+
+
+CODECS = {codec.name: codec for codec in (JSONCodec, OrjsonCodec, MsgpackCodec)}
+COMPRESSIONS = {compression.name: compression for compression in (NoCompression, ZlibCompression, ZstdCompression)}
+_CODECS_BY_ID = {codec.id: codec for codec in CODECS.values()}
+_COMPRESSIONS_BY_ID = {compression.id: compression for compression in COMPRESSIONS.values()}
+
+# What to use instead when the configured codec or compression is not installed.
+_FALLBACKS = {"orjson": "json", "msgpack": "json", "zstd": "zlib"}
+
+
+def _resolve(registry, name, kind):
+    """Get the configured codec or compression, falling back to one which is always available."""
+    if name not in registry:
+        raise ValueError(f"Unknown cache {kind} {name!r}, expected one of {sorted(registry)}")
+    while not registry[name].available:
+        fallback = _FALLBACKS[name]
+        logger.warning(f"Cache {kind} {name} is not installed, using {fallback} instead.")
+        name = fallback
+    return registry[name]
+
+
+class CacheCodec:
+    """Encode values for Redis with a codec, compressing those above a size threshold."""
+
+    def __init__(self, codec="json", compression="none", compression_threshold=0):
+        """Init the codec, falling back to the standard library for anything not installed."""
+        self.codec = _resolve(CODECS, codec, "codec")
+        self.compression = _resolve(COMPRESSIONS, compression, "compression")
+        self.compression_threshold = compression_threshold
+
+    def encode(self, obj):
+        """Encode the object, with its header."""
+        data = self.codec.dumps(obj)
+        compression = NoCompression
+        if self.compression is not NoCompression and len(data) >= self.compression_threshold:
+            compression = self.compression
+            data = compression.compress(data)
+        return HEADER.pack(MAGIC, FORMAT_VERSION, self.codec.id, compression.id) + data
+
+    @staticmethod
+    def decode(data):
+        """Decode a value encoded with any known codec and compression."""
+        if len(data) < HEADER.size:
+            raise CacheCodecError("Cached value is too short")
+        magic, version, codec_id, compression_id = HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise CacheCodecError("Cached value has no known header")
+        codec = _CODECS_BY_ID.get(codec_id)
+        compression = _COMPRESSIONS_BY_ID.get(compression_id)
+        if codec is None or not codec.available or compression is None or not compression.available:
+            raise CacheCodecError(f"Cached value uses unavailable codec {codec_id} or compression {compression_id}")
+        try:
+            return codec.loads(compression.decompress(data[HEADER.size :]))  # noqa: E203
+        except Exception as e:  # noqa: BLE001
+            raise CacheCodecError(f"Cached value cannot be decoded: {e}") from e
+
+
+@functools.lru_cache(maxsize=None)
+def _cache_codec(codec, compression, compression_threshold):
+    """Build the codec for a configuration, once."""
+    return CacheCodec(codec, compression, compression_threshold)
+
+
+def get_cache_codec():
+    """Get the codec configured in the settings."""
+    return _cache_codec(settings.CACHE_CODEC, settings.CACHE_COMPRESSION, settings.CACHE_COMPRESSION_THRESHOLD)
+
+
+def model_to_cache(instance, related=()):
+    """
+    Convert a model instance into plain values for the codecs.
+
+    The concrete fields are stored by attname, along with the given foreign keys when they are already loaded.
+    """
+    data = {"fields": {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}}
+    for name in related:
+        field = instance._meta.get_field(name)
+        if field.is_cached(instance):
+            data[name] = model_to_cache(getattr(instance, name))
+    return data
+
+
+def model_from_cache(model, data, related=()):
+    """Rebuild a model instance converted by model_to_cache, as if it had been loaded from the database."""
+    fields = data["fields"]
+    concrete_fields = [field for field in model._meta.concrete_fields if field.attname in fields]
+    instance = model.from_db(
+        DEFAULT_DB_ALIAS,
+        [field.attname for field in concrete_fields],
+        [field.to_python(fields[field.attname]) for field in concrete_fields],
+    )
+    for name in related:
+        if name in data:
+            field = model._meta.get_field(name)
+            field.set_cached_value(instance, model_from_cache(field.related_model, data[name]))
+    return instance
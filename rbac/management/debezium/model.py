@@ -29,3 +29,5 @@ class Outbox(models.Model):
     aggregateid = models.CharField(max_length=255)
     event_type = models.CharField(max_length=255, db_column="type")
     payload = models.JSONField()
+    # Selects the topic of the event, see PartitionKey.route
+    route = models.CharField(max_length=255, default="")
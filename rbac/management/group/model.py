@@ -27,7 +27,11 @@ from django.utils import timezone
 from internal.integration import chrome_handlers
 from internal.integration import sync_handlers
 from kessel.relations.v1beta1.common_pb2 import Relationship
-from management.cache import AccessCache, skip_purging_cache_for_public_tenant
+from management.cache import (
+    INVALIDATION_COLLECTOR,
+    connect_access_cache_signals,
+    skip_purging_cache_for_public_tenant,
+)
 from management.principal.model import Principal
 from management.rbac_fields import AutoDateTimeField
 from management.role.model import Role
@@ -112,9 +116,7 @@ def group_deleted_cache_handler(sender=None, instance=None, using=None, **kwargs
     if skip_purging_cache_for_public_tenant(instance.tenant):
         return
     logger.info("Handling signal for deleted group %s - invalidating policy cache for users in group", instance)
-    cache = AccessCache(instance.tenant.org_id)
-    for principal in instance.principals.all():
-        cache.delete_policy(principal.uuid)
+    INVALIDATION_COLLECTOR.add_principals(instance.tenant.org_id, instance.principals.values_list("uuid", flat=True))
 
 
 def principals_to_groups_cache_handler(
@@ -123,25 +125,25 @@ def principals_to_groups_cache_handler(
     """Signal handler to purge caches when Group membership changes."""
     if skip_purging_cache_for_public_tenant(instance.tenant):
         return
-    cache = AccessCache(instance.tenant.org_id)
+    org_id = instance.tenant.org_id
     if action in ("post_add", "pre_remove"):
         logger.info("Handling signal for %s group membership change - invalidating policy cache", instance)
         if isinstance(instance, Group):
             # One or more principals was added to/removed from the group
-            for principal in Principal.objects.filter(pk__in=pk_set):
-                cache.delete_policy(principal.uuid)
+            INVALIDATION_COLLECTOR.add_principals(
+                org_id, Principal.objects.filter(pk__in=pk_set).values_list("uuid", flat=True)
+            )
         elif isinstance(instance, Principal):
             # One or more groups was added to/removed from the principal
-            cache.delete_policy(instance.uuid)
+            INVALIDATION_COLLECTOR.add_principals(org_id, [instance.uuid])
     elif action == "pre_clear":
         logger.info("Handling signal for %s group membership clearing - invalidating policy cache", instance)
         if isinstance(instance, Group):
             # All principals are being removed from this group
-            for principal in instance.principals.all():
-                cache.delete_policy(principal.uuid)
+            INVALIDATION_COLLECTOR.add_principals(org_id, instance.principals.values_list("uuid", flat=True))
         elif isinstance(instance, Principal):
             # All groups are being removed from this principal
-            cache.delete_policy(instance.uuid)
+            INVALIDATION_COLLECTOR.add_principals(org_id, [instance.uuid])
 
 
 def group_deleted_chrome_handler(sender=None, instance=None, using=None, **kwargs):
@@ -208,7 +210,7 @@ def principal_group_change_sync_handler(
                 )
 
 
-if settings.ACCESS_CACHE_ENABLED and settings.ACCESS_CACHE_CONNECT_SIGNALS:
+if connect_access_cache_signals():
     signals.pre_delete.connect(group_deleted_cache_handler, sender=Group)
     signals.m2m_changed.connect(principals_to_groups_cache_handler, sender=Group.principals.through)
 
@@ -116,11 +116,11 @@ class RelationApiDualWriteGroupHandler(RelationApiDualWriteSubjectHandler):
             logger.info(f"[Dual Write] Skipping empty replication event. {self._expected_empty_relation_reason}")
             return
         try:
-            self._replicator.replicate(
+            self._replicator.replicate_changes(
                 ReplicationEvent(
                     event_type=self.event_type,
                     info={"group_uuid": str(self.group.uuid), "org_id": str(self.group.tenant.org_id)},
-                    partition_key=PartitionKey.byEnvironment(),
+                    partition_key=PartitionKey.byTenant(self.group.tenant.org_id),
                     remove=self.relations_to_remove,
                     add=self.relations_to_add,
                 ),
@@ -173,8 +173,10 @@ class RelationApiDualWriteGroupHandler(RelationApiDualWriteSubjectHandler):
             return
 
         def reset_mapping(mapping: BindingMapping):
+            # Only remove the relationship if it was assigned, so it is not cancelled out by the addition below
+            assigned = str(self.group.uuid) in mapping.mappings["groups"]
             to_remove = mapping.unassign_group(str(self.group.uuid))
-            if to_remove:
+            if to_remove and assigned:
                 self.relations_to_remove.append(to_remove)
             to_add = mapping.assign_group_to_bindings(str(self.group.uuid))
             if to_add:
@@ -22,7 +22,7 @@ from uuid import UUID
 
 import requests
 from django.conf import settings
-from django.db import IntegrityError, transaction
+from django.db import IntegrityError
 from django.db.models import Q
 from django.db.models.aggregates import Count
 from django.http import Http404
@@ -63,6 +63,7 @@ from management.querysets import (
     get_group_queryset,
     get_role_queryset,
 )
+from management.relation_replicator.outbox_replicator import OUTBOX_BUFFER
 from management.relation_replicator.relation_replicator import ReplicationEventType
 from management.role.view import RoleViewSet
 from management.utils import validate_and_get_key, validate_group_name, validate_uuid
@@ -192,6 +193,7 @@ class GroupViewSet(
     filterset_class = GroupFilter
     ordering_fields = ("name", "modified", "principalCount", "policyCount")
     ordering = ("name",)
+    cursor_ordering = ("id",)
     proxy = PrincipalProxy()
 
     def get_queryset(self):
@@ -431,7 +433,7 @@ class GroupViewSet(
         """
         validate_uuid(kwargs.get("uuid"), "group uuid validation")
 
-        with transaction.atomic():
+        with OUTBOX_BUFFER.atomic():
             self.protect_special_groups("delete")
             group = self.get_object()
             if not request.user.admin:
@@ -504,7 +506,7 @@ class GroupViewSet(
         """Validate principals in proxy request."""
         users = [principal.get("username") for principal in principals]
         resp = self.proxy.request_filtered_principals(
-            users, org_id=org_id, limit=len(users), options={"return_id": True}
+            users, org_id=org_id, limit=len(users), options={"return_id": True}, bypass_cache=True
         )
         if "errors" in resp:
             return resp
@@ -804,7 +806,7 @@ class GroupViewSet(
             else:
                 principals.append(specified_principal)
 
-        with transaction.atomic():
+        with OUTBOX_BUFFER.atomic():
             group = self.get_object()
             self.protect_special_groups("add principals", group, additional="platform_default")
 
@@ -914,7 +916,7 @@ class GroupViewSet(
         validate_uuid(uuid, "group uuid validation")
         org_id = self.request.user.org_id
 
-        with transaction.atomic():
+        with OUTBOX_BUFFER.atomic():
             group = self.get_object()
 
             self.protect_special_groups("remove principals", additional="platform_default")
@@ -1289,7 +1291,7 @@ class GroupViewSet(
             if serializer.is_valid(raise_exception=True):
                 roles = request.data.pop(ROLES_KEY, [])
 
-            with transaction.atomic():
+            with OUTBOX_BUFFER.atomic():
                 group = set_system_flag_before_update(group, request.tenant, request.user)
 
                 add_roles(group, roles, request.tenant, user=request.user)
@@ -1326,7 +1328,7 @@ class GroupViewSet(
             role_ids = request.query_params.get(ROLES_KEY, "").split(",")
             serializer = GroupRoleSerializerIn(data={"roles": role_ids})
             if serializer.is_valid(raise_exception=True):
-                with transaction.atomic():
+                with OUTBOX_BUFFER.atomic():
                     group = set_system_flag_before_update(group, request.tenant, request.user)
                     remove_roles(group, role_ids, request.tenant, request.user)
 
@@ -0,0 +1,136 @@
+#
+# Copyright 2025 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Process-wide pool of gRPC channels to the Relations and Inventory APIs."""
+import logging
+import os
+import threading
+import time
+
+import grpc
+from django.conf import settings
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+grpc_channel_state_total = Counter(
+    "grpc_channel_state_total", "Total connectivity state changes of pooled gRPC channels", ["target", "state"]
+)
+grpc_channels_ready = Gauge(
+    "grpc_channels_ready", "Pooled gRPC channels which are ready", ["target"], multiprocess_mode="livesum"
+)
+grpc_client_request_seconds = Histogram(
+    "grpc_client_request_seconds", "Time spent on unary gRPC requests", ["target", "method", "code"]
+)
+
+
+def channel_options():
+    """Return the options every pooled channel is created with."""
+    return [
+        ("grpc.keepalive_time_ms", settings.GRPC_KEEPALIVE_TIME_MS),
+        ("grpc.keepalive_timeout_ms", settings.GRPC_KEEPALIVE_TIMEOUT_MS),
+        ("grpc.keepalive_permit_without_calls", int(settings.GRPC_KEEPALIVE_PERMIT_WITHOUT_CALLS)),
+        ("grpc.http2.max_pings_without_data", 0),
+        ("grpc.max_reconnect_backoff_ms", settings.GRPC_MAX_RECONNECT_BACKOFF_MS),
+    ]
+
+
+class RequestTimer(grpc.UnaryUnaryClientInterceptor):
+    """Records the latency and status code of the unary requests made on a channel."""
+
+    def __init__(self, target):
+        """Init the timer for the given target."""
+        self.target = target
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        """Time the request, which has completed once the continuation returns."""
+        start = time.perf_counter()
+        outcome = continuation(client_call_details, request)
+        grpc_client_request_seconds.labels(
+            target=self.target, method=client_call_details.method, code=outcome.code().name
+        ).observe(time.perf_counter() - start)
+        return outcome
+
+
+class PooledChannel:
+    """A channel kept open for the lifetime of the process, along with its last known state."""
+
+    def __init__(self, target):
+        """Create the channel, which does not connect until the first request is made."""
+        self.target = target
+        self.state = None
+        self._channel = grpc.insecure_channel(target, options=channel_options())
+        self._channel.subscribe(self._on_state_change, try_to_connect=False)
+        self.channel = grpc.intercept_channel(self._channel, RequestTimer(target))
+
+    def _on_state_change(self, state):
+        """Track the connectivity of the channel."""
+        grpc_channel_state_total.labels(target=self.target, state=state.name).inc()
+        if state is grpc.ChannelConnectivity.READY:
+            grpc_channels_ready.labels(target=self.target).inc()
+        elif self.state is grpc.ChannelConnectivity.READY:
+            grpc_channels_ready.labels(target=self.target).dec()
+        if state is grpc.ChannelConnectivity.TRANSIENT_FAILURE:
+            logger.warning(f"gRPC channel to {self.target} failed to connect")
+        self.state = state
+
+    def close(self):
+        """Close the channel."""
+        self._channel.unsubscribe(self._on_state_change)
+        if self.state is grpc.ChannelConnectivity.READY:
+            grpc_channels_ready.labels(target=self.target).dec()
+        self.state = None
+        self._channel.close()
+
+
+class ChannelPool:
+    """
+    Hands out one long-lived channel per target.
+
+    Channels multiplex concurrent requests over a single HTTP/2 connection, so sharing them between threads avoids
+    paying the TCP and HTTP/2 setup on every request. gRPC channels cannot be used across a fork, so gunicorn's
+    post_fork hook and celery's worker_process_init signal reset the pool, and it is also emptied whenever it is used
+    from a new process. The inherited channels are dropped rather than closed, since they belong to the parent.
+    """
+
+    def __init__(self):
+        """Init the pool."""
+        self._channels = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def get(self, target):
+        """Return the channel to the given target, creating it on first use."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._channels = {}
+                self._pid = os.getpid()
+            pooled = self._channels.get(target)
+            if pooled is None:
+                pooled = self._channels[target] = PooledChannel(target)
+            return pooled.channel
+
+    def reset(self):
+        """Close every channel of this process, so the next request reconnects."""
+        with self._lock:
+            if self._pid == os.getpid():
+                for pooled in self._channels.values():
+                    pooled.close()
+            self._channels = {}
+            self._pid = os.getpid()
+
+
+GRPC_CHANNELS = ChannelPool()
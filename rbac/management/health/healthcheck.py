@@ -25,8 +25,11 @@ logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 
 def redis_health():
-    """Check health of redis cache."""
+    """Check health of redis cache, feeding the result to the circuit breaker."""
     time.sleep(10)
 
     redis_cache = BasicCache()
-    redis_cache.redis_health_check()
+    if redis_cache.read(redis_cache.connection.ping, "Redis cache is not reachable."):
+        logger.info("Redis cache is reachable.")
+        return True
+    return False
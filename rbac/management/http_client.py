@@ -0,0 +1,133 @@
+#
+# Copyright 2025 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Pooled HTTP clients for the services RBAC depends on."""
+import os
+import threading
+import time
+
+import requests
+from django.conf import settings
+from prometheus_client import Histogram
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+http_client_request_seconds = Histogram(
+    "rbac_http_client_request_seconds",
+    "Time spent on requests from RBAC to the services it depends on",
+    ["dependency", "method", "status"],
+)
+
+RETRY_STATUSES = (502, 503, 504)
+
+# The time by which the request of the current thread must start its last attempt, see DeadlineRetry.
+_deadlines = threading.local()
+
+
+class DeadlineRetry(Retry):
+    """Retry which gives up once another attempt could end after the total timeout of the request."""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        """Return the retry state for the next attempt, raising MaxRetryError when out of retries or time."""
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        deadline = getattr(_deadlines, "value", None)
+        if deadline is not None and time.monotonic() + new_retry.get_backoff_time() > deadline:
+            reason = error or ResponseError(f"no time left to retry after status {response and response.status}")
+            raise MaxRetryError(_pool, url, reason) from reason
+        return new_retry
+
+
+class HTTPClient:
+    """
+    Sends the requests to one dependency through a session kept for the lifetime of the process.
+
+    The session keeps the TLS connections to each host alive between requests, so only the first request to a host
+    pays for the handshake. Connection errors and gateway errors are retried with an exponential backoff, for the
+    methods which are safe to repeat against this dependency, as long as the last attempt can complete within
+    HTTP_CLIENT_TOTAL_TIMEOUT_SECONDS. Like the gRPC channels, the session is rebuilt in forked workers instead of
+    sharing the sockets of the parent.
+    """
+
+    def __init__(self, dependency, timeout, allowed_methods=("GET",)):
+        """Init the client of the given dependency, with the default timeout of its requests in seconds."""
+        self.dependency = dependency
+        self.timeout = timeout
+        self.allowed_methods = frozenset(allowed_methods)
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Return the session of this process."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._session = self._create_session()
+                self._pid = os.getpid()
+            return self._session
+
+    def _create_session(self):
+        """Create a session retrying the requests of this dependency."""
+        retry = DeadlineRetry(
+            total=settings.HTTP_CLIENT_RETRIES,
+            backoff_factor=settings.HTTP_CLIENT_BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=self.allowed_methods,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=settings.HTTP_CLIENT_POOL_SIZE, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def request(self, method, url, **kwargs):
+        """Send the request, recording its latency along with the status code or the error raised."""
+        kwargs.setdefault("timeout", self.timeout)
+        timeout = kwargs["timeout"]
+        attempt_timeout = sum(part or 0 for part in timeout) if isinstance(timeout, tuple) else timeout or 0
+        _deadlines.value = time.monotonic() + settings.HTTP_CLIENT_TOTAL_TIMEOUT_SECONDS - attempt_timeout
+        start = time.perf_counter()
+        result = "error"
+        try:
+            response = self.session.request(method, url, **kwargs)
+            result = response.status_code
+            return response
+        except requests.exceptions.RequestException as err:
+            result = type(err).__name__
+            raise
+        finally:
+            _deadlines.value = None
+            http_client_request_seconds.labels(dependency=self.dependency, method=method, status=result).observe(
+                time.perf_counter() - start
+            )
+
+    def get(self, url, **kwargs):
+        """Send a GET request."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Send a POST request."""
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """Close the connections of this process."""
+        with self._lock:
+            if self._session is not None and self._pid == os.getpid():
+                self._session.close()
+            self._session = None
+            self._pid = None
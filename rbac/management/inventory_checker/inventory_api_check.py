@@ -19,17 +19,21 @@
 
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Union
 
+import grpc
 from django.conf import settings
 from google.protobuf import json_format
 from internal.jwt_utils import JWTManager, JWTProvider
 from kessel.inventory.v1beta2 import (
+    allowed_pb2,
     inventory_service_pb2_grpc,
     reporter_reference_pb2,
     resource_reference_pb2,
     subject_reference_pb2,
 )
+from kessel.inventory.v1beta2.check_bulk_request_pb2 import CheckBulkRequest, CheckBulkRequestItem
 from kessel.inventory.v1beta2.check_request_pb2 import CheckRequest
 from management.cache import JWTCache
 from management.utils import create_client_channel
@@ -49,18 +53,66 @@ class InventoryApiBaseChecker:
 
         Accepts either a single check request or list of check requests.
         """
-        token = jwt_manager.get_jwt_from_redis()
-
         if isinstance(checks, CheckRequest):
             checks = [checks]
+        return all(self.check_inventory_bulk(checks))
+
+    def check_inventory_bulk(self, checks: List[CheckRequest]) -> List[bool]:
+        """
+        Check many relations at once, returning whether each of them exists in the order given.
+
+        The checks are sent in batches of INVENTORY_CHECK_BATCH_SIZE through the CheckBulk RPC, with at most
+        INVENTORY_CHECK_CONCURRENCY batches in flight over the same channel. Servers which do not implement
+        CheckBulk get the individual Check RPCs instead, fanned out with the same bound.
+        """
+        if not checks:
+            return []
+        token = jwt_manager.get_jwt_from_redis()
+        metadata = [("authorization", f"Bearer {token}")]
+        batch_size = settings.INVENTORY_CHECK_BATCH_SIZE
+        batches = [checks[start : start + batch_size] for start in range(0, len(checks), batch_size)]  # noqa: E203
+
+        with create_client_channel(settings.INVENTORY_API_SERVER) as channel:
+            stub = inventory_service_pb2_grpc.KesselInventoryServiceStub(channel)
+            try:
+                results = self._map(lambda batch: self._check_batch(stub, batch, metadata), batches)
+            except grpc.RpcError as err:
+                if err.code() != grpc.StatusCode.UNIMPLEMENTED:
+                    raise
+                logger.info("CheckBulk is not available on the inventory api, sending the checks one by one.")
+                results = self._map(lambda batch: [self._check(stub, check, metadata) for check in batch], batches)
+        return [allowed for batch in results for allowed in batch]
+
+    def _map(self, func, batches):
+        """Apply the function to every batch, running at most INVENTORY_CHECK_CONCURRENCY of them at once."""
+        if len(batches) == 1:
+            return [func(batches[0])]
+        with ThreadPoolExecutor(max_workers=settings.INVENTORY_CHECK_CONCURRENCY) as executor:
+            return list(executor.map(func, batches))
 
-            with create_client_channel(settings.INVENTORY_API_SERVER) as channel:
-                stub = inventory_service_pb2_grpc.KesselInventoryServiceStub(channel)
-                metadata = [("authorization", f"Bearer {token}")]
+    def _check_batch(self, stub, checks, metadata):
+        """Check a batch of relations with a single CheckBulk request."""
+        request = CheckBulkRequest(
+            items=[
+                CheckBulkRequestItem(object=check.object, relation=check.relation, subject=check.subject)
+                for check in checks
+            ]
+        )
+        response = stub.CheckBulk(request, metadata=metadata)
+        results = []
+        for pair in response.pairs:
+            if pair.HasField("error"):
+                logger.warning(f"Check of relation {pair.request.relation} failed: {pair.error.message}")
+                results.append(False)
+            else:
+                results.append(pair.item.allowed != allowed_pb2.Allowed.ALLOWED_FALSE)
+        if len(results) != len(checks):
+            raise ValueError(f"CheckBulk returned {len(results)} results for {len(checks)} checks.")
+        return results
 
-                responses = [stub.Check(req, metadata=metadata) for req in checks]
-                return all(self._is_allowed(res) for res in responses)
-        return False
+    def _check(self, stub, check, metadata):
+        """Check a single relation."""
+        return self._is_allowed(stub.Check(check, metadata=metadata))
 
     def _is_allowed(self, response):
         response_dict = json_format.MessageToDict(response)
@@ -73,9 +125,8 @@ class GroupPrincipalInventoryChecker(InventoryApiBaseChecker):
     def check_relationships(self, relationships):
         """Core logic to check group principal relations are correct."""
         inventory_relation_assignments = {"group_uuid": "", "principal_relations": []}
-        for r in relationships:
-            # Build the check request
-            check_request = CheckRequest(
+        checks = [
+            CheckRequest(
                 object=resource_reference_pb2.ResourceReference(
                     resource_id=r.resource.id,
                     resource_type=r.resource.type.name,
@@ -90,7 +141,9 @@ class GroupPrincipalInventoryChecker(InventoryApiBaseChecker):
                     )
                 ),
             )
-            relation_exists = self.check_inventory_core(check_request)
+            for r in relationships
+        ]
+        for r, relation_exists in zip(relationships, self.check_inventory_bulk(checks)):
             inventory_relation_assignments["group_uuid"] = r.resource.id
             inventory_relation_assignments["principal_relations"].append(
                 {"id": r.subject.subject.id, "relation_exists": relation_exists}
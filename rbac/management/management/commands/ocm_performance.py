@@ -10,6 +10,7 @@
 
 
 from django.core.management.base import BaseCommand
+from tests.performance.test_performance_cache import test_tenant_invalidation
 from tests.performance.test_performance_concurrent import (
     test_full_sync,
     test_group_roles,
@@ -18,6 +19,9 @@ from tests.performance.test_performance_concurrent import (
     test_tenant_groups,
     test_tenant_roles,
 )
+from tests.performance.test_performance_middleware import test_identity_middleware_queries
+from tests.performance.test_performance_outbox import test_outbox_logical_message, test_relationship_encoding
+from tests.performance.test_performance_synchronous import test_paged_sync
 from tests.performance.test_performance_util import setUp, tearDown
 
 
@@ -29,12 +33,16 @@ class Command(BaseCommand):
     run the setup command first to populate the database.
 
     Usage:
-        python manage.py command ocm_performance [setup|test|teardown]
+        python manage.py command ocm_performance [setup|test|teardown|cache]
+
+    The cache mode benchmarks access cache invalidation against the configured Redis.
     """
 
     def add_arguments(self, parser):
         """Parse command arguments."""
-        parser.add_argument("mode", type=str, nargs="?", default="test", help="Choice of setup, test, or teardown")
+        parser.add_argument(
+            "mode", type=str, nargs="?", default="test", help="Choice of setup, test, teardown or cache"
+        )
 
     def handle(self, **options):
         """Run the command."""
@@ -51,5 +59,11 @@ class Command(BaseCommand):
             test_group_roles()
             test_principals_roles()
             test_principals_groups()
+            test_identity_middleware_queries()
+            test_paged_sync()
+            test_outbox_logical_message()
+            test_relationship_encoding()
+        elif mode == "cache":
+            test_tenant_invalidation()
         else:
-            print("Invalid mode. Please choose from setup, test, or teardown.")
+            print("Invalid mode. Please choose from setup, test, teardown or cache.")
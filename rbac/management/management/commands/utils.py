@@ -206,7 +206,7 @@ def batch_import_workspace(records):
                     modified=record["modified_on"],
                 )
                 workspaces.append(workspace)
-            pairs.append((str(workspace.id), str(parent.id)))
+            pairs.append((str(workspace.id), str(parent.id), record["org_id"]))
         Workspace.objects.bulk_create(workspaces)
         Workspace.objects.bulk_update(workspaces_to_update, ["name", "modified"])
         BOOT_STRAP_SERVICE.create_workspace_relationships(pairs)
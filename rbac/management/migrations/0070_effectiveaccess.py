@@ -0,0 +1,77 @@
+# Generated by Django 4.2.24 on 2026-10-17 04:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0016_tenant_relations_consistency_token"),
+        ("management", "0069_auditlog_resource_uuid_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EffectiveAccess",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("application", models.TextField()),
+                ("org_admin", models.BooleanField(default=False)),
+                ("access", models.JSONField(default=list)),
+                ("access_ids", models.JSONField(default=list)),
+                ("modified", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "principal",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="effective_access",
+                        to="management.principal",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="api.tenant"),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="EffectiveAccessGeneration",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("generation", models.BigIntegerField(default=0)),
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="effective_access_generation",
+                        to="api.tenant",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="effectiveaccess",
+            constraint=models.UniqueConstraint(
+                fields=("principal", "application", "org_admin"),
+                name="unique effective access per principal",
+            ),
+        ),
+    ]
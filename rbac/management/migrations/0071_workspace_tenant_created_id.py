@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 05:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("management", "0070_effectiveaccess"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="workspace",
+            index=models.Index(fields=["tenant", "created", "id"], name="workspace_tenant_created_id"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-17 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("management", "0071_workspace_tenant_created_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outbox",
+            name="route",
+            field=models.CharField(default="", max_length=255),
+        ),
+    ]
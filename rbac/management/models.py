@@ -32,3 +32,4 @@ from management.policy.model import Policy
 from management.audit_log.model import AuditLog
 from management.workspace.model import Workspace
 from management.debezium.model import Outbox
+from management.access.model import EffectiveAccess, EffectiveAccessGeneration
@@ -16,13 +16,14 @@
 #
 
 """Notification handlers of object change."""
+import copy
 import json
 import logging
 import os
 from datetime import datetime
 from uuid import uuid4
 
-from core.kafka import RBACProducer
+from core.kafka import MESSAGE_BUFFER, RBACProducer
 from django.conf import settings
 
 from api.models import Tenant
@@ -38,7 +39,7 @@ with open(os.path.join(settings.BASE_DIR, "management", "notifications", "messag
 
 def build_notifications_message(event_type, payload, org_id=None):
     """Create message based on template."""
-    message = message_template
+    message = copy.deepcopy(message_template)
     message["org_id"] = org_id
     message["event_type"] = event_type
     message["timestamp"] = datetime.now().isoformat()
@@ -50,7 +51,7 @@ def notify(event_type, payload, org_id=None):
     """Actually send notifications message."""
     noto_message = build_notifications_message(event_type, payload, org_id)
     noto_headers = [("rh-message-id", str(uuid4()).encode("utf-8"))]
-    noto_producer.send_kafka_message(noto_topic, noto_message, noto_headers)
+    MESSAGE_BUFFER.send(noto_producer, noto_topic, noto_message, noto_headers)
 
 
 def notify_all(event_type, payload):
@@ -24,7 +24,11 @@ from django.db import models
 from django.db.models import signals
 from django.utils import timezone
 from internal.integration import sync_handlers
-from management.cache import AccessCache, skip_purging_cache_for_public_tenant
+from management.cache import (
+    INVALIDATION_COLLECTOR,
+    connect_access_cache_signals,
+    skip_purging_cache_for_public_tenant,
+)
 from management.group.model import Group
 from management.principal.model import Principal
 from management.rbac_fields import AutoDateTimeField
@@ -52,18 +56,21 @@ class Policy(TenantAwareModel):
         constraints = [models.UniqueConstraint(fields=["name", "tenant"], name="unique policy name per tenant")]
 
 
+def _invalidate_group_principals(org_id, group):
+    """Collect the cache invalidation for the principals of a policy's group."""
+    if group.platform_default:
+        INVALIDATION_COLLECTOR.add_tenant(org_id)
+    else:
+        INVALIDATION_COLLECTOR.add_principals(org_id, group.principals.values_list("uuid", flat=True))
+
+
 def policy_changed_cache_handler(sender=None, instance=None, using=None, **kwargs):
     """Signal handler for Principal cache expiry on Policy deletion."""
     if skip_purging_cache_for_public_tenant(instance.tenant):
         return
     logger.info("Handling signal for deleted policy %s - invalidating associated user cache keys", instance)
-    cache = AccessCache(instance.tenant.org_id)
     if instance.group:
-        principals = instance.group.principals.all()
-        if instance.group.platform_default:
-            cache.delete_all_policies_for_tenant()
-        for principal in principals:
-            cache.delete_policy(principal.uuid)
+        _invalidate_group_principals(instance.tenant.org_id, instance.group)
 
 
 def policy_to_roles_cache_handler(
@@ -72,37 +79,29 @@ def policy_to_roles_cache_handler(
     """Signal handler for Principal cache expiry on Policy/Role m2m change."""
     if skip_purging_cache_for_public_tenant(instance.tenant):
         return
-    cache = AccessCache(instance.tenant.org_id)
+    org_id = instance.tenant.org_id
     if action in ("post_add", "pre_remove"):
         logger.info("Handling signal for %s roles change - invalidating policy cache", instance)
         if isinstance(instance, Policy):
             # One or more roles was added to/removed from the policy
             if instance.group:
-                if instance.group.platform_default:
-                    cache.delete_all_policies_for_tenant()
-                for principal in instance.group.principals.all():
-                    cache.delete_policy(principal.uuid)
+                _invalidate_group_principals(org_id, instance.group)
         elif isinstance(instance, Role):
             # One or more policies was added to/removed from the role
-            for policy in Policy.objects.filter(pk__in=pk_set):
+            for policy in Policy.objects.filter(pk__in=pk_set).select_related("group"):
                 if policy.group:
-                    if policy.group.platform_default:
-                        cache.delete_all_policies_for_tenant()
-                    for principal in policy.group.principals.all():
-                        cache.delete_policy(principal.uuid)
+                    _invalidate_group_principals(org_id, policy.group)
     elif action == "pre_clear":
         logger.info("Handling signal for %s policy-roles clearing - invalidating policy cache", instance)
         if isinstance(instance, Policy):
             # All roles are being removed from this policy
             if instance.group:
-                if instance.group.platform_default:
-                    cache.delete_all_policies_for_tenant()
-                for principal in instance.group.principals.all():
-                    cache.delete_policy(principal.uuid)
+                _invalidate_group_principals(org_id, instance.group)
         elif isinstance(instance, Role):
             # All policies are being removed from this role
-            for principal in Principal.objects.filter(group__policies__roles__pk=instance.pk):
-                cache.delete_policy(principal.uuid)
+            INVALIDATION_COLLECTOR.add_principals(
+                org_id, Principal.objects.filter(group__policies__roles__pk=instance.pk).values_list("uuid", flat=True)
+            )
 
 
 def policy_changed_sync_handler(sender=None, instance=None, using=None, **kwargs):
@@ -167,7 +166,7 @@ def policy_to_roles_sync_handler(
             )
 
 
-if settings.ACCESS_CACHE_ENABLED and settings.ACCESS_CACHE_CONNECT_SIGNALS:
+if connect_access_cache_signals():
     signals.post_save.connect(policy_changed_cache_handler, sender=Policy)
     signals.pre_delete.connect(policy_changed_cache_handler, sender=Policy)
     signals.m2m_changed.connect(policy_to_roles_cache_handler, sender=Policy.roles.through)
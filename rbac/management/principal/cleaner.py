@@ -19,17 +19,22 @@
 import logging
 import os
 import ssl
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import xmltodict
 from django.conf import settings
 from django.db import connection, transaction
+from management.cache import CheckpointCache, INVALIDATION_COLLECTOR, PrincipalCache
+from management.group.model import Group
 from management.principal.model import Principal
-from management.principal.proxy import PrincipalProxy, external_principal_to_user
-from management.relation_replicator.outbox_replicator import OutboxReplicator
+from management.principal.proxy import PRINCIPAL_LOOKUP_CACHE, PrincipalProxy, external_principal_to_user
+from management.relation_replicator.outbox_replicator import OUTBOX_BUFFER, OutboxReplicator
+from management.relation_replicator.relation_replicator import PartitionKey, ReplicationEvent, ReplicationEventType
+from management.tenant_mapping.model import TenantMapping
 from management.tenant_service import get_tenant_bootstrap_service
 from management.tenant_service.tenant_service import TenantBootstrapService
-from prometheus_client import Counter
+from prometheus_client import Counter, Gauge
 from rest_framework import status
 from sentry_sdk import capture_exception
 from stompest.config import StompConfig
@@ -43,6 +48,9 @@ from api.models import Tenant, User
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 PROXY = PrincipalProxy()  # pylint: disable=invalid-name
+PRINCIPAL_CACHE = PrincipalCache()
+CHECKPOINTS = CheckpointCache()
+CLEANUP_CHECKPOINT = "principal_cleanup"
 
 # Location of the CA, certificate and key files as defined in the
 # "it-umb-key-pair" secret and the "umb-certificates" volume mount.
@@ -62,51 +70,59 @@ stomp_messages_nack_total = Counter(
     METRIC_STOMP_MESSAGES_NACK_TOTAL,
     "Number of stomp UMB messages that failed to be processed",
 )
+principal_cleanup_checked_total = Counter(
+    "rbac_principal_cleanup_checked_total", "Number of principals checked against BOP by the principal clean up"
+)
+principal_cleanup_removed_total = Counter(
+    "rbac_principal_cleanup_removed_total", "Number of principals removed by the principal clean up"
+)
+principal_cleanup_tenants_total = Counter(
+    "rbac_principal_cleanup_tenants_total", "Number of tenants processed by the principal clean up", ["result"]
+)
+principal_cleanup_progress = Gauge(
+    "rbac_principal_cleanup_progress", "Fraction of the tenants done by the running principal clean up"
+)
 
 
 def clean_tenant_principals(tenant):
     """Check if all the principals in the tenant exist, remove non-existent principals."""
     removed_principals = []
-    principals = list(Principal.objects.filter(type="user").filter(tenant=tenant))
+    principals = list(Principal.objects.filter(type="user", tenant=tenant, cross_account=False).order_by("username"))
     tenant_id = tenant.org_id
     logger.info(
         "clean_tenant_principals: Running clean up on %d principals for tenant %s.", len(principals), tenant_id
     )
-    for principal in principals:
-        if principal.cross_account:
-            continue
-        logger.debug("clean_tenant_principals: Checking for username %s for tenant %s.", principal.username, tenant_id)
-        org_id = tenant.org_id
-        resp = PROXY.request_filtered_principals([principal.username], org_id=org_id)
+    batch_size = settings.PRINCIPAL_CLEANUP_BATCH_SIZE
+    for start in range(0, len(principals), batch_size):
+        batch = principals[start : start + batch_size]  # noqa: E203
+        usernames = [principal.username for principal in batch]
+        logger.debug("clean_tenant_principals: Checking %d usernames for tenant %s.", len(batch), tenant_id)
+        resp = PROXY.request_filtered_principals(usernames, org_id=tenant_id, limit=len(batch), bypass_cache=True)
         status_code = resp.get("status_code")
         data = resp.get("data")
-        logger.info("clean_tenant_principals: Response code: %s Data: %s", str(status_code), str(data))
-        if status_code == status.HTTP_200_OK and data:
-            logger.debug(
-                "clean_tenant_principals: Username %s found for tenant %s, no change needed.",
-                principal.username,
-                tenant_id,
-            )
-        elif status_code == status.HTTP_200_OK and not data:
-            removed_principals.append(principal.username)
-            logger.info(
-                "clean_tenant_principals: Username %s not found for tenant %s, principal eligible for removal.",
-                principal.username,
-                tenant_id,
-            )
-            principal.delete()
-            logger.info(
-                "clean_tenant_principals: Username %s removed.",
-                principal.username,
-            )
-        else:
+        principal_cleanup_checked_total.inc(len(batch))
+        if status_code != status.HTTP_200_OK:
             logger.warning(
-                "clean_tenant_principals: Unknown status %d when checking username %s"
+                "clean_tenant_principals: Unknown status %s when checking %d usernames"
                 " for tenant %s, no change needed.",
                 status_code,
-                principal.username,
+                len(batch),
                 tenant_id,
             )
+            continue
+        if isinstance(data, dict):
+            data = data.get("users")
+        found = {user["username"].casefold() for user in data or [] if user.get("username")}
+        missing = [principal for principal in batch if principal.username.casefold() not in found]
+        if not missing:
+            continue
+        logger.info(
+            "clean_tenant_principals: Usernames %s not found for tenant %s, principals eligible for removal.",
+            str([principal.username for principal in missing]),
+            tenant_id,
+        )
+        remove_principals(tenant, missing)
+        removed_principals.extend(principal.username for principal in missing)
     removal_message = "clean_tenant_principals: Completed clean up of %d principals for tenant %s, %d removed: %s."
     logger.info(
         removal_message,
@@ -117,15 +133,101 @@ def clean_tenant_principals(tenant):
     )
 
 
-def clean_tenants_principals():
-    """Check which principals are eligible for clean up."""
-    logger.info("clean_tenant_principals: Start principal clean up.")
+def remove_principals(tenant, principals):
+    """
+    Remove principals of a tenant along with their group memberships, in a single transaction.
 
-    for tenant in list(Tenant.objects.filter(ready=True).exclude(tenant_name="public")):
-        logger.info("clean_tenant_principals: Running principal clean up for tenant %s.", tenant.tenant_name)
+    The memberships are replicated as one event, and the caches of all the principals are purged at once.
+    """
+    org_id = tenant.org_id
+    tuples_to_remove = []
+    with transaction.atomic():
+        if settings.REPLICATION_TO_RELATION_ENABLED:
+            tuples_to_remove = _membership_relationships(tenant, principals)
+        Principal.objects.filter(pk__in=[principal.pk for principal in principals]).delete()
+        INVALIDATION_COLLECTOR.add_principals(org_id, [principal.uuid for principal in principals])
+        if tuples_to_remove:
+            OutboxReplicator().replicate(
+                ReplicationEvent(
+                    event_type=ReplicationEventType.BULK_PRINCIPAL_CLEANUP,
+                    info={"org_id": org_id, "num_principals": len(principals)},
+                    partition_key=PartitionKey.byTenant(org_id),
+                    remove=tuples_to_remove,
+                )
+            )
+    for principal in principals:
+        PRINCIPAL_CACHE.delete_principal(org_id, principal.username)
+        PRINCIPAL_LOOKUP_CACHE.delete_users(org_id, principal.username)
+    principal_cleanup_removed_total.inc(len(principals))
+
+
+def _membership_relationships(tenant, principals):
+    """Return the group membership relationships of the principals, including their default groups."""
+    relationships = []
+    by_id = {principal.pk: principal for principal in principals}
+    memberships = Group.principals.through.objects.filter(principal_id__in=by_id).select_related("group")
+    for membership in memberships:
+        relationship = membership.group.relationship_to_principal(by_id[membership.principal_id])
+        if relationship is not None:
+            relationships.append(relationship)
+    mapping = TenantMapping.objects.filter(tenant=tenant).first()
+    if mapping is not None:
+        for principal in principals:
+            if principal.user_id:
+                for group_uuid in (mapping.default_group_uuid, mapping.default_admin_group_uuid):
+                    relationships.append(Group.relationship_to_user_id_for_group(str(group_uuid), principal.user_id))
+    return relationships
+
+
+def _clean_tenant(tenant):
+    """Clean up a tenant from a worker thread, returning its id once done."""
+    try:
         clean_tenant_principals(tenant)
-        logger.info("clean_tenant_principals: Completed principal clean up for tenant %s.", tenant.tenant_name)
+        principal_cleanup_tenants_total.labels(result="completed").inc()
+    except Exception:
+        principal_cleanup_tenants_total.labels(result="failed").inc()
+        logger.exception("clean_tenant_principals: Principal clean up failed for tenant %s.", tenant.org_id)
+    finally:
+        if settings.PRINCIPAL_CLEANUP_CONCURRENCY > 1:
+            connection.close()
+    return tenant.id
+
+
+def clean_tenants_principals():
+    """
+    Check which principals are eligible for clean up.
+
+    Tenants are cleaned up in order of their id, PRINCIPAL_CLEANUP_CONCURRENCY at a time. The id below which every
+    tenant is done is saved as a checkpoint as the job goes, so a job which is interrupted resumes from there.
+    """
+    checkpoint = CHECKPOINTS.get_checkpoint(CLEANUP_CHECKPOINT) or 0
+    if checkpoint:
+        logger.info("clean_tenant_principals: Resuming principal clean up after tenant id %s.", checkpoint)
+    else:
+        logger.info("clean_tenant_principals: Start principal clean up.")
+
+    tenants = list(Tenant.objects.filter(ready=True, id__gt=checkpoint).exclude(tenant_name="public").order_by("id"))
+    pending = [tenant.id for tenant in tenants]
+    done = set()
+
+    def advance(tenant_id):
+        done.add(tenant_id)
+        last = None
+        while pending and pending[0] in done:
+            last = pending.pop(0)
+        if last is not None:
+            CHECKPOINTS.save_checkpoint(CLEANUP_CHECKPOINT, last)
+        principal_cleanup_progress.set(1 - len(pending) / len(tenants))
+
+    if settings.PRINCIPAL_CLEANUP_CONCURRENCY > 1:
+        with ThreadPoolExecutor(max_workers=settings.PRINCIPAL_CLEANUP_CONCURRENCY) as executor:
+            for tenant_id in executor.map(_clean_tenant, tenants):
+                advance(tenant_id)
+    else:
+        for tenant in tenants:
+            advance(_clean_tenant(tenant))
 
+    CHECKPOINTS.delete_checkpoint(CLEANUP_CHECKPOINT)
     logger.info("clean_tenant_principals: Principal cleanup complete for all tenants.")
 
 
@@ -203,6 +305,13 @@ def retrieve_user_info(message) -> User:
     return external_principal_to_user(user_data)
 
 
+def _user_from_frame(frame) -> User:
+    """Parse the umb frame and retrieve the user it is about."""
+    body = frame.body.decode("utf-8", errors="ignore")
+    data_dict = xmltodict.parse(body)
+    return retrieve_user_info(data_dict.get("CanonicalMessage"))
+
+
 def process_umb_event(frame, umb_client: Stomp, bootstrap_service: TenantBootstrapService) -> bool:
     """
     Process each umb frame.
@@ -217,16 +326,14 @@ def process_umb_event(frame, umb_client: Stomp, bootstrap_service: TenantBootstr
             return False
 
         try:
-            body = frame.body.decode("utf-8", errors="ignore")
-            data_dict = xmltodict.parse(body)
-            canonical_message = data_dict.get("CanonicalMessage")
-
-            user = retrieve_user_info(canonical_message)
+            user = _user_from_frame(frame)
             # By default, only process disabled users.
             # If the setting is enabled, process all users.
             if not user.is_active or settings.PRINCIPAL_CLEANUP_UPDATE_ENABLED_UMB:
                 # If Tenant is not already ready, don't ready it
                 bootstrap_service.update_user(user, ready_tenant=False)
+            if user.org_id and user.username:
+                PRINCIPAL_LOOKUP_CACHE.delete_users(user.org_id, user.username)
             umb_client.ack(frame)
             stomp_messages_ack_total.inc()
         except Exception as e:
@@ -245,6 +352,98 @@ def process_umb_event(frame, umb_client: Stomp, bootstrap_service: TenantBootstr
     return True
 
 
+def _update_users(users: list[User], bootstrap_service: TenantBootstrapService):
+    """
+    Update the users of a batch of umb frames, in the order of their frames within each org.
+
+    Active users are imported in bulk, when the bootstrap service supports it. Users which have to be updated one at
+    a time, such as inactive users, first flush the users pending import in their org, so that a user disabled after
+    being updated in the same batch ends up disabled.
+    """
+    import_bulk_users = getattr(bootstrap_service, "import_bulk_users", None)
+    pending: list[User] = []
+    pending_org_ids = set()
+
+    def flush():
+        if pending:
+            import_bulk_users(list(pending), ready_tenants=False)
+            pending.clear()
+            pending_org_ids.clear()
+
+    for user in users:
+        # By default, only process disabled users.
+        # If the setting is enabled, process all users.
+        if user.is_active and not settings.PRINCIPAL_CLEANUP_UPDATE_ENABLED_UMB:
+            continue
+        if import_bulk_users is not None and user.is_active and user.org_id and not user.is_service_account:
+            pending.append(user)
+            pending_org_ids.add(user.org_id)
+            continue
+        if user.org_id in pending_org_ids:
+            flush()
+        # If Tenant is not already ready, don't ready it
+        bootstrap_service.update_user(user, ready_tenant=False)
+    flush()
+
+
+def process_umb_batch(frames: list, umb_client: Stomp, bootstrap_service: TenantBootstrapService) -> bool:
+    """
+    Process a batch of umb frames in a single transaction.
+
+    The frames are acked once the transaction has committed. Frames which cannot be parsed are nacked on their own,
+    while if updating the users fails, the frames are processed again one at a time so that only the failing ones
+    are nacked.
+
+    If the process should continue to listen for more frames, return True. Otherwise, return False.
+    """
+    processed = []
+    failed = []
+    try:
+        with OUTBOX_BUFFER.atomic():
+            # This is locked per transaction to ensure another listener process does not run concurrently.
+            if not _lock_listener():
+                # If there is another listener, let it run and abort this one.
+                logger.info("process_umb_batch: Another listener is running. Aborting.")
+                return False
+
+            for frame in frames:
+                try:
+                    processed.append((frame, _user_from_frame(frame)))
+                except Exception as e:
+                    logger.error("process_umb_batch: Error processing umb message : %s", str(e))
+                    capture_exception(e)
+                    failed.append(frame)
+
+            _update_users([user for _, user in processed], bootstrap_service)
+    except Exception as e:
+        logger.warning("process_umb_batch: Batch failed, processing its frames one at a time: %s", str(e))
+        for frame in failed:
+            umb_client.nack(frame)
+            stomp_messages_nack_total.inc()
+        for frame, _ in processed:
+            if not process_umb_event(frame, umb_client, bootstrap_service):
+                return False
+        return True
+
+    for frame in failed:
+        umb_client.nack(frame)
+        stomp_messages_nack_total.inc()
+    for frame, user in processed:
+        if user.org_id and user.username:
+            PRINCIPAL_LOOKUP_CACHE.delete_users(user.org_id, user.username)
+        umb_client.ack(frame)
+        stomp_messages_ack_total.inc()
+    return True
+
+
+def _receive_umb_batch() -> list:
+    """Receive the next frames, up to the batch size, waiting a short while for each frame after the first."""
+    frames = [UMB_CLIENT.receiveFrame()]
+    while len(frames) < settings.UMB_BATCH_SIZE and UMB_CLIENT.canRead(settings.UMB_BATCH_WAIT_SECONDS):
+        frames.append(UMB_CLIENT.receiveFrame())
+    return frames
+
+
 def process_principal_events_from_umb(bootstrap_service: Optional[TenantBootstrapService] = None):
     """Process principals events from UMB."""
     logger.info("process_tenant_principal_events: Start processing principal events from umb.")
@@ -261,6 +460,12 @@ def process_principal_events_from_umb(bootstrap_service: Optional[TenantBootstra
 
     try:
         while UMB_CLIENT.canRead(15):  # Check if queue is empty, 15 sec timeout
+            if settings.UMB_BATCH_SIZE > 1:
+                frames = _receive_umb_batch()
+                logger.info("process_tenant_principal_events: Processing batch. frames=%d", len(frames))
+                if not process_umb_batch(frames, UMB_CLIENT, bootstrap_service):
+                    break
+                continue
             frame = UMB_CLIENT.receiveFrame()
             logger.info("process_tenant_principal_events: Processing frame. info=%s", frame.info())
             if not process_umb_event(frame, UMB_CLIENT, bootstrap_service):
@@ -24,6 +24,7 @@ import requests
 from django.conf import settings
 from django.db.models import Q
 from management.authorization.missing_authorization import MissingAuthorizationError
+from management.http_client import HTTPClient
 from management.models import Group, Principal
 from prometheus_client import Counter, Histogram
 from rest_framework import serializers, status
@@ -57,6 +58,8 @@ it_request_error = Counter(
     ["error"],
 )
 
+IT_CLIENT = HTTPClient("it", settings.IT_SERVICE_TIMEOUT_SECONDS)
+
 # Keys for the "options" dictionary. The "options" dictionary represents the query parameters passed by the calling
 # client.
 SERVICE_ACCOUNT_DESCRIPTION_KEY = "service_account_description"
@@ -124,7 +127,7 @@ class ITService:
                     parameters["clientId"] = client_ids
 
                 # Call IT.
-                response = requests.get(
+                response = IT_CLIENT.get(
                     url=self.it_url,
                     headers={"Authorization": f"Bearer {bearer_token}"},
                     params=parameters,
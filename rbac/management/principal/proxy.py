@@ -16,10 +16,13 @@
 #
 
 """Proxy for principal management."""
+import json
 import logging
 
 import requests
 from django.conf import settings
+from management.cache import PrincipalLookupCache, SingleFlight
+from management.http_client import HTTPClient
 from management.models import Principal
 from prometheus_client import Counter, Histogram
 from rest_framework import status
@@ -48,6 +51,10 @@ bop_request_time_tracking = Histogram(
 bop_request_status_count = Counter(
     "bop_request_status_total", "Number of requests from RBAC to BOP and resulting status", ["method", "status"]
 )
+# BOP lookups are sent as POST requests, which are safe to retry
+BOP_CLIENT = HTTPClient("bop", settings.PRINCIPAL_PROXY_TIMEOUT_SECONDS, allowed_methods=("GET", "POST"))
+PRINCIPAL_LOOKUP_CACHE = PrincipalLookupCache()
+PRINCIPAL_LOOKUP_SINGLE_FLIGHT = SingleFlight()
 
 
 class PrincipalProxy:  # pylint: disable=too-few-public-methods
@@ -152,7 +159,7 @@ class PrincipalProxy:  # pylint: disable=too-few-public-methods
         url,
         org_id=None,
         org_id_filter=False,
-        method=requests.get,
+        method=BOP_CLIENT.get,
         params=None,
         data=None,
         return_id=False,  # noqa: C901
@@ -211,7 +218,7 @@ class PrincipalProxy:  # pylint: disable=too-few-public-methods
             if self.source_cert:
                 kwargs["verify"] = self.client_cert_path
             response = method(url, **kwargs)
-        except requests.exceptions.ConnectionError as conn:
+        except requests.exceptions.RequestException as conn:
             LOGGER.error("Unable to connect for URL %s with error: %s", url, conn)
             resp = {"status_code": status.HTTP_500_INTERNAL_SERVER_ERROR, "errors": [unexpected_error]}
             bop_request_status_count.labels(method=metrics_method, status=resp.get("status_code")).inc()
@@ -261,10 +268,10 @@ class PrincipalProxy:  # pylint: disable=too-few-public-methods
         if input:
             payload = input
             account_principals_path = f"/v3/accounts/{org_id}/usersBy"
-            method = requests.post
+            method = BOP_CLIENT.post
         else:
             account_principals_path = f"/v3/accounts/{org_id}/users"
-            method = requests.get
+            method = BOP_CLIENT.get
             payload = None
 
         params = self._create_params(limit, offset, options)
@@ -274,8 +281,15 @@ class PrincipalProxy:  # pylint: disable=too-few-public-methods
             url, org_id=org_id, params=params, org_id_filter=False, method=method, data=payload
         )
 
-    def request_filtered_principals(self, principals, org_id=None, limit=None, offset=None, options={}):
-        """Request specific principals for an account."""
+    def request_filtered_principals(
+        self, principals, org_id=None, limit=None, offset=None, options={}, bypass_cache=False
+    ):
+        """
+        Request specific principals for an account.
+
+        Lookups of a single username within a tenant are cached, including the ones which find nothing. Write
+        paths which must see the current state of BOP pass bypass_cache.
+        """
         if org_id is None:
             org_id_filter = False
         else:
@@ -289,16 +303,56 @@ class PrincipalProxy:  # pylint: disable=too-few-public-methods
         url = "{}://{}:{}{}{}".format(self.protocol, self.host, self.port, self.path, filtered_principals_path)
 
         return_id = False if options.get("return_id") is None else True
+        if (
+            len(principals) == 1
+            and org_id_filter
+            and not bypass_cache
+            and settings.PRINCIPAL_LOOKUP_CACHE_ENABLED
+            and not settings.BYPASS_BOP_VERIFICATION
+            and params.get("username_only") != "true"
+        ):
+            return self._request_cached_principal(url, principals[0], org_id, params, return_id)
         return self._request_principals(
             url,
             org_id=org_id,
             org_id_filter=org_id_filter,
-            method=requests.post,
+            method=BOP_CLIENT.post,
             params=params,
             data=payload,
             return_id=return_id,
         )
 
+    def _request_cached_principal(self, url, username, org_id, params, return_id):
+        """Look a username up through the cache, with a single request to BOP for concurrent misses."""
+        variant = json.dumps(params, sort_keys=True)
+        users = PRINCIPAL_LOOKUP_CACHE.get_users(org_id, username, variant)
+        if users is None:
+
+            def lookup():
+                resp = self._request_principals(
+                    url,
+                    org_id=org_id,
+                    org_id_filter=True,
+                    method=BOP_CLIENT.post,
+                    params=params,
+                    data={"users": [username]},
+                    return_id=True,
+                )
+                if resp.get("status_code") == status.HTTP_200_OK and isinstance(resp.get("data"), list):
+                    PRINCIPAL_LOOKUP_CACHE.save_users(org_id, username, variant, resp["data"])
+                return resp
+
+            resp = PRINCIPAL_LOOKUP_SINGLE_FLIGHT.do((org_id, username.lower(), variant), lookup)
+            if resp.get("status_code") != status.HTTP_200_OK or not isinstance(resp.get("data"), list):
+                return resp
+            users = resp["data"]
+        # The users are shared with the concurrent lookups, so each of them gets its own copies.
+        users = [dict(user) for user in users]
+        if not return_id:
+            for user in users:
+                user.pop("user_id", None)
+        return {"status_code": status.HTTP_200_OK, "data": users}
+
 
 def external_principal_to_user(principal: dict) -> User:
     """Convert external principal to the common User object."""
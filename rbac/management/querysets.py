@@ -173,7 +173,6 @@ def get_role_queryset(request) -> QuerySet:
             Role,
             **{
                 "prefetch_lookups_for_ids": "access",
-                "prefetch_lookups_for_groups": "policies__roles",
                 "is_org_admin": request.user.admin,
             },
         )
@@ -201,7 +200,6 @@ def get_role_queryset(request) -> QuerySet:
                 Role,
                 **{
                     "prefetch_lookups_for_ids": "access",
-                    "prefetch_lookups_for_groups": "policies__roles",
                     "is_org_admin": is_org_admin,
                 },
             )
@@ -241,7 +239,7 @@ def get_policy_queryset(request):
     return filter_queryset_by_tenant(Policy.objects.filter(uuid__in=access), request.tenant)
 
 
-def get_access_queryset(request: Request) -> QuerySet:
+def get_access_queryset(request: Request, is_org_admin: Optional[bool] = None) -> QuerySet:
     """Obtain the queryset for access."""
     if APPLICATION_KEY not in request.query_params:
         key = "detail"
@@ -249,13 +247,8 @@ def get_access_queryset(request: Request) -> QuerySet:
         raise serializers.ValidationError({key: _(message)})
 
     app = request.query_params.get(APPLICATION_KEY)
-    # If we are querying on a username we need to check if the username is an org_admin
-    # not the user making the request
-    username = request.query_params.get("username")
-    if not username or settings.BYPASS_BOP_VERIFICATION:
-        is_org_admin = request.user.admin
-    else:
-        is_org_admin = _check_user_username_is_org_admin(request=request, username=username)
+    if is_org_admin is None:
+        is_org_admin = get_access_org_admin_status(request)
 
     return get_object_principal_queryset(
         request,
@@ -264,12 +257,21 @@ def get_access_queryset(request: Request) -> QuerySet:
         **{
             APPLICATION_KEY: app,
             "prefetch_lookups_for_ids": "resourceDefinitions",
-            "prefetch_lookups_for_groups": "policies__roles__access",
             "is_org_admin": is_org_admin,
         },
     )
 
 
+def get_access_org_admin_status(request: Request) -> bool:
+    """Determine whether the principal whose access is requested is an org admin."""
+    # If we are querying on a username we need to check if the username is an org_admin
+    # not the user making the request
+    username = request.query_params.get("username")
+    if not username or settings.BYPASS_BOP_VERIFICATION:
+        return request.user.admin
+    return _check_user_username_is_org_admin(request=request, username=username)
+
+
 def get_object_principal_queryset(request, scope, clazz, **kwargs):
     """Get the query set for the specific object for principal scope."""
     if scope not in VALID_SCOPES:
@@ -16,11 +16,24 @@
 #
 
 """Class to handle Dual Write API related operations."""
+import logging
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from enum import Enum
+from itertools import chain
+from typing import Optional
 
 from django.conf import settings
 from kessel.relations.v1beta1 import common_pb2
+from prometheus_client import Counter
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+partition_audit_violations_total = Counter(
+    "relations_partition_audit_violations_total", "Total count of tuples changed through more than one partition"
+)
 
 
 class DualWriteException(Exception):
@@ -50,6 +63,7 @@ class ReplicationEventType(str, Enum):
     EXTERNAL_USER_UPDATE = "external_user_update"
     EXTERNAL_USER_DISABLE = "external_user_disable"
     BULK_EXTERNAL_USER_UPDATE = "bulk_external_user_update"
+    BULK_PRINCIPAL_CLEANUP = "bulk_principal_cleanup"
     MIGRATE_CUSTOM_ROLE = "migrate_custom_role"
     MIGRATE_TENANT_GROUPS = "migrate_tenant_groups"
     CUSTOMIZE_DEFAULT_GROUP = "customize_default_group"
@@ -65,6 +79,7 @@ class ReplicationEventType(str, Enum):
     UPDATE_WORKSPACE = "update_workspace"
     DELETE_WORKSPACE = "delete_workspace"
     MOVE_WORKSPACE = "move_workspace"
+    MERGED_EVENTS = "merged_events"
 
 
 class ReplicationEvent:
@@ -136,6 +151,40 @@ class RelationReplicator(ABC):
         """Replicate the given workspace event to Kessel Relations."""
         pass
 
+    def replicate_changes(self, event: ReplicationEvent):
+        """
+        Replicate only the tuples of the event which change.
+
+        Handlers replace the tuples of an object by removing all of its current tuples and adding all of its new ones,
+        so a role bound to many resources makes for huge events even when a single permission changed. Events apply
+        their removals before their additions, so a tuple both removed and added is left as it was, the removed tuples
+        being the current ones; such tuples are dropped from the event, along with duplicates. Nothing is replicated
+        when no tuple changes.
+
+        Migrations write the tuples of objects which may not have been replicated yet, so their events are replicated
+        in full.
+        """
+        if not settings.REPLICATION_TUPLE_DELTA or event.event_type in MIGRATION_EVENT_TYPES:
+            self.replicate(event)
+            return
+        add, remove = relationship_delta(event.add, event.remove)
+        if not add and not remove and (event.add or event.remove):
+            logger.info(
+                "[Dual Write] Skipping replication event, no tuples changed. event_type='%s' partition_key='%s'",
+                event.event_type,
+                event.partition_key,
+            )
+            return
+        self.replicate(
+            ReplicationEvent(
+                event_type=event.event_type,
+                partition_key=event.partition_key,
+                add=add,
+                remove=remove,
+                info=event.event_info,
+            )
+        )
+
 
 class PartitionKey(ABC):
     """
@@ -154,24 +203,37 @@ class PartitionKey(ABC):
         """
         return EnvironmentPartitionKey()
 
-    # TODO: Eventually we may want to scale out replication via more partitions.
-    # To do this we will need a procedure like this:
-    # 1. Add a field to the outbox table that can control the topic
-    # 3. Add configuration for `route.by.field` in Debezium
-    # 4. Start writing events with the new partition key, with a new value for this field.
-    #    Events in the WAL with the global key will be routed to the "old" topic,
-    #    while events with the new partition key(s) will be routed to a new topic.
-    # 5. Let the "old" topic be consumed entirely by the sink.
+    @staticmethod
+    def byTenant(org_id: Optional[str]) -> "PartitionKey":
+        """
+        Order the events of a tenant, given its org_id (None for the public tenant).
+
+        Events of different tenants are not ordered with respect to each other, so they can be processed by as many
+        consumers as there are partitions. Until REPLICATION_PARTITION_BY_TENANT is enabled, this orders all events
+        within the environment like byEnvironment.
+        """
+        if not settings.REPLICATION_PARTITION_BY_TENANT:
+            return EnvironmentPartitionKey()
+        return TenantPartitionKey(org_id)
+
+    # Switching partition keys follows this procedure:
+    # 1. Events carry a route in the outbox table, which controls their topic.
+    # 2. Configure `route.by.field` to `route` in Debezium.
+    # 3. Enable REPLICATION_PARTITION_BY_TENANT to start writing events with the tenant partition key.
+    #    Events in the WAL with the environment key are routed to the "old" topic,
+    #    while events with the tenant key are routed to a new topic.
+    # 4. Let the "old" topic be consumed entirely by the sink.
     #    This maintains order for those with respect to anything new.
-    # 6. Once that is empty, switch the sink to the new topic.
+    # 5. Once that is empty, switch the sink to the new topic.
     # This just introduces some delay in new access, but otherwise doesn't introduce an outage.
 
-    # Example: byTenant(tenant: Tenant) -> "PartitionKey":
-    # ...
-
     # When partitioning by another key, be mindful of causal relationships between events,
     # and other operations which may change the same tuples.
-    # The same tuples MUST only ever be changed with the same partition.
+    # The same tuples MUST only ever be changed with the same partition, see PartitionAudit.
+
+    def route(self, aggregatetype: str) -> str:
+        """Return the route of the events with this key, which selects their topic."""
+        return aggregatetype
 
     @abstractmethod
     def __str__(self) -> str:
@@ -185,3 +247,108 @@ class EnvironmentPartitionKey(PartitionKey):
     def __str__(self) -> str:
         """Return the environment name."""
         return settings.ENV_NAME
+
+
+class TenantPartitionKey(PartitionKey):
+    """Tenant partition key orders the events of each tenant, which are routed to their own topic."""
+
+    def __init__(self, org_id: Optional[str]):
+        """Initialize the key of the tenant with the given org_id, or of the public tenant."""
+        self.org_id = org_id
+
+    def __str__(self) -> str:
+        """Return the environment name followed by the org_id."""
+        return f"{settings.ENV_NAME}/{self.org_id or 'public'}"
+
+    def route(self, aggregatetype: str) -> str:
+        """Route the events to the topic of the events partitioned by tenant."""
+        return f"{aggregatetype}-by-tenant"
+
+
+def relationship_key(relationship: common_pb2.Relationship) -> str:
+    """Return the string identifying a tuple, including the namespaces and subject relation."""
+    resource = relationship.resource
+    subject = relationship.subject
+    return (
+        f"{resource.type.namespace}/{resource.type.name}:{resource.id}#{relationship.relation}@"
+        f"{subject.subject.type.namespace}/{subject.subject.type.name}:{subject.subject.id}#{subject.relation}"
+    )
+
+
+MIGRATION_EVENT_TYPES = frozenset(
+    {
+        ReplicationEventType.MIGRATE_CUSTOM_ROLE,
+        ReplicationEventType.MIGRATE_TENANT_GROUPS,
+        ReplicationEventType.MIGRATE_SYSTEM_ROLE_ASSIGNMENT,
+        ReplicationEventType.MIGRATE_CROSS_ACCOUNT_REQUEST,
+    }
+)
+
+
+def relationship_delta(
+    add: list[common_pb2.Relationship], remove: list[common_pb2.Relationship]
+) -> tuple[list[common_pb2.Relationship], list[common_pb2.Relationship]]:
+    """Return the tuples to add and to remove without duplicates, leaving out the tuples both added and removed."""
+    to_add = {relationship_key(relationship): relationship for relationship in add}
+    to_remove = {relationship_key(relationship): relationship for relationship in remove}
+    return (
+        [relationship for key, relationship in to_add.items() if key not in to_remove],
+        [relationship for key, relationship in to_remove.items() if key not in to_add],
+    )
+
+
+class PartitionAudit:
+    """
+    Best effort detection of tuples changed through more than one partition.
+
+    Events of different partitions are not ordered with respect to each other, so a tuple changed through two
+    partitions could end up in either state. The partition of the tuples replicated most recently by this process is
+    remembered, up to REPLICATION_PARTITION_AUDIT_SIZE tuples, and a tuple changed through another partition is
+    reported. In strict mode the event is rejected instead.
+
+    The memory is an in-process LRU, so it only catches violations made within one worker, for tuples it has not
+    evicted yet. A tuple changed through one partition by a worker and through another by a different worker goes
+    unnoticed, so a clean audit does not prove the invariant holds.
+    """
+
+    def __init__(self):
+        """Init the audit."""
+        self._partitions: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, event: ReplicationEvent):
+        """
+        Report the tuples of the event changed through another partition, then record the partition of its tuples.
+
+        An event rejected in strict mode is not replicated, so its partition is not recorded.
+        """
+        partition = str(event.partition_key)
+        keys = [relationship_key(relationship) for relationship in chain(event.add, event.remove)]
+        with self._lock:
+            violations = []
+            for key in keys:
+                previous = self._partitions.get(key)
+                if previous is not None and previous != partition:
+                    violations.append(f"{key} ({previous})")
+            if violations:
+                partition_audit_violations_total.inc(len(violations))
+                message = (
+                    f"[Dual Write] Tuples changed through more than one partition. "
+                    f"event_type='{event.event_type}' partition='{partition}' tuples={violations}"
+                )
+                if settings.REPLICATION_PARTITION_AUDIT_STRICT:
+                    raise DualWriteException(message)
+                logger.error(message)
+            for key in keys:
+                self._partitions[key] = partition
+                self._partitions.move_to_end(key)
+            while len(self._partitions) > settings.REPLICATION_PARTITION_AUDIT_SIZE:
+                self._partitions.popitem(last=False)
+
+    def reset(self):
+        """Forget the partitions recorded so far."""
+        with self._lock:
+            self._partitions.clear()
+
+
+PARTITION_AUDIT = PartitionAudit()
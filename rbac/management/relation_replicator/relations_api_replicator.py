@@ -27,6 +27,7 @@ from google.rpc import error_details_pb2
 from grpc_status import rpc_status
 from kessel.relations.v1beta1 import relation_tuples_pb2
 from kessel.relations.v1beta1 import relation_tuples_pb2_grpc
+from management.grpc_channels import GRPC_CHANNELS
 from management.relation_replicator.relation_replicator import RelationReplicator, ReplicationEvent
 
 
@@ -41,22 +42,21 @@ class RelationsApiReplicator(RelationReplicator):
         self._write_relationships(event.add)
 
     def _write_relationships(self, relationships):
-        with grpc.insecure_channel(settings.RELATION_API_SERVER) as channel:
-            stub = relation_tuples_pb2_grpc.KesselTupleServiceStub(channel)
-
-            request = relation_tuples_pb2.CreateTuplesRequest(
-                upsert=True,
-                tuples=relationships,
+        stub = relation_tuples_pb2_grpc.KesselTupleServiceStub(GRPC_CHANNELS.get(settings.RELATION_API_SERVER))
+
+        request = relation_tuples_pb2.CreateTuplesRequest(
+            upsert=True,
+            tuples=relationships,
+        )
+        try:
+            stub.CreateTuples(request)
+        except grpc.RpcError as err:
+            error = GRPCError(err)
+            logger.error(
+                "Failed to write relationships to the relation API server: "
+                f"error code {error.code}, reason {error.reason}"
+                f"relationships: {relationships}"
             )
-            try:
-                stub.CreateTuples(request)
-            except grpc.RpcError as err:
-                error = GRPCError(err)
-                logger.error(
-                    "Failed to write relationships to the relation API server: "
-                    f"error code {error.code}, reason {error.reason}"
-                    f"relationships: {relationships}"
-                )
 
 
 class GRPCError:
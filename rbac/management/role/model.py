@@ -26,9 +26,15 @@ from django.db.models import signals
 from django.utils import timezone
 from internal.integration import sync_handlers
 from kessel.relations.v1beta1.common_pb2 import Relationship
-from management.cache import AccessCache, skip_purging_cache_for_public_tenant
+from management.cache import (
+    INVALIDATION_COLLECTOR,
+    connect_access_cache_signals,
+    skip_purging_cache_for_public_tenant,
+)
 from management.models import Permission, Principal
 from management.rbac_fields import AutoDateTimeField
+from management.relation_replicator.relation_replicator import DualWriteException, PartitionKey
+from management.workspace.model import Workspace
 from migration_tool.models import (
     V2boundresource,
     V2role,
@@ -198,6 +204,28 @@ class BindingMapping(models.Model):
         v2_role_binding = self.get_role_binding()
         return v2_role_binding.as_tuples()
 
+    def partition_key(self) -> PartitionKey:
+        """
+        Return the partition key of this binding, which is the one of the tenant owning the bound resource.
+
+        Bindings of custom roles fall back to the tenant of the role once the bound workspace is gone. Otherwise the
+        tenant cannot be known, and replicating through any other partition could reorder the changes of the tuples,
+        so a DualWriteException is raised.
+        """
+        if not settings.REPLICATION_PARTITION_BY_TENANT:
+            return PartitionKey.byEnvironment()
+        if self.resource_type_name == "tenant":
+            return PartitionKey.byTenant(self.resource_id.split("/", 1)[-1])
+        org_id = Workspace.objects.filter(id=self.resource_id).values_list("tenant__org_id", flat=True).first()
+        if org_id is None and not self.role.system:
+            org_id = self.role.tenant.org_id
+        if org_id is None:
+            raise DualWriteException(
+                f"Cannot determine the tenant of binding {self.mappings.get('id')}, "
+                f"{self.resource_type_name} {self.resource_id} does not exist."
+            )
+        return PartitionKey.byTenant(org_id)
+
     def is_unassigned(self):
         """Return true if mapping is not assigned to any groups or users."""
         return len(self.mappings.get("groups", [])) == 0 and len(self.mappings.get("users", [])) == 0
@@ -337,10 +365,12 @@ def role_related_obj_change_cache_handler(sender=None, instance=None, using=None
         "invalidating associated user cache keys",
         instance,
     )
-    cache = AccessCache(instance.tenant.org_id)
-    if instance.role:
-        for principal in Principal.objects.filter(group__policies__roles__pk=instance.role.pk):
-            cache.delete_policy(principal.uuid)
+    # A role update saves many Access and ResourceDefinition rows in one transaction, resolve its principals once.
+    if instance.role and INVALIDATION_COLLECTOR.claim(("role", instance.role.pk)):
+        INVALIDATION_COLLECTOR.add_principals(
+            instance.tenant.org_id,
+            Principal.objects.filter(group__policies__roles__pk=instance.role.pk).values_list("uuid", flat=True),
+        )
 
 
 def role_related_obj_change_sync_handler(sender=None, instance=None, using=None, **kwargs):
@@ -355,7 +385,7 @@ def role_related_obj_change_sync_handler(sender=None, instance=None, using=None,
         )
 
 
-if settings.ACCESS_CACHE_ENABLED and settings.ACCESS_CACHE_CONNECT_SIGNALS:
+if connect_access_cache_signals():
     signals.pre_delete.connect(role_related_obj_change_cache_handler, sender=Role)
     signals.pre_delete.connect(role_related_obj_change_cache_handler, sender=Access)
     signals.pre_delete.connect(role_related_obj_change_cache_handler, sender=ResourceDefinition)
@@ -166,11 +166,11 @@ class SeedingRelationApiDualWriteHandler(BaseRelationApiDualWriteHandler):
         if not self.replication_enabled():
             return
         try:
-            self._replicator.replicate(
+            self._replicator.replicate_changes(
                 ReplicationEvent(
                     event_type=event_type,
                     info=metadata,
-                    partition_key=PartitionKey.byEnvironment(),
+                    partition_key=PartitionKey.byTenant(self.role.tenant.org_id),
                     remove=remove,
                     add=add,
                 ),
@@ -303,7 +303,7 @@ class RelationApiDualWriteHandler(BaseRelationApiDualWriteHandler):
             return
 
         try:
-            self._replicator.replicate(
+            self._replicator.replicate_changes(
                 ReplicationEvent(
                     event_type=self.event_type,
                     info={
@@ -311,7 +311,7 @@ class RelationApiDualWriteHandler(BaseRelationApiDualWriteHandler):
                         "v1_role_uuid": str(self.role.uuid),
                         "org_id": str(self.role.tenant.org_id),
                     },
-                    partition_key=PartitionKey.byEnvironment(),
+                    partition_key=PartitionKey.byTenant(self.role.tenant.org_id),
                     remove=self.current_role_relations,
                     add=self.role_relations,
                 ),
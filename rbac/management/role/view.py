@@ -24,7 +24,7 @@ import traceback
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError, transaction
+from django.db import IntegrityError
 from django.db.models import Q
 from django.db.models.aggregates import Count
 from django.http import Http404
@@ -35,6 +35,7 @@ from management.models import AuditLog, Permission
 from management.notifications.notification_handlers import role_obj_change_notification_handler
 from management.permissions import RoleAccessPermission
 from management.querysets import get_role_queryset, user_has_perm
+from management.relation_replicator.outbox_replicator import OUTBOX_BUFFER
 from management.relation_replicator.relation_replicator import DualWriteException, ReplicationEventType
 from management.role.relation_api_dual_write_handler import (
     RelationApiDualWriteHandler,
@@ -141,6 +142,7 @@ class RoleViewSet(
     filterset_class = RoleFilter
     ordering_fields = ("name", "display_name", "modified", "policyCount")
     ordering = ("name",)
+    cursor_ordering = ("id",)
 
     def get_queryset(self):
         """Obtain queryset for requesting user based on access and action."""
@@ -269,7 +271,7 @@ class RoleViewSet(
         """
         self.validate_role(request)
         try:
-            with transaction.atomic():
+            with OUTBOX_BUFFER.atomic():
                 return super().create(request=request, args=args, kwargs=kwargs)
         except IntegrityError as e:
             if DUPLICATE_KEY_ERROR_MSG in e.args[0]:
@@ -385,7 +387,7 @@ class RoleViewSet(
         validate_uuid(kwargs.get("uuid"), "role uuid validation")
 
         try:
-            with transaction.atomic():
+            with OUTBOX_BUFFER.atomic():
                 return super().destroy(request=request, args=args, kwargs=kwargs)
         except DualWriteException as e:
             return self.dual_write_exception_response(e)
@@ -465,7 +467,7 @@ class RoleViewSet(
         self.validate_role(request)
 
         try:
-            with transaction.atomic():
+            with OUTBOX_BUFFER.atomic():
                 return super().update(request=request, args=args, kwargs=kwargs)
         except DualWriteException as e:
             return self.dual_write_exception_response(e)
@@ -2,6 +2,7 @@
 
 from typing import Optional
 
+from management.cache import PrincipalCache
 from management.principal.model import Principal
 from management.tenant_mapping.model import logger
 from management.tenant_service.tenant_service import BootstrappedTenant
@@ -68,6 +69,8 @@ class V1TenantBootstrapService:
                 # or the console will still show the cached number of members
                 group.principals.remove(principal)
             principal.delete()
+            if user.org_id is not None:
+                PrincipalCache().delete_principal(user.org_id, principal.username)
             if not groups:
                 logger.info(f"Principal {user.user_id} was not under any groups.")
             for group in groups:
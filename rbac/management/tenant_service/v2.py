@@ -6,6 +6,7 @@ from uuid import UUID
 from django.conf import settings
 from django.db.models import Prefetch, Q
 from kessel.relations.v1beta1.common_pb2 import Relationship
+from management.cache import PrincipalCache
 from management.group.model import Group
 from management.principal.model import Principal
 from management.relation_replicator.relation_replicator import (
@@ -93,7 +94,7 @@ class V2TenantBootstrapService:
             ReplicationEvent(
                 event_type=ReplicationEventType.CREATE_UNGROUPED_HOSTS_WORKSPACE,
                 info={"org_id": tenant.org_id, "ungrouped_hosts_id": str(ungrouped_hosts.id)},
-                partition_key=PartitionKey.byEnvironment(),
+                partition_key=PartitionKey.byTenant(tenant.org_id),
                 add=[relationship],
             )
         )
@@ -145,7 +146,7 @@ class V2TenantBootstrapService:
             ReplicationEvent(
                 event_type=ReplicationEventType.EXTERNAL_USER_UPDATE,
                 info={"user_id": user.user_id, "org_id": user.org_id},
-                partition_key=PartitionKey.byEnvironment(),
+                partition_key=PartitionKey.byTenant(user.org_id),
                 add=tuples_to_add,
                 remove=tuples_to_remove,
             )
@@ -164,6 +165,7 @@ class V2TenantBootstrapService:
             users (list): List of User objects to update
         """
         org_ids = set()
+        account_numbers: dict[str, Optional[str]] = {}
         for user in users:
             if not user.is_active:
                 logger.info(f"User is not active. Skipping import. user_id={user.user_id} org_id={user.org_id}")
@@ -177,7 +179,9 @@ class V2TenantBootstrapService:
                     f"org_id={user.org_id}"
                 )
             org_ids.add(user.org_id)
-        bootstrapped_list = self._get_or_bootstrap_tenants(org_ids, ready_tenants)
+            if user.account or user.org_id not in account_numbers:
+                account_numbers[user.org_id] = user.account
+        bootstrapped_list = self._get_or_bootstrap_tenants(org_ids, ready_tenants, account_numbers)
         bootstrapped_mapping = {bootstrapped.tenant.org_id: bootstrapped for bootstrapped in bootstrapped_list}
 
         tuples_to_add = []
@@ -217,8 +221,8 @@ class V2TenantBootstrapService:
                 raise ValueError(f"Expected TenantMapping but got None. org_id: {bootstrapped.tenant.org_id}")
 
             sub_tuples_to_add, sub_tuples_to_remove = self._default_group_tuple_edits(user, mapping)
-            tuples_to_add.extend(sub_tuples_to_add)
-            tuples_to_remove.extend(sub_tuples_to_remove)
+            tuples_to_add.extend((user.org_id, relationship) for relationship in sub_tuples_to_add)
+            tuples_to_remove.extend((user.org_id, relationship) for relationship in sub_tuples_to_remove)
         # Bulk update existing principals
         if principals_to_update:
             logger.info(
@@ -227,16 +231,56 @@ class V2TenantBootstrapService:
             )
             Principal.objects.bulk_update(principals_to_update, ["user_id"])
 
-        self._replicator.replicate(
-            ReplicationEvent(
-                event_type=ReplicationEventType.BULK_EXTERNAL_USER_UPDATE,
-                info={"num_users": len(users), "first_user_id": users[0].user_id if users else None},
-                partition_key=PartitionKey.byEnvironment(),
-                add=tuples_to_add,
-                remove=tuples_to_remove,
-            )
+        self._replicate_by_tenant(
+            ReplicationEventType.BULK_EXTERNAL_USER_UPDATE,
+            {"num_users": len(users), "first_user_id": users[0].user_id if users else None},
+            add=tuples_to_add,
+            remove=tuples_to_remove,
         )
 
+    def _replicate_by_tenant(
+        self,
+        event_type: ReplicationEventType,
+        info: dict[str, object],
+        add: Optional[list[tuple[Optional[str], Relationship]]] = None,
+        remove: Optional[list[tuple[Optional[str], Relationship]]] = None,
+    ):
+        """
+        Replicate the (org_id, tuple) pairs of many tenants.
+
+        The tuples are replicated in one event per tenant when events are partitioned by tenant, since each tuple must
+        only ever be changed through the partition of its tenant. Otherwise they are replicated in a single event.
+        """
+        add = add or []
+        remove = remove or []
+        if not settings.REPLICATION_PARTITION_BY_TENANT:
+            self._replicator.replicate(
+                ReplicationEvent(
+                    event_type=event_type,
+                    info=info,
+                    partition_key=PartitionKey.byEnvironment(),
+                    add=[relationship for _, relationship in add],
+                    remove=[relationship for _, relationship in remove],
+                )
+            )
+            return
+
+        by_tenant: dict[Optional[str], tuple[list[Relationship], list[Relationship]]] = {}
+        for org_id, relationship in add:
+            by_tenant.setdefault(org_id, ([], []))[0].append(relationship)
+        for org_id, relationship in remove:
+            by_tenant.setdefault(org_id, ([], []))[1].append(relationship)
+        for org_id, (tuples_to_add, tuples_to_remove) in by_tenant.items():
+            self._replicator.replicate(
+                ReplicationEvent(
+                    event_type=event_type,
+                    info={**info, "org_id": org_id},
+                    partition_key=PartitionKey.byTenant(org_id),
+                    add=tuples_to_add,
+                    remove=tuples_to_remove,
+                )
+            )
+
     def _disable_user_in_tenant(self, user: User):
         """Disable a user in a tenant."""
         assert not user.is_active
@@ -276,6 +320,7 @@ class V2TenantBootstrapService:
                 tuples_to_remove.append(tuple)
 
             principal.delete()  # type: ignore
+            PrincipalCache().delete_principal(user.org_id, principal.username)  # type: ignore
         except Principal.DoesNotExist:
             logger.info(f"Could not find Principal to remove. org_id={user.org_id} user_id={user_id}")
 
@@ -291,7 +336,7 @@ class V2TenantBootstrapService:
                     "mapping_id": mapping.id if mapping else None,
                     "principal_uuid": principal_uuid,
                 },
-                partition_key=PartitionKey.byEnvironment(),
+                partition_key=PartitionKey.byTenant(user.org_id),
                 remove=tuples_to_remove,
             )
         )
@@ -333,7 +378,7 @@ class V2TenantBootstrapService:
             ReplicationEvent(
                 event_type=ReplicationEventType.BOOTSTRAP_TENANT,
                 info={"org_id": tenant.org_id, "default_workspace_id": str(default_workspace.id)},
-                partition_key=PartitionKey.byEnvironment(),
+                partition_key=PartitionKey.byTenant(tenant.org_id),
                 add=relationships,
             )
         )
@@ -354,13 +399,16 @@ class V2TenantBootstrapService:
             ReplicationEvent(
                 event_type=ReplicationEventType.BOOTSTRAP_TENANT,
                 info={"org_id": tenant.org_id, "forced": True},
-                partition_key=PartitionKey.byEnvironment(),
+                partition_key=PartitionKey.byTenant(tenant.org_id),
                 add=relationships,
             )
         )
 
-    def _get_or_bootstrap_tenants(self, org_ids: set, ready: bool) -> list[BootstrappedTenant]:
+    def _get_or_bootstrap_tenants(
+        self, org_ids: set, ready: bool, account_numbers: Optional[dict[str, Optional[str]]] = None
+    ) -> list[BootstrappedTenant]:
         """Bootstrap list of tenants, used by import_bulk_users."""
+        account_numbers = account_numbers or {}
         # Fetch existing tenants
         existing_tenants = {
             tenant.org_id: tenant
@@ -386,7 +434,7 @@ class V2TenantBootstrapService:
                 bootstrapped_list.append(BootstrappedTenant(tenant, tenant.tenant_mapping))
         # Create new tenants
         new_tenants = [
-            Tenant(tenant_name=f"org{org_id}", org_id=org_id, ready=ready)
+            Tenant(tenant_name=f"org{org_id}", org_id=org_id, ready=ready, account_id=account_numbers.get(org_id))
             for org_id in org_ids
             if org_id not in existing_tenants
         ]
@@ -400,7 +448,7 @@ class V2TenantBootstrapService:
     def _bootstrap_tenants(self, tenants: list[Tenant]) -> list[BootstrappedTenant]:
         # Set up workspace hierarchy for Tenant
         workspaces: list[Workspace] = []
-        relationships: list[Relationship] = []
+        relationships: list[tuple[Optional[str], Relationship]] = []
         mappings_to_create: list[TenantMapping] = []
         default_workspace_ids: list[UUID] = []
         for tenant in tenants:
@@ -415,7 +463,7 @@ class V2TenantBootstrapService:
 
             default_workspace_ids.append(default.id)
             workspaces.extend([root, default])
-            relationships.extend(built_in_relationships)
+            relationships.extend((tenant.org_id, relationship) for relationship in built_in_relationships)
 
         Workspace.objects.bulk_create(workspaces)
 
@@ -425,15 +473,15 @@ class V2TenantBootstrapService:
 
         for tenant, default_workspace_id in zip(tenants, default_workspace_ids):
             mapping = tenant_mappings[tenant.id]
-            relationships.extend(self._bootstrap_default_access(tenant, mapping, str(default_workspace_id)))
-            bootstrapped_tenants.append(BootstrappedTenant(tenant, mapping))
-        self._replicator.replicate(
-            ReplicationEvent(
-                event_type=ReplicationEventType.BULK_BOOTSTRAP_TENANT,
-                info={"num_tenants": len(tenants), "first_org_id": tenants[0].org_id if tenants else None},
-                partition_key=PartitionKey.byEnvironment(),
-                add=relationships,
+            relationships.extend(
+                (tenant.org_id, relationship)
+                for relationship in self._bootstrap_default_access(tenant, mapping, str(default_workspace_id))
             )
+            bootstrapped_tenants.append(BootstrappedTenant(tenant, mapping))
+        self._replicate_by_tenant(
+            ReplicationEventType.BULK_BOOTSTRAP_TENANT,
+            {"num_tenants": len(tenants), "first_org_id": tenants[0].org_id if tenants else None},
+            add=relationships,
         )
         return bootstrapped_tenants
 
@@ -612,7 +660,7 @@ class V2TenantBootstrapService:
         """
         Util for bulk creating workspace relationships based on pairs.
 
-        Input: pairs - List of tuples of (resource_id, subject_id)
+        Input: pairs - List of tuples of (resource_id, subject_id), optionally followed by the org_id of the workspace
         """
         relationships = []
         for pair in pairs:
@@ -623,12 +671,5 @@ class V2TenantBootstrapService:
                 str(pair[1]),
                 "parent",
             )
-            relationships.append(relationship)
-        self._replicator.replicate(
-            ReplicationEvent(
-                event_type=ReplicationEventType.WORKSPACE_IMPORT,
-                info={},
-                partition_key=PartitionKey.byEnvironment(),
-                add=relationships,
-            )
-        )
+            relationships.append((pair[2] if len(pair) > 2 else None, relationship))
+        self._replicate_by_tenant(ReplicationEventType.WORKSPACE_IMPORT, {}, add=relationships)
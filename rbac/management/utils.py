@@ -22,14 +22,15 @@ from contextlib import contextmanager
 from typing import Optional, TypedDict
 from uuid import UUID
 
-import grpc
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
+from django.db.models import Exists, Q, QuerySet
 from django.utils.translation import gettext as _
 from management.authorization.invalid_token import InvalidTokenError
 from management.authorization.missing_authorization import MissingAuthorizationError
 from management.authorization.token_validator import TokenValidator
 from management.cache import PrincipalCache
+from management.grpc_channels import GRPC_CHANNELS
 from management.models import Access, Group, Policy, Principal, Role
 from management.permissions.principal_access import PrincipalAccessPermission
 from management.principal.it_service import ITService
@@ -53,9 +54,8 @@ logger = logging.getLogger(__name__)
 
 @contextmanager
 def create_client_channel(addr):
-    """Create secure channel for grpc requests."""
-    secure_channel = grpc.insecure_channel(addr)
-    yield secure_channel
+    """Yield the pooled channel for grpc requests to the given address."""
+    yield GRPC_CHANNELS.get(addr)
 
 
 def validate_psk(psk, client_id):
@@ -235,85 +235,90 @@ def verify_principal_with_proxy(username, request, verify_principal=True):
 
 
 def policies_for_groups(groups):
-    """Gathers all policies for the given groups."""
-    policies = Policy.objects.filter(group__in=set(groups))
-    return set(policies)
+    """Return a lazy queryset of the policies for the given groups."""
+    return Policy.objects.filter(group__in=_pk_subquery(groups))
 
 
 def roles_for_policies(policies):
-    """Gathers all roles for the given policies."""
-    roles = Role.objects.filter(policies__in=set(policies))
-    return set(roles)
+    """Return a lazy queryset of the roles for the given policies."""
+    return Role.objects.filter(
+        pk__in=Policy.roles.through.objects.filter(policy__in=_pk_subquery(policies)).values("role_id")
+    )
 
 
 def access_for_roles(roles, param_applications):
-    """Gathers all access for the given roles and application(s)."""
+    """Return a lazy queryset of the access for the given roles and application(s)."""
+    access = Access.objects.filter(role__in=_pk_subquery(roles))
     if param_applications:
-        param_applications_list = param_applications.split(",")
-        access = Access.objects.filter(role__in=roles).filter(permission__application__in=param_applications_list)
-    else:
-        access = Access.objects.filter(role__in=roles)
-    return set(access)
+        access = access.filter(permission__application__in=param_applications.split(","))
+    return access
 
 
-def groups_for_principal(principal: Principal, tenant, **kwargs):
-    """Gathers all groups for a principal, including the default."""
-    if principal.cross_account:
-        return set()
-    assigned_group_set = principal.group.all()
+def _pk_subquery(objects):
+    """Turn a queryset into a primary key subquery so that it is embedded in the outer query, not evaluated."""
+    if isinstance(objects, QuerySet):
+        return objects.values("pk")
+    return set(objects)
 
-    # Only user principals should be able to get permissions from the default groups. For service accounts, customers
-    # need to explicitly add the service accounts to a group.
-    if principal.type == "user":
-        admin_default_group_set = (
-            Group.admin_default_set().filter(tenant=tenant) or Group.admin_default_set().public_tenant_only()
-        )
-        platform_default_group_set = (
-            Group.platform_default_set().filter(tenant=tenant) or Group.platform_default_set().public_tenant_only()
-        )
-    else:
-        admin_default_group_set = Group.objects.none()
-        platform_default_group_set = Group.objects.none()
 
-    prefetch_lookups = kwargs.get("prefetch_lookups_for_groups")
+def _default_group_filter(default_set, tenant):
+    """Match the tenant's own default group, or the public one if the tenant has no custom default group."""
+    tenant_default_set = default_set.filter(tenant=tenant)
+    return Q(pk__in=tenant_default_set.values("pk")) | Q(
+        Q(pk__in=default_set.public_tenant_only().values("pk")), ~Exists(tenant_default_set)
+    )
+
 
-    if prefetch_lookups:
-        assigned_group_set = assigned_group_set.prefetch_related(prefetch_lookups)
+def groups_for_principal(principal: Principal, tenant, **kwargs):
+    """
+    Return a lazy queryset of the groups for a principal, including the default groups.
 
-        if principal.type == "user":
-            platform_default_group_set = platform_default_group_set.prefetch_related(prefetch_lookups)
+    The default and admin default groups fall back to the public tenant ones when the tenant has no custom copy.
+    """
+    if principal.cross_account:
+        return Group.objects.none()
 
-    if kwargs.get("is_org_admin"):
-        return set(assigned_group_set | platform_default_group_set | admin_default_group_set)
+    group_filter = Q(pk__in=principal.group.values("pk"))
+    # Only user principals should be able to get permissions from the default groups. For service accounts, customers
+    # need to explicitly add the service accounts to a group.
+    if principal.type == Principal.Types.USER:
+        group_filter |= _default_group_filter(Group.platform_default_set(), tenant)
+        if kwargs.get("is_org_admin"):
+            group_filter |= _default_group_filter(Group.admin_default_set(), tenant)
 
-    return set(assigned_group_set | platform_default_group_set)
+    return Group.objects.filter(group_filter)
 
 
 def policies_for_principal(principal, tenant, **kwargs):
-    """Gathers all policies for a principal."""
-    groups = groups_for_principal(principal, tenant, **kwargs)
-    return policies_for_groups(groups)
+    """Return a lazy queryset of the policies for a principal."""
+    return policies_for_groups(groups_for_principal(principal, tenant, **kwargs))
 
 
 def roles_for_principal(principal, tenant, **kwargs):
-    """Gathers all roles for a principal."""
+    """Return a lazy queryset of the roles for a principal."""
     if principal.cross_account:
-        return roles_for_cross_account_principal(principal)
-    policies = policies_for_principal(principal, tenant, **kwargs)
-    return roles_for_policies(policies)
+        return Role.objects.filter(pk__in=roles_for_cross_account_principal(principal).values("pk"))
+    return roles_for_policies(policies_for_principal(principal, tenant, **kwargs))
 
 
 def access_for_principal(principal, tenant, **kwargs):
-    """Gathers all access for a principal for an application."""
+    """Return a lazy queryset of the access for a principal for an application, resolved in a single query."""
     application = kwargs.get(APPLICATION_KEY)
-    roles = roles_for_principal(principal, tenant, **kwargs)
-    access = access_for_roles(roles, application)
-    return access
+    return access_for_roles(roles_for_principal(principal, tenant, **kwargs), application)
+
+
+def permission_pairs_for_principal(principal: Principal, tenant, application, **kwargs):
+    """Return the distinct (resource_type, verb) pairs a principal is granted for an application, in one query."""
+    return (
+        access_for_roles(roles_for_principal(principal, tenant, **kwargs), application)
+        .values_list("permission__resource_type", "permission__verb")
+        .distinct()
+    )
 
 
 def queryset_by_id(objects, clazz, **kwargs):
     """Return a queryset of from the class ordered by id."""
-    wanted_ids = [obj.id for obj in objects]
+    wanted_ids = objects.values("id") if isinstance(objects, QuerySet) else [obj.id for obj in objects]
     prefetch_lookups = kwargs.get("prefetch_lookups_for_ids")
     query = clazz.objects.filter(id__in=wanted_ids).order_by("id")
     if prefetch_lookups:
@@ -67,6 +67,10 @@ class Workspace(TenantAwareModel):
                 condition=Q(parent__isnull=False),
             ),
         ]
+        indexes = [
+            # Serves the keyset pagination of the workspace list
+            models.Index(fields=["tenant", "created", "id"], name="workspace_tenant_created_id"),
+        ]
 
     def save(self, *args, **kwargs):
         """Override save on model to enforce validations."""
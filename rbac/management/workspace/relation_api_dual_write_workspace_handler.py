@@ -88,11 +88,11 @@ class RelationApiDualWriteWorkspaceHandler(BaseRelationApiDualWriteHandler):
             return
         try:
             if self.relations_to_remove or self.relations_to_add:
-                self._replicator.replicate(
+                self._replicator.replicate_changes(
                     ReplicationEvent(
                         event_type=self.event_type,
                         info={"workspace_id": str(self.workspace.id), "org_id": str(self.workspace.tenant.org_id)},
-                        partition_key=PartitionKey.byEnvironment(),
+                        partition_key=PartitionKey.byTenant(self.workspace.tenant.org_id),
                         remove=self.relations_to_remove,
                         add=self.relations_to_add,
                     ),
@@ -63,17 +63,13 @@ def get_access_permission_tuples(access, tenant, root_workspace_id, is_get_actio
 def workspace_permission_tuple_set(request, root_workspace_id, is_get_action):
     """Get the set of permission tuples for the user's roles on the workspace."""
     principal = get_principal_from_request(request)
-    roles = roles_for_principal(
-        principal,
-        request.tenant,
-        **{
-            "prefetch_lookups_for_ids": "resourceDefinitions",
-            "prefetch_lookups_for_groups": "policies__roles__access",
-            "is_org_admin": request.user.admin,
-        },
-    )
-    accesses = Access.objects.filter(
-        role__in=roles, permission__application="inventory", permission__resource_type__in=["groups", "*"]
+    roles = roles_for_principal(principal, request.tenant, is_org_admin=request.user.admin)
+    accesses = (
+        Access.objects.filter(
+            role__in=roles, permission__application="inventory", permission__resource_type__in=["groups", "*"]
+        )
+        .select_related("permission")
+        .prefetch_related("resourceDefinitions")
     )
     tuple_set = set()
     for access in accesses:
@@ -57,8 +57,9 @@ class WorkspaceViewSet(BaseV2ViewSet):
     queryset = Workspace.objects.annotate()
     serializer_class = WorkspaceSerializer
     ordering_fields = ("name",)
-    ordering = ("name",)
+    ordering = ("name", "-modified", "id")
     filter_backends = (filters.DjangoFilterBackend, OrderingFilter)
+    cursor_ordering = ("created", "id")
 
     def __init__(self, **kwargs):
         """Init viewset."""
@@ -113,9 +114,9 @@ class WorkspaceViewSet(BaseV2ViewSet):
         if name:
             queryset = queryset.filter(name__iexact=name.lower())
 
-        serializer = self.get_serializer(queryset, many=True)
-        page = self.paginate_queryset(serializer.data)
-        return self.get_paginated_response(page)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @transaction.atomic()
     def destroy(self, request, *args, **kwargs):
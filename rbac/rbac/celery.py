@@ -25,7 +25,7 @@ import sentry_sdk
 from app_common_python import LoadedConfig
 from celery import Celery
 from celery.schedules import crontab
-from celery.signals import worker_ready
+from celery.signals import worker_process_init, worker_process_shutdown, worker_ready
 from django.conf import settings
 from prometheus_client import CollectorRegistry, multiprocess, start_http_server
 
@@ -74,6 +74,22 @@ else:
 app.autodiscover_tasks()
 
 
+@worker_process_init.connect
+def reset_grpc_channels(sender=None, **kwargs):
+    """Drop the gRPC channels inherited from the parent process, which cannot be used across a fork."""
+    from management.grpc_channels import GRPC_CHANNELS
+
+    GRPC_CHANNELS.reset()
+
+
+@worker_process_shutdown.connect
+def close_kafka_producers(sender=None, **kwargs):
+    """Produce the Kafka messages still queued by the worker process before it exits."""
+    from core.kafka import close_producers
+
+    close_producers()
+
+
 @worker_ready.connect
 def start_metrics_server(sender=None, **kwargs):
     """Start the metrics server."""
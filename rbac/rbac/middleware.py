@@ -28,13 +28,13 @@ from django.http import Http404, HttpResponse, QueryDict
 from django.urls import resolve
 from feature_flags import FEATURE_FLAGS
 from management.authorization.token_validator import ITSSOTokenValidator, TokenValidator
-from management.cache import TenantCache
+from management.cache import AccessCache, PrincipalCache, TenantCache
 from management.models import Principal
 from management.principal.proxy import PrincipalProxy
 from management.relation_replicator.outbox_replicator import OutboxReplicator
 from management.tenant_service import get_tenant_bootstrap_service
 from management.tenant_service.tenant_service import TenantBootstrapService
-from management.utils import APPLICATION_KEY, access_for_principal, build_system_user_from_token, build_user_from_psk
+from management.utils import build_system_user_from_token, build_user_from_psk, permission_pairs_for_principal
 from prometheus_client import Counter
 from rest_framework import status
 
@@ -50,6 +50,8 @@ req_sys_counter = Counter(
     ["behalf", "method", "view", "status"],
 )
 TENANTS = TenantCache()
+PRINCIPALS = PrincipalCache()
+RBAC_RESOURCE_TYPES = ("group", "role", "policy", "principal", "permission")
 
 
 def catch_integrity_error(func):
@@ -151,58 +153,40 @@ class IdentityHeaderMiddleware:
             TENANTS.save_tenant(tenant)
         return tenant
 
-    @staticmethod  # noqa: C901
-    def _get_access_for_user(username, tenant):  # pylint: disable=too-many-locals,too-many-branches
+    @staticmethod
+    def _get_access_for_user(username, tenant):
         """Obtain access data for given username.
 
         Stubbed out to begin removal of RBAC on RBAC, with minimal disruption
         """
-        principal = None
-        access_list = None
-
-        access = {
-            "group": {"read": [], "write": []},
-            "role": {"read": [], "write": []},
-            "policy": {"read": [], "write": []},
-            "principal": {"read": [], "write": []},
-            "permission": {"read": [], "write": []},
-        }
+        access = {resource: {"read": [], "write": []} for resource in RBAC_RESOURCE_TYPES}
 
-        try:  # pylint: disable=R1702
-            principal = Principal.objects.get(username__iexact=username, tenant=tenant)
-            kwargs = {APPLICATION_KEY: "rbac"}
-            access_list = access_for_principal(principal, tenant, **kwargs)
-            for access_item in access_list:  # pylint: disable=too-many-nested-blocks
-                resource_type = access_item.permission.resource_type
-                operation = access_item.permission.verb
-                if operation == "*":
-                    operation = "write"
-                res_list = ["*"]
-                if resource_type == "*":
-                    for resource in ("group", "role", "policy", "principal", "permission"):
-                        if (
-                            resource in access.keys()
-                            and operation in access.get(resource, {}).keys()  # noqa: W504
-                            and isinstance(access.get(resource, {}).get(operation), list)  # noqa: W504
-                        ):  # noqa: E127
-                            access[resource][operation] += res_list
-                            if operation == "write":
-                                access[resource]["read"] += res_list
-                elif (
-                    resource_type in access.keys()
-                    and operation in access.get(resource_type, {}).keys()  # noqa: W504
-                    and isinstance(access.get(resource_type, {}).get(operation), list)  # noqa: W504
-                ):
-                    access[resource_type][operation] += res_list
+        # The principal is cached as well, so that a request served from the cached access map queries nothing.
+        principal = PRINCIPALS.get_principal(tenant.org_id, username)
+        if principal is None:
+            try:
+                principal = Principal.objects.get(username__iexact=username, tenant=tenant)
+            except Principal.DoesNotExist:
+                return access
+            PRINCIPALS.cache_principal(org_id=tenant.org_id, principal=principal)
+
+        cache = AccessCache(tenant.org_id)
+        cached_access = cache.get_access_map(principal.uuid)
+        if cached_access is not None:
+            return cached_access
+
+        for resource_type, verb in permission_pairs_for_principal(principal, tenant, "rbac"):
+            operation = "write" if verb == "*" else verb
+            if operation not in ("read", "write"):
+                continue
+            resources = RBAC_RESOURCE_TYPES if resource_type == "*" else (resource_type,)
+            for resource in resources:
+                if resource in access:
+                    access[resource][operation] = ["*"]
                     if operation == "write":
-                        access[resource_type]["read"] += res_list
-                for res_type, res_ops_obj in access.items():
-                    for op_type, op_list in res_ops_obj.items():
-                        if "*" in op_list:
-                            access[res_type][op_type] = ["*"]
-        except Principal.DoesNotExist:
-            return access
+                        access[resource]["read"] = ["*"]
 
+        cache.save_access_map(principal.uuid, access)
         return access
 
     @catch_integrity_error
@@ -218,6 +202,9 @@ class IdentityHeaderMiddleware:
         if is_no_auth(request):
             return self.get_response(request)
         user = User()
+        # The tenant is resolved at most once per request, through the cache hierarchy, and shared by the permission
+        # loading below, request.tenant and the downstream views.
+        tenant = None
         try:
             _, json_rh_auth = extract_header(request, self.header)
             user.account = json_rh_auth.get("identity", {}).get("account_number")
@@ -276,12 +263,8 @@ class IdentityHeaderMiddleware:
                 return HttpResponse(json.dumps(payload), content_type="application/json", status=400)
 
             if self.should_load_user_permissions(request, user):
-                try:
-                    tenant = Tenant.objects.filter(org_id=user.org_id).get()
-                except Tenant.DoesNotExist:
-                    request.user = user
-                    tenant = self.get_tenant(model=None, hostname=None, request=request)
-
+                request.user = user
+                tenant = self.get_tenant(model=None, hostname=None, request=request)
                 user.access = IdentityHeaderMiddleware._get_access_for_user(user.username, tenant)
             # Cross account request check
             internal = json_rh_auth.get("identity", {}).get("internal", {})
@@ -304,7 +287,9 @@ class IdentityHeaderMiddleware:
             raise error
         if user.username and (user.account or user.org_id):
             request.user = user
-            request.tenant = self.get_tenant(model=None, hostname=None, request=request)
+            if tenant is None or tenant.org_id != user.org_id:
+                tenant = self.get_tenant(model=None, hostname=None, request=request)
+            request.tenant = tenant
 
         response = self.get_response(request)
 
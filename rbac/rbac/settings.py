@@ -341,9 +341,23 @@ ACCESS_CACHE_LIFETIME = 10 * 60
 ACCESS_CACHE_ENABLED = ENVIRONMENT.bool("ACCESS_CACHE_ENABLED", default=True)
 ACCESS_CACHE_CONNECT_SIGNALS = ENVIRONMENT.bool("ACCESS_CACHE_CONNECT_SIGNALS", default=True)
 
+# Serialization of the cached values: json, orjson or msgpack, with values of at least CACHE_COMPRESSION_THRESHOLD
+# bytes compressed with zlib or zstd (or none). orjson, msgpack and zstandard are part of the Pipfile; should one of
+# them be missing, the cache falls back to json and zlib with a warning.
+CACHE_CODEC = ENVIRONMENT.get_value("CACHE_CODEC", default="msgpack")
+CACHE_COMPRESSION = ENVIRONMENT.get_value("CACHE_COMPRESSION", default="zstd")
+CACHE_COMPRESSION_THRESHOLD = ENVIRONMENT.int("CACHE_COMPRESSION_THRESHOLD", default=4096)
+
+# Materialized effective access backing the access endpoint. Maintained by the access cache signals.
+EFFECTIVE_ACCESS_ENABLED = ENVIRONMENT.bool("EFFECTIVE_ACCESS_ENABLED", default=False)
+EFFECTIVE_ACCESS_LIFETIME = ENVIRONMENT.int("EFFECTIVE_ACCESS_LIFETIME", default=60 * 60)
+
 REDIS_MAX_CONNECTIONS = ENVIRONMENT.get_value("REDIS_MAX_CONNECTIONS", default=10)
 REDIS_SOCKET_CONNECT_TIMEOUT = ENVIRONMENT.get_value("REDIS_SOCKET_CONNECT_TIMEOUT", default=0.1)
 REDIS_SOCKET_TIMEOUT = ENVIRONMENT.get_value("REDIS_SOCKET_TIMEOUT", default=0.1)
+# Consecutive Redis failures before the caches stop calling Redis, and seconds until they probe it again.
+REDIS_CIRCUIT_BREAKER_FAILURE_THRESHOLD = ENVIRONMENT.int("REDIS_CIRCUIT_BREAKER_FAILURE_THRESHOLD", default=3)
+REDIS_CIRCUIT_BREAKER_RESET_TIMEOUT = ENVIRONMENT.float("REDIS_CIRCUIT_BREAKER_RESET_TIMEOUT", default=10.0)
 REDIS_CACHE_CONNECTION_PARAMS = dict(
     max_connections=REDIS_MAX_CONNECTIONS,
     host=REDIS_HOST,
@@ -366,6 +380,26 @@ ROLE_CREATE_ALLOW_LIST = ENVIRONMENT.get_value("ROLE_CREATE_ALLOW_LIST", default
 
 # Dual write migration configuration
 REPLICATION_TO_RELATION_ENABLED = ENVIRONMENT.bool("REPLICATION_TO_RELATION_ENABLED", default=False)
+# Partition replication events by tenant instead of ordering all of them within the environment. The audit reports
+# tuples changed through more than one partition, as far as a single process can tell from the tuples it replicated
+# recently, so it cannot see violations spread across workers.
+REPLICATION_PARTITION_BY_TENANT = ENVIRONMENT.bool("REPLICATION_PARTITION_BY_TENANT", default=False)
+REPLICATION_PARTITION_AUDIT_ENABLED = ENVIRONMENT.bool("REPLICATION_PARTITION_AUDIT_ENABLED", default=False)
+REPLICATION_PARTITION_AUDIT_STRICT = ENVIRONMENT.bool("REPLICATION_PARTITION_AUDIT_STRICT", default=False)
+REPLICATION_PARTITION_AUDIT_SIZE = ENVIRONMENT.int("REPLICATION_PARTITION_AUDIT_SIZE", default=100000)
+# Only replicate the tuples which change when the dual write handlers replace the tuples of an object.
+REPLICATION_TUPLE_DELTA = ENVIRONMENT.bool("REPLICATION_TUPLE_DELTA", default=True)
+# Merge the replication events of the atomic blocks opened with OUTBOX_BUFFER.atomic() into one outbox row
+# per partition, of at most REPLICATION_OUTBOX_MAX_TUPLES tuples. Merged rows have the "merged_events" type instead
+# of the types of the events they merge, so only enable it once the consumers of the outbox handle that type.
+REPLICATION_OUTBOX_AGGREGATION = ENVIRONMENT.bool("REPLICATION_OUTBOX_AGGREGATION", default=False)
+REPLICATION_OUTBOX_MAX_TUPLES = ENVIRONMENT.int("REPLICATION_OUTBOX_MAX_TUPLES", default=10000)
+# Write the outbox events to the outbox table ("table"),
+# or emit them as logical decoding messages with the given prefix ("message").
+REPLICATION_OUTBOX_MODE = ENVIRONMENT.get_value("REPLICATION_OUTBOX_MODE", default="table")
+if REPLICATION_OUTBOX_MODE not in ("table", "message"):
+    raise ValueError(f"REPLICATION_OUTBOX_MODE must be 'table' or 'message', got '{REPLICATION_OUTBOX_MODE}'")
+REPLICATION_OUTBOX_MESSAGE_PREFIX = ENVIRONMENT.get_value("REPLICATION_OUTBOX_MESSAGE_PREFIX", default="rbac.outbox")
 V2_MIGRATION_APP_EXCLUDE_LIST = ENVIRONMENT.get_value("V2_MIGRATION_APP_EXCLUDE_LIST", default="").split(",")
 V2_MIGRATION_RESOURCE_EXCLUDE_LIST = ENVIRONMENT.get_value("V2_MIGRATION_RESOURCE_EXCLUDE_LIST", default="").split(",")
 V2_BOOTSTRAP_TENANT = ENVIRONMENT.bool("V2_BOOTSTRAP_TENANT", default=False)
@@ -427,6 +461,18 @@ if not KAFKA_ENABLED:
 
 # Kafka settings
 KAFKA_SERVERS = []
+# Messages are produced from a background thread unless KAFKA_PRODUCER_ASYNC is disabled,
+# the queue is bounded and messages are dropped when it stays full for KAFKA_PRODUCER_QUEUE_TIMEOUT seconds.
+KAFKA_PRODUCER_ASYNC = ENVIRONMENT.bool("KAFKA_PRODUCER_ASYNC", default=True)
+KAFKA_PRODUCER_QUEUE_SIZE = ENVIRONMENT.int("KAFKA_PRODUCER_QUEUE_SIZE", default=10000)
+KAFKA_PRODUCER_QUEUE_TIMEOUT = ENVIRONMENT.float("KAFKA_PRODUCER_QUEUE_TIMEOUT", default=1.0)
+# Seconds to wait before creating the Kafka client again after it failed, doubled on every consecutive failure
+KAFKA_PRODUCER_RETRY_BACKOFF = ENVIRONMENT.float("KAFKA_PRODUCER_RETRY_BACKOFF", default=1.0)
+KAFKA_PRODUCER_RETRY_BACKOFF_MAX = ENVIRONMENT.float("KAFKA_PRODUCER_RETRY_BACKOFF_MAX", default=60.0)
+KAFKA_PRODUCER_LINGER_MS = ENVIRONMENT.int("KAFKA_PRODUCER_LINGER_MS", default=5)
+KAFKA_PRODUCER_BATCH_SIZE = ENVIRONMENT.int("KAFKA_PRODUCER_BATCH_SIZE", default=16384)
+KAFKA_PRODUCER_COMPRESSION = ENVIRONMENT.get_value("KAFKA_PRODUCER_COMPRESSION", default=None)
+KAFKA_PRODUCER_CLOSE_TIMEOUT = ENVIRONMENT.int("KAFKA_PRODUCER_CLOSE_TIMEOUT", default=10)
 
 if KAFKA_ENABLED:
     KAFKA_AUTH = {}
@@ -497,6 +543,14 @@ IT_SERVICE_HOST = ENVIRONMENT.get_value("IT_SERVICE_HOST", default="localhost")
 IT_SERVICE_PORT = ENVIRONMENT.int("IT_SERVICE_PORT", default="443")
 IT_SERVICE_PROTOCOL_SCHEME = ENVIRONMENT.get_value("IT_SERVICE_PROTOCOL_SCHEME", default="https")
 IT_SERVICE_TIMEOUT_SECONDS = ENVIRONMENT.int("IT_SERVICE_TIMEOUT_SECONDS", default=10)
+PRINCIPAL_PROXY_TIMEOUT_SECONDS = ENVIRONMENT.int("PRINCIPAL_PROXY_TIMEOUT_SECONDS", default=10)
+SSO_TIMEOUT_SECONDS = ENVIRONMENT.int("SSO_TIMEOUT_SECONDS", default=10)
+# Connections kept per host, and retries of failed requests, by the HTTP clients of BOP, IT and SSO
+HTTP_CLIENT_POOL_SIZE = ENVIRONMENT.int("HTTP_CLIENT_POOL_SIZE", default=10)
+HTTP_CLIENT_RETRIES = ENVIRONMENT.int("HTTP_CLIENT_RETRIES", default=2)
+HTTP_CLIENT_BACKOFF_FACTOR = ENVIRONMENT.float("HTTP_CLIENT_BACKOFF_FACTOR", default=0.2)
+# Retries are only attempted while they can complete within this time, counted from the start of the first attempt
+HTTP_CLIENT_TOTAL_TIMEOUT_SECONDS = ENVIRONMENT.float("HTTP_CLIENT_TOTAL_TIMEOUT_SECONDS", default=15.0)
 IT_TOKEN_JKWS_CACHE_LIFETIME = ENVIRONMENT.int("IT_TOKEN_JKWS_CACHE_LIFETIME", default=28800)
 
 PRINCIPAL_USER_DOMAIN = ENVIRONMENT.get_value("PRINCIPAL_USER_DOMAIN", default="localhost")
@@ -504,7 +558,16 @@ PRINCIPAL_USER_DOMAIN = ENVIRONMENT.get_value("PRINCIPAL_USER_DOMAIN", default="
 # Settings for enabling/disabling deletion in principal cleanup job via UMB
 PRINCIPAL_CLEANUP_DELETION_ENABLED_UMB = ENVIRONMENT.bool("PRINCIPAL_CLEANUP_DELETION_ENABLED_UMB", default=False)
 PRINCIPAL_CLEANUP_UPDATE_ENABLED_UMB = ENVIRONMENT.bool("PRINCIPAL_CLEANUP_UPDATE_ENABLED_UMB", default=False)
+# Usernames checked per BOP request, and tenants cleaned up at once, by the principal clean up job
+PRINCIPAL_CLEANUP_BATCH_SIZE = ENVIRONMENT.int("PRINCIPAL_CLEANUP_BATCH_SIZE", default=100)
+PRINCIPAL_CLEANUP_CONCURRENCY = ENVIRONMENT.int("PRINCIPAL_CLEANUP_CONCURRENCY", default=4)
+# How long the checkpoint of an interrupted job is kept to resume from
+CHECKPOINT_LIFETIME = ENVIRONMENT.int("CHECKPOINT_LIFETIME", default=7 * 24 * 60 * 60)
 UMB_JOB_ENABLED = ENVIRONMENT.bool("UMB_JOB_ENABLED", default=True)
+# UMB frames processed per transaction, and how long to wait for the next frame of a batch.
+# A batch size of 1 processes each frame in its own transaction.
+UMB_BATCH_SIZE = ENVIRONMENT.int("UMB_BATCH_SIZE", default=1)
+UMB_BATCH_WAIT_SECONDS = ENVIRONMENT.float("UMB_BATCH_WAIT_SECONDS", default=1.0)
 UMB_HOST = ENVIRONMENT.get_value("UMB_HOST", default="localhost")
 UMB_PORT = ENVIRONMENT.get_value("UMB_PORT", default="61612")
 # Service account name
@@ -518,6 +581,14 @@ RELATION_API_SERVER = ENVIRONMENT.get_value("RELATION_API_SERVER", default="loca
 RELATIONS_API_CLIENT_ID = ENVIRONMENT.get_value("RELATION_API_CLIENT_ID", default="")
 RELATIONS_API_CLIENT_SECRET = ENVIRONMENT.get_value("RELATION_API_CLIENT_SECRET", default="")
 INVENTORY_API_SERVER = ENVIRONMENT.get_value("INVENTORY_API_SERVER", default="localhost:9000")
+# Keepalive of the pooled gRPC channels to the Relations and Inventory APIs
+GRPC_KEEPALIVE_TIME_MS = ENVIRONMENT.int("GRPC_KEEPALIVE_TIME_MS", default=30000)
+GRPC_KEEPALIVE_TIMEOUT_MS = ENVIRONMENT.int("GRPC_KEEPALIVE_TIMEOUT_MS", default=10000)
+GRPC_KEEPALIVE_PERMIT_WITHOUT_CALLS = ENVIRONMENT.bool("GRPC_KEEPALIVE_PERMIT_WITHOUT_CALLS", default=True)
+GRPC_MAX_RECONNECT_BACKOFF_MS = ENVIRONMENT.int("GRPC_MAX_RECONNECT_BACKOFF_MS", default=10000)
+# Checks sent per CheckBulk request, and requests in flight at once, by the inventory consistency checkers
+INVENTORY_CHECK_BATCH_SIZE = ENVIRONMENT.int("INVENTORY_CHECK_BATCH_SIZE", default=100)
+INVENTORY_CHECK_CONCURRENCY = ENVIRONMENT.int("INVENTORY_CHECK_CONCURRENCY", default=8)
 ENV_NAME = ENVIRONMENT.get_value("ENV_NAME", default="stage")
 
 # Versioned API settings
@@ -552,3 +623,12 @@ SYSTEM_USERS = ENVIRONMENT.json("SYSTEM_USERS", default={})
 
 # Principal caching settings
 PRINCIPAL_CACHE_LIFETIME = ENVIRONMENT.int("PRINCIPAL_CACHE_LIFETIME", default=3600)
+# Caching of the BOP lookups of single users, and of the users BOP does not know
+PRINCIPAL_LOOKUP_CACHE_ENABLED = ENVIRONMENT.bool("PRINCIPAL_LOOKUP_CACHE_ENABLED", default=True)
+PRINCIPAL_LOOKUP_CACHE_LIFETIME = ENVIRONMENT.int("PRINCIPAL_LOOKUP_CACHE_LIFETIME", default=300)
+PRINCIPAL_LOOKUP_NEGATIVE_LIFETIME = ENVIRONMENT.int("PRINCIPAL_LOOKUP_NEGATIVE_LIFETIME", default=30)
+
+# Optional per-worker in-process tier in front of the Redis tenant and principal caches
+LOCAL_CACHE_ENABLED = ENVIRONMENT.bool("LOCAL_CACHE_ENABLED", default=False)
+LOCAL_CACHE_MAX_SIZE = ENVIRONMENT.int("LOCAL_CACHE_MAX_SIZE", default=2048)
+LOCAL_CACHE_LIFETIME = ENVIRONMENT.int("LOCAL_CACHE_LIFETIME", default=30)
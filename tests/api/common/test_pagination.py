@@ -18,8 +18,12 @@
 from unittest.mock import Mock, patch
 
 from django.test import TestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 
-from api.common.pagination import PATH_INFO, StandardResultsSetPagination
+from api.common.pagination import PATH_INFO, KeysetPagination, StandardResultsSetPagination
+from api.models import Tenant
 
 
 class PaginationTest(TestCase):
@@ -103,3 +107,86 @@ class PaginationTest(TestCase):
         paginator.request.META = {}
         link = paginator.get_previous_link()
         self.assertEqual(link, expected)
+
+
+class KeysetPaginationTest(TestCase):
+    """Tests against the keyset pagination."""
+
+    def setUp(self):
+        """Set up the tenants to paginate, ordered on a non unique field first."""
+        Tenant.objects.bulk_create(
+            [Tenant(tenant_name=f"keyset{n}", org_id=f"keyset{n}", account_id=str(n % 3)) for n in range(7)]
+        )
+        self.queryset = Tenant.objects.filter(tenant_name__startswith="keyset")
+        self.view = Mock(cursor_ordering=("account_id", "id"))
+        self.factory = APIRequestFactory()
+
+    def paginate(self, url):
+        """Paginate the tenants for the given url."""
+        paginator = KeysetPagination()
+        request = Request(self.factory.get(url))
+        return paginator, paginator.paginate_queryset(self.queryset, request, self.view)
+
+    def test_pages_follow_the_ordering(self):
+        """Test following the next links walks every row once, in order."""
+        expected = list(self.queryset.order_by("account_id", "id"))
+        seen = []
+        url = "/api/rbac/v1/tenants/?cursor=&limit=3"
+        while url:
+            paginator, page = self.paginate(url)
+            self.assertLessEqual(len(page), 3)
+            seen.extend(page)
+            response = paginator.get_paginated_response([])
+            self.assertEqual(response.data["meta"], {"count": 7, "limit": 3})
+            url = response.data["links"]["next"]
+        self.assertEqual(seen, expected)
+
+    def test_id_tiebreaker(self):
+        """Test an ordering on non unique fields is completed with the id."""
+        self.view.cursor_ordering = ("account_id",)
+        expected = list(self.queryset.order_by("account_id", "id"))
+        seen = []
+        url = "/api/rbac/v1/tenants/?cursor=&limit=2"
+        while url:
+            paginator, page = self.paginate(url)
+            self.assertEqual(paginator.ordering, ("account_id", "id"))
+            seen.extend(page)
+            url = paginator.get_paginated_response([]).data["links"]["next"]
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        """Test invalid cursors are rejected."""
+        for cursor in ("garbage", "WzFd", "WyJhIiwgIm5vdCBhbiBpZCJd"):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(NotFound):
+                    self.paginate(f"/api/rbac/v1/tenants/?cursor={cursor}")
+
+    def test_limit(self):
+        """Test the limit defaults and is capped."""
+        for limit, expected in (("", 10), ("-1", 10), ("5", 5), ("5000", 1000)):
+            with self.subTest(limit=limit):
+                paginator, _ = self.paginate(f"/api/rbac/v1/tenants/?cursor=&limit={limit}")
+                self.assertEqual(paginator.limit, expected)
+
+    def test_count_free(self):
+        """Test the rows are not counted when the count is disabled."""
+        paginator = KeysetPagination()
+        request = Request(self.factory.get("/api/rbac/v1/tenants/?cursor=&count=false"))
+        with self.assertNumQueries(1):
+            paginator.paginate_queryset(self.queryset, request, self.view)
+        self.assertEqual(paginator.get_paginated_response([]).data["meta"], {"limit": 10})
+
+    def test_selected_by_standard_pagination(self):
+        """Test the standard pagination switches to keyset pagination for views declaring a cursor ordering."""
+        request = Request(self.factory.get("/api/rbac/v1/tenants/?cursor=&limit=2"))
+        paginator = StandardResultsSetPagination()
+        page = paginator.paginate_queryset(self.queryset, request, self.view)
+        self.assertEqual(page, list(self.queryset.order_by("account_id", "id")[:2]))
+        self.assertIsNotNone(paginator.get_paginated_response([]).data["links"]["next"])
+
+        for view, queryset in ((Mock(spec=[]), self.queryset), (self.view, list(self.queryset))):
+            with self.subTest(view=view):
+                paginator = StandardResultsSetPagination()
+                paginator.paginate_queryset(queryset, request, view)
+                self.assertIsNone(paginator.keyset)
+                self.assertEqual(paginator.get_paginated_response([]).data["meta"]["offset"], 0)
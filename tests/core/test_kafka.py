@@ -1,9 +1,13 @@
 from copy import deepcopy
+from threading import Event, current_thread
 from unittest.mock import Mock, MagicMock, patch, DEFAULT
+from django.db import transaction
 from django.test import TestCase
 from kafka.errors import KafkaError
-from core.kafka import RBACProducer, logger
+from core.kafka import FakeKafkaProducer, MessageBuffer, RBACProducer, logger
+from internal.integration import sync_handlers
 from django.test.utils import override_settings
+from prometheus_client import REGISTRY
 
 
 def copy_call_args(mock):
@@ -83,3 +87,248 @@ class KafkaTests(TestCase):
             MockKafkaProducer.get_producer.side_effect = mock_logger.info("Kafka producer initialized successfully")
 
         mock_logger.info.assert_any_call("Kafka producer initialized successfully")
+
+
+class MessageBufferTests(TestCase):
+    """Test the buffering of Kafka messages until the transaction commits."""
+
+    def setUp(self):
+        """Set up a buffer and a producer."""
+        self.buffer = MessageBuffer()
+        self.producer = MagicMock()
+
+    def sent(self):
+        """Return the (topic, message) pairs sent so far."""
+        return [
+            (topic, message)
+            for (topic, messages), _ in self.producer.send_kafka_messages.call_args_list
+            for message, _ in messages
+        ]
+
+    def test_messages_are_sent_on_commit(self):
+        """Test the messages are sent in order once the transaction commits, and repeated keys are coalesced."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.buffer.send(self.producer, "sync", {"name": "a"}, key="role-a")
+            self.buffer.send(self.producer, "sync", {"name": "b"}, key="role-b")
+            self.buffer.send(self.producer, "notifications", {"name": "n"})
+            self.buffer.send(self.producer, "notifications", {"name": "n"})
+            self.buffer.send(self.producer, "sync", {"name": "a2"}, key="role-a")
+            self.producer.send_kafka_messages.assert_not_called()
+
+        self.assertEqual(
+            self.sent(),
+            [
+                ("sync", {"name": "a2"}),
+                ("sync", {"name": "b"}),
+                ("notifications", {"name": "n"}),
+                ("notifications", {"name": "n"}),
+            ],
+        )
+        self.assertEqual(self.producer.send_kafka_messages.call_count, 2)
+
+    def test_messages_are_dropped_on_rollback(self):
+        """Test nothing is sent when the transaction rolls back."""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.buffer.send(self.producer, "sync", {"name": "a"}, key="role-a")
+                    raise ValueError
+            except ValueError:
+                pass
+            self.buffer.send(self.producer, "sync", {"name": "b"}, key="role-b")
+
+        self.assertEqual(self.sent(), [("sync", {"name": "b"})])
+
+    def test_messages_are_sent_right_away_outside_of_transactions(self):
+        """Test the messages are sent right away in autocommit mode."""
+        with patch("core.utils.transaction.get_connection") as get_connection:
+            get_connection.return_value.in_atomic_block = False
+            self.buffer.send(self.producer, "sync", {"name": "a"}, headers=[("id", b"1")], key="role-a")
+
+        self.producer.send_kafka_message.assert_called_once_with("sync", {"name": "a"}, [("id", b"1")])
+
+    def test_flushed_batch_is_not_reused(self):
+        """Test the messages sent once a batch was flushed are buffered in a new batch, and sent once."""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.buffer.send(self.producer, "sync", {"name": "a"})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.buffer.send(self.producer, "sync", {"name": "b"})
+        self.assertEqual(self.sent(), [("sync", {"name": "a"}), ("sync", {"name": "b"})])
+
+        callbacks[0]()
+        self.assertEqual(self.producer.send_kafka_messages.call_count, 2)
+
+    def test_send_errors_are_logged(self):
+        """Test a failing batch does not prevent the next ones from being sent."""
+        self.producer.send_kafka_messages.side_effect = [KafkaError, None]
+        with patch("core.kafka.logger") as mock_logger, self.captureOnCommitCallbacks(execute=True):
+            self.buffer.send(self.producer, "sync", {"name": "a"})
+            self.buffer.send(self.producer, "notifications", {"name": "n"})
+
+        self.assertEqual(self.producer.send_kafka_messages.call_count, 2)
+        mock_logger.exception.assert_called_once()
+
+    @patch("core.kafka.RBACProducer.send_kafka_message")
+    def test_role_modified_messages_are_coalesced(self, send_kafka_message):
+        """Test the sync messages about the same role are sent once per transaction."""
+        kafka_mock = copy_call_args(send_kafka_message)
+        with patch.object(sync_handlers, "MESSAGE_BUFFER", self.buffer), self.captureOnCommitCallbacks(execute=True):
+            for name in ["role_a", "role_a", "role_a_renamed"]:
+                sync_handlers.send_sync_message("role_modified", {"role": {"name": name, "uuid": "1"}})
+            sync_handlers.send_sync_message("role_modified", {"role": {"name": "role_b", "uuid": "2"}})
+
+        payloads = [call.args[1]["events"][0]["payload"] for call in kafka_mock.call_args_list]
+        self.assertEqual(
+            payloads, [{"role": {"name": "role_a_renamed", "uuid": "1"}}, {"role": {"name": "role_b", "uuid": "2"}}]
+        )
+
+
+@override_settings(DEVELOPMENT=False, MOCK_KAFKA=False, KAFKA_ENABLED=True, KAFKA_PRODUCER_ASYNC=True)
+class AsyncRBACProducerTests(TestCase):
+    """Test producing messages from a background thread."""
+
+    def setUp(self):
+        """Set up a producer with a mocked Kafka client."""
+        self.rbac_producer = RBACProducer()
+        self.rbac_producer.producer = MagicMock()
+        self.addCleanup(self.rbac_producer.close, timeout=5)
+
+    def messages(self, topic, result):
+        """Return the number of messages of the topic with the given outcome."""
+        return REGISTRY.get_sample_value("rbac_kafka_messages_total", {"topic": topic, "result": result}) or 0
+
+    def test_messages_are_produced_in_background(self):
+        """Test the messages are encoded and produced by the background thread."""
+        threads = []
+        self.rbac_producer.producer.send.side_effect = lambda *args, **kwargs: threads.append(current_thread())
+        self.rbac_producer.send_kafka_message("sync", {"name": "a"}, ("id", b"1"))
+        self.rbac_producer.flush(timeout=5)
+
+        self.rbac_producer.producer.send.assert_called_once_with(
+            "sync", value=b'{"name": "a"}', headers=[("id", b"1")]
+        )
+        self.rbac_producer.producer.flush.assert_called_once_with(timeout=5)
+        self.assertEqual(threads, [self.rbac_producer._thread])
+
+    def test_deliveries_are_recorded(self):
+        """Test acknowledged and failed deliveries are counted, and the latency of the acknowledged ones recorded."""
+        sent, failed = self.messages("sync", "sent"), self.messages("sync", "failed")
+        latency = REGISTRY.get_sample_value("rbac_kafka_produce_seconds_count", {"topic": "sync"}) or 0
+        future = self.rbac_producer.producer.send.return_value
+
+        self.rbac_producer.send_kafka_message("sync", {"name": "a"})
+        self.rbac_producer.flush(timeout=5)
+        callback, *args = future.add_callback.call_args.args
+        callback(*args, MagicMock())
+        errback, *args = future.add_errback.call_args.args
+        errback(*args, KafkaError("timed out"))
+
+        self.assertEqual(self.messages("sync", "sent"), sent + 1)
+        self.assertEqual(self.messages("sync", "failed"), failed + 1)
+        self.assertEqual(REGISTRY.get_sample_value("rbac_kafka_produce_seconds_count", {"topic": "sync"}), latency + 1)
+
+    @override_settings(KAFKA_PRODUCER_QUEUE_SIZE=1, KAFKA_PRODUCER_QUEUE_TIMEOUT=0.1)
+    def test_messages_are_dropped_when_queue_is_full(self):
+        """Test request threads only wait a short time for the background thread once its queue is full."""
+        producing, release = Event(), Event()
+
+        def send(*args, **kwargs):
+            producing.set()
+            release.wait(5)
+
+        self.rbac_producer.producer.send.side_effect = send
+        dropped = self.messages("sync", "dropped")
+
+        self.rbac_producer.send_kafka_message("sync", {"name": "a"})
+        self.assertTrue(producing.wait(5))
+        self.rbac_producer.send_kafka_message("sync", {"name": "b"})
+        self.rbac_producer.send_kafka_message("sync", {"name": "c"})
+        release.set()
+        self.rbac_producer.flush(timeout=5)
+
+        self.assertEqual(self.messages("sync", "dropped"), dropped + 1)
+        self.assertEqual(self.rbac_producer.producer.send.call_count, 2)
+
+    def test_produce_errors_are_counted(self):
+        """Test a message the Kafka client refuses does not stop the background thread."""
+        self.rbac_producer.producer.send.side_effect = [KafkaError("buffer full"), None]
+        failed = self.messages("sync", "failed")
+
+        self.rbac_producer.send_kafka_message("sync", {"name": "a"})
+        self.rbac_producer.send_kafka_message("sync", {"name": "b"})
+        self.rbac_producer.flush(timeout=5)
+
+        self.assertEqual(self.messages("sync", "failed"), failed + 1)
+        self.assertEqual(self.rbac_producer.producer.send.call_count, 2)
+
+    def test_close_produces_queued_messages(self):
+        """Test closing produces the queued messages and closes the Kafka client."""
+        client = self.rbac_producer.producer
+        self.rbac_producer.send_kafka_message("sync", {"name": "a"})
+        thread = self.rbac_producer._thread
+        self.rbac_producer.close(timeout=5)
+
+        client.send.assert_called_once()
+        client.close.assert_called_once_with(timeout=5)
+        self.assertFalse(thread.is_alive())
+
+    @override_settings(KAFKA_PRODUCER_ASYNC=False)
+    def test_synchronous_mode(self):
+        """Test messages are produced by the calling thread when the background thread is disabled."""
+        self.rbac_producer.send_kafka_message("sync", {"name": "a"})
+
+        self.rbac_producer.producer.send.assert_called_once()
+        self.assertIsNone(self.rbac_producer._thread)
+
+    def test_thread_is_restarted_after_fork(self):
+        """Test a forked process starts its own thread and Kafka client."""
+        self.rbac_producer.send_kafka_message("sync", {"name": "a"})
+        self.rbac_producer.flush(timeout=5)
+        messages = self.rbac_producer._queue
+        with patch("core.kafka.os.getpid", return_value=-1), patch("core.kafka.KafkaProducer") as kafka_producer:
+            self.rbac_producer.send_kafka_message("sync", {"name": "b"})
+            self.rbac_producer.flush(timeout=5)
+            self.rbac_producer.close(timeout=5)
+
+        self.assertIsNot(self.rbac_producer._queue, messages)
+        kafka_producer.return_value.send.assert_called_once()
+
+    @override_settings(KAFKA_AUTH={"bootstrap_servers": ["localhost:9092"]}, KAFKA_PRODUCER_ASYNC=False)
+    @patch("core.kafka.time.monotonic", return_value=100.0)
+    @patch("core.kafka.KafkaProducer", side_effect=KafkaError)
+    def test_client_creation_is_retried_with_backoff(self, kafka_producer, monotonic):
+        """Test messages fail while the Kafka client cannot be created, and later messages create it again."""
+        del self.rbac_producer.producer
+        failed = self.messages("sync", "failed")
+
+        self.rbac_producer.send_kafka_message("sync", {"name": "a"})
+        self.assertEqual(kafka_producer.call_count, 6)
+        self.assertFalse(hasattr(self.rbac_producer, "producer"))
+
+        # Backing off, the client is not created again
+        self.rbac_producer.send_kafka_message("sync", {"name": "b"})
+        self.assertEqual(kafka_producer.call_count, 6)
+        self.assertEqual(self.messages("sync", "failed"), failed + 2)
+
+        monotonic.return_value = 102.0
+        kafka_producer.side_effect = None
+        self.rbac_producer.send_kafka_message("sync", {"name": "c"})
+        kafka_producer.return_value.send.assert_called_once()
+        self.assertNotIsInstance(self.rbac_producer.producer, FakeKafkaProducer)
+
+    @override_settings(
+        KAFKA_AUTH={"bootstrap_servers": ["localhost:9092"], "retries": 5},
+        KAFKA_PRODUCER_LINGER_MS=20,
+        KAFKA_PRODUCER_COMPRESSION="gzip",
+    )
+    @patch("core.kafka.KafkaProducer")
+    def test_client_is_tuned(self, kafka_producer):
+        """Test the Kafka client is created with the configured batching and compression."""
+        del self.rbac_producer.producer
+        self.rbac_producer.get_producer()
+
+        kwargs = kafka_producer.call_args.kwargs
+        self.assertEqual(kwargs["bootstrap_servers"], ["localhost:9092"])
+        self.assertEqual(kwargs["retries"], 5)
+        self.assertEqual(kwargs["linger_ms"], 20)
+        self.assertEqual(kwargs["compression_type"], "gzip")
@@ -469,6 +469,25 @@ class IntegrationViewsTests(IdentityRequest):
         actual_org_ids = [t["org_id"] for t in response.data.get("data")]
         self.assertEqual(sorted(expected_org_ids), sorted(actual_org_ids))
 
+    def test_cursor_pagination(self):
+        """Test tenants, groups and roles can be walked with a cursor and without counting them."""
+        for path, expected in (
+            ("", Tenant.objects.all()),
+            (f"{self.tenant.org_id}/groups/", Group.objects.filter(tenant=self.tenant)),
+            (f"{self.tenant.org_id}/roles/", Role.objects.filter(tenant=self.tenant)),
+        ):
+            with self.subTest(path=path):
+                ids = []
+                next_link = f"/_private/api/v1/integrations/tenant/{path}?cursor=&count=false&limit=2"
+                while next_link:
+                    response = self.client.get(next_link, **self.request.META, follow=True)
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+                    self.assertNotIn("count", response.data["meta"])
+                    ids.extend(str(item.get("uuid", item.get("id"))) for item in response.data["data"])
+                    next_link = response.data["links"]["next"]
+                field = "uuid" if path else "id"
+                self.assertEqual(ids, [str(value) for value in expected.order_by("id").values_list(field, flat=True)])
+
     @patch(
         "management.principal.proxy.PrincipalProxy.request_filtered_principals",
         return_value={
@@ -0,0 +1,54 @@
+#
+# Copyright 2025 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Test the JWT utilities."""
+from unittest.mock import patch
+
+import requests
+from django.test import TestCase, override_settings
+from internal.jwt_utils import JWTProvider
+
+
+@override_settings(REDHAT_SSO="sso.example.com")
+class JWTProviderTest(TestCase):
+    """Test the JWT provider."""
+
+    @patch("internal.jwt_utils.SSO_CLIENT.post", side_effect=requests.exceptions.ReadTimeout)
+    def test_request_errors_return_no_token(self, post):
+        """Test a failed request to SSO does not raise."""
+        self.assertIsNone(JWTProvider().get_jwt_token("client_id", "client_secret"))
+        post.assert_called_once()
+
+    @patch("internal.jwt_utils.SSO_CLIENT.post")
+    def test_token(self, post):
+        """Test the access token of the SSO response is returned."""
+        post.return_value.json.return_value = {"access_token": "token"}
+        self.assertEqual(JWTProvider().get_jwt_token("client_id", "client_secret"), "token")
+
+    @patch("internal.jwt_utils.SSO_CLIENT.post")
+    def test_error_responses_return_no_token(self, post):
+        """Test an error response or a response without an access token does not raise."""
+        post.return_value.ok = False
+        post.return_value.status_code = 401
+        self.assertIsNone(JWTProvider().get_jwt_token("client_id", "client_secret"))
+        post.return_value.json.assert_not_called()
+
+        post.return_value.ok = True
+        post.return_value.json.return_value = {"error": "invalid_client"}
+        self.assertIsNone(JWTProvider().get_jwt_token("client_id", "client_secret"))
+
+        post.return_value.json.side_effect = ValueError("Expecting value")
+        self.assertIsNone(JWTProvider().get_jwt_token("client_id", "client_secret"))
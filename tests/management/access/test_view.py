@@ -15,7 +15,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Test the access view."""
-from unittest.mock import patch, Mock
+from unittest.mock import ANY, patch, Mock
 
 from api.models import CrossAccountRequest
 from django.urls import reverse
@@ -27,8 +27,15 @@ from rest_framework.test import APIClient
 from api.models import Tenant, User
 from datetime import timedelta
 
-from management.cache import TenantCache
+from management.access.model import (
+    get_effective_access,
+    get_effective_access_generation,
+    invalidate_effective_access,
+    save_effective_access,
+)
+from management.cache import AccessCache, TenantCache, connect_access_cache_signals
 from management.models import Group, Permission, Principal, ResourceDefinition, Policy, Role, Access, Workspace
+from management.models import EffectiveAccess
 from tests.identity_request import IdentityRequest
 
 
@@ -38,98 +45,103 @@ class AccessViewTests(IdentityRequest):
     def setUp(self):
         """Set up the access view tests."""
         super().setUp()
-        request = self.request_context["request"]
-        user = User()
-        user.username = self.user_data["username"]
-        user.account = self.customer_data["account_id"]
-        user.org_id = self.customer_data["org_id"]
-        request.user = user
-        self.public_tenant = Tenant.objects.get(tenant_name="public")
-
-        self.access_data = {
-            "permission": "app:*:*",
-            "resourceDefinitions": [{"attributeFilter": {"key": "key1.id", "operation": "equal", "value": "value1"}}],
-        }
-
-        test_tenant_org_id = "100001"
-
-        # we need to delete old test_tenant's that may exist in cache
-        TENANTS = TenantCache()
-        TENANTS.delete_tenant(test_tenant_org_id)
-
-        # items with test_ prefix have hard coded attributes for new BOP requests
-        self.test_tenant = Tenant(
-            tenant_name="acct1111111", account_id="1111111", org_id=test_tenant_org_id, ready=True
-        )
-        self.test_tenant.save()
-        self.test_principal = Principal(username="test_user", tenant=self.test_tenant)
-        self.test_principal.save()
-        self.test_group = Group(name="test_groupA", tenant=self.test_tenant)
-        self.test_group.save()
-        self.test_group.principals.add(self.test_principal)
-        self.test_group.save()
-        self.test_permission = Permission.objects.create(permission="app:test_*:test_*", tenant=self.test_tenant)
-        Permission.objects.create(permission="app:test_foo:test_bar", tenant=self.test_tenant)
-        user_data = {"username": "test_user", "email": "test@gmail.com"}
-        request_context = self._create_request_context(
-            {"account_id": "1111111", "tenant_name": "acct1111111", "org_id": "100001"}, user_data, is_org_admin=True
-        )
-        request = request_context["request"]
-        self.test_headers = request.META
-        test_tenant_root_workspace = Workspace.objects.create(
-            name="Test Tenant Root Workspace", type=Workspace.Types.ROOT, tenant=self.test_tenant
-        )
-        Workspace.objects.create(
-            name="Test Tenant Default Workspace",
-            type=Workspace.Types.DEFAULT,
-            parent=test_tenant_root_workspace,
-            tenant=self.test_tenant,
-        )
-
-        self.principal = Principal(username=user.username, tenant=self.tenant)
-        self.principal.save()
-        self.admin_principal = Principal(username="user_admin", tenant=self.tenant)
-        self.admin_principal.save()
-        self.group = Group(name="groupA", tenant=self.tenant)
-        self.group.save()
-        self.group.principals.add(self.principal)
-        self.group.save()
-        self.permission = Permission.objects.create(permission="app:*:*", tenant=self.tenant)
-        Permission.objects.create(permission="app:foo:bar", tenant=self.tenant)
-        tenant_root_workspace = Workspace.objects.create(
-            name="root",
-            description="Root workspace",
-            tenant=self.tenant,
-            type=Workspace.Types.ROOT,
-        )
-        self.default_ws = Workspace.objects.create(
-            name="Tenant Default Workspace",
-            type=Workspace.Types.DEFAULT,
-            parent=tenant_root_workspace,
-            tenant=self.tenant,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            request = self.request_context["request"]
+            user = User()
+            user.username = self.user_data["username"]
+            user.account = self.customer_data["account_id"]
+            user.org_id = self.customer_data["org_id"]
+            request.user = user
+            self.public_tenant = Tenant.objects.get(tenant_name="public")
+
+            self.access_data = {
+                "permission": "app:*:*",
+                "resourceDefinitions": [
+                    {"attributeFilter": {"key": "key1.id", "operation": "equal", "value": "value1"}}
+                ],
+            }
 
-        customer_data = {
-            "account_id": self.tenant.account_id,
-            "tenant_name": self.tenant.tenant_name,
-            "org_id": self.tenant.org_id,
-        }
+            test_tenant_org_id = "100001"
+
+            # we need to delete old test_tenant's that may exist in cache
+            TENANTS = TenantCache()
+            TENANTS.delete_tenant(test_tenant_org_id)
+
+            # items with test_ prefix have hard coded attributes for new BOP requests
+            self.test_tenant = Tenant(
+                tenant_name="acct1111111", account_id="1111111", org_id=test_tenant_org_id, ready=True
+            )
+            self.test_tenant.save()
+            self.test_principal = Principal(username="test_user", tenant=self.test_tenant)
+            self.test_principal.save()
+            self.test_group = Group(name="test_groupA", tenant=self.test_tenant)
+            self.test_group.save()
+            self.test_group.principals.add(self.test_principal)
+            self.test_group.save()
+            self.test_permission = Permission.objects.create(permission="app:test_*:test_*", tenant=self.test_tenant)
+            Permission.objects.create(permission="app:test_foo:test_bar", tenant=self.test_tenant)
+            user_data = {"username": "test_user", "email": "test@gmail.com"}
+            request_context = self._create_request_context(
+                {"account_id": "1111111", "tenant_name": "acct1111111", "org_id": "100001"},
+                user_data,
+                is_org_admin=True,
+            )
+            request = request_context["request"]
+            self.test_headers = request.META
+            test_tenant_root_workspace = Workspace.objects.create(
+                name="Test Tenant Root Workspace", type=Workspace.Types.ROOT, tenant=self.test_tenant
+            )
+            Workspace.objects.create(
+                name="Test Tenant Default Workspace",
+                type=Workspace.Types.DEFAULT,
+                parent=test_tenant_root_workspace,
+                tenant=self.test_tenant,
+            )
+
+            self.principal = Principal(username=user.username, tenant=self.tenant)
+            self.principal.save()
+            self.admin_principal = Principal(username="user_admin", tenant=self.tenant)
+            self.admin_principal.save()
+            self.group = Group(name="groupA", tenant=self.tenant)
+            self.group.save()
+            self.group.principals.add(self.principal)
+            self.group.save()
+            self.permission = Permission.objects.create(permission="app:*:*", tenant=self.tenant)
+            Permission.objects.create(permission="app:foo:bar", tenant=self.tenant)
+            tenant_root_workspace = Workspace.objects.create(
+                name="root",
+                description="Root workspace",
+                tenant=self.tenant,
+                type=Workspace.Types.ROOT,
+            )
+            self.default_ws = Workspace.objects.create(
+                name="Tenant Default Workspace",
+                type=Workspace.Types.DEFAULT,
+                parent=tenant_root_workspace,
+                tenant=self.tenant,
+            )
+
+            customer_data = {
+                "account_id": self.tenant.account_id,
+                "tenant_name": self.tenant.tenant_name,
+                "org_id": self.tenant.org_id,
+            }
 
-        service_account_data = self._create_service_account_data()
-        self.service_account = Principal(
-            username=service_account_data["username"],
-            tenant=self.tenant,
-            type="service-account",
-            service_account_id=service_account_data["client_id"],
-        )
-        self.service_account.save()
-
-        request_context_service_account_principal = self._create_request_context(
-            customer_data=customer_data,
-            service_account_data=service_account_data,
-            is_org_admin=False,
-        )
-        self.headers_service_account = request_context_service_account_principal["request"].META
+            service_account_data = self._create_service_account_data()
+            self.service_account = Principal(
+                username=service_account_data["username"],
+                tenant=self.tenant,
+                type="service-account",
+                service_account_id=service_account_data["client_id"],
+            )
+            self.service_account.save()
+
+            request_context_service_account_principal = self._create_request_context(
+                customer_data=customer_data,
+                service_account_data=service_account_data,
+                is_org_admin=False,
+            )
+            self.headers_service_account = request_context_service_account_principal["request"].META
 
     def tearDown(self):
         """Tear down access view tests."""
@@ -770,8 +782,8 @@ class AccessViewTests(IdentityRequest):
         self.assertEqual(len(response.data.get("data")), 0)
         self.assertEqual(response.data.get("meta").get("limit"), 0)
 
-    @patch("management.cache.AccessCache.save_policy", return_value=None)
-    @patch("management.cache.AccessCache.get_policy", return_value=None)
+    @patch("management.cache.AccessCache.save_access", return_value=None)
+    @patch("management.cache.AccessCache.get_access_index", return_value=None)
     @patch(
         "management.principal.proxy.PrincipalProxy.request_filtered_principals",
         return_value={
@@ -789,7 +801,7 @@ class AccessViewTests(IdentityRequest):
             ],
         },
     )
-    def test_get_access_with_ordering_and_cache(self, mock_request, get_policy, save_policy):
+    def test_get_access_with_ordering_and_cache(self, mock_request, get_access_index, save_access):
         """Test that we can obtain the expected access with ordering and cache."""
 
         role_name = "roleA"
@@ -800,109 +812,41 @@ class AccessViewTests(IdentityRequest):
         policy_name = "policyA"
         response = self.create_policy(policy_name, self.test_group.uuid, [role_uuid, test_role.uuid], self.test_tenant)
 
-        tenant_name = self.test_tenant.tenant_name
         principal_id = self.test_principal.uuid
-        principal_username = self.test_principal.username
-        key = f"rbac::policy::tenant={tenant_name}::user={principal_id}"
         client = APIClient()
 
-        #### Sort by application ####
-        url = "{}?application=&username={}&order_by={}".format(
-            reverse("v1_management:access"), self.test_principal.username, "application"
-        )
-        response = client.get(url, **self.test_headers)
-
-        # Cache is called saved with sub_key ""
-        get_policy.assert_called_with(principal_id, "&order:application")
-        called_with_para = save_policy.mock_calls[0][1]
-        self.assertEqual(principal_id, called_with_para[0])
-        self.assertEqual("&order:application", called_with_para[1])
-        self.assertEqual(2, len(called_with_para[2]))  # it catches all the policies
-        self.assertEqual(response.data["meta"]["count"], 2)
-        self.assertEqual(response.data["data"][0]["permission"], "app:*:*")  # check order
-
-        url = "{}?application=&username={}&order_by={}".format(
-            reverse("v1_management:access"), self.test_principal.username, "-application"
-        )
-        response = client.get(url, **self.test_headers)
-        get_policy.assert_called_with(principal_id, "&order:-application")
-        called_with_para = save_policy.mock_calls[1][1]
-        self.assertEqual(principal_id, called_with_para[0])
-        self.assertEqual("&order:-application", called_with_para[1])
-        self.assertEqual(2, len(called_with_para[2]))  # it catches all the policies
-        self.assertEqual(response.data["meta"]["count"], 2)
-        # Response data is in reverse order
-        self.assertEqual(response.data["data"][0]["permission"], "test:assigned:permission1")  # check order
-
-        #### Sort by resource_type ####
-        url = "{}?application=&username={}&order_by={}".format(
-            reverse("v1_management:access"), self.test_principal.username, "resource_type"
-        )
-        response = client.get(url, **self.test_headers)
-
-        # Cache is called saved with sub_key ""
-        get_policy.assert_called_with(principal_id, "&order:resource_type")
-        called_with_para = save_policy.mock_calls[2][1]
-        self.assertEqual(principal_id, called_with_para[0])
-        self.assertEqual("&order:resource_type", called_with_para[1])
-        self.assertEqual(2, len(called_with_para[2]))  # it catches all the policies
-        self.assertEqual(response.data["meta"]["count"], 2)
-        self.assertEqual(response.data["data"][0]["permission"], "app:*:*")  # check order
-
-        url = "{}?application=&username={}&order_by={}".format(
-            reverse("v1_management:access"), self.test_principal.username, "-resource_type"
-        )
-        response = client.get(url, **self.test_headers)
-        get_policy.assert_called_with(principal_id, "&order:-resource_type")
-        called_with_para = save_policy.mock_calls[3][1]
-        self.assertEqual(principal_id, called_with_para[0])
-        self.assertEqual("&order:-resource_type", called_with_para[1])
-        self.assertEqual(2, len(called_with_para[2]))  # it catches all the policies
-        self.assertEqual(response.data["meta"]["count"], 2)
-        # Response data is in reverse order
-        self.assertEqual(response.data["data"][0]["permission"], "test:assigned:permission1")  # check order
-
-        #### Sort by verb ####
-        url = "{}?application=&username={}&order_by={}".format(
-            reverse("v1_management:access"), self.test_principal.username, "verb"
-        )
-        response = client.get(url, **self.test_headers)
-
-        # Cache is called saved with sub_key ""
-        get_policy.assert_called_with(principal_id, "&order:verb")
-        called_with_para = save_policy.mock_calls[4][1]
-        self.assertEqual(principal_id, called_with_para[0])
-        self.assertEqual("&order:verb", called_with_para[1])
-        self.assertEqual(2, len(called_with_para[2]))  # it catches all the policies
-        self.assertEqual(response.data["meta"]["count"], 2)
-        self.assertEqual(response.data["data"][0]["permission"], "app:*:*")  # check order
-
-        url = "{}?application=&username={}&order_by={}".format(
-            reverse("v1_management:access"), self.test_principal.username, "-verb"
-        )
-        response = client.get(url, **self.test_headers)
-        # Cache is called saved with sub_key ""
-        get_policy.assert_called_with(principal_id, "&order:-verb")
-        called_with_para = save_policy.mock_calls[5][1]
-        self.assertEqual(principal_id, called_with_para[0])
-        self.assertEqual("&order:-verb", called_with_para[1])
-        self.assertEqual(2, len(called_with_para[2]))  # it catches all the policies
-        self.assertEqual(response.data["meta"]["count"], 2)
-        # Response data is in reverse order
-        self.assertEqual(response.data["data"][0]["permission"], "test:assigned:permission1")  # check order
+        # Every ordering reads and saves the same unsorted access of every application
+        for ordering, first_permission in (
+            ("application", "app:*:*"),
+            ("-application", "test:assigned:permission1"),
+            ("resource_type", "app:*:*"),
+            ("-resource_type", "test:assigned:permission1"),
+            ("verb", "app:*:*"),
+            ("-verb", "test:assigned:permission1"),
+        ):
+            url = "{}?application=&username={}&order_by={}".format(
+                reverse("v1_management:access"), self.test_principal.username, ordering
+            )
+            response = client.get(url, **self.test_headers)
+
+            get_access_index.assert_called_with(principal_id, [""])
+            called_with_para = save_access.call_args[0]
+            self.assertEqual(principal_id, called_with_para[0])
+            self.assertEqual([""], called_with_para[1])
+            self.assertEqual(2, len(called_with_para[2]))  # it catches all the policies
+            self.assertEqual(response.data["meta"]["count"], 2)
+            self.assertEqual(response.data["data"][0]["permission"], first_permission)  # check order
 
         #### Sort by nothing still works ####
         url = "{}?application=&username={}&order_by=".format(
             reverse("v1_management:access"), self.test_principal.username
         )
         response = client.get(url, **self.test_headers)
-        # Cache is called saved with sub_key ""
-        get_policy.assert_called_with(principal_id, "")
-        called_with_para = save_policy.mock_calls[6][1]
-        self.assertEqual(principal_id, called_with_para[0])
-        self.assertEqual("", called_with_para[1])
-        self.assertEqual(2, len(called_with_para[2]))  # it catches all the policies
+        get_access_index.assert_called_with(principal_id, [""])
+        called_with_para = save_access.call_args[0]
+        self.assertEqual(2, len(called_with_para[2]))
         self.assertEqual(response.data["meta"]["count"], 2)
+        self.assertEqual(save_access.call_count, 7)
 
     @patch(
         "management.principal.proxy.PrincipalProxy.request_filtered_principals",
@@ -1006,8 +950,8 @@ class AccessViewTests(IdentityRequest):
         response = client.get(url, **self.headers)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-    @patch("management.cache.AccessCache.get_policy", return_value=None)
-    @patch("management.cache.AccessCache.save_policy", return_value=None)
+    @patch("management.cache.AccessCache.get_access_index", return_value=None)
+    @patch("management.cache.AccessCache.save_access", return_value=None)
     @patch(
         "management.principal.proxy.PrincipalProxy.request_filtered_principals",
         return_value={
@@ -1025,7 +969,7 @@ class AccessViewTests(IdentityRequest):
             ],
         },
     )
-    def test_get_access_with_pagination_and_cache(self, mock_request, save_policy, get_policy):
+    def test_get_access_with_pagination_and_cache(self, mock_request, save_access, get_access_index):
         """Test that we can obtain the expected access with pagination and cache."""
 
         role_name = "roleA"
@@ -1036,22 +980,20 @@ class AccessViewTests(IdentityRequest):
         policy_name = "policyA"
         response = self.create_policy(policy_name, self.test_group.uuid, [role_uuid, test_role.uuid], self.test_tenant)
 
-        tenant_name = self.test_tenant.tenant_name
         principal_id = self.test_principal.uuid
-        key = f"rbac::policy::tenant={tenant_name}::user={principal_id}"
         client = APIClient()
 
-        ######## access_policy are cached with desired sub_key ############
+        ######## access_policy are cached for the application, whatever the page ############
         url = "{}?application={}&username={}&offset=1&limit=1".format(
             reverse("v1_management:access"), "app", self.test_principal.username
         )
         response = client.get(url, **self.test_headers)
 
-        get_policy.assert_called_with(principal_id, "app")
-        called_with_para = save_policy.mock_calls[0][1]  # save_policy params
+        get_access_index.assert_called_with(principal_id, ["app"])
+        called_with_para = save_access.mock_calls[0][1]  # save_access params
         self.assertEqual(principal_id, called_with_para[0])
-        self.assertEqual("app", called_with_para[1])
-        self.assertEqual([self.access_data], called_with_para[2])  # it catches all the policies for app
+        self.assertEqual(["app"], called_with_para[1])
+        self.assertEqual([self.access_data], [item for _, item in called_with_para[2]])  # all the policies for app
         self.assertEqual(response.data["meta"]["count"], 1)
         self.assertEqual(
             response.data["data"], []
@@ -1064,15 +1006,45 @@ class AccessViewTests(IdentityRequest):
         )
         response = client.get(url, **self.test_headers)
 
-        # Cache is called saved with sub_key ""
-        get_policy.assert_called_with(principal_id, "")
-        called_with_para = save_policy.mock_calls[1][1]
+        get_access_index.assert_called_with(principal_id, [""])
+        called_with_para = save_access.mock_calls[1][1]
         self.assertEqual(principal_id, called_with_para[0])
-        self.assertEqual("", called_with_para[1])
+        self.assertEqual([""], called_with_para[1])
         self.assertEqual(2, len(called_with_para[2]))  # it catches all the policies for app
         self.assertEqual(response.data["meta"]["count"], 2)
         self.assertEqual(len(response.data["data"]), 1)  # returns one policy because limit is 1
 
+    @patch("management.cache.AccessCache.get_access_items")
+    @patch("management.cache.AccessCache.get_access_index")
+    @patch("management.cache.AccessCache.save_access")
+    def test_get_access_pages_from_cache(self, save_access, get_access_index, get_access_items):
+        """Test cached access is sorted from its index, and only the items of the page are read."""
+        get_access_index.return_value = [
+            ("app", 0, 1, "app:zeta:read"),
+            ("other", 0, 2, "other:beta:write"),
+            ("app", 1, 3, "app:alpha:read"),
+        ]
+        get_access_items.side_effect = lambda uuid, entries: [{"permission": entry[3]} for entry in entries]
+        url = "{}?application=app,other&order_by=resource_type&offset=1&limit=1".format(
+            reverse("v1_management:access")
+        )
+        response = APIClient().get(url, **self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["meta"]["count"], 3)
+        self.assertEqual(response.data["data"], [{"permission": "other:beta:write"}])
+        get_access_index.assert_called_once_with(ANY, ["app", "other"])
+        get_access_items.assert_called_once_with(ANY, [("other", 0, 2, "other:beta:write")])
+        save_access.assert_not_called()
+
+        # Everything is recomputed if the items are gone by the time they are read
+        get_access_items.side_effect = None
+        get_access_items.return_value = None
+        response = APIClient().get(url, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"], [])  # the principal has no access in the database
+        save_access.assert_called_once()
+
     def test_get_access_with_invalid_ordering_value(self):
         """Test that get access with invalid ordering value raises 401."""
 
@@ -1107,3 +1079,158 @@ class AccessViewTests(IdentityRequest):
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             self.assertEqual(response.data.get("meta").get("limit"), default_limit)
             self.assertEqual(response.data.get("meta").get("count"), expected_count)
+
+    @override_settings(EFFECTIVE_ACCESS_ENABLED=True)
+    def test_get_access_from_effective_access(self):
+        """Test that access is materialized per application and served from the effective access table."""
+        role = self.create_role_and_permission("Role A", "app:foo:read")
+        Access.objects.create(role=role, permission=self.permission, tenant=self.tenant)
+        self.create_policy("policyA", self.group.uuid, [role.uuid], tenant=self.tenant)
+
+        client = APIClient()
+        url = "{}?application={}".format(reverse("v1_management:access"), "app,default")
+        response = client.get(url, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data.get("data")), 2)
+
+        # Only applications which exist are materialized, including the ones without access.
+        self.assertEqual(
+            set(EffectiveAccess.objects.filter(principal=self.principal).values_list("application", flat=True)),
+            {"app"},
+        )
+        Permission.objects.create(permission="default:*:*", tenant=self.tenant)
+        response = client.get(url, **self.headers)
+        self.assertEqual(
+            set(EffectiveAccess.objects.filter(principal=self.principal).values_list("application", flat=True)),
+            {"app", "default"},
+        )
+
+        with patch("management.access.view.AccessView.get_queryset") as get_queryset:
+            url = "{}?application={}&order_by={}".format(reverse("v1_management:access"), "app", "-resource_type")
+            response = client.get(url, **self.headers)
+            get_queryset.assert_not_called()
+        self.assertEqual([access["permission"] for access in response.data.get("data")], ["app:foo:read", "app:*:*"])
+
+    @override_settings(EFFECTIVE_ACCESS_ENABLED=True)
+    def test_effective_access_ranked_by_access_id(self):
+        """Test that access served from the effective access table is ranked by the ids of its access objects."""
+        role = self.create_role_and_permission("Role A", "app:foo:read")
+        access = Access.objects.create(role=role, permission=self.permission, tenant=self.tenant)
+        self.create_policy("policyA", self.group.uuid, [role.uuid], tenant=self.tenant)
+        access_ids = sorted(Access.objects.filter(role=role).values_list("id", flat=True))
+
+        client = APIClient()
+        url = "{}?application={}".format(reverse("v1_management:access"), "app")
+        client.get(url, **self.headers)
+        effective_access = EffectiveAccess.objects.get(principal=self.principal, application="app")
+        self.assertEqual(sorted(effective_access.access_ids), access_ids)
+
+        ranked_items = get_effective_access(self.principal, ["app"], effective_access.org_admin)
+        self.assertEqual([access_id for access_id, _ in ranked_items], access_ids)
+        self.assertEqual(dict(ranked_items)[access.id]["permission"], self.permission.permission)
+
+    @override_settings(EFFECTIVE_ACCESS_ENABLED=True)
+    def test_effective_access_invalidated_on_changes(self):
+        """Test that changes to the access chain drop the materialized access of the affected principals."""
+        # Invalidations are purged when the transaction commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            role = self.create_role_and_permission("Role A", "app:foo:read")
+            self.create_policy("policyA", self.group.uuid, [role.uuid], tenant=self.tenant)
+
+        client = APIClient()
+        url = "{}?application={}".format(reverse("v1_management:access"), "app")
+        response = client.get(url, **self.headers)
+        self.assertEqual(len(response.data.get("data")), 1)
+        self.assertTrue(EffectiveAccess.objects.filter(principal=self.principal).exists())
+
+        # Adding access to an assigned role is picked up.
+        with self.captureOnCommitCallbacks(execute=True):
+            Access.objects.create(role=role, permission=self.permission, tenant=self.tenant)
+        self.assertFalse(EffectiveAccess.objects.filter(principal=self.principal).exists())
+        response = client.get(url, **self.headers)
+        self.assertEqual(len(response.data.get("data")), 2)
+
+        # Removing the principal from the group is picked up.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.principals.remove(self.principal)
+        self.assertFalse(EffectiveAccess.objects.filter(principal=self.principal).exists())
+        response = client.get(url, **self.headers)
+        self.assertEqual(len(response.data.get("data")), 0)
+
+    @override_settings(EFFECTIVE_ACCESS_ENABLED=True)
+    def test_access_invalidated_while_computed_is_not_materialized(self):
+        """Test that access computed before an invalidation is not stored after it."""
+        generation = get_effective_access_generation(self.tenant.id)
+        invalidate_effective_access(self.tenant.org_id, [self.principal.uuid])
+        save_effective_access(self.principal, ["app"], False, [(1, {"permission": "app:*:*"})], generation)
+        self.assertFalse(EffectiveAccess.objects.filter(principal=self.principal).exists())
+
+        save_effective_access(
+            self.principal,
+            ["app"],
+            False,
+            [(1, {"permission": "app:*:*"})],
+            get_effective_access_generation(self.tenant.id),
+        )
+        self.assertTrue(EffectiveAccess.objects.filter(principal=self.principal).exists())
+
+    @override_settings(EFFECTIVE_ACCESS_ENABLED=True)
+    def test_effective_access_invalidated_on_system_role_changes(self):
+        """Test that changes to the roles of the public tenant drop the materialized access of every tenant."""
+        with self.captureOnCommitCallbacks(execute=True):
+            system_role = Role.objects.create(name="System Role", tenant=self.public_tenant, system=True)
+            permission = Permission.objects.create(permission="app:system:read", tenant=self.public_tenant)
+        EffectiveAccess.objects.create(tenant=self.tenant, principal=self.principal, application="app")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Access.objects.create(role=system_role, permission=permission, tenant=self.public_tenant)
+        self.assertFalse(EffectiveAccess.objects.filter(principal=self.principal).exists())
+
+    @override_settings(EFFECTIVE_ACCESS_ENABLED=True, ACCESS_CACHE_ENABLED=False)
+    def test_effective_access_invalidated_without_access_cache(self):
+        """Test that the materialized access is dropped even when the Redis access cache is disabled."""
+        self.assertTrue(connect_access_cache_signals())
+        EffectiveAccess.objects.create(tenant=self.tenant, principal=self.principal, application="app")
+        AccessCache(self.tenant.org_id).delete_policies([self.principal.uuid])
+        self.assertFalse(EffectiveAccess.objects.filter(principal=self.principal).exists())
+
+        EffectiveAccess.objects.create(tenant=self.tenant, principal=self.principal, application="app")
+        AccessCache(self.tenant.org_id).delete_all_policies_for_tenant()
+        self.assertFalse(EffectiveAccess.objects.filter(principal=self.principal).exists())
+
+        with override_settings(EFFECTIVE_ACCESS_ENABLED=False):
+            self.assertFalse(connect_access_cache_signals())
+
+    @override_settings(EFFECTIVE_ACCESS_ENABLED=True)
+    def test_effective_access_invalidated_on_cross_account_request_changes(self):
+        """Test that status changes of a cross-account request drop the materialized access of its principal."""
+        org_id = self.customer_data["org_id"]
+        with self.captureOnCommitCallbacks(execute=True):
+            principal = Principal.objects.create(username=f"{org_id}-123456", cross_account=True, tenant=self.tenant)
+            cross_account_request = CrossAccountRequest.objects.create(
+                target_account=self.customer_data["account_id"],
+                user_id="123456",
+                target_org=org_id,
+                end_date=timezone.now() + timedelta(10),
+                status="approved",
+            )
+        EffectiveAccess.objects.create(tenant=self.tenant, principal=principal, application="app")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cross_account_request.status = "expired"
+            cross_account_request.save()
+        self.assertFalse(EffectiveAccess.objects.filter(principal=principal).exists())
+
+    @override_settings(EFFECTIVE_ACCESS_ENABLED=True, EFFECTIVE_ACCESS_LIFETIME=0)
+    def test_effective_access_expires(self):
+        """Test that materialized access older than its lifetime is recomputed."""
+        role = self.create_role_and_permission("Role A", "app:foo:read")
+        self.create_policy("policyA", self.group.uuid, [role.uuid], tenant=self.tenant)
+
+        client = APIClient()
+        url = "{}?application={}".format(reverse("v1_management:access"), "app")
+        client.get(url, **self.headers)
+        with patch("management.access.view.AccessView.get_queryset", return_value=Access.objects.none()) as get_qs:
+            response = client.get(url, **self.headers)
+            get_qs.assert_called_once()
+        self.assertEqual(len(response.data.get("data")), 0)
@@ -33,8 +33,9 @@ class GroupDefinerTests(IdentityRequest):
         """Set up the group definer tests."""
         super().setUp()
         self.public_tenant = Tenant.objects.get(tenant_name="public")
-        seed_roles()
-        seed_group()
+        with self.captureOnCommitCallbacks(execute=True):
+            seed_roles()
+            seed_group()
 
     def test_default_group_seeding_properly(self):
         """Test that default group are seeded properly."""
@@ -71,20 +72,22 @@ class GroupDefinerTests(IdentityRequest):
     def test_default_group_seeding_reassign_roles(self, send_kafka_message):
         """Test that previous assigned roles would be eliminated before assigning new roles."""
         kafka_mock = copy_call_args(send_kafka_message)
-        self.modify_default_group()
-        new_platform_role = Role.objects.create(
-            name="new_platform_role", platform_default=True, system=True, tenant=self.public_tenant
-        )
-        role_to_remove = Role.objects.get(name="User Access administrator")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.modify_default_group()
+            new_platform_role = Role.objects.create(
+                name="new_platform_role", platform_default=True, system=True, tenant=self.public_tenant
+            )
+            role_to_remove = Role.objects.get(name="User Access administrator")
 
-        Tenant.objects.create(tenant_name="unready1", org_id="unready1", ready=False)
-        Tenant.objects.create(tenant_name="unready2", org_id="unready2", ready=False)
+            Tenant.objects.create(tenant_name="unready1", org_id="unready1", ready=False)
+            Tenant.objects.create(tenant_name="unready2", org_id="unready2", ready=False)
 
         with self.settings(NOTIFICATIONS_RH_ENABLED=True, NOTIFICATIONS_ENABLED=True):
-            try:
-                seed_group()
-            except Exception:
-                self.fail(msg="update seed_group encountered an exception")
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    seed_group()
+                except Exception:
+                    self.fail(msg="update seed_group encountered an exception")
 
             group = Group.objects.get(platform_default=True, tenant=self.public_tenant)
             self.assertEqual(group.system, True)
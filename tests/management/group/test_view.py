@@ -123,146 +123,147 @@ class GroupViewsetTests(IdentityRequest):
     def setUp(self):
         """Set up the group viewset tests."""
         super().setUp()
-        request = self.request_context["request"]
-        user = User()
-        user.username = self.user_data["username"]
-        user.account = self.customer_data["account_id"]
-        user.org_id = self.customer_data["org_id"]
-        user.admin = True
-        request.user = user
-
-        self.dummy_role_id = uuid4()
-
-        test_tenant_org_id = "100001"
-
-        # we need to delete old test_tenant's that may exist in cache
-        TENANTS = TenantCache()
-        TENANTS.delete_tenant(test_tenant_org_id)
-
-        self.test_tenant = Tenant(
-            tenant_name="acct1111111",
-            account_id="1111111",
-            org_id=test_tenant_org_id,
-            ready=True,
-        )
-        self.test_tenant.save()
-        self.test_principal = Principal(username="test_user", tenant=self.test_tenant)
-        self.test_principal.save()
-        self.test_principalB = Principal(username="mock_user", tenant=self.test_tenant)
-        self.test_principalB.save()
-        self.test_principalC = Principal(username="user_not_attached_to_group_explicitly", tenant=self.test_tenant)
-        self.test_principalC.save()
-        user_data = {"username": "test_user", "email": "test@gmail.com"}
-        test_request_context = self._create_request_context(
-            {
-                "account_id": "1111111",
-                "tenant_name": "acct1111111",
-                "org_id": test_tenant_org_id,
-            },
-            user_data,
-            is_org_admin=True,
-        )
-        test_request = test_request_context["request"]
-        self.test_headers = test_request.META
-
-        self.public_tenant = Tenant.objects.get(tenant_name="public")
-        self.principal = Principal(username=self.user_data["username"], tenant=self.tenant, user_id="1")
-        self.principal.save()
-        self.principalB = Principal(username="mock_user", tenant=self.tenant, user_id="2")
-        self.principalB.save()
-        self.principalC = Principal(username="user_not_attached_to_group_explicitly", tenant=self.tenant)
-        self.principalC.save()
-        self.group = Group(name="groupA", tenant=self.tenant)
-        self.group.save()
-        self.role = Role.objects.create(
-            name="roleA",
-            description="A role for a group.",
-            system=True,
-            tenant=self.tenant,
-        )
-        self.ext_tenant = ExtTenant.objects.create(name="foo")
-        self.ext_role_relation = ExtRoleRelation.objects.create(role=self.role, ext_tenant=self.ext_tenant)
-        self.policy = Policy.objects.create(name="policyA", group=self.group, tenant=self.tenant)
-        self.policy.roles.add(self.role)
-        self.policy.save()
-        self.group.policies.add(self.policy)
-        self.group.principals.add(self.principal, self.principalB)
-        self.group.save()
-
-        self.defGroup = Group(
-            name="groupDef",
-            platform_default=True,
-            system=True,
-            tenant=self.public_tenant,
-        )
-        self.defGroup.save()
-        self.defGroup.principals.add(self.principal, self.test_principal)
-        self.defGroup.save()
-        self.defPolicy = Policy(
-            name="defPolicy",
-            system=True,
-            tenant=self.public_tenant,
-            group=self.defGroup,
-        )
-        self.defPolicy.save()
-
-        self.adminGroup = Group(
-            name="groupAdmin",
-            admin_default=True,
-            tenant=self.public_tenant,
-            system=True,
-        )
-        self.adminGroup.save()
-        self.adminGroup.principals.add(self.principal, self.test_principal)
-        self.adminGroup.save()
-        self.adminPolicy = Policy(name="adminPolicy", tenant=self.public_tenant, group=self.adminGroup)
-        self.adminPolicy.save()
-
-        self.emptyGroup = Group(name="groupE", tenant=self.tenant)
-        self.emptyGroup.save()
-
-        self.groupB = Group.objects.create(name="groupB", tenant=self.tenant)
-        self.groupB.principals.add(self.principal, self.principal)
-        self.policyB = Policy.objects.create(name="policyB", group=self.groupB, tenant=self.tenant)
-        self.roleB = Role.objects.create(name="roleB", system=False, tenant=self.tenant)
-        self.policyB.roles.add(self.roleB)
-        self.policyB.save()
-
-        # role that's not assigned to principal
-        self.roleOrphan = Role.objects.create(name="roleOrphan", tenant=self.tenant)
-
-        # group that associates with multiple roles
-        self.groupMultiRole = Group.objects.create(name="groupMultiRole", tenant=self.tenant)
-        self.policyMultiRole = Policy.objects.create(name="policyMultiRole", tenant=self.tenant)
-        self.policyMultiRole.roles.add(self.role)
-        self.policyMultiRole.roles.add(self.roleB)
-        self.groupMultiRole.policies.add(self.policyMultiRole)
-
-        # fixtures for Service Accounts
-        self.sa_client_ids = [
-            "b6636c60-a31d-013c-b93d-6aa2427b506c",
-            "69a116a0-a3d4-013c-b940-6aa2427b506c",
-            "6f3c2700-a3d4-013c-b941-6aa2427b506c",
-        ]
-        self.service_accounts = []
-        for uuid in self.sa_client_ids:
-            principal = Principal(
-                username="service-account-" + uuid,
+        with self.captureOnCommitCallbacks(execute=True):
+            request = self.request_context["request"]
+            user = User()
+            user.username = self.user_data["username"]
+            user.account = self.customer_data["account_id"]
+            user.org_id = self.customer_data["org_id"]
+            user.admin = True
+            request.user = user
+
+            self.dummy_role_id = uuid4()
+
+            test_tenant_org_id = "100001"
+
+            # we need to delete old test_tenant's that may exist in cache
+            TENANTS = TenantCache()
+            TENANTS.delete_tenant(test_tenant_org_id)
+
+            self.test_tenant = Tenant(
+                tenant_name="acct1111111",
+                account_id="1111111",
+                org_id=test_tenant_org_id,
+                ready=True,
+            )
+            self.test_tenant.save()
+            self.test_principal = Principal(username="test_user", tenant=self.test_tenant)
+            self.test_principal.save()
+            self.test_principalB = Principal(username="mock_user", tenant=self.test_tenant)
+            self.test_principalB.save()
+            self.test_principalC = Principal(username="user_not_attached_to_group_explicitly", tenant=self.test_tenant)
+            self.test_principalC.save()
+            user_data = {"username": "test_user", "email": "test@gmail.com"}
+            test_request_context = self._create_request_context(
+                {
+                    "account_id": "1111111",
+                    "tenant_name": "acct1111111",
+                    "org_id": test_tenant_org_id,
+                },
+                user_data,
+                is_org_admin=True,
+            )
+            test_request = test_request_context["request"]
+            self.test_headers = test_request.META
+
+            self.public_tenant = Tenant.objects.get(tenant_name="public")
+            self.principal = Principal(username=self.user_data["username"], tenant=self.tenant, user_id="1")
+            self.principal.save()
+            self.principalB = Principal(username="mock_user", tenant=self.tenant, user_id="2")
+            self.principalB.save()
+            self.principalC = Principal(username="user_not_attached_to_group_explicitly", tenant=self.tenant)
+            self.principalC.save()
+            self.group = Group(name="groupA", tenant=self.tenant)
+            self.group.save()
+            self.role = Role.objects.create(
+                name="roleA",
+                description="A role for a group.",
+                system=True,
                 tenant=self.tenant,
-                type="service-account",
-                service_account_id=uuid,
-                user_id=f"sa_sub_{uuid}",
             )
-            self.service_accounts.append(principal)
-            principal.save()
+            self.ext_tenant = ExtTenant.objects.create(name="foo")
+            self.ext_role_relation = ExtRoleRelation.objects.create(role=self.role, ext_tenant=self.ext_tenant)
+            self.policy = Policy.objects.create(name="policyA", group=self.group, tenant=self.tenant)
+            self.policy.roles.add(self.role)
+            self.policy.save()
+            self.group.policies.add(self.policy)
+            self.group.principals.add(self.principal, self.principalB)
+            self.group.save()
+
+            self.defGroup = Group(
+                name="groupDef",
+                platform_default=True,
+                system=True,
+                tenant=self.public_tenant,
+            )
+            self.defGroup.save()
+            self.defGroup.principals.add(self.principal, self.test_principal)
+            self.defGroup.save()
+            self.defPolicy = Policy(
+                name="defPolicy",
+                system=True,
+                tenant=self.public_tenant,
+                group=self.defGroup,
+            )
+            self.defPolicy.save()
 
-        self.group.principals.add(*self.service_accounts)
-        self.group.save()
+            self.adminGroup = Group(
+                name="groupAdmin",
+                admin_default=True,
+                tenant=self.public_tenant,
+                system=True,
+            )
+            self.adminGroup.save()
+            self.adminGroup.principals.add(self.principal, self.test_principal)
+            self.adminGroup.save()
+            self.adminPolicy = Policy(name="adminPolicy", tenant=self.public_tenant, group=self.adminGroup)
+            self.adminPolicy.save()
+
+            self.emptyGroup = Group(name="groupE", tenant=self.tenant)
+            self.emptyGroup.save()
+
+            self.groupB = Group.objects.create(name="groupB", tenant=self.tenant)
+            self.groupB.principals.add(self.principal, self.principal)
+            self.policyB = Policy.objects.create(name="policyB", group=self.groupB, tenant=self.tenant)
+            self.roleB = Role.objects.create(name="roleB", system=False, tenant=self.tenant)
+            self.policyB.roles.add(self.roleB)
+            self.policyB.save()
+
+            # role that's not assigned to principal
+            self.roleOrphan = Role.objects.create(name="roleOrphan", tenant=self.tenant)
+
+            # group that associates with multiple roles
+            self.groupMultiRole = Group.objects.create(name="groupMultiRole", tenant=self.tenant)
+            self.policyMultiRole = Policy.objects.create(name="policyMultiRole", tenant=self.tenant)
+            self.policyMultiRole.roles.add(self.role)
+            self.policyMultiRole.roles.add(self.roleB)
+            self.groupMultiRole.policies.add(self.policyMultiRole)
+
+            # fixtures for Service Accounts
+            self.sa_client_ids = [
+                "b6636c60-a31d-013c-b93d-6aa2427b506c",
+                "69a116a0-a3d4-013c-b940-6aa2427b506c",
+                "6f3c2700-a3d4-013c-b941-6aa2427b506c",
+            ]
+            self.service_accounts = []
+            for uuid in self.sa_client_ids:
+                principal = Principal(
+                    username="service-account-" + uuid,
+                    tenant=self.tenant,
+                    type="service-account",
+                    service_account_id=uuid,
+                    user_id=f"sa_sub_{uuid}",
+                )
+                self.service_accounts.append(principal)
+                principal.save()
 
-        self.bootstrap_service = V2TenantBootstrapService(NoopReplicator())
-        bootstrapped = self.bootstrap_service.bootstrap_tenant(self.tenant)
-        self.default_workspace = bootstrapped.default_workspace
-        self.root_workspace = bootstrapped.root_workspace
+            self.group.principals.add(*self.service_accounts)
+            self.group.save()
+
+            self.bootstrap_service = V2TenantBootstrapService(NoopReplicator())
+            bootstrapped = self.bootstrap_service.bootstrap_tenant(self.tenant)
+            self.default_workspace = bootstrapped.default_workspace
+            self.root_workspace = bootstrapped.root_workspace
 
     def tearDown(self):
         """Tear down group viewset tests."""
@@ -281,15 +282,16 @@ class GroupViewsetTests(IdentityRequest):
     def test_create_group_success(self, send_kafka_message, mock_request):
         """Test that we can create a group."""
         with self.settings(NOTIFICATIONS_ENABLED=True):
-            group_name = "groupC"
-            test_data = {"name": group_name}
+            with self.captureOnCommitCallbacks(execute=True):
+                group_name = "groupC"
+                test_data = {"name": group_name}
 
-            org_id = self.customer_data["org_id"]
+                org_id = self.customer_data["org_id"]
 
-            # create a group
-            url = reverse("v1_management:group-list")
-            client = APIClient()
-            response = client.post(url, test_data, format="json", **self.headers)
+                # create a group
+                url = reverse("v1_management:group-list")
+                client = APIClient()
+                response = client.post(url, test_data, format="json", **self.headers)
             uuid = response.data.get("uuid")
             self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
@@ -756,14 +758,15 @@ class GroupViewsetTests(IdentityRequest):
     def test_update_group_success(self, send_kafka_message, mock_request):
         """Test that we can update an existing group."""
         with self.settings(NOTIFICATIONS_ENABLED=True):
-            updated_name = self.group.name + "_update"
-            test_data = {"name": updated_name}
+            with self.captureOnCommitCallbacks(execute=True):
+                updated_name = self.group.name + "_update"
+                test_data = {"name": updated_name}
 
-            org_id = self.customer_data["org_id"]
+                org_id = self.customer_data["org_id"]
 
-            url = reverse("v1_management:group-detail", kwargs={"uuid": self.group.uuid})
-            client = APIClient()
-            response = client.put(url, test_data, format="json", **self.headers)
+                url = reverse("v1_management:group-detail", kwargs={"uuid": self.group.uuid})
+                client = APIClient()
+                response = client.put(url, test_data, format="json", **self.headers)
 
             self.assertEqual(response.status_code, status.HTTP_200_OK)
 
@@ -863,23 +866,26 @@ class GroupViewsetTests(IdentityRequest):
     def test_delete_group_success(self, send_kafka_message, mock_method):
         """Test that we can delete an existing group."""
         with self.settings(NOTIFICATIONS_ENABLED=True):
-            url = reverse("v1_management:group-roles", kwargs={"uuid": self.group.uuid})
-            request_body = {"roles": [self.role.uuid]}
-            client = APIClient()
-
-            response = client.post(url, request_body, format="json", **self.headers)
-            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            with self.captureOnCommitCallbacks(execute=True):
+                url = reverse("v1_management:group-roles", kwargs={"uuid": self.group.uuid})
+                request_body = {"roles": [self.role.uuid]}
+                client = APIClient()
+
+                response = client.post(url, request_body, format="json", **self.headers)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+                default_workspace_id = str(self.default_workspace.id)
+                role_binding_id = (
+                    BindingMapping.objects.filter(role=self.role, resource_id=default_workspace_id)
+                    .get()
+                    .mappings["id"]
+                )
 
-            default_workspace_id = str(self.default_workspace.id)
-            role_binding_id = (
-                BindingMapping.objects.filter(role=self.role, resource_id=default_workspace_id).get().mappings["id"]
-            )
-
-            url = reverse("v1_management:group-detail", kwargs={"uuid": self.group.uuid})
-            client = APIClient()
-            principals_user_ids = self.group.principals.values_list("user_id", flat=True)
-            group_uuid = self.group.uuid
-            response = client.delete(url, **self.headers)
+                url = reverse("v1_management:group-detail", kwargs={"uuid": self.group.uuid})
+                client = APIClient()
+                principals_user_ids = self.group.principals.values_list("user_id", flat=True)
+                group_uuid = self.group.uuid
+                response = client.delete(url, **self.headers)
 
             actual_call_arg = mock_method.call_args[0][0]
             to_remove = actual_call_arg["relations_to_remove"]
@@ -1433,23 +1439,24 @@ class GroupViewsetTests(IdentityRequest):
         """Test that adding a role to a platform_default group flips the system flag."""
         kafka_mock = copy_call_args(send_kafka_message)
         with self.settings(NOTIFICATIONS_ENABLED=True):
-            url = reverse("v1_management:group-roles", kwargs={"uuid": self.defGroup.uuid})
-            client = APIClient()
-            test_data = {"roles": [self.roleB.uuid, self.dummy_role_id]}
-
-            org_id = self.customer_data["org_id"]
-
-            default_role = Role.objects.create(
-                name="default_role",
-                description="A default role for a group.",
-                platform_default=True,
-                system=True,
-                tenant=self.public_tenant,
-            )
-            self.defGroup.policies.first().roles.add(default_role)
-            self.assertTrue(self.defGroup.system)
-            self.assertEqual(self.defGroup.roles().count(), 1)
-            response = client.post(url, test_data, format="json", **self.headers)
+            with self.captureOnCommitCallbacks(execute=True):
+                url = reverse("v1_management:group-roles", kwargs={"uuid": self.defGroup.uuid})
+                client = APIClient()
+                test_data = {"roles": [self.roleB.uuid, self.dummy_role_id]}
+
+                org_id = self.customer_data["org_id"]
+
+                default_role = Role.objects.create(
+                    name="default_role",
+                    description="A default role for a group.",
+                    platform_default=True,
+                    system=True,
+                    tenant=self.public_tenant,
+                )
+                self.defGroup.policies.first().roles.add(default_role)
+                self.assertTrue(self.defGroup.system)
+                self.assertEqual(self.defGroup.roles().count(), 1)
+                response = client.post(url, test_data, format="json", **self.headers)
             actual_call_arg = mock_method.call_args_list[0][0][0]
             to_remove = actual_call_arg["relations_to_remove"]
             to_add = actual_call_arg["relations_to_add"]
@@ -1571,31 +1578,32 @@ class GroupViewsetTests(IdentityRequest):
         """Test that removing a role from a platform_default group flips the system flag."""
         kafka_mock = copy_call_args(send_kafka_message)
         with self.settings(NOTIFICATIONS_ENABLED=True):
-            default_role = Role.objects.create(
-                name="default_role",
-                description="A default role for a group.",
-                platform_default=True,
-                system=True,
-                tenant=self.public_tenant,
-            )
-            default_role_to_keep_in_group = Role.objects.create(
-                name="default_role_to_keep_in_group",
-                description="A default role for a group that is kept within the group.",
-                platform_default=True,
-                system=True,
-                tenant=self.public_tenant,
-            )
-            self.defGroup.policies.first().roles.add(default_role)
-            self.defGroup.policies.first().roles.add(default_role_to_keep_in_group)
+            with self.captureOnCommitCallbacks(execute=True):
+                default_role = Role.objects.create(
+                    name="default_role",
+                    description="A default role for a group.",
+                    platform_default=True,
+                    system=True,
+                    tenant=self.public_tenant,
+                )
+                default_role_to_keep_in_group = Role.objects.create(
+                    name="default_role_to_keep_in_group",
+                    description="A default role for a group that is kept within the group.",
+                    platform_default=True,
+                    system=True,
+                    tenant=self.public_tenant,
+                )
+                self.defGroup.policies.first().roles.add(default_role)
+                self.defGroup.policies.first().roles.add(default_role_to_keep_in_group)
 
-            self.assertTrue(self.defGroup.system)
+                self.assertTrue(self.defGroup.system)
 
-            org_id = self.customer_data["org_id"]
+                org_id = self.customer_data["org_id"]
 
-            url = reverse("v1_management:group-roles", kwargs={"uuid": self.defGroup.uuid})
-            client = APIClient()
-            url = "{}?roles={}".format(url, default_role.uuid)
-            response = client.delete(url, format="json", **self.headers)
+                url = reverse("v1_management:group-roles", kwargs={"uuid": self.defGroup.uuid})
+                client = APIClient()
+                url = "{}?roles={}".format(url, default_role.uuid)
+                response = client.delete(url, format="json", **self.headers)
             actual_call_arg = mock_method.call_args_list[0][0][0]
             to_remove = actual_call_arg["relations_to_remove"]
             tuple_to_replicate = actual_call_arg["relations_to_add"]
@@ -1716,22 +1724,23 @@ class GroupViewsetTests(IdentityRequest):
         """Test that removing a role from a platform_default group flips the system flag."""
         kafka_mock = copy_call_args(send_kafka_message)
         with self.settings(NOTIFICATIONS_ENABLED=True):
-            default_role = Role.objects.create(
-                name="default_role",
-                description="A default role for a group.",
-                platform_default=True,
-                system=True,
-                tenant=self.public_tenant,
-            )
-            self.defGroup.policies.first().roles.add(default_role)
-            self.assertTrue(self.defGroup.system)
+            with self.captureOnCommitCallbacks(execute=True):
+                default_role = Role.objects.create(
+                    name="default_role",
+                    description="A default role for a group.",
+                    platform_default=True,
+                    system=True,
+                    tenant=self.public_tenant,
+                )
+                self.defGroup.policies.first().roles.add(default_role)
+                self.assertTrue(self.defGroup.system)
 
-            org_id = self.customer_data["org_id"]
+                org_id = self.customer_data["org_id"]
 
-            url = reverse("v1_management:group-roles", kwargs={"uuid": self.defGroup.uuid})
-            client = APIClient()
-            url = "{}?roles={}".format(url, default_role.uuid)
-            response = client.delete(url, format="json", **self.headers)
+                url = reverse("v1_management:group-roles", kwargs={"uuid": self.defGroup.uuid})
+                client = APIClient()
+                url = "{}?roles={}".format(url, default_role.uuid)
+                response = client.delete(url, format="json", **self.headers)
             actual_call_arg = mock_method.call_args_list[0][0][0]
             to_remove = actual_call_arg["relations_to_remove"]
             tuple_to_replicate = actual_call_arg["relations_to_add"]
@@ -1870,16 +1879,17 @@ class GroupViewsetTests(IdentityRequest):
         """Test that adding multiple roles to a group returns successfully."""
         kafka_mock = copy_call_args(send_kafka_message)
         with self.settings(NOTIFICATIONS_ENABLED=True):
-            groupC = Group.objects.create(name="groupC", tenant=self.tenant)
-            url = reverse("v1_management:group-roles", kwargs={"uuid": groupC.uuid})
-            client = APIClient()
-            test_data = {"roles": [self.role.uuid, self.roleB.uuid]}
+            with self.captureOnCommitCallbacks(execute=True):
+                groupC = Group.objects.create(name="groupC", tenant=self.tenant)
+                url = reverse("v1_management:group-roles", kwargs={"uuid": groupC.uuid})
+                client = APIClient()
+                test_data = {"roles": [self.role.uuid, self.roleB.uuid]}
 
-            org_id = self.customer_data["org_id"]
+                org_id = self.customer_data["org_id"]
 
-            self.assertCountEqual([], list(groupC.roles()))
+                self.assertCountEqual([], list(groupC.roles()))
 
-            response = client.post(url, test_data, format="json", **self.headers)
+                response = client.post(url, test_data, format="json", **self.headers)
 
             self.assertCountEqual([self.role, self.roleB], list(groupC.roles()))
             self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -2050,16 +2060,17 @@ class GroupViewsetTests(IdentityRequest):
         """Test that removing multiple roles from a group returns successfully."""
         kafka_mock = copy_call_args(send_kafka_message)
         with self.settings(NOTIFICATIONS_ENABLED=True):
-            url = reverse("v1_management:group-roles", kwargs={"uuid": self.group.uuid})
-            client = APIClient()
-            url = "{}?roles={},{}".format(url, self.role.uuid, self.roleB.uuid)
+            with self.captureOnCommitCallbacks(execute=True):
+                url = reverse("v1_management:group-roles", kwargs={"uuid": self.group.uuid})
+                client = APIClient()
+                url = "{}?roles={},{}".format(url, self.role.uuid, self.roleB.uuid)
 
-            org_id = self.customer_data["org_id"]
+                org_id = self.customer_data["org_id"]
 
-            self.policy.roles.add(self.roleB)
-            self.assertCountEqual([self.role, self.roleB], list(self.group.roles()))
+                self.policy.roles.add(self.roleB)
+                self.assertCountEqual([self.role, self.roleB], list(self.group.roles()))
 
-            response = client.delete(url, format="json", **self.headers)
+                response = client.delete(url, format="json", **self.headers)
 
             self.assertCountEqual([], list(self.group.roles()))
             self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
@@ -3772,24 +3783,25 @@ class GroupPrincipalViewsetTests(GroupViewsetTests):
         """Test that adding a principal to a group returns successfully."""
         # Create a group and a cross account user.
         with self.settings(NOTIFICATIONS_ENABLED=True):
-            test_group = Group.objects.create(name="test", tenant=self.tenant)
-            cross_account_user = Principal.objects.create(
-                username="cross_account_user", cross_account=True, tenant=self.tenant
-            )
+            with self.captureOnCommitCallbacks(execute=True):
+                test_group = Group.objects.create(name="test", tenant=self.tenant)
+                cross_account_user = Principal.objects.create(
+                    username="cross_account_user", cross_account=True, tenant=self.tenant
+                )
 
-            org_id = self.customer_data["org_id"]
+                org_id = self.customer_data["org_id"]
 
-            url = reverse("v1_management:group-principals", kwargs={"uuid": test_group.uuid})
-            client = APIClient()
-            username = "test_add_user"
-            test_data = {
-                "principals": [
-                    {"username": username},
-                    {"username": cross_account_user.username},
-                ]
-            }
+                url = reverse("v1_management:group-principals", kwargs={"uuid": test_group.uuid})
+                client = APIClient()
+                username = "test_add_user"
+                test_data = {
+                    "principals": [
+                        {"username": username},
+                        {"username": cross_account_user.username},
+                    ]
+                }
 
-            response = client.post(url, test_data, format="json", **self.headers)
+                response = client.post(url, test_data, format="json", **self.headers)
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             principal = Principal.objects.get(username=username)
 
@@ -3999,16 +4011,17 @@ class GroupPrincipalViewsetTests(GroupViewsetTests):
         """Test that removing a principal from a group returns successfully."""
         self.maxDiff = None
         with self.settings(NOTIFICATIONS_ENABLED=True):
-            test_user = Principal.objects.create(username="test_user", tenant=self.tenant, user_id="123798")
-            self.group.principals.add(test_user)
+            with self.captureOnCommitCallbacks(execute=True):
+                test_user = Principal.objects.create(username="test_user", tenant=self.tenant, user_id="123798")
+                self.group.principals.add(test_user)
 
-            url = reverse("v1_management:group-principals", kwargs={"uuid": self.group.uuid})
-            client = APIClient()
+                url = reverse("v1_management:group-principals", kwargs={"uuid": self.group.uuid})
+                client = APIClient()
 
-            org_id = self.customer_data["org_id"]
+                org_id = self.customer_data["org_id"]
 
-            url = f"{url}?usernames={test_user.username}"
-            response = client.delete(url, format="json", **self.headers)
+                url = f"{url}?usernames={test_user.username}"
+                response = client.delete(url, format="json", **self.headers)
             self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
             # test whether correctly added to audit logs
@@ -5714,7 +5727,7 @@ class GroupViewNonAdminTests(IdentityRequest):
 
     @override_settings(IT_BYPASS_TOKEN_VALIDATION=True)
     @patch("management.relation_replicator.outbox_replicator.OutboxReplicator._save_replication_event")
-    @patch("management.principal.it_service.requests.get")
+    @patch("management.principal.it_service.IT_CLIENT.get")
     def test_add_service_account_principal_in_group_with_User_Access_Admin_success(self, mock_request, mock_method):
         """
         Test that non org admin with 'User Access administrator' role can add
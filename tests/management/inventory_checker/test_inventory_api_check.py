@@ -0,0 +1,149 @@
+#
+# Copyright 2025 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Test the inventory api checkers."""
+from unittest.mock import MagicMock, patch
+
+import grpc
+from django.test import TestCase, override_settings
+from google.rpc import status_pb2
+from kessel.inventory.v1beta2 import (
+    allowed_pb2,
+    check_bulk_response_pb2,
+    check_response_pb2,
+    resource_reference_pb2,
+    subject_reference_pb2,
+)
+from kessel.inventory.v1beta2.check_request_pb2 import CheckRequest
+from management.inventory_checker.inventory_api_check import GroupPrincipalInventoryChecker, InventoryApiBaseChecker
+from migration_tool.utils import create_relationship
+
+
+class UnimplementedError(grpc.RpcError):
+    """A CheckBulk error from a server which does not implement it."""
+
+    def code(self):
+        """Return the status code."""
+        return grpc.StatusCode.UNIMPLEMENTED
+
+
+def bulk_response(request, metadata=None):
+    """Allow every principal except the ones named "missing"."""
+    pairs = []
+    for item in request.items:
+        if item.subject.resource.resource_id == "error":
+            pairs.append(check_bulk_response_pb2.CheckBulkResponsePair(request=item, error=status_pb2.Status(code=13)))
+            continue
+        allowed = (
+            allowed_pb2.Allowed.ALLOWED_FALSE
+            if item.subject.resource.resource_id.startswith("missing")
+            else allowed_pb2.Allowed.ALLOWED_TRUE
+        )
+        pairs.append(
+            check_bulk_response_pb2.CheckBulkResponsePair(
+                request=item, item=check_bulk_response_pb2.CheckBulkResponseItem(allowed=allowed)
+            )
+        )
+    return check_bulk_response_pb2.CheckBulkResponse(pairs=pairs)
+
+
+@override_settings(INVENTORY_CHECK_BATCH_SIZE=10, INVENTORY_CHECK_CONCURRENCY=4)
+@patch("management.inventory_checker.inventory_api_check.jwt_manager.get_jwt_from_redis", return_value="token")
+class InventoryApiCheckerTest(TestCase):
+    """Test the inventory api checkers."""
+
+    def relationships(self, principals):
+        """Build the group principal relationships to check."""
+        return [
+            create_relationship(("rbac", "group"), "group-uuid", ("rbac", "principal"), principal, "member")
+            for principal in principals
+        ]
+
+    def stub(self, **kwargs):
+        """Patch the inventory api stub."""
+        stub = MagicMock(**kwargs)
+        patcher = patch(
+            "management.inventory_checker.inventory_api_check.inventory_service_pb2_grpc.KesselInventoryServiceStub",
+            return_value=stub,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return stub
+
+    def test_group_principals_are_checked_in_batches(self, _):
+        """Test the checks are batched, and the results reported in the order of the relationships."""
+        stub = self.stub(**{"CheckBulk.side_effect": bulk_response})
+        principals = [f"missing-{n}" if n % 7 == 0 else f"principal-{n}" for n in range(25)]
+
+        report = GroupPrincipalInventoryChecker().check_relationships(self.relationships(principals))
+
+        self.assertEqual(stub.CheckBulk.call_count, 3)
+        stub.Check.assert_not_called()
+        self.assertEqual(report["group_uuid"], "group-uuid")
+        self.assertEqual(
+            report["principal_relations"],
+            [{"id": principal, "relation_exists": not principal.startswith("missing")} for principal in principals],
+        )
+
+    def test_failed_checks_are_reported_missing(self, _):
+        """Test a check which failed on the server does not count as an existing relation."""
+        self.stub(**{"CheckBulk.side_effect": bulk_response})
+
+        report = GroupPrincipalInventoryChecker().check_relationships(self.relationships(["principal", "error"]))
+
+        self.assertEqual(
+            report["principal_relations"],
+            [{"id": "principal", "relation_exists": True}, {"id": "error", "relation_exists": False}],
+        )
+
+    def test_falls_back_to_check(self, _):
+        """Test the checks are sent one by one to servers without CheckBulk."""
+        stub = self.stub(**{"CheckBulk.side_effect": UnimplementedError()})
+        stub.Check.side_effect = lambda request, metadata=None: check_response_pb2.CheckResponse(
+            allowed=(
+                allowed_pb2.Allowed.ALLOWED_FALSE
+                if request.subject.resource.resource_id == "missing"
+                else allowed_pb2.Allowed.ALLOWED_TRUE
+            )
+        )
+
+        report = GroupPrincipalInventoryChecker().check_relationships(self.relationships(["principal", "missing"]))
+
+        self.assertEqual(stub.Check.call_count, 2)
+        self.assertEqual(
+            report["principal_relations"],
+            [{"id": "principal", "relation_exists": True}, {"id": "missing", "relation_exists": False}],
+        )
+
+    def test_check_inventory_core_checks_every_request(self, mock_token):
+        """Test a list of checks is only allowed when every check is, with a single token lookup each."""
+        self.stub(**{"CheckBulk.side_effect": bulk_response})
+        checks = [
+            CheckRequest(
+                object=resource_reference_pb2.ResourceReference(resource_id="group-uuid", resource_type="group"),
+                relation="member",
+                subject=subject_reference_pb2.SubjectReference(
+                    resource=resource_reference_pb2.ResourceReference(resource_id=principal, resource_type="principal")
+                ),
+            )
+            for principal in ("principal", "other", "missing")
+        ]
+        checker = InventoryApiBaseChecker()
+
+        self.assertTrue(checker.check_inventory_core(checks[0]))
+        self.assertTrue(checker.check_inventory_core(checks[:2]))
+        self.assertFalse(checker.check_inventory_core(checks))
+        self.assertEqual(mock_token.call_count, 3)
@@ -306,9 +306,9 @@ a210f23c-f2d2-40c6-b47c-43fa1bgg814a,0dffe7e11-c56e-4fcb-b7a6-66db2e013983
         self.assertEqual(
             mock_cwr.call_args[0][0],
             [
-                (workspace_id_1, str(defaults[0].id)),
-                (workspace_id_2, str(defaults[1].id)),
-                (workspace_id_3, str(default_ws_3.id)),
+                (workspace_id_1, str(defaults[0].id), org_id_1),
+                (workspace_id_2, str(defaults[1].id), org_id_2),
+                (workspace_id_3, str(default_ws_3.id), org_id_3),
             ],
         )
         self.assertEqual(Workspace.objects.filter(id__in=[workspace_id_1, workspace_id_2, workspace_id_3]).count(), 3)
@@ -331,9 +331,9 @@ a210f23c-f2d2-40c6-b47c-43fa1bgg814a,0dffe7e11-c56e-4fcb-b7a6-66db2e013983
         self.assertEqual(
             mock_cwr.call_args[0][0],
             [
-                (workspace_id_1, str(defaults[0].id)),
-                (workspace_id_2, str(defaults[1].id)),
-                (workspace_id_3, str(default_ws_3.id)),
+                (workspace_id_1, str(defaults[0].id), org_id_1),
+                (workspace_id_2, str(defaults[1].id), org_id_2),
+                (workspace_id_3, str(default_ws_3.id), org_id_3),
             ],
         )
         updated_ws_1 = Workspace.objects.get(id=workspace_id_1)
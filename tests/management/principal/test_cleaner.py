@@ -29,7 +29,7 @@ from rest_framework import status
 from management.group.definer import seed_group
 from management.group.model import Group
 from management.policy.model import Policy
-from management.principal.cleaner import LOCK_ID, clean_tenant_principals
+from management.principal.cleaner import LOCK_ID, clean_tenant_principals, clean_tenants_principals
 from management.principal.model import Principal
 from management.principal.cleaner import (
     process_principal_events_from_umb,
@@ -40,6 +40,7 @@ from management.principal.proxy import external_principal_to_user
 from management.relation_replicator.relation_replicator import PartitionKey, ReplicationEvent, ReplicationEventType
 from management.tenant_mapping.model import TenantMapping
 from management.tenant_service import get_tenant_bootstrap_service
+from management.tenant_service.v2 import V2TenantBootstrapService
 from management.workspace.model import Workspace
 from api.models import Tenant, User
 from migration_tool.in_memory_tuples import (
@@ -176,6 +177,75 @@ class PrincipalCleanerTests(IdentityRequest):
             self.fail(msg="clean_tenant_principals encountered an exception")
         self.assertEqual(Principal.objects.count(), 1)
 
+    @override_settings(PRINCIPAL_CLEANUP_BATCH_SIZE=2)
+    @patch("management.principal.proxy.PrincipalProxy._request_principals")
+    def test_principal_cleanup_in_batches(self, mock_request):
+        """Test the principals are checked against BOP in batches, and only the missing ones removed."""
+        for username in ("user1", "user2", "user3", "user4", "user5"):
+            Principal.objects.create(username=username, tenant=self.tenant)
+        # BOP may return the usernames with another case
+        mock_request.side_effect = lambda *args, **kwargs: {
+            "status_code": status.HTTP_200_OK,
+            "data": [{"username": username.upper()} for username in kwargs["data"]["users"] if username != "user2"],
+        }
+
+        clean_tenant_principals(self.tenant)
+
+        self.assertEqual(mock_request.call_count, 3)
+        self.assertEqual(
+            [call.kwargs["data"]["users"] for call in mock_request.call_args_list],
+            [["user1", "user2"], ["user3", "user4"], ["user5"]],
+        )
+        self.assertEqual(
+            sorted(Principal.objects.values_list("username", flat=True)), ["user1", "user3", "user4", "user5"]
+        )
+
+    @override_settings(REPLICATION_TO_RELATION_ENABLED=True)
+    @patch("management.principal.cleaner.OutboxReplicator")
+    @patch(
+        "management.principal.proxy.PrincipalProxy._request_principals",
+        return_value={"status_code": status.HTTP_200_OK, "data": []},
+    )
+    def test_principal_cleanup_replicates_memberships_once(self, mock_request, replicator):
+        """Test the group memberships of the removed principals are replicated as a single event."""
+        principals = [
+            Principal.objects.create(username=f"user{n}", user_id=f"100{n}", tenant=self.tenant) for n in range(3)
+        ]
+        self.group.principals.add(*principals)
+
+        with patch("management.principal.cleaner.INVALIDATION_COLLECTOR") as collector:
+            clean_tenant_principals(self.tenant)
+
+        self.assertEqual(Principal.objects.count(), 0)
+        replicator().replicate.assert_called_once()
+        event = replicator().replicate.call_args.args[0]
+        self.assertEqual(event.event_type, ReplicationEventType.BULK_PRINCIPAL_CLEANUP)
+        self.assertCountEqual(
+            [(r.resource.id, r.subject.subject.id) for r in event.remove],
+            [(str(self.group.uuid), Principal.user_id_to_principal_resource_id(f"100{n}")) for n in range(3)],
+        )
+        collector.add_principals.assert_called_once_with(
+            self.tenant.org_id, [principal.uuid for principal in principals]
+        )
+
+    @override_settings(PRINCIPAL_CLEANUP_CONCURRENCY=1)
+    @patch("management.principal.cleaner.clean_tenant_principals")
+    @patch("management.principal.cleaner.CHECKPOINTS")
+    def test_principal_cleanup_resumes_from_checkpoint(self, checkpoints, clean):
+        """Test the clean up skips the tenants done before it was interrupted, and saves its progress."""
+        tenants = [
+            Tenant.objects.create(tenant_name=f"acct-cleanup-{n}", org_id=f"cleanup-{n}", ready=True) for n in range(3)
+        ]
+        checkpoints.get_checkpoint.return_value = tenants[0].id
+        clean.side_effect = [None, Exception("BOP is down")]
+
+        clean_tenants_principals()
+
+        self.assertEqual([call.args[0] for call in clean.call_args_list], tenants[1:])
+        # A failed tenant does not stop the job
+        checkpoints.save_checkpoint.assert_called_with("principal_cleanup", tenants[2].id)
+        checkpoints.delete_checkpoint.assert_called_once_with("principal_cleanup")
+
 
 FRAME_BODY = (
     b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<CanonicalMessage xmlns="http://esb.redhat.com/Canonical/6">\n    '
@@ -329,22 +399,23 @@ class PrincipalUMBTests(IdentityRequest):
             "data": [],
         },
     )
-    @patch("management.group.model.AccessCache")
+    @patch("management.cache.AccessCache.delete_policies")
     @patch("management.principal.cleaner.UMB_CLIENT")
-    def test_cleanup_principal_in_or_not_in_group(self, client_mock, cache_class, proxy_mock):
+    def test_cleanup_principal_in_or_not_in_group(self, client_mock, delete_policies, proxy_mock):
         """Test that we can run a principal clean up on a tenant with a principal in a group."""
         principal_name = "principal-test"
         self.principal = Principal(username=principal_name, tenant=self.tenant, user_id="56780000")
         self.principal.save()
-        self.group.principals.add(self.principal)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.principals.add(self.principal)
         self.group.save()
 
         before = REGISTRY.get_sample_value(METRIC_STOMP_MESSAGES_ACK_TOTAL)
         client_mock.canRead.side_effect = [True, False]
         client_mock.receiveFrame.return_value = MagicMock(body=FRAME_BODY)
-        cache_mock = MagicMock()
-        cache_class.return_value = cache_mock
-        process_principal_events_from_umb()
+        delete_policies.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            process_principal_events_from_umb()
 
         after = REGISTRY.get_sample_value(METRIC_STOMP_MESSAGES_ACK_TOTAL)
         client_mock.receiveFrame.assert_called_once()
@@ -353,7 +424,7 @@ class PrincipalUMBTests(IdentityRequest):
         self.assertFalse(Principal.objects.filter(username=principal_name).exists())
         self.group.refresh_from_db()
         self.assertFalse(self.group.principals.all())
-        cache_mock.delete_policy.assert_called_once_with(self.principal.uuid)
+        delete_policies.assert_called_once_with({self.principal.uuid})
         self.assertTrue(before + 1 == after)
 
         # When principal not in group
@@ -952,14 +1023,15 @@ class PrincipalUMBTestsWithV2TenantBootstrap(PrincipalUMBTests):
             "data": [],
         },
     )
-    @patch("management.group.model.AccessCache")
+    @patch("management.cache.AccessCache.delete_policies")
     @patch("management.principal.cleaner.UMB_CLIENT")
     @patch("management.relation_replicator.outbox_replicator.OutboxReplicator.replicate")
-    def test_disable_principal_which_is_in_or_not_in_group(self, replicate, client_mock, cache_class, proxy_mock):
+    def test_disable_principal_which_is_in_or_not_in_group(self, replicate, client_mock, delete_policies, proxy_mock):
         """Process a umb message to disable a principal which is either in or not in a group."""
         principal_name = "principal-test"
         self.principal = Principal.objects.create(username=principal_name, tenant=self.tenant, user_id="56780000")
-        self.group.principals.add(self.principal)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.principals.add(self.principal)
         self.group.save()
         custom_group_uuid = str(self.group.uuid)
         replicator = InMemoryRelationReplicator(self._tuples)
@@ -988,11 +1060,11 @@ class PrincipalUMBTestsWithV2TenantBootstrap(PrincipalUMBTests):
         before = REGISTRY.get_sample_value(METRIC_STOMP_MESSAGES_ACK_TOTAL)
         client_mock.canRead.side_effect = [True, False]
         client_mock.receiveFrame.return_value = MagicMock(body=FRAME_BODY)
-        cache_mock = MagicMock()
-        cache_class.return_value = cache_mock
+        delete_policies.reset_mock()
         self.assert_user_memberships(mapping, self.principal.user_id, custom_group_uuid, 1)
         replicate.side_effect = replicator.replicate
-        process_principal_events_from_umb()
+        with self.captureOnCommitCallbacks(execute=True):
+            process_principal_events_from_umb()
 
         after = REGISTRY.get_sample_value(METRIC_STOMP_MESSAGES_ACK_TOTAL)
         client_mock.receiveFrame.assert_called_once()
@@ -1001,7 +1073,7 @@ class PrincipalUMBTestsWithV2TenantBootstrap(PrincipalUMBTests):
         self.assertFalse(Principal.objects.filter(username=principal_name).exists())
         self.group.refresh_from_db()
         self.assertFalse(self.group.principals.all())
-        cache_mock.delete_policy.assert_called_once_with(self.principal.uuid)
+        delete_policies.assert_called_once_with({self.principal.uuid})
         self.assertTrue(before + 1 == after)
         replicate.assert_called_once()
         replication_event = replicate.call_args_list[0].args[0]
@@ -1035,22 +1107,23 @@ class PrincipalUMBTestsWithV2TenantBootstrap(PrincipalUMBTests):
             "data": [],
         },
     )
-    @patch("management.group.model.AccessCache")
+    @patch("management.cache.AccessCache.delete_policies")
     @patch("management.principal.cleaner.UMB_CLIENT")
-    def test_disable_principal_without_user_id_in_group(self, client_mock, cache_class, proxy_mock):
+    def test_disable_principal_without_user_id_in_group(self, client_mock, delete_policies, proxy_mock):
         """Process a umb message to disable a principal which does not have user id."""
         principal_name = "principal-test"
         principal = Principal.objects.create(username=principal_name, tenant=self.tenant)
         principal.save()
-        self.group.principals.add(principal)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.principals.add(principal)
         self.group.save()
 
         before = REGISTRY.get_sample_value(METRIC_STOMP_MESSAGES_ACK_TOTAL)
         client_mock.canRead.side_effect = [True, False]
         client_mock.receiveFrame.return_value = MagicMock(body=FRAME_BODY)
-        cache_mock = MagicMock()
-        cache_class.return_value = cache_mock
-        process_principal_events_from_umb()
+        delete_policies.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            process_principal_events_from_umb()
 
         after = REGISTRY.get_sample_value(METRIC_STOMP_MESSAGES_ACK_TOTAL)
         client_mock.receiveFrame.assert_called_once()
@@ -1059,7 +1132,7 @@ class PrincipalUMBTestsWithV2TenantBootstrap(PrincipalUMBTests):
         self.assertFalse(Principal.objects.filter(username=principal_name).exists())
         self.group.refresh_from_db()
         self.assertFalse(self.group.principals.all())
-        cache_mock.delete_policy.assert_called_once_with(principal.uuid)
+        delete_policies.assert_called_once_with({principal.uuid})
         self.assertTrue(before + 1 == after)
 
     @patch("management.principal.cleaner.retrieve_user_info")
@@ -1138,3 +1211,138 @@ class PrincipalUMBTestsWithV1TenantBootstrap(IdentityRequest):
         client_mock.ack.assert_called_once()
         self.assertFalse(Tenant.objects.filter(org_id="17685860").exists())
         self.assertFalse(Principal.objects.filter(user_id=self.principal_user_id).exists())
+
+
+@override_settings(UMB_BATCH_SIZE=10, PRINCIPAL_CLEANUP_UPDATE_ENABLED_UMB=True)
+class PrincipalUMBBatchTests(IdentityRequest):
+    """Test processing the UMB frames in batches."""
+
+    def setUp(self):
+        """Set up the batch tests."""
+        super().setUp()
+        self.bootstrap_service = MagicMock(spec=V2TenantBootstrapService)
+        self.users = [
+            User(username="a", org_id="1", user_id="11"),
+            User(username="b", org_id="2", user_id="22"),
+            User(username="c", org_id="1", user_id="33", is_active=False),
+            User(username="d", org_id="2", user_id="44"),
+        ]
+        self.frames = [MagicMock(body=FRAME_BODY) for _ in self.users]
+
+    def mock_client(self, client_mock):
+        """Deliver the frames in a single batch."""
+        client_mock.canRead.side_effect = [True] * len(self.frames) + [False, False]
+        client_mock.receiveFrame.side_effect = self.frames
+
+    @patch("management.principal.cleaner.retrieve_user_info")
+    @patch("management.principal.cleaner.UMB_CLIENT")
+    def test_active_users_are_imported_in_bulk(self, client_mock, retrieve_user_info):
+        """Test active users are imported in bulk, keeping the order of the frames within each org."""
+        self.mock_client(client_mock)
+        retrieve_user_info.side_effect = self.users
+        self.bootstrap_service.update_user.side_effect = lambda *args, **kwargs: client_mock.ack.assert_not_called()
+        before = REGISTRY.get_sample_value(METRIC_STOMP_MESSAGES_ACK_TOTAL)
+
+        process_principal_events_from_umb(self.bootstrap_service)
+
+        a, b, c, d = self.users
+        self.assertEqual(
+            [(name, args) for name, args, _ in self.bootstrap_service.mock_calls],
+            [("import_bulk_users", ([a, b],)), ("update_user", (c,)), ("import_bulk_users", ([d],))],
+        )
+        self.assertEqual([call.args[0] for call in client_mock.ack.call_args_list], self.frames)
+        client_mock.nack.assert_not_called()
+        self.assertEqual(REGISTRY.get_sample_value(METRIC_STOMP_MESSAGES_ACK_TOTAL), before + 4)
+
+    @override_settings(PRINCIPAL_CLEANUP_UPDATE_ENABLED_UMB=False)
+    @patch("management.principal.cleaner.retrieve_user_info")
+    @patch("management.principal.cleaner.UMB_CLIENT")
+    def test_only_inactive_users_are_updated_by_default(self, client_mock, retrieve_user_info):
+        """Test active users are skipped unless updates are enabled."""
+        self.mock_client(client_mock)
+        retrieve_user_info.side_effect = self.users
+
+        process_principal_events_from_umb(self.bootstrap_service)
+
+        self.bootstrap_service.import_bulk_users.assert_not_called()
+        self.bootstrap_service.update_user.assert_called_once_with(self.users[2], ready_tenant=False)
+        self.assertEqual(client_mock.ack.call_count, 4)
+
+    @patch("management.principal.cleaner.retrieve_user_info")
+    @patch("management.principal.cleaner.UMB_CLIENT")
+    def test_bulk_imported_tenants_keep_their_account(self, client_mock, retrieve_user_info):
+        """Test the tenants created by a bulk import are given the account of their users."""
+        Group.objects.create(name="default", platform_default=True, tenant=Tenant.objects.get(tenant_name="public"))
+        self.users = [
+            User(username="a", org_id="1001", user_id="11"),
+            User(username="b", org_id="1001", user_id="22", account="10001"),
+            User(username="c", org_id="1002", user_id="33", account="10002"),
+        ]
+        self.frames = [MagicMock(body=FRAME_BODY) for _ in self.users]
+        self.mock_client(client_mock)
+        retrieve_user_info.side_effect = self.users
+
+        process_principal_events_from_umb(V2TenantBootstrapService(InMemoryRelationReplicator(InMemoryTuples())))
+
+        self.assertEqual(Tenant.objects.get(org_id="1001").account_id, "10001")
+        self.assertEqual(Tenant.objects.get(org_id="1002").account_id, "10002")
+        self.assertEqual(client_mock.ack.call_count, 3)
+
+    @patch("management.principal.cleaner.retrieve_user_info")
+    @patch("management.principal.cleaner.UMB_CLIENT")
+    def test_failed_batch_is_processed_frame_by_frame(self, client_mock, retrieve_user_info):
+        """Test a failed batch is retried one frame at a time, and only the failing frames are nacked."""
+        self.mock_client(client_mock)
+        users = {frame: user for frame, user in zip(self.frames, self.users)}
+        users[self.frames[3]] = ValueError("User id not found in message.")
+        # The batch parses each frame, then the fallback parses the frames parsed by the batch once more.
+        retrieve_user_info.side_effect = list(users.values()) + self.users[:3]
+        self.bootstrap_service.import_bulk_users.side_effect = Exception("Bulk import failed")
+
+        def update_user(user, **kwargs):
+            if user.username == "b":
+                raise Exception("Update failed")
+
+        self.bootstrap_service.update_user.side_effect = update_user
+
+        process_principal_events_from_umb(self.bootstrap_service)
+
+        self.assertEqual([call.args[0] for call in client_mock.ack.call_args_list], [self.frames[0], self.frames[2]])
+        self.assertCountEqual(
+            [call.args[0] for call in client_mock.nack.call_args_list], [self.frames[1], self.frames[3]]
+        )
+
+    @patch("management.principal.cleaner.retrieve_user_info")
+    @patch("management.principal.cleaner.UMB_CLIENT")
+    def test_batch_is_not_processed_without_lock(self, client_mock, retrieve_user_info):
+        """Test the frames are neither processed nor acked while another listener is running."""
+        self.mock_client(client_mock)
+        with patch("management.principal.cleaner._lock_listener", return_value=False):
+            process_principal_events_from_umb(self.bootstrap_service)
+
+        retrieve_user_info.assert_not_called()
+        client_mock.ack.assert_not_called()
+        client_mock.nack.assert_not_called()
+        client_mock.disconnect.assert_called_once()
+
+    @override_settings(V2_BOOTSTRAP_TENANT=True)
+    @patch(
+        "management.principal.proxy.PrincipalProxy.request_filtered_principals",
+        return_value={"status_code": 200, "data": []},
+    )
+    @patch("management.principal.cleaner.UMB_CLIENT")
+    def test_deleted_user_is_removed(self, client_mock, proxy_mock):
+        """Test a deleted user is removed by a batch, along with its memberships."""
+        self.tenant.org_id = "17685860"
+        self.tenant.save()
+        principal = Principal.objects.create(username="principal-test", tenant=self.tenant, user_id="56780000")
+        group = Group.objects.create(name="groupA", tenant=self.tenant)
+        group.principals.add(principal)
+        self.frames = self.frames[:2]
+        self.mock_client(client_mock)
+
+        process_principal_events_from_umb()
+
+        self.assertFalse(Principal.objects.filter(username="principal-test").exists())
+        self.assertFalse(group.principals.exists())
+        self.assertEqual(client_mock.ack.call_count, 2)
@@ -302,7 +302,7 @@ class ITServiceTests(IdentityRequest):
                 "the time created and created at fields for the RBAC and IT models do not match",
             )
 
-    @mock.patch("management.principal.it_service.requests.get")
+    @mock.patch("management.principal.it_service.IT_CLIENT.get")
     def test_request_service_accounts_single_page(self, get: mock.Mock):
         """Test that the function under test can handle fetching a single page of service accounts from IT"""
         # Create the mocked response from IT.
@@ -344,7 +344,7 @@ class ITServiceTests(IdentityRequest):
             it_service_accounts=mocked_service_accounts, rbac_service_accounts=result
         )
 
-    @mock.patch("management.principal.it_service.requests.get")
+    @mock.patch("management.principal.it_service.IT_CLIENT.get")
     def test_request_service_accounts_multiple_pages(self, get: mock.Mock):
         """Test that the function under test can handle fetching multiple pages from IT"""
         # Create the mocked response from IT.
@@ -431,7 +431,7 @@ class ITServiceTests(IdentityRequest):
             it_service_accounts=mocked_service_accounts, rbac_service_accounts=result
         )
 
-    @mock.patch("management.principal.it_service.requests.get")
+    @mock.patch("management.principal.it_service.IT_CLIENT.get")
     def test_request_service_accounts_unexpected_status_code(self, get: mock.Mock):
         """Test that the function under test raises an exception when an unexpected status code is received from IT"""
         get.__name__ = "get"
@@ -471,7 +471,7 @@ class ITServiceTests(IdentityRequest):
             timeout=settings.IT_SERVICE_TIMEOUT_SECONDS,
         )
 
-    @mock.patch("management.principal.it_service.requests.get")
+    @mock.patch("management.principal.it_service.IT_CLIENT.get")
     def test_request_service_accounts_connection_error(self, get: mock.Mock):
         """Test that the function under test raises an exception a connection error happens when connecting to IT"""
         get.__name__ = "get"
@@ -510,7 +510,7 @@ class ITServiceTests(IdentityRequest):
             timeout=settings.IT_SERVICE_TIMEOUT_SECONDS,
         )
 
-    @mock.patch("management.principal.it_service.requests.get")
+    @mock.patch("management.principal.it_service.IT_CLIENT.get")
     def test_request_service_accounts_timeout(self, get: mock.Mock):
         """Test that the function under test raises an exception a connection error happens when connecting to IT"""
         get.__name__ = "get"
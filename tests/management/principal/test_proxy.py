@@ -15,15 +15,18 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Test the principal proxy."""
+import time
+from threading import Event, Thread
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework import status
 import requests
 
 from api.models import Tenant
 from management.principal.model import Principal
-from management.principal.proxy import PrincipalProxy
+from management.cache import LocalCacheInvalidator, RedisCircuitBreaker
+from management.principal.proxy import PRINCIPAL_LOOKUP_CACHE, PrincipalProxy
 
 
 class MockResponse:  # pylint: disable=too-few-public-methods
@@ -258,3 +261,139 @@ class PrincipalProxyTest(TestCase):
         usernames.sort()
         expected = ["user1", "user2"]
         self.assertEqual(usernames, expected)
+
+
+USER = {
+    "username": "test_user",
+    "email": "test_user@example.com",
+    "first_name": "test",
+    "last_name": "user",
+    "is_active": True,
+    "is_org_admin": False,
+    "external_source_id": "1234",
+    "org_id": "1234",
+    "user_id": "1234",
+}
+
+
+@override_settings(LOCAL_CACHE_ENABLED=True)
+@patch("management.cache.PrincipalLookupCache.connection")
+@patch("management.cache.REDIS_CIRCUIT_BREAKER", new_callable=lambda: RedisCircuitBreaker(3, 10))
+class PrincipalLookupCacheTest(TestCase):
+    """Test the caching of the BOP lookups of single users."""
+
+    def setUp(self):
+        """Give every test its own local tiers, without the pub/sub listener thread."""
+        super().setUp()
+        for patcher in (
+            patch("management.cache.LOCAL_CACHE_INVALIDATOR", new=LocalCacheInvalidator()),
+            patch("management.cache.threading.Thread"),
+            patch("management.cache.Redis"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.proxy = PrincipalProxy()
+
+    @patch("management.principal.proxy.PrincipalProxy._request_principals")
+    def test_lookups_are_cached(self, request_principals, *_):
+        """Test a user is looked up once, and returned with or without its user id as asked."""
+        request_principals.return_value = {"status_code": status.HTTP_200_OK, "data": [dict(USER)]}
+
+        first = self.proxy.request_filtered_principals(["test_user"], org_id="1234", options={"return_id": True})
+        second = self.proxy.request_filtered_principals(["test_user"], org_id="1234")
+
+        request_principals.assert_called_once()
+        self.assertTrue(request_principals.call_args.kwargs["return_id"])
+        self.assertEqual(first, {"status_code": status.HTTP_200_OK, "data": [USER]})
+        self.assertNotIn("user_id", second["data"][0])
+
+        # Lookups with other parameters, or of many users, are separate
+        self.proxy.request_filtered_principals(["test_user"], org_id="1234", options={"status": "all"})
+        self.proxy.request_filtered_principals(["test_user", "other"], org_id="1234")
+        self.assertEqual(request_principals.call_count, 3)
+
+    @patch("management.principal.proxy.PrincipalProxy._request_principals")
+    def test_missing_users_are_cached(self, request_principals, *_):
+        """Test a user BOP does not know is cached, and bypassing the cache still asks BOP."""
+        request_principals.return_value = {"status_code": status.HTTP_200_OK, "data": []}
+
+        for _ in range(2):
+            resp = self.proxy.request_filtered_principals(["missing"], org_id="1234")
+            self.assertEqual(resp, {"status_code": status.HTTP_200_OK, "data": []})
+        request_principals.assert_called_once()
+
+        self.proxy.request_filtered_principals(["missing"], org_id="1234", bypass_cache=True)
+        self.assertEqual(request_principals.call_count, 2)
+
+        PRINCIPAL_LOOKUP_CACHE.delete_users("1234", "missing")
+        self.proxy.request_filtered_principals(["missing"], org_id="1234")
+        self.assertEqual(request_principals.call_count, 3)
+
+    @patch("management.principal.proxy.PrincipalProxy._request_principals")
+    def test_usernames_are_case_insensitive(self, request_principals, *_):
+        """Test lookups and purges of a username share the entries whatever its case."""
+        request_principals.return_value = {"status_code": status.HTTP_200_OK, "data": [dict(USER)]}
+
+        self.proxy.request_filtered_principals(["Test_User"], org_id="1234")
+        self.proxy.request_filtered_principals(["test_user"], org_id="1234")
+        request_principals.assert_called_once()
+
+        PRINCIPAL_LOOKUP_CACHE.delete_users("1234", "TEST_USER")
+        self.proxy.request_filtered_principals(["test_user"], org_id="1234")
+        self.assertEqual(request_principals.call_count, 2)
+
+    @override_settings(PRINCIPAL_LOOKUP_NEGATIVE_LIFETIME=-1)
+    @patch("management.principal.proxy.PrincipalProxy._request_principals")
+    def test_expired_lookups_are_misses(self, request_principals, *_):
+        """Test entries are not served past their own lifetime."""
+        request_principals.return_value = {"status_code": status.HTTP_200_OK, "data": []}
+        self.proxy.request_filtered_principals(["missing"], org_id="1234")
+        self.proxy.request_filtered_principals(["missing"], org_id="1234")
+        self.assertEqual(request_principals.call_count, 2)
+
+    @patch("management.principal.proxy.PrincipalProxy._request_principals")
+    def test_errors_are_not_cached(self, request_principals, *_):
+        """Test failed lookups are returned as is, and retried."""
+        error = {"status_code": status.HTTP_500_INTERNAL_SERVER_ERROR, "errors": [{"detail": "Unexpected error."}]}
+        request_principals.return_value = error
+        for _ in range(2):
+            self.assertEqual(self.proxy.request_filtered_principals(["test_user"], org_id="1234"), error)
+        self.assertEqual(request_principals.call_count, 2)
+
+    @patch("management.principal.proxy.PrincipalProxy._request_principals")
+    def test_concurrent_misses_are_coalesced(self, request_principals, *_):
+        """Test concurrent lookups of the same user share a single request to BOP."""
+        started = Event()
+        release = Event()
+
+        def slow_lookup(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return {"status_code": status.HTTP_200_OK, "data": [dict(USER)]}
+
+        request_principals.side_effect = slow_lookup
+        results = []
+        leader = Thread(
+            target=lambda: results.append(self.proxy.request_filtered_principals(["test_user"], org_id="1234"))
+        )
+        leader.start()
+        started.wait(5)
+        # Keep the followers from reading the entry the leader is about to cache.
+        with patch("management.cache.PrincipalLookupCache.get_users", return_value=None):
+            followers = [
+                Thread(
+                    target=lambda: results.append(self.proxy.request_filtered_principals(["test_user"], org_id="1234"))
+                )
+                for _ in range(3)
+            ]
+            for follower in followers:
+                follower.start()
+            # Give the followers the time to join the lookup in flight.
+            time.sleep(0.2)
+            release.set()
+            for thread in [leader, *followers]:
+                thread.join(5)
+
+        request_principals.assert_called_once()
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result["data"][0]["username"] == "test_user" for result in results))
@@ -16,12 +16,35 @@
 #
 """Test OutboxReplicator."""
 
+import json
 import logging
+import os
+import struct
+import uuid
 
-from django.test import TestCase, override_settings
+from django.conf import settings
+from django.db import connection, IntegrityError, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
 from google.protobuf import json_format
-from management.relation_replicator.outbox_replicator import InMemoryLog, OutboxReplicator, OutboxWAL
-from management.relation_replicator.relation_replicator import PartitionKey, ReplicationEvent, ReplicationEventType
+from kessel.relations.v1beta1.common_pb2 import ObjectReference, ObjectType, Relationship, SubjectReference
+from management.relation_replicator.outbox_replicator import (
+    InMemoryLog,
+    merge_events,
+    OUTBOX_BUFFER,
+    OUTBOX_LOGS,
+    OutboxLogicalMessage,
+    OutboxReplicator,
+    OutboxWAL,
+    relationship_to_dict,
+)
+from management.relation_replicator.relation_replicator import (
+    DualWriteException,
+    PARTITION_AUDIT,
+    PartitionKey,
+    relationship_delta,
+    ReplicationEvent,
+    ReplicationEventType,
+)
 from migration_tool.utils import create_relationship
 from prometheus_client import REGISTRY
 
@@ -96,6 +119,7 @@ class OutboxReplicatorTest(TestCase):
             },
         )
         self.assertEqual(logged_event.aggregatetype, "relations-replication-event")
+        self.assertEqual(logged_event.route, "relations-replication-event")
 
     def test_replicate_empty_event_warns_instead_of_saving(self):
         """Test replicate with empty event warns."""
@@ -186,6 +210,100 @@ class OutboxReplicatorTest(TestCase):
         self.replicator.replicate(event)
         self.assertEqual(len(self.log), 1)
 
+    @override_settings(ENV_NAME="test-env", REPLICATION_PARTITION_BY_TENANT=True)
+    def test_replicate_by_tenant_routes_to_tenant_topic(self):
+        """Test events partitioned by tenant are keyed by the tenant and routed to their own topic."""
+        relationship = create_relationship(("rbac", "group"), "g1", ("rbac", "principal"), "localhost/p1", "member")
+        for org_id in ["o1", None]:
+            self.replicator.replicate(
+                ReplicationEvent(
+                    add=[relationship],
+                    event_type=ReplicationEventType.ADD_PRINCIPALS_TO_GROUP,
+                    info={},
+                    partition_key=PartitionKey.byTenant(org_id),
+                )
+            )
+
+        self.assertEqual([event.aggregateid for event in self.log], ["test-env/o1", "test-env/public"])
+        self.assertEqual({event.route for event in self.log}, {"relations-replication-event-by-tenant"})
+
+    @override_settings(ENV_NAME="test-env")
+    def test_by_tenant_is_by_environment_until_enabled(self):
+        """Test the tenant partition key keeps ordering all events of the environment until it is enabled."""
+        partition_key = PartitionKey.byTenant("o1")
+
+        self.assertEqual(str(partition_key), "test-env")
+        self.assertEqual(partition_key.route("workspace"), "workspace")
+
+
+@override_settings(REPLICATION_PARTITION_AUDIT_ENABLED=True, REPLICATION_PARTITION_BY_TENANT=True)
+class PartitionAuditTest(TestCase):
+    """Test the audit of the partitions tuples are changed through."""
+
+    def setUp(self):
+        """Set up."""
+        super().setUp()
+        self.replicator = OutboxReplicator(InMemoryLog())
+        self.relationship = create_relationship(
+            ("rbac", "group"), "g1", ("rbac", "principal"), "localhost/p1", "member"
+        )
+        PARTITION_AUDIT.reset()
+        self.addCleanup(PARTITION_AUDIT.reset)
+        self.addCleanup(logging.disable, logging.root.manager.disable)
+        logging.disable(logging.NOTSET)
+
+    def replicate(self, org_id, relationship=None):
+        """Replicate the removal of the tuple through the partition of the tenant."""
+        self.replicator.replicate(
+            ReplicationEvent(
+                remove=[relationship or self.relationship],
+                event_type=ReplicationEventType.REMOVE_PRINCIPALS_FROM_GROUP,
+                info={},
+                partition_key=PartitionKey.byTenant(org_id),
+            )
+        )
+
+    def test_same_partition_is_allowed(self):
+        """Test a tuple may be changed repeatedly through the same partition."""
+        before = REGISTRY.get_sample_value("relations_partition_audit_violations_total") or 0
+        self.replicate("o1")
+        self.replicate("o1")
+        self.replicate("o2", create_relationship(("rbac", "group"), "g2", ("rbac", "principal"), "p1", "member"))
+
+        self.assertEqual(REGISTRY.get_sample_value("relations_partition_audit_violations_total"), before)
+
+    def test_other_partition_is_reported(self):
+        """Test a tuple changed through another partition is logged and counted."""
+        before = REGISTRY.get_sample_value("relations_partition_audit_violations_total") or 0
+        self.replicate("o1")
+        with self.assertLogs("management.relation_replicator.relation_replicator", level="ERROR") as logs:
+            self.replicate("o2")
+
+        self.assertIn("rbac/group:g1#member@rbac/principal:localhost/p1# (", logs.output[0])
+        self.assertEqual(REGISTRY.get_sample_value("relations_partition_audit_violations_total"), before + 1)
+
+    @override_settings(REPLICATION_PARTITION_AUDIT_STRICT=True)
+    def test_other_partition_is_rejected_when_strict(self):
+        """Test a tuple changed through another partition is rejected in strict mode."""
+        self.replicate("o1")
+        with self.assertRaises(DualWriteException):
+            self.replicate("o2")
+
+    @override_settings(REPLICATION_PARTITION_AUDIT_STRICT=True)
+    def test_rejected_event_is_not_recorded(self):
+        """Test the partition of a rejected event is not recorded, so the accepted partition still applies."""
+        self.replicate("o1")
+        with self.assertRaises(DualWriteException):
+            self.replicate("o2")
+        self.replicate("o1")
+
+    @override_settings(REPLICATION_PARTITION_AUDIT_SIZE=1, REPLICATION_PARTITION_AUDIT_STRICT=True)
+    def test_least_recently_replicated_tuples_are_forgotten(self):
+        """Test the audit only remembers the most recently replicated tuples."""
+        self.replicate("o1")
+        self.replicate("o1", create_relationship(("rbac", "group"), "g2", ("rbac", "principal"), "p1", "member"))
+        self.replicate("o2")
+
 
 class OutboxReplicatorPrometheusTest(TestCase):
     """Test OutboxReplicator Prometheus Metrics."""
@@ -225,3 +343,404 @@ class OutboxReplicatorPrometheusTest(TestCase):
 
         after = REGISTRY.get_sample_value("relations_replication_event_total")
         self.assertEqual(1, after - before)
+
+
+class RelationshipToDictTest(TestCase):
+    """Test the encoding of relationships in outbox payloads."""
+
+    def test_matches_message_to_dict(self):
+        """Test the relationships are encoded exactly like json_format.MessageToDict does."""
+        relationships = [
+            create_relationship(("rbac", "group"), "g1", ("rbac", "principal"), "localhost/p1", "member"),
+            create_relationship(("rbac", "role_binding"), "b1", ("rbac", "group"), "g1", "subject", "member"),
+            create_relationship(("rbac", "role"), "r1", ("rbac", "principal"), "*", "inventory_hosts_read"),
+            Relationship(),
+            Relationship(relation="parent", subject=SubjectReference(relation="")),
+            Relationship(resource=ObjectReference(id="w1"), subject=SubjectReference(subject=ObjectReference())),
+            Relationship(resource=ObjectReference(type=ObjectType(name="workspace"))),
+        ]
+        for relationship in relationships:
+            with self.subTest(relationship=relationship):
+                expected = json_format.MessageToDict(relationship)
+                encoded = relationship_to_dict(relationship)
+                self.assertEqual(encoded, expected)
+                self.assertEqual(json.dumps(encoded), json.dumps(expected))
+
+    def test_known_fields(self):
+        """Test the relationship messages have no fields the encoder does not know about."""
+        self.assertEqual([field.name for field in Relationship.DESCRIPTOR.fields], ["resource", "relation", "subject"])
+        self.assertEqual([field.name for field in SubjectReference.DESCRIPTOR.fields], ["relation", "subject"])
+        self.assertEqual([field.name for field in ObjectReference.DESCRIPTOR.fields], ["type", "id"])
+        self.assertEqual([field.name for field in ObjectType.DESCRIPTOR.fields], ["namespace", "name"])
+
+
+@override_settings(ENV_NAME="test-env", REPLICATION_PARTITION_BY_TENANT=True, REPLICATION_OUTBOX_AGGREGATION=True)
+class ReplicationBufferTest(TestCase):
+    """Test the merging of the replication events of an atomic block."""
+
+    def setUp(self):
+        """Set up."""
+        super().setUp()
+        self.log = InMemoryLog()
+        self.replicator = OutboxReplicator(self.log)
+        self.addCleanup(logging.disable, logging.root.manager.disable)
+        logging.disable(logging.NOTSET)
+
+    def relationship(self, principal):
+        """Return the membership of the principal in the group."""
+        return create_relationship(("rbac", "group"), "g1", ("rbac", "principal"), principal, "member")
+
+    def replicate(self, add=[], remove=[], org_id="o1", event_type=ReplicationEventType.ADD_PRINCIPALS_TO_GROUP):
+        """Replicate the changes through the partition of the tenant."""
+        self.replicator.replicate(
+            ReplicationEvent(
+                add=[self.relationship(principal) for principal in add],
+                remove=[self.relationship(principal) for principal in remove],
+                event_type=event_type,
+                info={},
+                partition_key=PartitionKey.byTenant(org_id),
+            )
+        )
+
+    def principals(self, relations):
+        """Return the principals of the encoded memberships."""
+        return [relation["subject"]["subject"]["id"] for relation in relations]
+
+    def test_events_of_a_partition_are_merged(self):
+        """Test the events of a partition are saved as one event, where the last change of a tuple wins."""
+        with OUTBOX_BUFFER.atomic():
+            self.replicate(add=["p1", "p2"])
+            self.replicate(remove=["p2", "p3"], event_type=ReplicationEventType.REMOVE_PRINCIPALS_FROM_GROUP)
+            self.replicate(add=["p3"], remove=["p1"])
+            self.assertEqual(len(self.log), 0)
+
+        self.assertEqual(len(self.log), 1)
+        event = self.log.first()
+        self.assertEqual(event.event_type, ReplicationEventType.MERGED_EVENTS)
+        self.assertEqual(event.aggregateid, "test-env/o1")
+        self.assertEqual(self.principals(event.payload["relations_to_add"]), ["p3"])
+        self.assertEqual(self.principals(event.payload["relations_to_remove"]), ["p1", "p2"])
+
+    def test_single_event_is_saved_as_is(self):
+        """Test a partition with a single event keeps the type of the event."""
+        with OUTBOX_BUFFER.atomic():
+            self.replicate(add=["p1"])
+            self.replicate(add=["p1"], org_id="o2")
+
+        self.assertEqual([event.aggregateid for event in self.log], ["test-env/o1", "test-env/o2"])
+        self.assertEqual({event.event_type for event in self.log}, {ReplicationEventType.ADD_PRINCIPALS_TO_GROUP})
+
+    def test_nested_blocks_share_the_buffer(self):
+        """Test the events of nested blocks are saved when the outermost block exits."""
+        with OUTBOX_BUFFER.atomic():
+            with OUTBOX_BUFFER.atomic():
+                self.replicate(add=["p1"])
+            self.replicate(add=["p2"])
+            self.assertEqual(len(self.log), 0)
+
+        self.assertEqual(len(self.log), 1)
+        self.assertEqual(self.principals(self.log.first().payload["relations_to_add"]), ["p1", "p2"])
+
+    def test_events_of_rolled_back_savepoints_are_dropped(self):
+        """Test the events replicated in a savepoint which is rolled back are not saved."""
+        with OUTBOX_BUFFER.atomic():
+            self.replicate(add=["p1"])
+            try:
+                with transaction.atomic():
+                    self.replicate(add=["p2"])
+                    raise IntegrityError()
+            except IntegrityError:
+                pass
+
+        self.assertEqual(len(self.log), 1)
+        self.assertEqual(self.principals(self.log.first().payload["relations_to_add"]), ["p1"])
+
+    def test_nothing_is_saved_when_the_block_fails(self):
+        """Test the events are dropped when the block raises."""
+        with self.assertRaises(DualWriteException):
+            with OUTBOX_BUFFER.atomic():
+                self.replicate(add=["p1"])
+                raise DualWriteException()
+
+        self.assertEqual(len(self.log), 0)
+
+    def test_empty_events_are_not_merged(self):
+        """Test empty events are still warned about instead of being merged."""
+        with self.assertLogs("management.relation_replicator.outbox_replicator", level="WARNING") as logs:
+            with OUTBOX_BUFFER.atomic():
+                self.replicate(add=["p1"])
+                self.replicate()
+
+        self.assertEqual(len(self.log), 1)
+        self.assertEqual(self.log.first().event_type, ReplicationEventType.ADD_PRINCIPALS_TO_GROUP)
+        self.assertIn("Skipping empty replication event.", logs.output[0])
+
+    @override_settings(REPLICATION_OUTBOX_MAX_TUPLES=2)
+    def test_merged_events_are_chunked(self):
+        """Test merged events are split into events of at most REPLICATION_OUTBOX_MAX_TUPLES tuples."""
+        with OUTBOX_BUFFER.atomic():
+            self.replicate(add=["p1", "p2"])
+            self.replicate(add=["p3"], remove=["p4"])
+
+        self.assertEqual(
+            [
+                (
+                    self.principals(event.payload["relations_to_add"]),
+                    self.principals(event.payload["relations_to_remove"]),
+                )
+                for event in self.log
+            ],
+            [(["p1", "p2"], []), (["p3"], ["p4"])],
+        )
+
+    def test_merged_events_list_their_types(self):
+        """Test merged events keep the types and the infos of the events they merge in their info."""
+        events = [
+            ReplicationEvent(
+                add=[self.relationship("p1")],
+                event_type=ReplicationEventType.ADD_PRINCIPALS_TO_GROUP,
+                info={"org_id": "o1", "group_uuid": "g1"},
+                partition_key=PartitionKey.byTenant("o1"),
+            ),
+            ReplicationEvent(
+                remove=[self.relationship("p2")],
+                event_type=ReplicationEventType.REMOVE_PRINCIPALS_FROM_GROUP,
+                info={"group_uuid": "g1"},
+                partition_key=PartitionKey.byTenant("o1"),
+            ),
+        ]
+
+        (merged,) = merge_events(events)
+
+        self.assertEqual(merged.event_type, ReplicationEventType.MERGED_EVENTS)
+        self.assertEqual(
+            merged.event_info,
+            {
+                "event_types": ["add_principals_to_group", "remove_principals_from_group"],
+                "org_ids": ["o1"],
+                "infos": [{"org_id": "o1", "group_uuid": "g1"}, {"group_uuid": "g1"}],
+            },
+        )
+
+    @override_settings(REPLICATION_OUTBOX_AGGREGATION=False)
+    def test_disabled(self):
+        """Test the events are saved right away when the aggregation is disabled."""
+        with OUTBOX_BUFFER.atomic():
+            self.replicate(add=["p1"])
+            self.replicate(add=["p2"])
+            self.assertEqual(len(self.log), 2)
+
+
+def wal_level():
+    """Return the WAL level of the database."""
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW wal_level")
+        return cursor.fetchone()[0]
+
+
+class ReplicationDeltaTest(TestCase):
+    """Test the replication of the tuples which change."""
+
+    def setUp(self):
+        """Set up."""
+        super().setUp()
+        self.log = InMemoryLog()
+        self.replicator = OutboxReplicator(self.log)
+        self.addCleanup(logging.disable, logging.root.manager.disable)
+        logging.disable(logging.NOTSET)
+
+    def relationship(self, principal):
+        """Return the membership of the principal in the group."""
+        return create_relationship(("rbac", "group"), "g1", ("rbac", "principal"), principal, "member")
+
+    def replicate_changes(self, add=[], remove=[], event_type=ReplicationEventType.UPDATE_GROUP):
+        """Replicate the changes of the memberships."""
+        self.replicator.replicate_changes(
+            ReplicationEvent(
+                add=[self.relationship(principal) for principal in add],
+                remove=[self.relationship(principal) for principal in remove],
+                event_type=event_type,
+                info={"org_id": "o1"},
+                partition_key=PartitionKey.byEnvironment(),
+            )
+        )
+
+    def principals(self, relations):
+        """Return the principals of the encoded memberships."""
+        return [relation["subject"]["subject"]["id"] for relation in relations]
+
+    def test_relationship_delta(self):
+        """Test tuples both added and removed are left out, along with duplicates."""
+        add, remove = relationship_delta(
+            [self.relationship("p1"), self.relationship("p2"), self.relationship("p2")],
+            [self.relationship("p3"), self.relationship("p1"), self.relationship("p3")],
+        )
+
+        self.assertEqual(add, [self.relationship("p2")])
+        self.assertEqual(remove, [self.relationship("p3")])
+
+    def test_only_changed_tuples_are_replicated(self):
+        """Test the event only carries the tuples which change, keeping its type."""
+        self.replicate_changes(add=["p1", "p2", "p3"], remove=["p1", "p2", "p4"])
+
+        self.assertEqual(len(self.log), 1)
+        event = self.log.first()
+        self.assertEqual(event.event_type, ReplicationEventType.UPDATE_GROUP)
+        self.assertEqual(self.principals(event.payload["relations_to_add"]), ["p3"])
+        self.assertEqual(self.principals(event.payload["relations_to_remove"]), ["p4"])
+
+    def test_unchanged_event_is_skipped(self):
+        """Test nothing is replicated when every tuple is left as it was."""
+        with self.assertLogs("management.relation_replicator.relation_replicator", level="INFO") as logs:
+            self.replicate_changes(add=["p1", "p2"], remove=["p2", "p1"])
+
+        self.assertEqual(len(self.log), 0)
+        self.assertIn("no tuples changed", logs.output[0])
+
+    def test_migration_events_are_replicated_in_full(self):
+        """Test migrations replicate every tuple, since the tuples may not have been replicated yet."""
+        self.replicate_changes(add=["p1"], remove=["p1"], event_type=ReplicationEventType.MIGRATE_TENANT_GROUPS)
+
+        event = self.log.first()
+        self.assertEqual(self.principals(event.payload["relations_to_add"]), ["p1"])
+        self.assertEqual(self.principals(event.payload["relations_to_remove"]), ["p1"])
+
+    @override_settings(REPLICATION_TUPLE_DELTA=False)
+    def test_delta_can_be_disabled(self):
+        """Test the event is replicated as it is when the delta is disabled."""
+        self.replicate_changes(add=["p1", "p2"], remove=["p1"])
+
+        event = self.log.first()
+        self.assertEqual(self.principals(event.payload["relations_to_add"]), ["p1", "p2"])
+        self.assertEqual(self.principals(event.payload["relations_to_remove"]), ["p1"])
+
+
+class OutboxLogicalMessageTest(TestCase):
+    """Test emitting the outbox events as logical decoding messages."""
+
+    def test_mode_is_selected_by_setting(self):
+        """Test the replicator writes to the log of the configured mode."""
+        self.assertIs(OutboxReplicator()._log, OUTBOX_LOGS["table"])
+        with self.settings(REPLICATION_OUTBOX_MODE="message"):
+            self.assertIsInstance(OutboxReplicator()._log, OutboxLogicalMessage)
+
+    @override_settings(REPLICATION_OUTBOX_AGGREGATION=False)
+    def test_message_content_matches_outbox_row(self):
+        """Test the emitted message holds the same columns as the event logged in memory."""
+        relationship = create_relationship(("rbac", "group"), "g1", ("rbac", "principal"), "localhost/p1", "member")
+        event = ReplicationEvent(
+            add=[relationship],
+            event_type=ReplicationEventType.ADD_PRINCIPALS_TO_GROUP,
+            info={},
+            partition_key=PartitionKey.byEnvironment(),
+        )
+        emitted = []
+
+        def capture(execute, sql, params, many, context):
+            if "pg_logical_emit_message" in sql:
+                emitted.append(params)
+            return execute(sql, params, many, context)
+
+        in_memory = InMemoryLog()
+        OutboxReplicator(in_memory).replicate(event)
+        with connection.execute_wrapper(capture):
+            OutboxReplicator(OUTBOX_LOGS["message"]).replicate(event)
+
+        self.assertEqual(len(emitted), 1)
+        prefix, content = emitted[0]
+        self.assertEqual(prefix, settings.REPLICATION_OUTBOX_MESSAGE_PREFIX)
+        message = json.loads(content)
+        expected = in_memory.first()
+        uuid.UUID(message.pop("id"))
+        self.assertEqual(
+            message,
+            {
+                "aggregatetype": expected.aggregatetype,
+                "aggregateid": expected.aggregateid,
+                "type": expected.event_type,
+                "payload": expected.payload,
+                "route": expected.route,
+            },
+        )
+
+
+class OutboxLogicalMessageDecodingTest(TransactionTestCase):
+    """Test the content of the messages read back from a replication slot."""
+
+    def setUp(self):
+        """Create a replication slot reading the messages of this test."""
+        super().setUp()
+        if wal_level() != "logical":
+            self.skipTest("Logical decoding is not enabled")
+        self.slot = f"rbac_test_outbox_{os.getpid()}"
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_create_logical_replication_slot(%s, 'pgoutput')", [self.slot])
+        self.addCleanup(self.drop_slot)
+
+    def drop_slot(self):
+        """Drop the replication slot."""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_drop_replication_slot(%s)", [self.slot])
+
+    def messages(self):
+        """Return the content of the messages emitted by the outbox, decoded from the pgoutput protocol."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT data FROM pg_logical_slot_get_binary_changes(%s, NULL, NULL, 'proto_version', '1', "
+                "'publication_names', 'rbac_test', 'messages', 'true')",
+                [self.slot],
+            )
+            rows = [bytes(row[0]) for row in cursor.fetchall()]
+        messages = []
+        for data in rows:
+            if data[:1] != b"M":
+                continue
+            # Message: flags (1 byte), LSN (8 bytes), prefix (null terminated), length (4 bytes), content.
+            prefix_end = data.index(b"\0", 10)
+            start = prefix_end + 5
+            (length,) = struct.unpack_from(">i", data, prefix_end + 1)
+            if data[10:prefix_end].decode() == settings.REPLICATION_OUTBOX_MESSAGE_PREFIX:
+                messages.append(json.loads(data[start : start + length]))
+        return messages
+
+    def replicate(self, log, rollback=False):
+        """Replicate the same event through the log."""
+        relationship = create_relationship(("rbac", "group"), "g1", ("rbac", "principal"), "localhost/p1", "member")
+        try:
+            with transaction.atomic():
+                OutboxReplicator(log).replicate(
+                    ReplicationEvent(
+                        add=[relationship],
+                        event_type=ReplicationEventType.ADD_PRINCIPALS_TO_GROUP,
+                        info={},
+                        partition_key=PartitionKey.byEnvironment(),
+                    )
+                )
+                if rollback:
+                    raise IntegrityError()
+        except IntegrityError:
+            pass
+
+    @override_settings(REPLICATION_OUTBOX_AGGREGATION=False)
+    def test_messages_match_outbox_rows(self):
+        """Test the committed messages hold the same columns as the events logged in memory."""
+        in_memory = InMemoryLog()
+        self.replicate(in_memory)
+        self.replicate(OUTBOX_LOGS["message"])
+        self.replicate(OUTBOX_LOGS["message"], rollback=True)
+
+        messages = self.messages()
+        self.assertEqual(len(messages), 1)
+        message = messages[0]
+        expected = in_memory.first()
+        uuid.UUID(message.pop("id"))
+        self.assertEqual(
+            message,
+            {
+                "aggregatetype": expected.aggregatetype,
+                "aggregateid": expected.aggregateid,
+                "type": expected.event_type,
+                "payload": expected.payload,
+                "route": expected.route,
+            },
+        )
@@ -54,7 +54,8 @@ class RoleDefinerTests(IdentityRequest):
         kafka_mock = copy_call_args(send_kafka_message)
         """Test that we can run a role seeding update."""
         with self.settings(NOTIFICATIONS_RH_ENABLED=True, NOTIFICATIONS_ENABLED=True):
-            self.try_seed_roles()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.try_seed_roles()
 
             roles = Role.objects.filter(platform_default=True)
 
@@ -119,30 +120,32 @@ class RoleDefinerTests(IdentityRequest):
     def test_role_update_platform_default_role(self, send_kafka_message):
         """Test that role seeding updates send out notification."""
         kafka_mock = copy_call_args(send_kafka_message)
-        self.try_seed_roles()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.try_seed_roles()
 
-        # Update non platform default role
-        non_platform_role_to_update = Role.objects.get(name="User Access administrator")
-        non_platform_role_to_update.version = 0
-        access = non_platform_role_to_update.access.first()
-        access.permission = Permission.objects.get(permission="rbac:principal:read")
-        non_platform_role_to_update.save()
-        access.save()
-
-        # Update platform default role
-        platform_role_to_update = Role.objects.get(name="User Access principal viewer")
-        platform_role_to_update.version = 0
-        access = platform_role_to_update.access.first()
-        access.permission = Permission.objects.get(permission="rbac:*:*")
-        platform_role_to_update.save()
-        access.save()
-
-        org_id = self.customer_data["org_id"]
-        Tenant.objects.create(tenant_name="unready1", org_id="unready1", ready=False)
-        Tenant.objects.create(tenant_name="unready2", org_id="unready2", ready=False)
+            # Update non platform default role
+            non_platform_role_to_update = Role.objects.get(name="User Access administrator")
+            non_platform_role_to_update.version = 0
+            access = non_platform_role_to_update.access.first()
+            access.permission = Permission.objects.get(permission="rbac:principal:read")
+            non_platform_role_to_update.save()
+            access.save()
+
+            # Update platform default role
+            platform_role_to_update = Role.objects.get(name="User Access principal viewer")
+            platform_role_to_update.version = 0
+            access = platform_role_to_update.access.first()
+            access.permission = Permission.objects.get(permission="rbac:*:*")
+            platform_role_to_update.save()
+            access.save()
+
+            org_id = self.customer_data["org_id"]
+            Tenant.objects.create(tenant_name="unready1", org_id="unready1", ready=False)
+            Tenant.objects.create(tenant_name="unready2", org_id="unready2", ready=False)
 
         with self.settings(NOTIFICATIONS_RH_ENABLED=True, NOTIFICATIONS_ENABLED=True):
-            seed_roles()
+            with self.captureOnCommitCallbacks(execute=True):
+                seed_roles()
 
             platform_role_to_update.refresh_from_db()
             non_platform_role_to_update.refresh_from_db()
@@ -15,10 +15,14 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Test the group model."""
+import uuid
+
 from django.db import IntegrityError, transaction
+from django.test import override_settings
 
 from api.cross_access.model import CrossAccountRequest
 from management.models import BindingMapping, ExtRoleRelation, ExtTenant, Role
+from management.relation_replicator.relation_replicator import DualWriteException, PartitionKey
 from tests.identity_request import IdentityRequest
 from migration_tool.models import (
     V2role,
@@ -151,6 +155,21 @@ class BindingMappingTests(IdentityRequest):
         self.binding_mapping.assign_user_to_bindings(self.user_id_1, self.cars[0])
         self.assertFalse(self.binding_mapping.is_unassigned())
 
+    @override_settings(REPLICATION_PARTITION_BY_TENANT=True)
+    def test_partition_key_without_workspace(self):
+        """Test bindings of deleted workspaces use the tenant of a custom role, and are rejected for system roles."""
+        resource = V2boundresource(resource_type=("rbac", "workspace"), resource_id=str(uuid.uuid4()))
+        v2rolebinding = V2rolebinding(
+            id="v2rolebinding", role=self.v2role, resource=resource, groups=frozenset(), users=frozenset()
+        )
+        binding_mapping = BindingMapping.for_role_binding(v2rolebinding, self.role)
+        self.assertEqual(str(binding_mapping.partition_key()), str(PartitionKey.byTenant(self.tenant.org_id)))
+
+        system_role = Role.objects.create(name="system role", system=True, tenant=self.tenant)
+        system_binding_mapping = BindingMapping.for_role_binding(v2rolebinding, system_role)
+        with self.assertRaises(DualWriteException):
+            system_binding_mapping.partition_key()
+
     def test_add_group_to_bindings(self):
         """Test that adding groups adds to the groups array in the mapping with group uuids."""
         self.binding_mapping.assign_group_to_bindings("group1")
@@ -18,11 +18,14 @@
 
 from typing import Optional, Tuple
 import uuid
-from django.test import TestCase
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
 from management.group.definer import seed_group
 from management.group.model import Group
 from management.policy.model import Policy
 from management.principal.model import Principal
+from management.relation_replicator.relation_replicator import ReplicationEventType
 from management.tenant_mapping.model import TenantMapping
 from management.tenant_service.v2 import V2TenantBootstrapService
 from management.workspace.model import Workspace
@@ -307,6 +310,39 @@ class V2TenantBootstrapServiceTest(TestCase):
         _, mapping, _, _ = self.assertTenantBootstrapped("o4", existing=True)  # 9
         self.assertAddedToDefaultGroup("localhost/u6", mapping)  # 1
 
+    @override_settings(REPLICATION_PARTITION_BY_TENANT=True, ENV_NAME="test-env")
+    def test_bulk_adding_users_replicates_by_tenant(self):
+        self.fixture.new_tenant(org_id="o1")
+        self.fixture.new_unbootstrapped_tenant(org_id="o2")
+        self.tuples.clear()
+
+        users = []
+        for user_id, org_id in [("u1", "o1"), ("u2", "o2"), ("u3", "o1")]:
+            user = User()
+            user.user_id = user_id
+            user.username = f"username-{user_id}"
+            user.org_id = org_id
+            user.is_active = True
+            users.append(user)
+
+        replicator = self.service._replicator
+        with patch.object(replicator, "replicate", wraps=replicator.replicate) as replicate:
+            self.service.import_bulk_users(users)
+
+        events = [call.args[0] for call in replicate.call_args_list]
+        # One event bootstraps o2, and one event per tenant adds the users.
+        self.assertEqual(
+            [(event.event_type, str(event.partition_key)) for event in events],
+            [
+                (ReplicationEventType.BULK_BOOTSTRAP_TENANT, "test-env/o2"),
+                (ReplicationEventType.BULK_EXTERNAL_USER_UPDATE, "test-env/o1"),
+                (ReplicationEventType.BULK_EXTERNAL_USER_UPDATE, "test-env/o2"),
+            ],
+        )
+        self.assertEqual(events[1].event_info["org_id"], "o1")
+        self.assertEqual(len(events[1].add), 2)
+        self.assertEqual(len(events[2].add), 1)
+
     def test_bulk_import_updates_user_ids_on_principals_but_does_not_add_principals(self):
         bootstrapped = self.fixture.new_tenant(org_id="o1")
         self.tuples.clear()
@@ -0,0 +1,125 @@
+#
+# Copyright 2025 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Test the cache codecs."""
+import json
+import pickle
+import uuid
+from unittest.mock import patch
+
+from django.test import TestCase
+from management.cache_codec import (
+    FORMAT_VERSION,
+    MAGIC,
+    CODECS,
+    COMPRESSIONS,
+    CacheCodec,
+    CacheCodecError,
+    JSONCodec,
+    MsgpackCodec,
+    NoCompression,
+    ZlibCompression,
+    ZstdCompression,
+    get_cache_codec,
+    model_from_cache,
+    model_to_cache,
+)
+from management.models import Principal
+
+from api.models import Tenant
+
+
+class CacheCodecTest(TestCase):
+    """Test the cache codecs."""
+
+    POLICY = [
+        {
+            "permission": "app:resource:read",
+            "resourceDefinitions": [
+                {"attributeFilter": {"key": "key", "operation": "in", "value": [str(n) for n in range(500)]}}
+            ],
+        }
+    ]
+
+    def test_round_trip(self):
+        """Test values survive every installed codec and compression, and carry their header."""
+        for codec in CODECS.values():
+            for compression in COMPRESSIONS.values():
+                with self.subTest(codec=codec.name, compression=compression.name):
+                    if not codec.available or not compression.available:
+                        self.skipTest(f"{codec.name} or {compression.name} is not installed")
+                    cache_codec = CacheCodec(codec.name, compression.name, compression_threshold=0)
+                    self.assertIs(cache_codec.codec, codec)
+                    self.assertIs(cache_codec.compression, compression)
+                    value = cache_codec.encode(self.POLICY)
+                    self.assertEqual(value[0], MAGIC)
+                    self.assertEqual(value[1], FORMAT_VERSION)
+                    self.assertEqual(CacheCodec.decode(value), self.POLICY)
+
+    def test_compression_threshold(self):
+        """Test only the values above the threshold are compressed."""
+        cache_codec = CacheCodec("json", "zlib", compression_threshold=1024)
+        small = cache_codec.encode({"key": "value"})
+        self.assertEqual(small[3], 0)
+        self.assertEqual(small[4:], b'{"key":"value"}')
+
+        large = cache_codec.encode(self.POLICY)
+        self.assertEqual(large[3], ZlibCompression.id)
+        self.assertLess(len(large), len(json.dumps(self.POLICY)))
+        self.assertEqual(CacheCodec.decode(large), self.POLICY)
+
+    def test_missing_libraries_fall_back(self):
+        """Test codecs which are not installed fall back to the standard library."""
+        with (
+            patch("management.cache_codec.MsgpackCodec.available", False),
+            patch("management.cache_codec.ZstdCompression.available", False),
+        ):
+            cache_codec = CacheCodec("msgpack", "zstd")
+            self.assertIs(cache_codec.codec, JSONCodec)
+            self.assertIs(cache_codec.compression, ZlibCompression)
+
+    def test_unknown_codec(self):
+        """Test misconfigured codecs are rejected."""
+        with self.assertRaises(ValueError):
+            CacheCodec("yaml")
+
+    def test_default_settings(self):
+        """Test the compact codec and compression are used by default."""
+        cache_codec = get_cache_codec()
+        self.assertIs(cache_codec.codec, MsgpackCodec)
+        self.assertIs(cache_codec.compression, ZstdCompression)
+
+    def test_values_without_header_are_rejected(self):
+        """Test values written before the codecs, or by an unknown version, cannot be decoded."""
+        value = CacheCodec().encode(self.POLICY)
+        for invalid in (b"", json.dumps(self.POLICY).encode(), pickle.dumps(self.POLICY), b"\xfe\x02" + value[2:]):
+            with self.subTest(value=invalid[:8]):
+                with self.assertRaises(CacheCodecError):
+                    CacheCodec.decode(invalid)
+
+    def test_model_round_trip(self):
+        """Test model instances are rebuilt as loaded from the database, with their loaded relations."""
+        tenant = Tenant(id=1, tenant_name="acct1", org_id="1", ready=True)
+        principal = Principal(id=2, uuid=uuid.uuid4(), username="user", tenant=tenant)
+        value = CacheCodec("json").encode(model_to_cache(principal, related=["tenant"]))
+
+        cached = model_from_cache(Principal, CacheCodec.decode(value), related=["tenant"])
+        self.assertEqual(cached.pk, principal.pk)
+        self.assertEqual(cached.uuid, principal.uuid)
+        self.assertFalse(cached._state.adding)
+        with self.assertNumQueries(0):
+            self.assertEqual(cached.tenant.org_id, "1")
+            self.assertTrue(cached.tenant.ready)
@@ -0,0 +1,97 @@
+#
+# Copyright 2025 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Test the pool of gRPC channels."""
+from unittest.mock import MagicMock, patch
+
+import grpc
+from django.test import TestCase, override_settings
+from management.grpc_channels import ChannelPool, RequestTimer
+from management.utils import create_client_channel
+from prometheus_client import REGISTRY
+
+
+class ChannelPoolTest(TestCase):
+    """Test the pool of gRPC channels."""
+
+    def setUp(self):
+        """Set up the pool."""
+        self.pool = ChannelPool()
+        self.addCleanup(self.pool.reset)
+
+    def test_channels_are_reused_per_target(self):
+        """Test each target gets a single channel."""
+        channel = self.pool.get("localhost:9000")
+        self.assertIs(self.pool.get("localhost:9000"), channel)
+        self.assertIsNot(self.pool.get("localhost:9001"), channel)
+
+    @override_settings(GRPC_KEEPALIVE_TIME_MS=1000)
+    def test_channels_are_created_lazily_with_keepalive(self):
+        """Test channels are created with keepalive, without connecting until the first request."""
+        with patch("management.grpc_channels.grpc.insecure_channel") as insecure_channel:
+            self.pool.get("localhost:9000")
+
+        insecure_channel.assert_called_once()
+        self.assertIn(("grpc.keepalive_time_ms", 1000), insecure_channel.call_args.kwargs["options"])
+        insecure_channel.return_value.subscribe.assert_called_once()
+        self.assertFalse(insecure_channel.return_value.subscribe.call_args.kwargs["try_to_connect"])
+
+    def test_pool_is_emptied_after_fork(self):
+        """Test a forked process does not use the channels of its parent."""
+        channel = self.pool.get("localhost:9000")
+        with patch("management.grpc_channels.os.getpid", return_value=-1):
+            self.assertIsNot(self.pool.get("localhost:9000"), channel)
+
+    def test_reset(self):
+        """Test resetting closes the channels, and the next request reconnects."""
+        with patch("management.grpc_channels.grpc.insecure_channel") as insecure_channel:
+            channel = self.pool.get("localhost:9000")
+            self.pool.reset()
+            insecure_channel.return_value.close.assert_called_once()
+            self.assertIsNot(self.pool.get("localhost:9000"), channel)
+
+    def test_reset_in_celery_worker_processes(self):
+        """Test celery worker processes reset the pool when they start."""
+        from celery.signals import worker_process_init
+        from rbac.celery import app  # noqa: F401
+
+        with patch("management.grpc_channels.GRPC_CHANNELS") as channels:
+            worker_process_init.send(sender=None)
+        channels.reset.assert_called_once()
+
+    def test_create_client_channel_uses_pool(self):
+        """Test the channel handed out to requests is pooled and stays open."""
+        with create_client_channel("localhost:9000") as first, create_client_channel("localhost:9000") as second:
+            self.assertIs(first, second)
+        with create_client_channel("localhost:9000") as third:
+            self.assertIs(first, third)
+
+
+class RequestTimerTest(TestCase):
+    """Test the timing of gRPC requests."""
+
+    def test_requests_are_timed(self):
+        """Test the latency is recorded with the method and the status code."""
+        outcome = MagicMock()
+        outcome.code.return_value = grpc.StatusCode.UNAVAILABLE
+        details = MagicMock(method="/kessel.inventory.v1beta2.KesselInventoryService/Check")
+        labels = {"target": "localhost:9000", "method": details.method, "code": "UNAVAILABLE"}
+        before = REGISTRY.get_sample_value("grpc_client_request_seconds_count", labels) or 0
+
+        result = RequestTimer("localhost:9000").intercept_unary_unary(lambda *args: outcome, details, MagicMock())
+
+        self.assertIs(result, outcome)
+        self.assertEqual(REGISTRY.get_sample_value("grpc_client_request_seconds_count", labels), before + 1)
@@ -0,0 +1,127 @@
+#
+# Copyright 2025 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Test the pooled HTTP clients."""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import requests
+from django.test import TestCase, override_settings
+from management.http_client import HTTPClient
+from prometheus_client import REGISTRY
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Answers with the queued statuses, then with 200, keeping the connections alive."""
+
+    protocol_version = "HTTP/1.1"
+
+    def handle_request(self):
+        """Send the next status."""
+        self.server.requests += 1
+        self.server.connections.add(self.client_address)
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    do_GET = handle_request
+    do_POST = handle_request
+
+    def log_message(self, *args):
+        """Keep the test output clean."""
+
+
+@override_settings(HTTP_CLIENT_RETRIES=2, HTTP_CLIENT_BACKOFF_FACTOR=0)
+class HTTPClientTest(TestCase):
+    """Test the pooled HTTP clients."""
+
+    def setUp(self):
+        """Start a local server."""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.requests = 0
+        self.server.connections = set()
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/users"
+        self.client = HTTPClient("test", timeout=5, allowed_methods=("GET",))
+        self.addCleanup(self.client.close)
+
+    def test_connections_are_reused(self):
+        """Test consecutive requests share a single connection."""
+        for _ in range(5):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.server.requests, 5)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_gateway_errors_are_retried(self):
+        """Test gateway errors are retried for the allowed methods only."""
+        self.server.statuses = [503, 502]
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.server.requests, 3)
+
+        self.server.statuses = [503]
+        self.assertEqual(self.client.post(self.url).status_code, 503)
+        self.assertEqual(self.server.requests, 4)
+
+    def test_retries_are_bounded(self):
+        """Test the last response is returned once the retries run out."""
+        self.server.statuses = [503, 503, 503, 503]
+        self.assertEqual(self.client.get(self.url).status_code, 503)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_retries_stop_at_the_total_timeout(self):
+        """Test no retry is attempted when it could end after the total timeout."""
+        self.server.statuses = [503, 503]
+        with override_settings(HTTP_CLIENT_TOTAL_TIMEOUT_SECONDS=5):
+            self.assertEqual(self.client.get(self.url).status_code, 503)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_requests_are_timed(self):
+        """Test the latency is recorded with the dependency, the method and the status code."""
+        labels = {"dependency": "test", "method": "GET", "status": "200"}
+        before = REGISTRY.get_sample_value("rbac_http_client_request_seconds_count", labels) or 0
+        self.client.get(self.url)
+        self.assertEqual(REGISTRY.get_sample_value("rbac_http_client_request_seconds_count", labels), before + 1)
+
+    def test_errors_are_timed(self):
+        """Test failed requests are recorded with the error raised, and the error is not swallowed."""
+        labels = {"dependency": "test", "method": "GET", "status": "ConnectionError"}
+        before = REGISTRY.get_sample_value("rbac_http_client_request_seconds_count", labels) or 0
+        self.server.shutdown()
+        self.server.server_close()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.get(self.url)
+        self.assertEqual(REGISTRY.get_sample_value("rbac_http_client_request_seconds_count", labels), before + 1)
+
+    def test_default_timeout(self):
+        """Test requests get the timeout of the dependency unless given one."""
+        with patch("requests.Session.request") as request:
+            self.client.get(self.url)
+            self.client.get(self.url, timeout=1)
+        self.assertEqual(request.call_args_list[0].kwargs["timeout"], 5)
+        self.assertEqual(request.call_args_list[1].kwargs["timeout"], 1)
+
+    def test_session_is_rebuilt_after_fork(self):
+        """Test a forked process does not use the connections of its parent."""
+        session = self.client.session
+        self.assertIs(self.client.session, session)
+        with patch("management.http_client.os.getpid", return_value=-1):
+            self.assertIsNot(self.client.session, session)
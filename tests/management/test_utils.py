@@ -24,6 +24,7 @@ from management.utils import (
     access_for_principal,
     get_principal_from_request,
     groups_for_principal,
+    permission_pairs_for_principal,
     policies_for_principal,
     roles_for_principal,
     account_id_for_tenant,
@@ -163,6 +164,42 @@ class UtilsTests(IdentityRequest):
         roles = roles_for_principal(self.principal, self.tenant)
         self.assertCountEqual(roles, [self.roleA, self.default_role])
 
+    def test_principal_querysets_are_lazy(self):
+        """Test that the principal helpers compose into a single query, evaluated only when iterated."""
+        with self.assertNumQueries(0):
+            access = access_for_principal(self.principal, self.tenant, application="app", is_org_admin=True)
+            roles = roles_for_principal(self.principal, self.tenant, is_org_admin=True)
+        with self.assertNumQueries(1):
+            self.assertCountEqual(access, [self.accessA, self.default_access, self.default_admin_access])
+        with self.assertNumQueries(1):
+            self.assertCountEqual(roles, [self.roleA, self.default_role, self.default_admin_role])
+
+    def test_roles_for_service_account(self):
+        """Test that a service account only gets the roles of the groups it was explicitly added to."""
+        self.assertCountEqual(roles_for_principal(self.service_account, self.tenant), [])
+        self.groupA.principals.add(self.service_account)
+        self.assertCountEqual(roles_for_principal(self.service_account, self.tenant), [self.roleA])
+
+    def test_roles_for_principal_public_default_group(self):
+        """Test that the public default group is used when the tenant has no custom default group."""
+        public_tenant = Tenant.objects.get(tenant_name="public")
+        public_role = Role.objects.create(name="public default role", system=True, tenant=public_tenant)
+        public_policy = Policy.objects.create(name="public default policy", system=True, tenant=public_tenant)
+        public_policy.roles.add(public_role)
+        public_group = Group.objects.create(
+            name="public default group", system=True, platform_default=True, tenant=public_tenant
+        )
+        public_group.policies.add(public_policy)
+
+        self.assertCountEqual(roles_for_principal(self.principal, self.tenant), [self.roleA, self.default_role])
+        self.default_group.delete()
+        self.assertCountEqual(roles_for_principal(self.principal, self.tenant), [self.roleA, public_role])
+
+    def test_permission_pairs_for_principal(self):
+        """Test that the distinct resource types and verbs granted for an application are returned."""
+        self.assertCountEqual(permission_pairs_for_principal(self.principal, self.tenant, "app"), [("*", "*")])
+        self.assertCountEqual(permission_pairs_for_principal(self.principal, self.tenant, "other"), [])
+
     def test_account_number_from_tenant_name(self):
         """Test that we get the expected account number from a tenant name."""
         tenant = Tenant.objects.create(tenant_name="acct1234")
@@ -2232,6 +2232,43 @@ class WorkspaceTestsList(WorkspaceViewTests):
         # Account for ungrouped and new standard workspace not having access
         self.assertEqual(payload.get("meta").get("count"), Workspace.objects.count() - 2)
 
+    def test_workspace_list_paginated_in_database(self):
+        """List workspaces serializing only the requested page."""
+        url = reverse("v2_management:workspace-list")
+        client = APIClient()
+        expected = list(Workspace.objects.filter(tenant=self.tenant).order_by("name", "-modified", "id"))
+
+        with patch("management.workspace.view.WorkspaceSerializer.to_representation", return_value={}) as serialize:
+            response = client.get(f"{url}?limit=2&offset=1", None, format="json", **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["meta"]["count"], len(expected))
+        self.assertEqual([c.args[0] for c in serialize.call_args_list], expected[1:3])
+
+    def test_workspace_list_cursor(self):
+        """List workspaces with a cursor, following the next links in (created, id) order."""
+        url = reverse("v2_management:workspace-list")
+        client = APIClient()
+        expected = [
+            str(id)
+            for id in Workspace.objects.filter(tenant=self.tenant)
+            .order_by("created", "id")
+            .values_list("id", flat=True)
+        ]
+
+        ids = []
+        next_link = f"{url}?cursor=&limit=2"
+        while next_link:
+            response = client.get(next_link, None, format="json", **self.headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["meta"]["count"], len(expected))
+            self.assertLessEqual(len(response.data["data"]), 2)
+            ids.extend(workspace["id"] for workspace in response.data["data"])
+            next_link = response.data["links"]["next"]
+        self.assertEqual(ids, expected)
+
+        response = client.get(f"{url}?cursor=invalid", None, format="json", **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
 
 @override_settings(V2_APIS_ENABLED=True)
 class WorkspaceTestsDetail(WorkspaceViewTests):
@@ -0,0 +1,67 @@
+# Benchmark for access cache tenant invalidation
+
+import logging
+import time
+
+from django.conf import settings
+from management.cache import AccessCache
+
+from tests.performance.test_performance_util import timerStart, timerStop
+
+N_KEYS = 1_000_000
+N_TENANTS = 100
+PIPELINE_SIZE = 10_000
+
+PREFIX = "perf_test"
+
+logger = logging.getLogger(__name__)
+
+
+def _fill(cache, tenants, n_keys):
+    """Cache an access policy for n_keys principals spread over the tenants."""
+    with cache.connection.pipeline(transaction=False) as pipe:
+        for i in range(n_keys):
+            tenant_cache = tenants[i % len(tenants)]
+            key = tenant_cache.key_for(f"{PREFIX}_principal_{i}")
+            pipe.hset(key, "app", "[]")
+            pipe.expire(key, settings.ACCESS_CACHE_LIFETIME)
+            if i % PIPELINE_SIZE == 0:
+                pipe.execute()
+        pipe.execute()
+
+
+def _scan_and_delete(cache, pattern):
+    """Delete the keys matching the pattern, the way tenants were invalidated before generations."""
+    with cache.connection.pipeline() as pipe:
+        for key in cache.connection.scan_iter(match=pattern, count=1000):
+            pipe.delete(key)
+        pipe.execute()
+
+
+def test_tenant_invalidation(n_keys=N_KEYS):
+    """Compare the latency of invalidating one tenant with SCAN and with a generation bump."""
+    tenants = [AccessCache(f"{PREFIX}_org{i}") for i in range(N_TENANTS)]
+    print(f"Caching {n_keys} policies over {N_TENANTS} tenants...")
+    _fill(tenants[0], tenants, n_keys)
+
+    results = {}
+    for name, invalidate in (
+        (
+            "Tenant Invalidation (SCAN)",
+            lambda cache: _scan_and_delete(cache, f"rbac::policy::tenant={cache.tenant}::*"),
+        ),
+        ("Tenant Invalidation (generation)", AccessCache.delete_all_policies_for_tenant),
+    ):
+        start = timerStart(name)
+        invalidate(AccessCache(tenants[1].tenant))
+        results[name], _ = timerStop(start, 1)
+
+    for name, request_time in results.items():
+        logger.info(f"Test: {name}")
+        logger.info(f"Number of cached keys: {n_keys}")
+        logger.info(f"Invalidation time: {request_time} seconds")
+
+    # The entries left behind by the generation bump expire with ACCESS_CACHE_LIFETIME, drop them right away.
+    start = time.perf_counter()
+    _scan_and_delete(tenants[0], f"rbac::policy::*tenant={PREFIX}_org*")
+    print(f"Cleaned up the cached policies in {time.perf_counter() - start} seconds")
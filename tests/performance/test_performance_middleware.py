@@ -0,0 +1,47 @@
+# Query count benchmark for the identity header middleware
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIClient
+
+from api.models import Tenant
+
+import logging
+
+from tests.performance.test_performance_util import (
+    PREFIX,
+    build_identity,
+    timerStart,
+    timerStop,
+    write_to_logger,
+)
+
+client = APIClient()
+
+logger = logging.getLogger(__name__)
+
+
+def test_identity_middleware_queries():
+    """Test the number of queries issued per request by a non org admin principal."""
+    # 1 request for each tenant, made by its first principal so that the user permissions get loaded
+    tenants = Tenant.objects.filter(tenant_name__startswith=f"{PREFIX}_acct")
+
+    name = "Identity Middleware Queries"
+    start = timerStart(name)
+
+    num_requests = 0
+    num_queries = 0
+
+    for t in tenants:
+        identity = build_identity(org_id=t.org_id, username=f"{PREFIX}_principal_{t.org_id}_0", is_org_admin=False)
+        with CaptureQueriesContext(connection) as context:
+            client.get("/api/rbac/v1/groups/", **identity.META, follow=True)
+
+        num_queries += len(context.captured_queries)
+        num_requests += 1
+
+    request_time, average = timerStop(start, num_requests)
+
+    write_to_logger(logger, name, "/api/rbac/v1/groups/", num_requests, request_time, average)
+    logger.info(f"Average queries per request: {num_queries / max(num_requests, 1)}")
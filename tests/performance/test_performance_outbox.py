@@ -0,0 +1,64 @@
+# Benchmarks for the outbox replicator
+
+import logging
+import timeit
+
+from django.db import transaction
+from google.protobuf import json_format
+from management.models import Outbox
+from management.relation_replicator.outbox_replicator import OUTBOX_LOGS, relationship_to_dict
+from management.relation_replicator.relation_replicator import AggregateTypes, ReplicationEventType
+from migration_tool.utils import create_relationship
+
+N_EVENTS = 200
+N_RELATIONSHIPS = 2000
+
+logger = logging.getLogger(__name__)
+
+
+def _outbox(i):
+    """Return an outbox event."""
+    return Outbox(
+        aggregatetype=AggregateTypes.RELATIONS,
+        aggregateid="perf-test",
+        event_type=ReplicationEventType.ADD_PRINCIPALS_TO_GROUP,
+        payload={"relations_to_add": [{"relation": f"member{i}"}], "relations_to_remove": []},
+        route=AggregateTypes.RELATIONS.value,
+    )
+
+
+def _log_all(log, events):
+    """Log the events, rolling them back so that they are never replicated."""
+    with transaction.atomic():
+        for event in events:
+            log.log(event)
+        transaction.set_rollback(True)
+
+
+def test_outbox_logical_message(n_events=N_EVENTS):
+    """Compare logging outbox events as rows of the outbox table and as logical decoding messages."""
+    events = [_outbox(i) for i in range(n_events)]
+    print(f"Logging {n_events} outbox events...")
+
+    for mode in ("table", "message"):
+        log_time = min(timeit.repeat(lambda: _log_all(OUTBOX_LOGS[mode], events), number=1, repeat=3))
+        logger.info(f"Test: Outbox Log ({mode})")
+        logger.info(f"Number of events: {n_events}")
+        logger.info(f"Log time: {log_time} seconds")
+        print(f"Outbox Log ({mode}): {log_time} seconds")
+
+
+def test_relationship_encoding(n_relationships=N_RELATIONSHIPS):
+    """Compare encoding the relationships of a bulk event with json_format.MessageToDict and relationship_to_dict."""
+    relationships = [
+        create_relationship(("rbac", "group"), str(i), ("rbac", "principal"), f"localhost/p{i}", "member")
+        for i in range(n_relationships)
+    ]
+    print(f"Encoding {n_relationships} relationships...")
+
+    for name, encode in (("MessageToDict", json_format.MessageToDict), ("relationship_to_dict", relationship_to_dict)):
+        encode_time = min(timeit.repeat(lambda: [encode(r) for r in relationships], number=1, repeat=5))
+        logger.info(f"Test: Relationship Encoding ({name})")
+        logger.info(f"Number of relationships: {n_relationships}")
+        logger.info(f"Encoding time: {encode_time} seconds")
+        print(f"Relationship Encoding ({name}): {encode_time} seconds")
@@ -292,3 +292,31 @@ def test_full_sync():
     request_time, average = timerStop(start, num_requests)
 
     write_to_logger(logger, name, "", num_requests, request_time, average)
+
+
+def test_paged_sync():
+    """Test walking every group and role of every tenant page by page, with offsets and with cursors."""
+    tenants = Tenant.objects.filter(Q(group__system=False) | Q(role__system=False)).distinct()
+
+    def walk(url):
+        requests = 0
+        while url:
+            response = client.get(url, **identity.META, follow=True)
+            if response.status_code != status.HTTP_200_OK:
+                raise Exception(f"Received an error status {response.status_code}\n")
+            requests += 1
+            url = response.data["links"]["next"]
+        return requests
+
+    for name, params in (("Paged Sync (offset)", "limit=10"), ("Paged Sync (cursor)", "cursor=&count=false&limit=10")):
+        start = timerStart(name)
+        num_requests = 0
+        for t in tenants:
+            for resource in ("groups", "roles"):
+                num_requests += walk(
+                    f"/_private/api/v1/integrations/tenant/{t.org_id}/{resource}/?external_tenant=ocm&{params}"
+                )
+        request_time, average = timerStop(start, num_requests)
+        write_to_logger(
+            logger, name, "/api/v1/integrations/tenant/{org_id}/{groups,roles}/", num_requests, request_time, average
+        )
@@ -137,16 +137,16 @@ def tearDown():
 # ------------------------
 # Identity builder helpers
 # ------------------------
-def build_identity():
+def build_identity(org_id="11111", username="user_dev", is_org_admin=True):
     """Build identity."""
     identity = {
         "identity": {
             "account_number": "10001",
-            "org_id": "11111",
+            "org_id": org_id,
             "user": {
-                "username": "user_dev",
-                "email": "user_dev@foo.com",
-                "is_org_admin": True,
+                "username": username,
+                "email": f"{username}@foo.com",
+                "is_org_admin": is_org_admin,
                 "is_internal": True,
                 "user_id": "51736777",
             },
@@ -15,13 +15,24 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Test the caching system."""
-import pickle
+import json
 from unittest import skipIf
-from unittest.mock import call, patch
+from unittest.mock import Mock, call, patch
 
 from django.conf import settings
-from django.test import TestCase
-from management.cache import TenantCache
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from redis import exceptions
+from management.cache import (
+    INVALIDATION_COLLECTOR,
+    AccessCache,
+    LocalCache,
+    LocalCacheInvalidator,
+    PrincipalCache,
+    RedisCircuitBreaker,
+    TenantCache,
+)
 from management.models import Access, Group, Permission, Policy, Principal, ResourceDefinition, Role
 
 from api.models import Tenant
@@ -41,6 +52,11 @@ class AccessCacheTest(TestCase):
     def setUp(self):
         """Set up AccessCache tests."""
         super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_objects()
+
+    def create_objects(self):
+        """Create the objects for the tests."""
         self.principal_a = Principal.objects.create(username="principal_a", tenant=self.tenant)
         self.principal_b = Principal.objects.create(username="principal_b", tenant=self.tenant)
         self.group_a = Group.objects.create(name="group_a", platform_default=True, tenant=self.tenant)
@@ -55,195 +71,346 @@ class AccessCacheTest(TestCase):
         self.tenant.delete()
         super().tearDownClass()
 
-    @patch("management.group.model.AccessCache.delete_policy")
-    def test_group_cache_add_remove_signals(self, cache):
-        """Test signals attached to Groups"""
-        cache.reset_mock()
+    def assertInvalidated(self, delete_policies, *principals):
+        """Assert the policies of exactly the given principals were purged, in a single call."""
+        delete_policies.assert_called_once_with({principal.uuid for principal in principals})
+        delete_policies.reset_mock()
 
+    @patch("management.cache.AccessCache.delete_policies")
+    def test_group_cache_add_remove_signals(self, delete_policies):
+        """Test signals attached to Groups"""
         # If a Principal is added to a group
-        self.group_a.principals.add(self.principal_a)
-
-        cache.assert_called_once()
-        cache.assert_called_once_with(self.principal_a.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group_b.principals.add(self.principal_a)
+        self.assertInvalidated(delete_policies, self.principal_a)
 
-        cache.reset_mock()
         # If a Group is added to a Principal
-        self.principal_b.group.add(self.group_a)
-        cache.asset_called_once()
-        cache.asset_called_once_with(self.principal_b.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.principal_b.group.add(self.group_b)
+        self.assertInvalidated(delete_policies, self.principal_b)
 
-        cache.reset_mock()
         # If a Principal is removed from a group
-        self.group_a.principals.remove(self.principal_a)
-        cache.assert_called_once()
-        cache.assert_called_once_with(self.principal_a.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group_b.principals.remove(self.principal_a)
+        self.assertInvalidated(delete_policies, self.principal_a)
 
-        cache.reset_mock()
         # If a Group is removed from a Principal
-        self.principal_b.group.remove(self.group_a)
-        cache.asset_called_once()
-        cache.asset_called_once_with(self.principal_b.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.principal_b.group.remove(self.group_b)
+        self.assertInvalidated(delete_policies, self.principal_b)
+
+    @patch("management.cache.AccessCache.delete_policies")
+    def test_group_cache_clear_signals(self, delete_policies):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group_a.principals.add(self.principal_a, self.principal_b)
+        delete_policies.reset_mock()
 
-    @patch("management.group.model.AccessCache.delete_policy")
-    def test_group_cache_clear_signals(self, cache):
         # If all groups are removed from a Principal
-        self.group_a.principals.add(self.principal_a, self.principal_b)
-        cache.reset_mock()
-        self.principal_a.group.clear()
-        cache.assert_called_once()
-        cache.assert_called_once_with(self.principal_a.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.principal_a.group.clear()
+        self.assertInvalidated(delete_policies, self.principal_a)
 
-        cache.reset_mock()
         # If all Principals are removed from a Group
-        self.group_a.principals.clear()
-        cache.asset_called_once()
-        cache.asset_called_once_with(self.principal_b.uuid)
-
-    @patch("management.group.model.AccessCache.delete_policy")
-    def test_group_cache_delete_group_signal(self, cache):
-        self.group_a.principals.add(self.principal_a)
-        cache.reset_mock()
-        self.group_a.delete()
-        cache.assert_called_once()
-        cache.assert_called_once_with(self.principal_a.uuid)
-
-    @patch("management.policy.model.AccessCache.delete_all_policies_for_tenant")
-    @patch("management.policy.model.AccessCache.delete_policy")
-    def test_policy_cache_group_signals(self, cache_delete, cache_delete_all):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group_a.principals.clear()
+        self.assertInvalidated(delete_policies, self.principal_b)
+
+    @patch("management.cache.AccessCache.delete_policies")
+    def test_group_cache_delete_group_signal(self, delete_policies):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group_a.principals.add(self.principal_a)
+        delete_policies.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group_a.delete()
+        self.assertInvalidated(delete_policies, self.principal_a)
+
+    @patch("management.cache.AccessCache.delete_all_policies_for_tenant")
+    @patch("management.cache.AccessCache.delete_policies")
+    def test_policy_cache_group_signals(self, delete_policies, delete_all):
         """Test signals attached to Groups"""
-        self.group_a.principals.add(self.principal_a)
-        self.group_b.principals.add(self.principal_b)
-        cache_delete.reset_mock()
-
-        # If a policy has its group set
-        self.policy_a.group = self.group_a
-        self.policy_a.save()
-        cache_delete_all.asset_called_once()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group_a.principals.add(self.principal_a)
+            self.group_b.principals.add(self.principal_b)
+        delete_policies.reset_mock()
+
+        # If a policy has its group set to the platform default group
+        with self.captureOnCommitCallbacks(execute=True):
+            self.policy_a.group = self.group_a
+            self.policy_a.save()
+        delete_all.assert_called_once()
+        delete_policies.assert_not_called()
 
-        cache_delete.reset_mock()
         # If a policy has its group changed
-        self.policy_a.group = self.group_b
-        self.policy_a.save()
-        cache_delete.asset_called_once()
-        cache_delete.asset_called_once_with(self.principal_b.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.policy_b.group = self.group_b
+            self.policy_b.save()
+        self.assertInvalidated(delete_policies, self.principal_b)
 
-        cache_delete.reset_mock()
         # If a policy is deleted
-        self.policy_a.delete()
-        cache_delete.assert_called_once()
-        cache_delete.assert_called_once_with(self.principal_b.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.policy_b.delete()
+        self.assertInvalidated(delete_policies, self.principal_b)
 
-    @patch("management.policy.model.AccessCache.delete_all_policies_for_tenant")
-    @patch("management.policy.model.AccessCache.delete_policy")
-    def test_policy_cache_add_remove_roles_signals(self, cache_delete, cache_delete_all):
+    @patch("management.cache.AccessCache.delete_all_policies_for_tenant")
+    @patch("management.cache.AccessCache.delete_policies")
+    def test_policy_cache_add_remove_roles_signals(self, delete_policies, delete_all):
         """Test signals attached to Policy/Roles"""
-        self.group_b.principals.add(self.principal_b)
-        self.policy_a.group = self.group_a
-        self.policy_a.save()
-        self.policy_b.group = self.group_b
-        self.policy_b.save()
-        cache_delete.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group_b.principals.add(self.principal_b)
+            self.policy_a.group = self.group_a
+            self.policy_a.save()
+            self.policy_b.group = self.group_b
+            self.policy_b.save()
+        delete_policies.reset_mock()
+        delete_all.reset_mock()
 
         # If a Role is added to a platform default group's Policy
-        self.policy_a.roles.add(self.role_a)
-        self.policy_a.save()
-        cache_delete_all.asset_called_once()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.policy_a.roles.add(self.role_a)
+        delete_all.assert_called_once()
+        delete_all.reset_mock()
 
-        cache_delete.reset_mock()
         # If a Policy is added to a Role
-        self.role_b.policies.add(self.policy_a)
-        cache_delete.asset_called_once()
-        cache_delete.asset_called_once_with(self.principal_b.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role_b.policies.add(self.policy_b)
+        self.assertInvalidated(delete_policies, self.principal_b)
 
-        cache_delete.reset_mock()
         # If a Role is removed from a platform default group's Policy
-        self.policy_a.roles.remove(self.role_a)
-        self.policy_a.save()
-        cache_delete_all.asset_called_once()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.policy_a.roles.remove(self.role_a)
+        delete_all.assert_called_once()
 
-        cache_delete.reset_mock()
-        # If a Role is removed from a Policy
-        self.policy_b.roles.remove(self.role_b)
-        cache_delete.assert_called_once()
-        cache_delete.assert_called_once_with(self.principal_b.uuid)
-
-        cache_delete.reset_mock()
         # If a Policy is removed from a Role
-        self.role_b.policies.remove(self.policy_b)
-        cache_delete.asset_called_once()
-        cache_delete.asset_called_once_with(self.principal_b.uuid)
-
-    @patch("management.policy.model.AccessCache.delete_policy")
-    def test_policy_cache_clear_signals(self, cache):
-        self.group_a.principals.add(self.principal_a)
-        self.group_b.principals.add(self.principal_b)
-        self.policy_a.group = self.group_a
-        self.policy_a.save()
-        self.policy_b.group = self.group_b
-        self.policy_b.save()
-        self.policy_a.roles.add(self.role_a)
-        self.policy_b.roles.add(self.role_b)
-        cache.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role_b.policies.remove(self.policy_b)
+        self.assertInvalidated(delete_policies, self.principal_b)
+
+    @patch("management.cache.AccessCache.delete_policies")
+    def test_policy_cache_clear_signals(self, delete_policies):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group_b.principals.add(self.principal_a)
+            self.policy_a.group = self.group_b
+            self.policy_a.save()
+            self.policy_a.roles.add(self.role_a)
+        delete_policies.reset_mock()
 
         # If all policies are removed from a role
-        self.role_a.policies.clear()
-        cache.assert_called_once()
-        cache.assert_called_once_with(self.principal_a.uuid)
-
-        cache.reset_mock()
-        # If all Roles are removed from a Policy
-        self.policy_b.roles.clear()
-        cache.asset_called_once()
-        cache.asset_called_once_with(self.principal_b.uuid)
-
-    @patch("management.role.model.AccessCache.delete_policy")
-    def test_policy_cache_change_delete_roles_signals(self, cache):
-        self.group_a.principals.add(self.principal_a)
-        self.group_b.principals.add(self.principal_b)
-        self.policy_a.group = self.group_a
-        self.policy_a.save()
-        self.policy_b.group = self.group_b
-        self.policy_b.save()
-        self.policy_a.roles.add(self.role_a)
-        self.policy_b.roles.add(self.role_b)
-        cache.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role_a.policies.clear()
+        self.assertInvalidated(delete_policies, self.principal_a)
+
+    @patch("management.cache.AccessCache.delete_policies")
+    def test_policy_cache_change_delete_roles_signals(self, delete_policies):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group_b.principals.add(self.principal_a)
+            self.policy_a.group = self.group_b
+            self.policy_a.save()
+            self.policy_a.roles.add(self.role_a)
+            self.permission = Permission.objects.create(permission="foo:*:*", tenant=self.tenant)
+        delete_policies.reset_mock()
 
         # If a role is changed
-        self.role_a.version += 1
-        self.role_a.save()
-        cache.assert_called_once()
-        cache.assert_called_once_with(self.principal_a.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role_a.version += 1
+            self.role_a.save()
+        self.assertInvalidated(delete_policies, self.principal_a)
 
-        cache.reset_mock()
         # If Access is added
-        self.permission = Permission.objects.create(permission="foo:*:*", tenant=self.tenant)
-        self.access_a = Access.objects.create(permission=self.permission, role=self.role_a, tenant=self.tenant)
-        cache.assert_called_once()
-        cache.assert_called_once_with(self.principal_a.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.access_a = Access.objects.create(permission=self.permission, role=self.role_a, tenant=self.tenant)
+        self.assertInvalidated(delete_policies, self.principal_a)
 
-        cache.reset_mock()
         # If ResourceDefinition is added
-        self.rd_a = ResourceDefinition.objects.create(access=self.access_a, tenant=self.tenant)
-        cache.assert_called_once()
-        cache.assert_called_once_with(self.principal_a.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rd_a = ResourceDefinition.objects.create(access=self.access_a, tenant=self.tenant)
+        self.assertInvalidated(delete_policies, self.principal_a)
 
-        cache.reset_mock()
         # If ResourceDefinition is destroyed
-        self.rd_a.delete()
-        cache.assert_called_once()
-        cache.assert_called_once_with(self.principal_a.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rd_a.delete()
+        self.assertInvalidated(delete_policies, self.principal_a)
 
-        cache.reset_mock()
         # If Access is destroyed
-        self.access_a.delete()
-        cache.assert_called_once()
-        cache.assert_called_once_with(self.principal_a.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.access_a.delete()
+        self.assertInvalidated(delete_policies, self.principal_a)
 
-        cache.reset_mock()
         # If Role is destroyed
-        self.role_a.delete()
-        cache.assert_called_once()
-        cache.assert_called_once_with(self.principal_a.uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role_a.delete()
+        self.assertInvalidated(delete_policies, self.principal_a)
+
+    @patch("management.cache.AccessCache.delete_policies")
+    def test_role_update_is_coalesced(self, delete_policies):
+        """Test a role update touching many objects resolves its principals once and purges them once."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group_b.principals.add(self.principal_a, self.principal_b)
+            self.policy_a.group = self.group_b
+            self.policy_a.save()
+            self.policy_a.roles.add(self.role_a)
+            permissions = [
+                Permission.objects.create(permission=f"foo:bar{i}:read", tenant=self.tenant) for i in range(5)
+            ]
+        delete_policies.reset_mock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as context:
+                self.role_a.save()
+                for permission in permissions:
+                    access = Access.objects.create(permission=permission, role=self.role_a, tenant=self.tenant)
+                    ResourceDefinition.objects.create(access=access, tenant=self.tenant)
+        principal_lookups = [
+            query for query in context.captured_queries if 'FROM "management_principal"' in query["sql"]
+        ]
+        self.assertEqual(len(principal_lookups), 1)
+        self.assertInvalidated(delete_policies, self.principal_a, self.principal_b)
+
+    @patch("management.cache.AccessCache.connection")
+    def test_delete_policies_unlinks_in_one_pipeline(self, redis_connection):
+        """Test the policies of several principals are purged with a single pipelined UNLINK."""
+        redis_connection.mget.return_value = [b"1", b"2"]
+        cache = AccessCache(self.tenant.org_id)
+        cache.delete_policies([self.principal_a.uuid, self.principal_b.uuid])
+        redis_connection.pipeline.assert_called_once_with(transaction=False)
+        pipeline = redis_connection.pipeline.return_value
+        pipeline.unlink.assert_called_once_with(
+            cache.key_for(self.principal_a.uuid), cache.key_for(self.principal_b.uuid)
+        )
+        pipeline.execute.assert_called_once()
+
+    @patch("management.cache.AccessCache.connection")
+    def test_policy_keys_embed_generation(self, redis_connection):
+        """Test policy keys embed the global and tenant generations, read once per cache instance."""
+        redis_connection.mget.return_value = [b"5", b"7"]
+        cache = AccessCache(self.tenant.org_id)
+        self.assertEqual(
+            cache.key_for("uuid"), f"rbac::policy::tenant={self.tenant.org_id}::generation=5.7::user=uuid"
+        )
+        cache.key_for("other")
+        redis_connection.mget.assert_called_once_with(
+            ["rbac::policy::generation::tenant=*", f"rbac::policy::generation::tenant={self.tenant.org_id}"]
+        )
+
+    @patch("management.cache.REDIS_CIRCUIT_BREAKER", new_callable=lambda: RedisCircuitBreaker(3, 10))
+    @patch("management.cache.AccessCache.connection")
+    def test_policy_read_resolves_generation(self, redis_connection, breaker):
+        """Test a policy is read from the hash of the current generation, which is kept for later writes."""
+        redis_connection.mget.return_value = [b"5", b"7"]
+        redis_connection.hmget.return_value = [AccessCache(self.tenant.org_id).encode({"app": "read"})]
+        cache = AccessCache(self.tenant.org_id)
+
+        self.assertEqual(cache.get_access_map("uuid"), {"app": "read"})
+
+        redis_connection.hmget.assert_called_once_with(
+            f"rbac::policy::tenant={self.tenant.org_id}::generation=5.7::user=uuid", [AccessCache.ACCESS_MAP_SUB_KEY]
+        )
+        redis_connection.register_script.assert_not_called()
+        cache.key_for("uuid")
+        redis_connection.mget.assert_called_once()
+
+    @patch("management.cache.AccessCache.connection")
+    def test_missing_generation_is_seeded(self, redis_connection):
+        """Test a missing generation counter is seeded before use."""
+        redis_connection.mget.return_value = [b"5", None]
+        pipe = redis_connection.pipeline.return_value.__enter__.return_value
+        pipe.execute.return_value = [False, True, [b"5", b"1700000000"]]
+        cache = AccessCache(self.tenant.org_id)
+        self.assertEqual(cache.generation, "5.1700000000")
+        self.assertEqual(pipe.set.call_count, 2)
+        self.assertTrue(all(call.kwargs == {"nx": True} for call in pipe.set.call_args_list))
+
+    @patch("management.cache.AccessCache.connection")
+    def test_delete_all_policies_bumps_generation(self, redis_connection):
+        """Test a tenant is invalidated by bumping its generation instead of scanning its keys."""
+        redis_connection.mget.side_effect = [[b"5", b"7"], [b"5", b"8"]]
+        pipe = redis_connection.pipeline.return_value.__enter__.return_value
+        cache = AccessCache(self.tenant.org_id)
+        old_key = cache.key_for("uuid")
+
+        cache.delete_all_policies_for_tenant()
+
+        generation_key = f"rbac::policy::generation::tenant={self.tenant.org_id}"
+        pipe.set.assert_called_once()
+        self.assertEqual(pipe.set.call_args.args[0], generation_key)
+        pipe.incr.assert_called_once_with(generation_key)
+        redis_connection.scan_iter.assert_not_called()
+        self.assertNotEqual(cache.key_for("uuid"), old_key)
+
+    @patch("management.cache.AccessCache.connection")
+    def test_delete_all_policies_for_all_tenants(self, redis_connection):
+        """Test invalidating every tenant bumps the global generation."""
+        pipe = redis_connection.pipeline.return_value.__enter__.return_value
+        AccessCache("*").delete_all_policies_for_tenant()
+        pipe.incr.assert_called_once_with("rbac::policy::generation::tenant=*")
+
+    @patch("management.cache.REDIS_CIRCUIT_BREAKER", new_callable=lambda: RedisCircuitBreaker(3, 10))
+    @patch("management.cache.AccessCache.connection")
+    def test_access_partitioned_by_application(self, redis_connection, breaker):
+        """Test access is saved per application, and read back for any set of applications in canonical order."""
+        fields = {}
+        redis_connection.mget.return_value = [b"1", b"1"]
+        redis_connection.pipeline.return_value.__enter__.return_value.hset.side_effect = (
+            lambda key, mapping: fields.update(mapping)
+        )
+        redis_connection.hmget.side_effect = lambda key, names: [fields.get(name) for name in names]
+        cache = AccessCache(self.tenant.org_id)
+        ranked_items = [
+            (1, {"permission": "app:a:read", "resourceDefinitions": []}),
+            (2, {"permission": "other:b:read", "resourceDefinitions": []}),
+            (3, {"permission": "app:c:write", "resourceDefinitions": []}),
+        ]
+
+        self.assertIsNone(cache.get_access_index("uuid", [""]))
+        cache.save_access("uuid", [""], ranked_items)
+        entries = cache.get_access_index("uuid", [""])
+        self.assertEqual(
+            entries, [("app", 0, 1, "app:a:read"), ("other", 0, 2, "other:b:read"), ("app", 1, 3, "app:c:write")]
+        )
+        self.assertEqual(cache.get_access_items("uuid", entries[1:]), [item for _, item in ranked_items[1:]])
+        self.assertEqual(cache.get_access_index("uuid", ["other"]), [("other", 0, 2, "other:b:read")])
+
+        # Applications without any access are cached as such, but do not complete other sets of applications
+        cache.save_access("uuid", ["unused"], [])
+        self.assertEqual(cache.get_access_index("uuid", ["unused"]), [])
+        self.assertIsNone(cache.get_access_index("uuid", ["unused", "missing"]))
+
+        # Items which are gone are reported as missing
+        del fields["rbac::access::item::app=app::1"]
+        self.assertIsNone(cache.get_access_items("uuid", entries))
+
+    @patch("management.cache.AccessCache.delete_policies")
+    def test_rolled_back_changes_are_not_purged(self, delete_policies):
+        """Test invalidations collected in a transaction which rolls back are dropped."""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.group_b.principals.add(self.principal_a)
+                    raise IntegrityError()
+            except IntegrityError:
+                pass
+            self.group_b.principals.add(self.principal_b)
+        self.assertInvalidated(delete_policies, self.principal_b)
+
+    @patch("management.cache.AccessCache.delete_policies")
+    def test_flushed_batch_is_not_reused(self, delete_policies):
+        """Test invalidations collected once a batch was purged are collected in a new batch, and purged once."""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.group_b.principals.add(self.principal_a)
+        self.assertInvalidated(delete_policies, self.principal_a)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group_b.principals.add(self.principal_b)
+        self.assertInvalidated(delete_policies, self.principal_b)
+
+        callbacks[0]()
+        delete_policies.assert_not_called()
+
+    @patch("management.cache.AccessCache.delete_policies")
+    def test_autocommit_purges_immediately(self, delete_policies):
+        """Test invalidations outside of a transaction are purged right away."""
+        with patch("core.utils.transaction.get_connection") as get_connection:
+            get_connection.return_value.in_atomic_block = False
+            INVALIDATION_COLLECTOR.add_principals(self.tenant.org_id, [self.principal_a.uuid])
+        delete_policies.assert_called_once_with([self.principal_a.uuid])
 
 
 class TenantCacheTest(TestCase):
@@ -258,13 +425,13 @@ class TenantCacheTest(TestCase):
         self.tenant.delete()
         super().tearDownClass()
 
+    @patch("management.cache.REDIS_CIRCUIT_BREAKER", new_callable=lambda: RedisCircuitBreaker(3, 10))
     @patch("management.cache.TenantCache.connection")
-    @patch("management.cache.BasicCache.redis_health_check")
-    def test_tenant_cache_functions_success(self, redis_health_check, redis_connection):
+    def test_tenant_cache_functions_success(self, redis_connection, breaker):
         tenant_name = self.tenant.tenant_name
         tenant_org_id = self.tenant.org_id
         key = f"rbac::tenant::tenant={tenant_org_id}"
-        dump_content = pickle.dumps(self.tenant)
+        dump_content = TenantCache().encode(self.tenant)
 
         # Save tenant to cache
         tenant_cache = TenantCache()
@@ -272,33 +439,211 @@ class TenantCacheTest(TestCase):
         self.assertTrue(call().__enter__().set(key, dump_content) in redis_connection.pipeline.mock_calls)
 
         redis_connection.get.return_value = dump_content
-        redis_health_check.return_value = True
         # Get tenant from cache
         tenant = tenant_cache.get_tenant(tenant_org_id)
-        redis_health_check.assert_called_once()
         redis_connection.get.assert_called_once_with(key)
         self.assertEqual(tenant, self.tenant)
 
         # Delete tenant from cache
         tenant_cache.delete_tenant(tenant_org_id)
         redis_connection.delete.assert_called_once_with(key)
+        self.assertEqual(breaker.state, RedisCircuitBreaker.CLOSED)
 
+    @patch("management.cache.REDIS_CIRCUIT_BREAKER", new_callable=lambda: RedisCircuitBreaker(3, 10))
     @patch("management.cache.TenantCache.connection")
-    @patch("management.cache.BasicCache.redis_health_check")
-    def test_tenant_cache_functions_failure(self, redis_health_check, redis_connection):
-        tenant_name = self.tenant.tenant_name
+    def test_tenant_cache_functions_failure(self, redis_connection, breaker):
         tenant_org_id = self.tenant.org_id
         key = f"rbac::tenant::tenant={tenant_org_id}"
-        dump_content = pickle.dumps(self.tenant)
-
-        # Save tenant to cache
         tenant_cache = TenantCache()
+
+        # Redis errors are swallowed until the breaker opens, after which Redis is not called at all
+        redis_connection.get.side_effect = exceptions.ConnectionError()
+        for _ in range(3):
+            self.assertIsNone(tenant_cache.get_tenant(tenant_org_id))
+        self.assertEqual(breaker.state, RedisCircuitBreaker.OPEN)
+        self.assertEqual(redis_connection.get.call_count, 3)
+
+        self.assertIsNone(tenant_cache.get_tenant(tenant_org_id))
         tenant_cache.save_tenant(self.tenant)
-        self.assertTrue(call().__enter__().set(key, dump_content) in redis_connection.pipeline.mock_calls)
+        self.assertEqual(redis_connection.get.call_count, 3)
+        redis_connection.pipeline.assert_not_called()
 
-        redis_connection.get.return_value = dump_content
-        redis_health_check.return_value = False
-        # Get tenant from cache (should fail because redis_health_check failed)
-        tenant = tenant_cache.get_tenant(tenant_org_id)
-        redis_health_check.assert_called_once()
-        self.assertNotEqual(tenant, self.tenant)
+        # Invalidations are still attempted while the breaker is open
+        redis_connection.delete.side_effect = exceptions.ConnectionError()
+        tenant_cache.delete_tenant(tenant_org_id)
+        redis_connection.delete.assert_called_once_with(key)
+
+    @patch("management.cache.REDIS_CIRCUIT_BREAKER", new_callable=lambda: RedisCircuitBreaker(3, 10))
+    @patch("management.cache.TenantCache.connection")
+    def test_legacy_entries_are_misses(self, redis_connection, breaker):
+        """Test entries written before the codecs are ignored rather than unpickled."""
+        redis_connection.get.return_value = b"\x80\x04legacy pickle"
+        self.assertIsNone(TenantCache().get_tenant(self.tenant.org_id))
+        self.assertEqual(breaker.state, RedisCircuitBreaker.CLOSED)
+
+
+class RedisCircuitBreakerTest(TestCase):
+    """Test the circuit breaker guarding the Redis caches."""
+
+    @patch("management.cache.time.monotonic")
+    def test_breaker_opens_and_recovers(self, monotonic):
+        """Test the breaker opens after consecutive failures and closes after a successful probe."""
+        monotonic.return_value = 100.0
+        breaker = RedisCircuitBreaker(failure_threshold=2, reset_timeout=10)
+        self.assertTrue(breaker.allow_request())
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, RedisCircuitBreaker.CLOSED)
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, RedisCircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, RedisCircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+
+        # A single probe is let through once the timeout elapses
+        monotonic.return_value = 110.0
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.state, RedisCircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow_request())
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, RedisCircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow_request())
+
+    @patch("management.cache.time.monotonic")
+    def test_failed_probe_reopens(self, monotonic):
+        """Test a failed probe opens the breaker for another timeout."""
+        monotonic.return_value = 100.0
+        breaker = RedisCircuitBreaker(failure_threshold=1, reset_timeout=10)
+        breaker.record_failure()
+
+        monotonic.return_value = 111.0
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, RedisCircuitBreaker.OPEN)
+
+        monotonic.return_value = 120.0
+        self.assertFalse(breaker.allow_request())
+        monotonic.return_value = 121.0
+        self.assertTrue(breaker.allow_request())
+
+
+class LocalCacheTest(TestCase):
+    """Test the in-process cache tier."""
+
+    @patch("management.cache.time.monotonic")
+    def test_lru_eviction_and_expiry(self, monotonic):
+        """Test entries are bounded by size and lifetime."""
+        monotonic.return_value = 100.0
+        local_cache = LocalCache("test", max_size=2, lifetime=10)
+        local_cache.set("a", {"value": 1})
+        local_cache.set("b", {"value": 2})
+        self.assertEqual(local_cache.get("a"), {"value": 1})
+
+        # "b" is the least recently used entry
+        local_cache.set("c", {"value": 3})
+        self.assertIsNone(local_cache.get("b"))
+        self.assertEqual(local_cache.get("c"), {"value": 3})
+
+        monotonic.return_value = 111.0
+        self.assertIsNone(local_cache.get("a"))
+
+    def test_entries_are_copies(self):
+        """Test callers never share the cached object."""
+        local_cache = LocalCache("test", max_size=2, lifetime=10)
+        item = {"value": 1}
+        local_cache.set("a", item)
+        item["value"] = 2
+        cached = local_cache.get("a")
+        cached["value"] = 3
+        self.assertEqual(local_cache.get("a"), {"value": 1})
+
+
+@override_settings(LOCAL_CACHE_ENABLED=True)
+@patch("management.cache.REDIS_CIRCUIT_BREAKER", new_callable=lambda: RedisCircuitBreaker(3, 10))
+class TwoTierCacheTest(TestCase):
+    """Test the in-process tier in front of the Redis tenant and principal caches."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up the tenant."""
+        super().setUpClass()
+        cls.tenant = Tenant.objects.create(tenant_name="acct24680", org_id="24680")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tenant.delete()
+        super().tearDownClass()
+
+    def setUp(self):
+        """Give every test its own local tiers, without the pub/sub listener thread."""
+        super().setUp()
+        self.invalidator = LocalCacheInvalidator()
+        for patcher in (
+            patch("management.cache.LOCAL_CACHE_INVALIDATOR", new=self.invalidator),
+            patch("management.cache.threading.Thread"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @patch("management.cache.Redis")
+    @patch("management.cache.TenantCache.connection")
+    def test_tenant_served_from_local_tier(self, redis_connection, redis, breaker):
+        """Test a tenant read from Redis is served locally afterwards, until it is deleted."""
+        redis_connection.get.return_value = TenantCache().encode(self.tenant)
+        tenant_cache = TenantCache()
+
+        self.assertEqual(tenant_cache.get_tenant(self.tenant.org_id), self.tenant)
+        self.assertEqual(tenant_cache.get_tenant(self.tenant.org_id), self.tenant)
+        redis_connection.get.assert_called_once()
+
+        # Deleting drops the local entry and tells the other workers to do the same
+        tenant_cache.delete_tenant(self.tenant.org_id)
+        redis().publish.assert_called_once_with(
+            "rbac::cache::invalidate",
+            json.dumps({"cache": "tenant", "key": self.tenant.org_id, "origin": self.invalidator._origin}),
+        )
+        tenant_cache.get_tenant(self.tenant.org_id)
+        self.assertEqual(redis_connection.get.call_count, 2)
+
+    @patch("management.cache.Redis")
+    @patch("management.cache.PrincipalCache.connection")
+    def test_principal_saved_to_local_tier(self, redis_connection, redis, breaker):
+        """Test a cached principal does not need Redis to be read back, and other workers drop their copy."""
+        principal = Principal(username="local_user", tenant=self.tenant)
+        principal_cache = PrincipalCache()
+        principal_cache.cache_principal(self.tenant.org_id, principal)
+
+        cached = principal_cache.get_principal(self.tenant.org_id, "local_user")
+        self.assertEqual(cached.username, "local_user")
+        redis_connection.get.assert_not_called()
+        key = principal_cache.key_for(self.tenant.org_id, "local_user")
+        redis().publish.assert_called_once_with(
+            "rbac::cache::invalidate",
+            json.dumps({"cache": "principal", "key": key, "origin": self.invalidator._origin}),
+        )
+
+    @patch("management.cache.Redis")
+    def test_listener_skips_own_invalidations(self, redis, breaker):
+        """Test a worker keeps the entries it saved itself when its own invalidation comes back."""
+
+        class Stop(BaseException):
+            pass
+
+        local_cache = self.invalidator.local_cache("tenant")
+
+        def listen():
+            local_cache.set("own", self.tenant)
+            local_cache.set("other", self.tenant)
+            for key, origin in (("own", self.invalidator._origin), ("other", "another-worker")):
+                yield {"data": json.dumps({"cache": "tenant", "key": key, "origin": origin})}
+
+        pubsub = Mock()
+        pubsub.listen.side_effect = listen
+        redis().pubsub.side_effect = [pubsub, Stop()]
+        with self.assertRaises(Stop):
+            self.invalidator._listen()
+
+        self.assertEqual(local_cache.get("own"), self.tenant)
+        self.assertIsNone(local_cache.get("other"))
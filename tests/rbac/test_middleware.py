@@ -247,6 +247,42 @@ class IdentityHeaderMiddlewareTest(IdentityRequest):
         self.assertIsNotNone(tenant)
         self.assertTrue(tenant.ready)
 
+    @patch("rbac.middleware.IdentityHeaderMiddleware._get_access_for_user", return_value={})
+    @patch("rbac.middleware.resolve")
+    def test_process_resolves_tenant_once(self, mock_resolve, get_access_for_user):
+        """Test that loading the user permissions and setting request.tenant share a single tenant lookup."""
+        request = self._create_request_context(self.customer, self.user_data, is_org_admin=False)["request"]
+        request.path = "/api/v1/providers/"
+        request.method = "GET"
+        middleware = IdentityHeaderMiddleware(get_response=Mock())
+
+        with patch.object(middleware, "get_tenant", wraps=middleware.get_tenant) as get_tenant:
+            middleware(request)
+
+        get_tenant.assert_called_once()
+        tenant = Tenant.objects.get(org_id=self.org_id)
+        self.assertEqual(request.tenant, tenant)
+        get_access_for_user.assert_called_once_with(self.user_data["username"], tenant)
+
+    @patch("management.cache.AccessCache.get_access_map", return_value={})
+    @patch("rbac.middleware.resolve")
+    def test_process_queries_with_cached_tenant(self, mock_resolve, get_access_map):
+        """Test a request of a non org admin only queries its principal when the tenant and its access are cached."""
+        request = self._create_request_context(self.customer, self.user_data, is_org_admin=False)["request"]
+        request.path = "/api/v1/providers/"
+        request.method = "GET"
+        middleware = IdentityHeaderMiddleware(get_response=Mock())
+        tenant = Tenant.objects.create(
+            tenant_name=self.tenant_name, account_id=self.customer["account_id"], org_id=self.org_id, ready=True
+        )
+        Principal.objects.create(username=self.user_data["username"], tenant=tenant)
+
+        with patch("rbac.middleware.TENANTS.get_tenant", return_value=tenant), self.assertNumQueries(1):
+            middleware(request)
+
+        self.assertEqual(request.tenant, tenant)
+        get_access_map.assert_called_once()
+
     @patch("rbac.middleware.resolve")
     @override_settings(SYSTEM_USERS={"testuser": {}})
     def test_process_ignores_system_user_jwt_if_identity_header(self, mock_resolve):
@@ -989,6 +1025,52 @@ class AccessHandlingTest(TestCase):
         }
         self.assertEqual(expected, access)
 
+    def test_principal_with_access_from_default_group(self):
+        """Test a user gets the access granted through the platform default group."""
+        Principal.objects.create(username="test_user", tenant=self.tenant)
+        group = Group.objects.create(name="default", platform_default=True, system=True, tenant=self.tenant)
+        role = Role.objects.create(name="role1", tenant=self.tenant)
+        perm = Permission.objects.create(permission="rbac:principal:read", tenant=self.tenant)
+        Access.objects.create(permission=perm, role=role, tenant=self.tenant)
+        policy = Policy.objects.create(name="policy1", group=group, tenant=self.tenant)
+        policy.roles.add(role)
+        access = IdentityHeaderMiddleware._get_access_for_user("test_user", self.tenant)
+        self.assertEqual({"read": ["*"], "write": []}, access["principal"])
+        self.assertEqual({"read": [], "write": []}, access["group"])
+
+    @patch("management.cache.AccessCache.save_access_map")
+    @patch("management.cache.AccessCache.get_access_map")
+    def test_access_map_is_cached(self, get_access_map, save_access_map):
+        """Test the access map is served from the access cache, and saved to it on a miss."""
+        principal = Principal.objects.create(username="test_user", tenant=self.tenant)
+        cached = {"group": {"read": ["*"], "write": []}}
+        get_access_map.return_value = cached
+        with self.assertNumQueries(1):
+            self.assertEqual(cached, IdentityHeaderMiddleware._get_access_for_user("test_user", self.tenant))
+        save_access_map.assert_not_called()
+
+        get_access_map.return_value = None
+        access = IdentityHeaderMiddleware._get_access_for_user("test_user", self.tenant)
+        get_access_map.assert_called_with(principal.uuid)
+        save_access_map.assert_called_once_with(principal.uuid, access)
+
+    @patch("management.cache.AccessCache.get_access_map")
+    @patch("rbac.middleware.PRINCIPALS")
+    def test_cached_access_map_of_cached_principal(self, principals, get_access_map):
+        """Test the access map of a cached principal is served without any query."""
+        principal = Principal.objects.create(username="test_user", tenant=self.tenant)
+        principals.get_principal.return_value = None
+        IdentityHeaderMiddleware._get_access_for_user("test_user", self.tenant)
+        principals.cache_principal.assert_called_once_with(org_id=self.tenant.org_id, principal=principal)
+
+        cached = {"group": {"read": ["*"], "write": []}}
+        get_access_map.return_value = cached
+        principals.get_principal.return_value = principal
+        with self.assertNumQueries(0):
+            self.assertEqual(cached, IdentityHeaderMiddleware._get_access_for_user("test_user", self.tenant))
+        principals.get_principal.assert_called_with(self.tenant.org_id, "test_user")
+        get_access_map.assert_called_with(principal.uuid)
+
 
 class RBACReadOnlyApiMiddleware(IdentityRequest):
     """Tests against the read-only API middleware."""